@@ -0,0 +1 @@
+"""Benchmarks and the in-process fake mail servers they run against."""
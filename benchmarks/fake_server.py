@@ -0,0 +1,1305 @@
+"""In-process fake IMAP4rev1 and SMTP servers for integration tests and benchmarks.
+
+The servers speak enough of RFC 3501 (plus BINARY, ID, IDLE, UIDPLUS, MOVE, SORT,
+ESEARCH, ESORT and SPECIAL-USE) and RFC 5321 for EmailClient to run unmodified against
+them over a real socket. Mailboxes can be seeded with synthetic messages that
+are generated from their UID on demand, so a million-message mailbox only
+costs its UID list. Every command is counted as a round trip and can be
+delayed to simulate network latency.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import bisect
+import re
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from email import message_from_bytes
+from email.message import Message
+from email.parser import BytesHeaderParser
+from email.policy import compat32
+from email.utils import collapse_rfc2231_value, format_datetime, getaddresses, parsedate_to_datetime
+
+DEFAULT_CAPABILITIES = (
+    "IMAP4rev1",
+    "BINARY",
+    "ID",
+    "IDLE",
+    "UIDPLUS",
+    "MOVE",
+    "SORT",
+    "ESEARCH",
+    "ESORT",
+    "CONTEXT=SEARCH",
+    "CONTEXT=SORT",
+    "SPECIAL-USE",
+)
+# A plain RFC 3501 server, for measuring the fallback paths
+BASIC_CAPABILITIES = ("IMAP4rev1",)
+
+_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+_SYSTEM_FLAGS = ("\\Answered", "\\Flagged", "\\Deleted", "\\Seen", "\\Draft")
+
+
+class SyntheticMessages:
+    """Deterministic plain-text messages derived from their UID.
+
+    Message N is dated N minutes after ``start``; every second one is \\Seen.
+    """
+
+    def __init__(self, mailbox: str, body_size: int = 2048, start: datetime = _EPOCH):
+        self.tag = re.sub(r"[^A-Za-z0-9]+", "-", mailbox).strip("-").lower() or "mailbox"
+        self.body_size = body_size
+        self.start = start
+
+    def date(self, uid: int) -> datetime:
+        return self.start + timedelta(minutes=uid)
+
+    def flags(self, uid: int) -> set[str]:
+        return {"\\Seen"} if uid % 2 == 0 else set()
+
+    def message(self, uid: int) -> bytes:
+        line = f"Synthetic body text for message {uid}. "
+        text = (line * (self.body_size // len(line) + 1))[: self.body_size]
+        body = "\r\n".join(text[i : i + 76] for i in range(0, len(text), 76))
+        sender = uid % 97
+        return (
+            f"From: Sender {sender} <sender{sender}@example.com>\r\n"
+            "To: user@example.com\r\n"
+            f"Subject: Synthetic message {uid}\r\n"
+            f"Date: {format_datetime(self.date(uid))}\r\n"
+            f"Message-ID: <{uid}.{self.tag}@fake.example.com>\r\n"
+            "MIME-Version: 1.0\r\n"
+            'Content-Type: text/plain; charset="utf-8"\r\n'
+            "\r\n"
+            f"{body}\r\n"
+        ).encode()
+
+
+class FakeMailbox:
+    """One mailbox: an ascending UID list plus sparse per-message state."""
+
+    def __init__(self, name: str, uidvalidity: int, special_use: str | None = None):
+        self.name = name
+        self.uidvalidity = uidvalidity
+        self.special_use = special_use
+        self.uids: list[int] = []
+        self.uidnext = 1
+        self._raw: dict[int, bytes] = {}
+        self._dates: dict[int, datetime] = {}
+        self._flags: dict[int, set[str]] = {}
+        self._synthetic: SyntheticMessages | None = None
+        # Sessions in IDLE, called with each untagged response a change produces
+        self.listeners: set[Callable[[str], None]] = set()
+
+    def _notify(self, *lines: str) -> None:
+        for listener in list(self.listeners):
+            for line in lines:
+                listener(line)
+
+    def __len__(self) -> int:
+        return len(self.uids)
+
+    def seed(self, count: int, body_size: int = 2048) -> None:
+        """Add ``count`` synthetic messages without materializing them."""
+        if self._synthetic is None:
+            self._synthetic = SyntheticMessages(self.name, body_size)
+        self.uids.extend(range(self.uidnext, self.uidnext + count))
+        self.uidnext += count
+        self._notify(f"{len(self)} EXISTS")
+
+    def add(self, raw: bytes, flags: set[str] | None = None, internaldate: datetime | None = None) -> int:
+        uid = self.uidnext
+        self.uidnext += 1
+        self.uids.append(uid)
+        self._raw[uid] = raw
+        self._flags[uid] = set(flags or ())
+        self._dates[uid] = internaldate or datetime.now(timezone.utc)
+        self._notify(f"{len(self)} EXISTS")
+        return uid
+
+    def raw(self, uid: int) -> bytes:
+        raw = self._raw.get(uid)
+        if raw is None:
+            raw = self._synthetic.message(uid) if self._synthetic else b""
+        return raw
+
+    def flags(self, uid: int) -> set[str]:
+        flags = self._flags.get(uid)
+        if flags is None:
+            flags = self._synthetic.flags(uid) if self._synthetic else set()
+        return flags
+
+    def set_flags(self, uid: int, flags: set[str]) -> None:
+        self._flags[uid] = flags
+        self._notify(f"{self.seq(uid)} FETCH (UID {uid} FLAGS ({' '.join(sorted(flags))}))")
+
+    def internaldate(self, uid: int) -> datetime:
+        internaldate = self._dates.get(uid)
+        if internaldate is None:
+            internaldate = self._synthetic.date(uid) if self._synthetic else _EPOCH
+        return internaldate
+
+    def sent_date(self, uid: int) -> datetime:
+        """The Date header, falling back to INTERNALDATE (RFC 5256 DATE sort key)."""
+        if uid not in self._raw:
+            return self.internaldate(uid)
+        try:
+            sent = parsedate_to_datetime(self.headers(uid).get("Date", ""))
+        except (TypeError, ValueError):
+            return self.internaldate(uid)
+        return sent if sent.tzinfo else sent.replace(tzinfo=timezone.utc)
+
+    def headers(self, uid: int) -> Message:
+        return BytesHeaderParser(policy=compat32).parsebytes(self.raw(uid))
+
+    def seq(self, uid: int) -> int:
+        """Sequence number of ``uid`` (which must exist)."""
+        return bisect.bisect_left(self.uids, uid) + 1
+
+    def select_uids(self, ranges: list[tuple[int, int]]) -> list[int]:
+        selected: set[int] = set()
+        for low, high in ranges:
+            selected.update(self.uids[bisect.bisect_left(self.uids, low) : bisect.bisect_right(self.uids, high)])
+        return sorted(selected)
+
+    def select_seqs(self, ranges: list[tuple[int, int]]) -> list[int]:
+        selected: set[int] = set()
+        for low, high in ranges:
+            selected.update(self.uids[max(low, 1) - 1 : high])
+        return sorted(selected)
+
+    def remove(self, uids: list[int]) -> list[int]:
+        """Expunge ``uids``; returns their sequence numbers, highest first."""
+        seqs = sorted((self.seq(uid) for uid in uids), reverse=True)
+        removed = set(uids)
+        self.uids = [uid for uid in self.uids if uid not in removed]
+        for uid in removed:
+            self._raw.pop(uid, None)
+            self._dates.pop(uid, None)
+            self._flags.pop(uid, None)
+        self._notify(*(f"{seq} EXPUNGE" for seq in seqs))
+        return seqs
+
+
+class FakeMailStore:
+    """Mailboxes shared by all sessions of a FakeIMAPServer."""
+
+    def __init__(self, delimiter: str = "/"):
+        self.delimiter = delimiter
+        self.mailboxes: dict[str, FakeMailbox] = {}
+        self._next_uidvalidity = 1
+        self.create("INBOX")
+        self.create("Sent", special_use="\\Sent")
+        self.create("Trash", special_use="\\Trash")
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return "INBOX" if name.upper() == "INBOX" else name
+
+    def get(self, name: str) -> FakeMailbox | None:
+        return self.mailboxes.get(self._key(name))
+
+    def __getitem__(self, name: str) -> FakeMailbox:
+        return self.mailboxes[self._key(name)]
+
+    def create(self, name: str, special_use: str | None = None) -> FakeMailbox:
+        mailbox = FakeMailbox(self._key(name), self._next_uidvalidity, special_use)
+        self._next_uidvalidity += 1
+        self.mailboxes[mailbox.name] = mailbox
+        return mailbox
+
+    def delete(self, name: str) -> None:
+        del self.mailboxes[self._key(name)]
+
+    def rename(self, old: str, new: str) -> None:
+        mailbox = self.mailboxes.pop(self._key(old))
+        mailbox.name = new
+        self.mailboxes[new] = mailbox
+
+    def seed(self, mailbox: str, count: int, body_size: int = 2048) -> FakeMailbox:
+        target = self.get(mailbox) or self.create(mailbox)
+        target.seed(count, body_size)
+        return target
+
+
+class _Literal(bytes):
+    """Literal data sent by the client, as opposed to atoms and quoted strings."""
+
+
+_LITERAL_RE = re.compile(rb"\{(\d+)(\+?)\}\r\n$")
+_ATOM_RE = re.compile(r'[^\s()"\[]*(?:\[[^\]]*\][^\s()"\[]*)*')
+
+
+def _read_quoted(text: str, start: int) -> tuple[str, int]:
+    """Read the quoted string at ``text[start]``; returns (value, index after the closing quote)."""
+    value = []
+    i = start + 1
+    while i < len(text) and text[i] != '"':
+        if text[i] == "\\" and i + 1 < len(text):
+            i += 1
+        value.append(text[i])
+        i += 1
+    return "".join(value), i + 1
+
+
+def _tokenize(segments: list[bytes]) -> list:
+    """Split a command into atoms, strings, literals and nested parenthesized lists."""
+    root: list = []
+    stack = [root]
+    for segment in segments:
+        if isinstance(segment, _Literal):
+            stack[-1].append(bytes(segment))
+            continue
+        text = segment.decode("utf-8", errors="replace")
+        i = 0
+        while i < len(text):
+            char = text[i]
+            if char == " ":
+                i += 1
+            elif char == "(":
+                nested: list = []
+                stack[-1].append(nested)
+                stack.append(nested)
+                i += 1
+            elif char == ")":
+                if len(stack) > 1:
+                    stack.pop()
+                i += 1
+            elif char == '"':
+                value, i = _read_quoted(text, i)
+                stack[-1].append(value)
+            else:
+                end = _ATOM_RE.match(text, i).end()
+                if end == i:
+                    end = i + 1
+                stack[-1].append(text[i:end])
+                i = end
+    return root
+
+
+def _parse_ranges(sequence_set: str, largest: int) -> list[tuple[int, int]]:
+    """Parse ``"1:3,5,7:*"`` into inclusive (low, high) ranges."""
+    ranges = []
+    for part in sequence_set.split(","):
+        first, _, last = part.partition(":")
+        low = largest if first == "*" else int(first)
+        high = low if not last else (largest if last == "*" else int(last))
+        ranges.append((min(low, high), max(low, high)))
+    return ranges
+
+
+def format_sequence_set(values: list[int], keep_order: bool = False) -> str:
+    """Compress numbers into a sequence set; ``keep_order`` also emits descending runs."""
+    if not keep_order:
+        values = sorted(set(values))
+    runs: list[list[int]] = []  # [first, last, step]
+    for value in values:
+        if runs:
+            first, last, step = runs[-1]
+            if step == 0 and (value - last == 1 or (keep_order and value - last == -1)):
+                runs[-1] = [first, value, value - last]
+                continue
+            if step != 0 and value - last == step:
+                runs[-1][1] = value
+                continue
+        runs.append([value, value, 0])
+    return ",".join(str(first) if first == last else f"{first}:{last}" for first, last, _ in runs)
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _literal(data: bytes) -> bytes:
+    return b"{%d}\r\n" % len(data) + data
+
+
+def _imap_date(value: str) -> date:
+    return datetime.strptime(value.title(), "%d-%b-%Y").date()
+
+
+def _split_message(raw: bytes) -> tuple[bytes, bytes]:
+    """Split into (header block including the blank line, body)."""
+    for separator in (b"\r\n\r\n", b"\n\n"):
+        index = raw.find(separator)
+        if index != -1:
+            return raw[: index + len(separator)], raw[index + len(separator) :]
+    return raw, b""
+
+
+def _header_fields(header: bytes, names: list[str], exclude: bool) -> bytes:
+    wanted = {name.upper() for name in names}
+    kept: list[bytes] = []
+    keep = False
+    for line in header.splitlines(keepends=True):
+        if line in (b"\r\n", b"\n"):
+            break
+        if line[:1] in (b" ", b"\t"):
+            if keep:
+                kept.append(line)
+            continue
+        name = line.split(b":", 1)[0].decode("ascii", errors="replace").strip().upper()
+        keep = (name in wanted) != exclude
+        if keep:
+            kept.append(line)
+    return b"".join(kept) + b"\r\n"
+
+
+def _message_part(raw: bytes, path: list[int]) -> Message | None:
+    part: Message = message_from_bytes(raw, policy=compat32)
+    for number in path:
+        if part.is_multipart():
+            payload = part.get_payload()
+            if number < 1 or number > len(payload):
+                return None
+            part = payload[number - 1]
+        elif number != 1:
+            return None
+        if part.get_content_type() == "message/rfc822" and number != path[-1]:
+            part = part.get_payload(0)
+    return part
+
+
+def _section(raw: bytes, section: str) -> bytes:
+    """Return the octets for a BODY[section] fetch (RFC 3501 6.4.5)."""
+    spec = section.upper()
+    path: list[int] = []
+    while spec and spec.split(".", 1)[0].isdigit():
+        number, _, spec = spec.partition(".")
+        path.append(int(number))
+    if path:
+        part = _message_part(raw, path)
+        if part is None:
+            return b""
+        part_raw = part.as_bytes()
+        if not spec:
+            return _split_message(part_raw)[1]
+        if spec == "MIME":
+            return _split_message(part_raw)[0]
+        # HEADER/TEXT of an attached message/rfc822 part
+        raw = part.get_payload(0).as_bytes() if part.get_content_type() == "message/rfc822" else part_raw
+    header, body = _split_message(raw)
+    if not spec:
+        return raw
+    if spec == "HEADER":
+        return header
+    if spec == "TEXT":
+        return body
+    match = re.match(r"HEADER\.FIELDS(\.NOT)?\s*\((.*)\)", spec)
+    if match:
+        return _header_fields(header, match.group(2).split(), exclude=bool(match.group(1)))
+    raise ValueError(f"Unsupported section {section}")
+
+
+def _binary(raw: bytes, section: str) -> bytes:
+    """Return the octets for a BINARY[section] fetch: the part without its transfer encoding (RFC 3516)."""
+    if not re.fullmatch(r"\d+(\.\d+)*", section):
+        return _section(raw, section)
+    part = _message_part(raw, [int(number) for number in section.split(".")])
+    if part is None:
+        return b""
+    if part.is_multipart():
+        return _section(raw, section)
+    return part.get_payload(decode=True) or b""
+
+
+def _nstring(value: str | None) -> bytes:
+    if value is None:
+        return b"NIL"
+    data = value.encode("utf-8", errors="surrogateescape")
+    if any(byte > 0x7F or byte in b'"\\\r\n' for byte in data):
+        return _literal(data)
+    return b'"' + data + b'"'
+
+
+def _unfold(value: str | None) -> str | None:
+    return re.sub(r"\r?\n(?=[ \t])", "", str(value)) if value is not None else None
+
+
+def _addresses(message: Message, name: str, fallback: str | None = None) -> bytes:
+    values = message.get_all(name) or (message.get_all(fallback) if fallback else None)
+    if not values:
+        return b"NIL"
+    addresses = []
+    for display, address in getaddresses([_unfold(value) for value in values]):
+        mailbox, _, host = address.rpartition("@") if "@" in address else (address, "", "")
+        fields = [_nstring(display or None), b"NIL", _nstring(mailbox), _nstring(host)]
+        addresses.append(b"(" + b" ".join(fields) + b")")
+    return b"(" + b"".join(addresses) + b")"
+
+
+def _envelope(message: Message) -> bytes:
+    """ENVELOPE structure of a message (RFC 3501 7.4.2), with header values passed through."""
+    fields = [
+        _nstring(_unfold(message.get("Date"))),
+        _nstring(_unfold(message.get("Subject"))),
+        _addresses(message, "From"),
+        _addresses(message, "Sender", fallback="From"),
+        _addresses(message, "Reply-To", fallback="From"),
+        _addresses(message, "To"),
+        _addresses(message, "Cc"),
+        _addresses(message, "Bcc"),
+        _nstring(_unfold(message.get("In-Reply-To"))),
+        _nstring(_unfold(message.get("Message-ID"))),
+    ]
+    return b"(" + b" ".join(fields) + b")"
+
+
+def _parameters(part: Message, header: str = "content-type") -> bytes:
+    params = part.get_params(header=header) or []
+    pairs = [_nstring(key.upper()) + b" " + _nstring(collapse_rfc2231_value(value)) for key, value in params[1:]]
+    return b"(" + b" ".join(pairs) + b")" if pairs else b"NIL"
+
+
+def _disposition(part: Message) -> bytes:
+    disposition = part.get_content_disposition()
+    if disposition is None:
+        return b"NIL"
+    return b"(" + _nstring(disposition.upper()) + b" " + _parameters(part, "content-disposition") + b")"
+
+
+def _body_structure(part: Message) -> bytes:
+    """Extensible BODYSTRUCTURE of a MIME entity (RFC 3501 7.4.2)."""
+    if part.get_content_maintype() == "multipart":
+        children = b"".join(_body_structure(child) for child in part.get_payload())
+        subtype = _nstring(part.get_content_subtype().upper())
+        return b"(" + b" ".join([children, subtype, _parameters(part), _disposition(part), b"NIL", b"NIL"]) + b")"
+    body = _split_message(part.as_bytes())[1]
+    fields = [
+        _nstring(part.get_content_maintype().upper()),
+        _nstring(part.get_content_subtype().upper()),
+        _parameters(part),
+        _nstring(part.get("Content-ID")),
+        _nstring(part.get("Content-Description")),
+        _nstring(str(part.get("Content-Transfer-Encoding", "7BIT")).upper()),
+        b"%d" % len(body),
+    ]
+    if part.get_content_maintype() == "text":
+        fields.append(b"%d" % body.count(b"\n"))
+    elif part.get_content_type() == "message/rfc822":
+        attached = part.get_payload(0)
+        fields += [_envelope(attached), _body_structure(attached), b"%d" % body.count(b"\n")]
+    fields += [b"NIL", _disposition(part), b"NIL", b"NIL"]
+    return b"(" + b" ".join(fields) + b")"
+
+
+_STRUCTURE_ITEMS: dict[str, Callable[[Message], bytes]] = {"ENVELOPE": _envelope, "BODYSTRUCTURE": _body_structure}
+_BODY_ITEM_RE = re.compile(
+    r"^(BODY\.PEEK|BODY|BINARY\.PEEK|BINARY)\[([^\]]*)\](?:<(\d+)(?:\.(\d+))?>)?$", re.IGNORECASE
+)
+_FETCH_MACROS = {
+    "ALL": ["FLAGS", "INTERNALDATE", "RFC822.SIZE", "ENVELOPE"],
+    "FAST": ["FLAGS", "INTERNALDATE", "RFC822.SIZE"],
+}
+_FLAG_KEYS = {
+    "SEEN": ("\\Seen", True),
+    "UNSEEN": ("\\Seen", False),
+    "FLAGGED": ("\\Flagged", True),
+    "UNFLAGGED": ("\\Flagged", False),
+    "ANSWERED": ("\\Answered", True),
+    "UNANSWERED": ("\\Answered", False),
+    "DELETED": ("\\Deleted", True),
+    "UNDELETED": ("\\Deleted", False),
+    "DRAFT": ("\\Draft", True),
+    "UNDRAFT": ("\\Draft", False),
+}
+
+SearchPredicate = Callable[[FakeMailbox, int, int], bool]
+
+
+def _always(mailbox: FakeMailbox, seq: int, uid: int) -> bool:
+    return True
+
+
+def _compile_search(keys: list) -> SearchPredicate | None:
+    """Compile SEARCH keys into a predicate over (mailbox, seq, uid); None means ALL."""
+    tokens = iter(keys)
+    predicates = [p for p in (_compile_key(key, tokens) for key in tokens) if p is not None]
+    if not predicates:
+        return None
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda mailbox, seq, uid: all(p(mailbox, seq, uid) for p in predicates)
+
+
+def _header_contains(field_name: str, value: str) -> SearchPredicate:
+    value = value.lower()
+    return lambda mailbox, seq, uid: value in str(mailbox.headers(uid).get(field_name, "")).lower()
+
+
+def _compile_key(key: str | list, tokens) -> SearchPredicate | None:  # noqa: C901
+    if isinstance(key, list):
+        return _compile_search(key) or _always
+    name = key.upper()
+    if name == "ALL":
+        return None
+    if name in _FLAG_KEYS:
+        flag, present = _FLAG_KEYS[name]
+        return lambda mailbox, seq, uid: (flag in mailbox.flags(uid)) == present
+    if name in ("KEYWORD", "UNKEYWORD"):
+        keyword, present = next(tokens), name == "KEYWORD"
+        return lambda mailbox, seq, uid: (keyword in mailbox.flags(uid)) == present
+    if name in ("NEW", "RECENT"):
+        return lambda mailbox, seq, uid: False
+    if name == "OLD":
+        return None
+    if name == "NOT":
+        inner = _compile_key(next(tokens), tokens) or _always
+        return lambda mailbox, seq, uid: not inner(mailbox, seq, uid)
+    if name == "OR":
+        left = _compile_key(next(tokens), tokens) or _always
+        right = _compile_key(next(tokens), tokens) or _always
+        return lambda mailbox, seq, uid: left(mailbox, seq, uid) or right(mailbox, seq, uid)
+    if name in ("BEFORE", "ON", "SINCE", "SENTBEFORE", "SENTON", "SENTSINCE"):
+        day = _imap_date(next(tokens))
+        sent = name.startswith("SENT")
+        compare = {"BEFORE": day.__gt__, "ON": day.__eq__, "SINCE": day.__le__}[name.removeprefix("SENT")]
+
+        def by_date(mailbox: FakeMailbox, seq: int, uid: int) -> bool:
+            moment = mailbox.sent_date(uid) if sent else mailbox.internaldate(uid)
+            return compare(moment.date())
+
+        return by_date
+    if name in ("SUBJECT", "FROM", "TO", "CC", "BCC"):
+        return _header_contains(name, next(tokens))
+    if name == "HEADER":
+        field_name = next(tokens)
+        return _header_contains(field_name, next(tokens))
+    if name in ("BODY", "TEXT"):
+        needle = next(tokens).lower().encode()
+        if name == "BODY":
+            return lambda mailbox, seq, uid: needle in _split_message(mailbox.raw(uid))[1].lower()
+        return lambda mailbox, seq, uid: needle in mailbox.raw(uid).lower()
+    if name in ("LARGER", "SMALLER"):
+        size = int(next(tokens))
+        if name == "LARGER":
+            return lambda mailbox, seq, uid: len(mailbox.raw(uid)) > size
+        return lambda mailbox, seq, uid: len(mailbox.raw(uid)) < size
+    if name == "UID":
+        sequence_set = next(tokens)
+        return lambda mailbox, seq, uid: any(
+            low <= uid <= high for low, high in _parse_ranges(sequence_set, mailbox.uidnext - 1)
+        )
+    if name[0].isdigit() or name[0] == "*":
+        return lambda mailbox, seq, uid: any(low <= seq <= high for low, high in _parse_ranges(key, len(mailbox)))
+    raise ValueError(f"Unsupported search key {key}")
+
+
+def _first_address(value: str) -> str:
+    addresses = getaddresses([value])
+    return addresses[0][1].lower() if addresses else ""
+
+
+def _sort_key(name: str, mailbox: FakeMailbox) -> Callable[[int], object]:
+    if name == "DATE":
+        return mailbox.sent_date
+    if name == "ARRIVAL":
+        return mailbox.internaldate
+    if name == "SIZE":
+        return lambda uid: len(mailbox.raw(uid))
+    if name == "SUBJECT":
+        return lambda uid: re.sub(
+            r"^(\s*(re|fwd?)\s*:\s*)+", "", str(mailbox.headers(uid).get("Subject", "")), flags=re.I
+        ).lower()
+    if name in ("FROM", "TO", "CC"):
+        return lambda uid: _first_address(str(mailbox.headers(uid).get(name, "")))
+    raise ValueError(f"Unsupported sort key {name}")
+
+
+@dataclass
+class _Command:
+    tag: str
+    name: str
+    args: list
+
+
+class _CommandError(Exception):
+    """Ends a command with a tagged NO or BAD."""
+
+    def __init__(self, status: str, text: str):
+        super().__init__(text)
+        self.status = status
+        self.text = text
+
+
+class _IMAPSession:
+    """One client connection to the fake IMAP server."""
+
+    def __init__(self, server: FakeIMAPServer, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.authenticated = False
+        self.mailbox: FakeMailbox | None = None
+        self.readonly = False
+
+    @property
+    def store(self) -> FakeMailStore:
+        return self.server.store
+
+    def _send(self, line: str | bytes) -> None:
+        if isinstance(line, str):
+            line = line.encode()
+        self.writer.write(line + b"\r\n")
+
+    def _untagged(self, line: str | bytes) -> None:
+        self._send((b"* " if isinstance(line, bytes) else "* ") + line)
+
+    async def run(self) -> None:
+        self._untagged(f"OK [CAPABILITY {' '.join(self.server.capabilities)}] Fake IMAP4rev1 server ready")
+        await self.writer.drain()
+        try:
+            while True:
+                command = await self._read_command()
+                if command is None:
+                    return
+                keep_open = await self._dispatch(command)
+                await self.writer.drain()
+                if not keep_open:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+
+    async def _read_command(self) -> _Command | None:
+        line = await self.reader.readuntil(b"\r\n")
+        segments: list[bytes] = []
+        while True:
+            match = _LITERAL_RE.search(line)
+            if not match:
+                segments.append(line[:-2])
+                break
+            segments.append(line[: match.start()])
+            if not match.group(2):
+                # Synchronizing literal: the client waits for this before sending the data
+                self.server.round_trips += 1
+                await self.server.delay()
+                self._send("+ Ready for literal data")
+                await self.writer.drain()
+            segments.append(_Literal(await self.reader.readexactly(int(match.group(1)))))
+            line = await self.reader.readuntil(b"\r\n")
+        tokens = _tokenize(segments)
+        if len(tokens) < 2 or not isinstance(tokens[0], str) or not isinstance(tokens[1], str):
+            self._send("* BAD Invalid command")
+            return _Command(tag="*", name="", args=[])
+        return _Command(tag=tokens[0], name=tokens[1].upper(), args=tokens[2:])
+
+    async def _dispatch(self, command: _Command) -> bool:
+        """Run one command; returns False once the connection should close."""
+        if not command.name:
+            return True
+        name = command.name
+        if name == "UID" and command.args and isinstance(command.args[0], str):
+            name = f"UID {command.args[0].upper()}"
+        self.server.commands[name] += 1
+        self.server.round_trips += 1
+        await self.server.delay()
+
+        handler = getattr(self, f"_cmd_{name.lower().replace(' ', '_')}", None)
+        if handler is None:
+            self._send(f"{command.tag} BAD Unknown command {name}")
+            return True
+        if name not in ("CAPABILITY", "NOOP", "LOGOUT", "LOGIN", "ID") and not self.authenticated:
+            self._send(f"{command.tag} NO Not authenticated")
+            return True
+        try:
+            text = handler(command)
+            if asyncio.iscoroutine(text):
+                text = await text
+        except _CommandError as e:
+            self._send(f"{command.tag} {e.status} {e.text}")
+            return True
+        except (ValueError, IndexError, KeyError, TypeError) as e:
+            self._send(f"{command.tag} BAD {e}")
+            return True
+        self._send(f"{command.tag} OK {text}")
+        return name != "LOGOUT"
+
+    def _selected(self) -> FakeMailbox:
+        if self.mailbox is None:
+            raise _CommandError("BAD", "No mailbox selected")
+        return self.mailbox
+
+    def _writable(self) -> FakeMailbox:
+        mailbox = self._selected()
+        if self.readonly:
+            raise _CommandError("NO", "Mailbox is read-only")
+        return mailbox
+
+    def _mailbox(self, name: str) -> FakeMailbox:
+        mailbox = self.store.get(name)
+        if mailbox is None:
+            raise _CommandError("NO", f"[TRYCREATE] Mailbox {name} does not exist")
+        return mailbox
+
+    # Any state
+
+    def _cmd_capability(self, command: _Command) -> str:
+        self._untagged(f"CAPABILITY {' '.join(self.server.capabilities)}")
+        return "CAPABILITY completed"
+
+    def _cmd_noop(self, command: _Command) -> str:
+        return "NOOP completed"
+
+    def _cmd_logout(self, command: _Command) -> str:
+        self._untagged("BYE Fake IMAP4rev1 server logging out")
+        return "LOGOUT completed"
+
+    def _cmd_id(self, command: _Command) -> str:
+        self._untagged('ID ("name" "fake-imap")')
+        return "ID completed"
+
+    def _cmd_login(self, command: _Command) -> str:
+        user_name, password = command.args[0], command.args[1]
+        if (user_name, password) != (self.server.user_name, self.server.password):
+            raise _CommandError("NO", "[AUTHENTICATIONFAILED] Invalid credentials")
+        self.authenticated = True
+        self.server.logins += 1
+        return f"[CAPABILITY {' '.join(self.server.capabilities)}] LOGIN completed"
+
+    # Authenticated state
+
+    def _cmd_select(self, command: _Command, readonly: bool = False) -> str:
+        self.mailbox = None
+        mailbox = self.store.get(command.args[0])
+        if mailbox is None:
+            raise _CommandError("NO", "[NONEXISTENT] No such mailbox")
+        self.mailbox, self.readonly = mailbox, readonly
+        self._untagged(f"FLAGS ({' '.join(_SYSTEM_FLAGS)})")
+        self._untagged(f"{len(mailbox)} EXISTS")
+        self._untagged("0 RECENT")
+        self._untagged(f"OK [UIDVALIDITY {mailbox.uidvalidity}] UIDs valid")
+        self._untagged(f"OK [UIDNEXT {mailbox.uidnext}] Predicted next UID")
+        return f"[{'READ-ONLY' if readonly else 'READ-WRITE'}] {command.name} completed"
+
+    def _cmd_examine(self, command: _Command) -> str:
+        return self._cmd_select(command, readonly=True)
+
+    async def _cmd_idle(self, command: _Command) -> str:
+        """Push changes to the selected mailbox until the client sends DONE (RFC 2177)."""
+        mailbox = self._selected()
+        pushed: asyncio.Queue[str] = asyncio.Queue()
+        mailbox.listeners.add(pushed.put_nowait)
+        self._send("+ idling")
+        await self.writer.drain()
+        done = asyncio.ensure_future(self.reader.readuntil(b"\r\n"))
+        try:
+            while not done.done():
+                push = asyncio.ensure_future(pushed.get())
+                await asyncio.wait({done, push}, return_when=asyncio.FIRST_COMPLETED)
+                if push.done():
+                    self._untagged(push.result())
+                    await self.writer.drain()
+                else:
+                    push.cancel()
+        finally:
+            mailbox.listeners.discard(pushed.put_nowait)
+            done.cancel()
+        if done.result().strip().upper() != b"DONE":
+            raise _CommandError("BAD", "Expected DONE")
+        return "IDLE terminated"
+
+    def _cmd_close(self, command: _Command) -> str:
+        mailbox = self._selected()
+        if not self.readonly:
+            mailbox.remove([uid for uid in mailbox.uids if "\\Deleted" in mailbox.flags(uid)])
+        self.mailbox = None
+        return "CLOSE completed"
+
+    def _cmd_unselect(self, command: _Command) -> str:
+        self._selected()
+        self.mailbox = None
+        return "UNSELECT completed"
+
+    def _cmd_list(self, command: _Command) -> str:
+        reference, pattern = command.args[0], command.args[1]
+        delimiter = re.escape(self.store.delimiter)
+        regex = "".join(
+            ".*" if char == "*" else f"[^{delimiter}]*" if char == "%" else re.escape(char)
+            for char in reference + pattern
+        )
+        names = list(self.store.mailboxes)
+        for name in names:
+            if not re.fullmatch(regex, name, flags=re.IGNORECASE if name == "INBOX" else 0):
+                continue
+            mailbox = self.store.mailboxes[name]
+            children = any(other.startswith(name + self.store.delimiter) for other in names)
+            attributes = ["\\HasChildren" if children else "\\HasNoChildren"]
+            if mailbox.special_use and "SPECIAL-USE" in self.server.capabilities:
+                attributes.append(mailbox.special_use)
+            self._untagged(f"{command.name} ({' '.join(attributes)}) {_quote(self.store.delimiter)} {_quote(name)}")
+        return f"{command.name} completed"
+
+    _cmd_lsub = _cmd_list
+
+    def _cmd_status(self, command: _Command) -> str:
+        mailbox = self._mailbox(command.args[0])
+        values = {
+            "MESSAGES": len(mailbox),
+            "UIDNEXT": mailbox.uidnext,
+            "UIDVALIDITY": mailbox.uidvalidity,
+            "UNSEEN": sum(1 for uid in mailbox.uids if "\\Seen" not in mailbox.flags(uid)),
+            "RECENT": 0,
+        }
+        items = " ".join(f"{item.upper()} {values[item.upper()]}" for item in command.args[1])
+        self._untagged(f"STATUS {_quote(mailbox.name)} ({items})")
+        return "STATUS completed"
+
+    def _cmd_create(self, command: _Command) -> str:
+        name = command.args[0].rstrip(self.store.delimiter)
+        if self.store.get(name) is not None:
+            raise _CommandError("NO", "[ALREADYEXISTS] Mailbox already exists")
+        self.store.create(name)
+        return "CREATE completed"
+
+    def _cmd_delete(self, command: _Command) -> str:
+        name = command.args[0]
+        if name.upper() == "INBOX":
+            raise _CommandError("NO", "Cannot delete INBOX")
+        self._mailbox(name)
+        self.store.delete(name)
+        return "DELETE completed"
+
+    def _cmd_rename(self, command: _Command) -> str:
+        old, new = command.args[0], command.args[1]
+        self._mailbox(old)
+        if self.store.get(new) is not None:
+            raise _CommandError("NO", "[ALREADYEXISTS] Mailbox already exists")
+        self.store.rename(old, new)
+        return "RENAME completed"
+
+    def _cmd_append(self, command: _Command) -> str:
+        mailbox = self._mailbox(command.args[0])
+        flags: set[str] = set()
+        internaldate = None
+        message = None
+        for arg in command.args[1:]:
+            if isinstance(arg, list):
+                flags = set(arg)
+            elif isinstance(arg, bytes):
+                message = arg
+            elif isinstance(arg, str):
+                internaldate = datetime.strptime(arg, "%d-%b-%Y %H:%M:%S %z")
+        if message is None:
+            raise _CommandError("BAD", "Missing message literal")
+        uid = mailbox.add(message, flags, internaldate)
+        return f"[APPENDUID {mailbox.uidvalidity} {uid}] APPEND completed"
+
+    # Selected state
+
+    def _cmd_expunge(self, command: _Command, uids: list[int] | None = None) -> str:
+        mailbox = self._writable()
+        candidates = mailbox.uids if uids is None else uids
+        for seq in mailbox.remove([uid for uid in candidates if "\\Deleted" in mailbox.flags(uid)]):
+            self._untagged(f"{seq} EXPUNGE")
+        return "EXPUNGE completed"
+
+    def _cmd_uid_expunge(self, command: _Command) -> str:
+        mailbox = self._selected()
+        uids = mailbox.select_uids(_parse_ranges(command.args[1], mailbox.uidnext - 1))
+        return self._cmd_expunge(command, uids)
+
+    def _messages(self, sequence_set: str, uid: bool) -> list[int]:
+        mailbox = self._selected()
+        if uid:
+            return mailbox.select_uids(_parse_ranges(sequence_set, mailbox.uids[-1] if mailbox.uids else 0))
+        return mailbox.select_seqs(_parse_ranges(sequence_set, len(mailbox)))
+
+    def _search(self, keys: list) -> list[int]:
+        """Matching UIDs in ascending order."""
+        mailbox = self._selected()
+        if keys and isinstance(keys[0], str) and keys[0].upper() == "CHARSET":
+            keys = keys[2:]
+        predicate = _compile_search(keys)
+        if predicate is None:
+            return list(mailbox.uids)
+        return [uid for seq, uid in enumerate(mailbox.uids, 1) if predicate(mailbox, seq, uid)]
+
+    @staticmethod
+    def _return_options(args: list) -> tuple[list[str] | None, list]:
+        """Split an ESEARCH ``RETURN (...)`` clause (RFC 4731) off the arguments."""
+        if args and isinstance(args[0], str) and args[0].upper() == "RETURN":
+            return [str(option) for option in args[1]], args[2:]
+        return None, args
+
+    def _esearch(self, tag: str, results: list[int], options: list[str], uid: bool, ordered: bool) -> None:
+        options = [option.upper() for option in options] or ["ALL"]
+        parts = [f"(TAG {_quote(tag)})"]
+        if uid:
+            parts.append("UID")
+        i = 0
+        while i < len(options):
+            option = options[i]
+            if option == "MIN" and results:
+                parts.append(f"MIN {min(results)}")
+            elif option == "MAX" and results:
+                parts.append(f"MAX {max(results)}")
+            elif option == "COUNT":
+                parts.append(f"COUNT {len(results)}")
+            elif option == "ALL" and results:
+                parts.append(f"ALL {format_sequence_set(results, keep_order=ordered)}")
+            elif option == "PARTIAL":
+                i += 1
+                window = options[i]
+                first, last = (int(n) for n in window.split(":"))
+                if first < 0:
+                    first, last = len(results) + first + 1, len(results) + last + 1
+                low, high = min(first, last), max(first, last)
+                page = results[max(low, 1) - 1 : max(high, 0)]
+                page_set = format_sequence_set(page, keep_order=ordered) if page else "NIL"
+                parts.append(f"PARTIAL ({window} {page_set})")
+            i += 1
+        self._untagged("ESEARCH " + " ".join(parts))
+
+    def _cmd_search(self, command: _Command, uid: bool = False) -> str:
+        options, keys = self._return_options(command.args)
+        uids = self._search(keys)
+        mailbox = self._selected()
+        results = uids if uid else [mailbox.seq(u) for u in uids]
+        if options is not None:
+            if "ESEARCH" not in self.server.capabilities:
+                raise _CommandError("BAD", "ESEARCH not supported")
+            self._esearch(command.tag, results, options, uid, ordered=False)
+        else:
+            self._untagged(" ".join(["SEARCH", *(str(r) for r in results)]))
+        return "SEARCH completed"
+
+    def _cmd_uid_search(self, command: _Command) -> str:
+        return self._cmd_search(_Command(command.tag, command.name, command.args[1:]), uid=True)
+
+    def _cmd_sort(self, command: _Command, uid: bool = False) -> str:
+        if "SORT" not in self.server.capabilities:
+            raise _CommandError("BAD", "SORT not supported")
+        options, args = self._return_options(command.args)
+        if options is not None and "ESORT" not in self.server.capabilities:
+            raise _CommandError("BAD", "ESORT not supported")
+        program, _charset, keys = args[0], args[1], args[2:]
+        mailbox = self._selected()
+        uids = self._search(keys)
+        criteria: list[tuple[bool, str]] = []
+        reverse = False
+        for item in program:
+            if item.upper() == "REVERSE":
+                reverse = True
+                continue
+            criteria.append((reverse, item.upper()))
+            reverse = False
+        for reverse, name in reversed(criteria):
+            uids.sort(key=_sort_key(name, mailbox), reverse=reverse)
+        results = uids if uid else [mailbox.seq(u) for u in uids]
+        if options is not None:
+            self._esearch(command.tag, results, options, uid, ordered=True)
+        else:
+            self._untagged(" ".join(["SORT", *(str(r) for r in results)]))
+        return "SORT completed"
+
+    def _cmd_uid_sort(self, command: _Command) -> str:
+        return self._cmd_sort(_Command(command.tag, command.name, command.args[1:]), uid=True)
+
+    def _fetch_item(self, mailbox: FakeMailbox, uid: int, item: str) -> bytes:  # noqa: C901
+        name = item.upper()
+        if name == "UID":
+            return b"UID %d" % uid
+        if name == "FLAGS":
+            return f"FLAGS ({' '.join(sorted(mailbox.flags(uid)))})".encode()
+        if name == "INTERNALDATE":
+            return f'INTERNALDATE "{mailbox.internaldate(uid).strftime("%d-%b-%Y %H:%M:%S %z")}"'.encode()
+        if name == "RFC822.SIZE":
+            return b"RFC822.SIZE %d" % len(mailbox.raw(uid))
+        if name in _STRUCTURE_ITEMS:
+            message = message_from_bytes(mailbox.raw(uid), policy=compat32)
+            return name.encode() + b" " + _STRUCTURE_ITEMS[name](message)
+        if name in ("RFC822", "RFC822.HEADER", "RFC822.TEXT"):
+            section = {"RFC822": "", "RFC822.HEADER": "HEADER", "RFC822.TEXT": "TEXT"}[name]
+            if name != "RFC822.HEADER":
+                self._mark_seen(mailbox, uid)
+            return name.encode() + b" " + _literal(_section(mailbox.raw(uid), section))
+        match = _BODY_ITEM_RE.match(item)
+        if not match:
+            raise ValueError(f"Unsupported fetch item {item}")
+        kind, section, start, count = match.groups()
+        if not kind.upper().endswith(".PEEK"):
+            self._mark_seen(mailbox, uid)
+        data = (_binary if kind.upper().startswith("BINARY") else _section)(mailbox.raw(uid), section)
+        label = f"{kind.upper().removesuffix('.PEEK')}[{section.upper()}]"
+        if start is not None:
+            data = data[int(start) : int(start) + int(count)] if count is not None else data[int(start) :]
+            label += f"<{start}>"
+        return label.encode() + b" " + _literal(data)
+
+    def _mark_seen(self, mailbox: FakeMailbox, uid: int) -> None:
+        if not self.readonly:
+            mailbox.set_flags(uid, mailbox.flags(uid) | {"\\Seen"})
+
+    def _cmd_fetch(self, command: _Command, uid: bool = False) -> str:
+        mailbox = self._selected()
+        sequence_set, items = command.args[0], command.args[1]
+        items = list(items) if isinstance(items, list) else list(_FETCH_MACROS.get(items.upper(), [items]))
+        if uid and "UID" not in (i.upper() for i in items):
+            items.insert(0, "UID")
+        for message_uid in self._messages(sequence_set, uid):
+            body = b" ".join(self._fetch_item(mailbox, message_uid, item) for item in items)
+            self._untagged(b"%d FETCH (" % mailbox.seq(message_uid) + body + b")")
+        return "FETCH completed"
+
+    def _cmd_uid_fetch(self, command: _Command) -> str:
+        return self._cmd_fetch(_Command(command.tag, command.name, command.args[1:]), uid=True)
+
+    def _cmd_store(self, command: _Command, uid: bool = False) -> str:
+        mailbox = self._writable()
+        sequence_set, operation = command.args[0], command.args[1].upper()
+        flag_args = command.args[2:]
+        flags = set(flag_args[0]) if len(flag_args) == 1 and isinstance(flag_args[0], list) else set(flag_args)
+        silent = operation.endswith(".SILENT")
+        operation = operation.removesuffix(".SILENT")
+        for message_uid in self._messages(sequence_set, uid):
+            current = mailbox.flags(message_uid)
+            if operation == "+FLAGS":
+                updated = current | flags
+            elif operation == "-FLAGS":
+                updated = current - flags
+            elif operation == "FLAGS":
+                updated = set(flags)
+            else:
+                raise _CommandError("BAD", f"Invalid STORE operation {operation}")
+            mailbox.set_flags(message_uid, updated)
+            if not silent:
+                items = f"FLAGS ({' '.join(sorted(updated))})"
+                if uid:
+                    items = f"UID {message_uid} {items}"
+                self._untagged(f"{mailbox.seq(message_uid)} FETCH ({items})")
+        return "STORE completed"
+
+    def _cmd_uid_store(self, command: _Command) -> str:
+        return self._cmd_store(_Command(command.tag, command.name, command.args[1:]), uid=True)
+
+    def _copy(self, command: _Command, uid: bool) -> tuple[FakeMailbox, list[int], str]:
+        source = self._selected()
+        destination = self._mailbox(command.args[1])
+        uids = self._messages(command.args[0], uid)
+        copied = [destination.add(source.raw(u), set(source.flags(u)), source.internaldate(u)) for u in uids]
+        if not uids or "UIDPLUS" not in self.server.capabilities:
+            return source, uids, ""
+        code = (
+            f"[COPYUID {destination.uidvalidity} {format_sequence_set(uids)} "
+            f"{format_sequence_set(copied, keep_order=True)}]"
+        )
+        return source, uids, code
+
+    def _cmd_copy(self, command: _Command, uid: bool = False) -> str:
+        _, _, code = self._copy(command, uid)
+        return f"{code} COPY completed".lstrip()
+
+    def _cmd_uid_copy(self, command: _Command) -> str:
+        return self._cmd_copy(_Command(command.tag, command.name, command.args[1:]), uid=True)
+
+    def _cmd_move(self, command: _Command, uid: bool = False) -> str:
+        if "MOVE" not in self.server.capabilities:
+            raise _CommandError("BAD", "MOVE not supported")
+        self._writable()
+        source, uids, code = self._copy(command, uid)
+        if code:
+            self._untagged(f"OK {code}")
+        for seq in source.remove(uids):
+            self._untagged(f"{seq} EXPUNGE")
+        return "MOVE completed"
+
+    def _cmd_uid_move(self, command: _Command) -> str:
+        return self._cmd_move(_Command(command.tag, command.name, command.args[1:]), uid=True)
+
+
+class FakeIMAPServer:
+    """A fake IMAP4rev1 server on 127.0.0.1, for use as an async context manager.
+
+    Args:
+        store: Mailboxes to serve; a new store with INBOX, Sent and Trash by default.
+        capabilities: Capabilities to advertise and honour.
+        latency: Seconds to wait before answering each command (one simulated round trip).
+    """
+
+    def __init__(
+        self,
+        store: FakeMailStore | None = None,
+        *,
+        capabilities: tuple[str, ...] = DEFAULT_CAPABILITIES,
+        latency: float = 0.0,
+        user_name: str = "user",
+        password: str = "password",  # noqa: S107
+    ):
+        self.store = store or FakeMailStore()
+        self.capabilities = capabilities
+        self.latency = latency
+        self.user_name = user_name
+        self.password = password
+        self.host = "127.0.0.1"
+        self.port = 0
+        self.commands: Counter[str] = Counter()
+        self.round_trips = 0
+        self.connections = 0
+        self.logins = 0
+        self._server: asyncio.Server | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    async def delay(self) -> None:
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+    def reset_stats(self) -> None:
+        self.commands.clear()
+        self.round_trips = self.connections = self.logins = 0
+
+    async def start(self) -> FakeIMAPServer:
+        self._server = await asyncio.start_server(self._handle, self.host, 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> FakeIMAPServer:
+        return await self.start()
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            await _IMAPSession(self, reader, writer).run()
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+@dataclass
+class SentMessage:
+    sender: str
+    recipients: list[str]
+    data: bytes
+
+
+class FakeSMTPServer:
+    """A fake ESMTP server on 127.0.0.1 that keeps what it receives in ``messages``.
+
+    Args:
+        latency: Seconds to wait before each reply (one simulated round trip).
+    """
+
+    def __init__(self, *, latency: float = 0.0, user_name: str = "user", password: str = "password"):  # noqa: S107
+        self.latency = latency
+        self.user_name = user_name
+        self.password = password
+        self.host = "127.0.0.1"
+        self.port = 0
+        self.messages: list[SentMessage] = []
+        self.commands: Counter[str] = Counter()
+        self.round_trips = 0
+        self.connections = 0
+        self._server: asyncio.Server | None = None
+
+    def reset_stats(self) -> None:
+        self.commands.clear()
+        self.round_trips = self.connections = 0
+
+    async def start(self) -> FakeSMTPServer:
+        self._server = await asyncio.start_server(self._handle, self.host, 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> FakeSMTPServer:
+        return await self.start()
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    async def _reply(self, writer: asyncio.StreamWriter, *lines: str) -> None:
+        self.round_trips += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        for i, line in enumerate(lines):
+            separator = " " if i == len(lines) - 1 else "-"
+            writer.write(f"{line[:3]}{separator}{line[4:]}\r\n".encode())
+        await writer.drain()
+
+    async def _read_line(self, reader: asyncio.StreamReader) -> str:
+        return (await reader.readuntil(b"\r\n"))[:-2].decode("utf-8", errors="replace")
+
+    def _check_plain(self, credentials: str) -> bool:
+        _, user_name, password = base64.b64decode(credentials).decode().split("\0")
+        return (user_name, password) == (self.user_name, self.password)
+
+    async def _auth(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, args: list[str]) -> bool:
+        mechanism = args[0].upper() if args else ""
+        if mechanism == "PLAIN":
+            if len(args) > 1:
+                return self._check_plain(args[1])
+            await self._reply(writer, "334 ")
+            return self._check_plain(await self._read_line(reader))
+        if mechanism == "LOGIN":
+            await self._reply(writer, "334 VXNlcm5hbWU6")
+            user_name = base64.b64decode(await self._read_line(reader)).decode()
+            await self._reply(writer, "334 UGFzc3dvcmQ6")
+            password = base64.b64decode(await self._read_line(reader)).decode()
+            return (user_name, password) == (self.user_name, self.password)
+        return False
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:  # noqa: C901
+        self.connections += 1
+        sender, recipients = "", []
+        try:
+            writer.write(b"220 fake.example.com ESMTP ready\r\n")
+            await writer.drain()
+            while True:
+                line = await self._read_line(reader)
+                verb, *args = line.split(" ")
+                verb = verb.upper()
+                self.commands[verb] += 1
+                if verb == "EHLO":
+                    await self._reply(
+                        writer, "250 fake.example.com", "250 AUTH PLAIN LOGIN", "250 8BITMIME", "250 SIZE 52428800"
+                    )
+                elif verb == "HELO":
+                    await self._reply(writer, "250 fake.example.com")
+                elif verb == "AUTH":
+                    ok = await self._auth(reader, writer, args)
+                    await self._reply(writer, "235 Authenticated" if ok else "535 Authentication failed")
+                elif verb == "MAIL":
+                    sender, recipients = line.split(":", 1)[1].split(">")[0].strip(" <"), []
+                    await self._reply(writer, "250 OK")
+                elif verb == "RCPT":
+                    recipients.append(line.split(":", 1)[1].split(">")[0].strip(" <"))
+                    await self._reply(writer, "250 OK")
+                elif verb == "DATA":
+                    await self._reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while (data_line := await reader.readuntil(b"\r\n")) != b".\r\n":
+                        lines.append(data_line[1:] if data_line.startswith(b".") else data_line)
+                    self.messages.append(SentMessage(sender, recipients, b"".join(lines)))
+                    await self._reply(writer, "250 Queued")
+                elif verb in ("RSET", "NOOP"):
+                    await self._reply(writer, "250 OK")
+                elif verb == "QUIT":
+                    await self._reply(writer, "221 Bye")
+                    return
+                else:
+                    await self._reply(writer, "502 Command not implemented")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+        finally:
+            writer.close()
@@ -0,0 +1,126 @@
+"""Microbenchmark of header parsing for list_emails_metadata pages.
+
+Parses pages of realistic header blocks (Received chains, DKIM signatures,
+encoded subjects and display names) into metadata twice: with the lean
+header extractor, and with the full ``BytesParser(policy=default)`` path it
+falls back to. Checks both give identical metadata before timing them.
+
+Usage::
+
+    python -m benchmarks.headers --headers 1000 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from unittest.mock import patch
+
+from mcp_email_server.emails.classic import _parse_header_blocks
+
+_NAMES = ("Jane Doe", "Doe, Jane", "Jörg Müller", "O'Brien", "李雷", "support")
+_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+_SUBJECTS = ("Quarterly report", "Re: Lunch?", "Réunion demain", "[list] Weekly digest #{n}", "Fwd: 請求書")
+
+
+def _encoded(text: str) -> str:
+    if text.isascii():
+        return text
+    return "=?utf-8?b?" + base64.b64encode(text.encode()).decode() + "?="
+
+
+def _mailbox(n: int) -> str:
+    name = _NAMES[n % len(_NAMES)]
+    address = f"user{n}@example{n % 7}.com"
+    if not name.isascii():
+        return f"{_encoded(name)} <{address}>"
+    if "," in name:
+        return f'"{name}" <{address}>'
+    return f"{name} <{address}>" if n % 3 else address
+
+
+def header_block(n: int) -> bytes:
+    """A header block as a mailing list or webmail server would deliver it."""
+    date = format_datetime(_START.replace(minute=n % 60))
+    lines = [
+        *(
+            f"Received: from mx{hop}.example.net (mx{hop}.example.net [192.0.2.{hop}])\r\n"
+            f"\tby mail.example.com with ESMTPS id {n:08x}{hop}; {date}"
+            for hop in range(3)
+        ),
+        "DKIM-Signature: v=1; a=rsa-sha256; c=relaxed/relaxed; d=example.net; s=selector;\r\n"
+        "\th=from:to:subject:date:message-id; bh=" + "A" * 44 + ";\r\n\tb=" + "B" * 340,
+        f"Message-ID: <{n}.{n * 7919}@mail.example.net>",
+        f"Date: {date}",
+        f"From: {_mailbox(n)}",
+        "To: " + ", ".join(_mailbox(n + i) for i in range(1, 2 + n % 3)),
+        *([f"Cc: {_mailbox(n + 5)},\r\n {_mailbox(n + 6)}"] if n % 2 else []),
+        f"Subject: {_encoded(_SUBJECTS[n % len(_SUBJECTS)].format(n=n))}",
+        "MIME-Version: 1.0",
+        'Content-Type: multipart/alternative; boundary="b1"',
+        "List-Unsubscribe: <mailto:leave@example.net>",
+    ]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+@dataclass
+class HeaderBenchmarkResult:
+    parser: str
+    headers: int
+    best_seconds: float
+    headers_per_second: float
+
+
+def _best_time(blocks: list[tuple[str, bytes]], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _parse_header_blocks(blocks)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(headers: int, repeat: int) -> list[HeaderBenchmarkResult]:
+    blocks = [(str(n), header_block(n)) for n in range(headers)]
+    with patch("mcp_email_server.emails.classic.header_values", return_value=None):
+        full = _parse_header_blocks(blocks)
+        full_seconds = _best_time(blocks, repeat)
+    if _parse_header_blocks(blocks) != full:
+        raise AssertionError("Lean header extraction differs from the full parser")
+    lean_seconds = _best_time(blocks, repeat)
+    return [
+        HeaderBenchmarkResult("email.parser (default policy)", headers, full_seconds, headers / full_seconds),
+        HeaderBenchmarkResult("lean extractor", headers, lean_seconds, headers / lean_seconds),
+    ]
+
+
+def format_results(results: list[HeaderBenchmarkResult]) -> str:
+    lines = [f"{'parser':<32}{'headers':>10}{'best ms':>12}{'headers/s':>14}"]
+    lines += [
+        f"{r.parser:<32}{r.headers:>10}{r.best_seconds * 1000:>12.1f}{r.headers_per_second:>14.0f}" for r in results
+    ]
+    lines.append(f"speedup: {results[0].best_seconds / results[1].best_seconds:.1f}x")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--headers", type=int, default=1000, help="header blocks per page")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per parser; the best one counts")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.headers, args.repeat)
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+    else:
+        print(format_results(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""Throughput benchmarks against the in-process fake IMAP and SMTP servers.
+
+Each scenario drives the ClassicEmailHandler that backs the MCP tools, so the
+numbers include parsing and connection handling, not just the wire protocol.
+Reports ops/sec, p50/p99 latency and round trips (IMAP commands, literal
+continuations and SMTP replies) per operation.
+
+Usage::
+
+    python -m benchmarks.run --messages 100000 --latency-ms 5
+    python -m benchmarks.run --capabilities basic --scenario list_emails_metadata
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from benchmarks.fake_server import (
+    BASIC_CAPABILITIES,
+    DEFAULT_CAPABILITIES,
+    FakeIMAPServer,
+    FakeMailStore,
+    FakeSMTPServer,
+)
+from mcp_email_server.config import EmailServer, EmailSettings, get_settings
+from mcp_email_server.emails.classic import ClassicEmailHandler
+from mcp_email_server.emails.pool import close_connection_pools
+
+CAPABILITY_PRESETS = {"full": DEFAULT_CAPABILITIES, "basic": BASIC_CAPABILITIES}
+LABEL = "Benchmark"
+
+
+@dataclass
+class BenchmarkResult:
+    scenario: str
+    operations: int
+    seconds: float
+    ops_per_second: float
+    p50_ms: float
+    p99_ms: float
+    round_trips_per_op: float
+    logins: int
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class BenchmarkContext:
+    """The fake servers, a handler pointed at them, and per-iteration UID batches."""
+
+    def __init__(self, imap: FakeIMAPServer, smtp: FakeSMTPServer, handler: ClassicEmailHandler, batch_size: int):
+        self.imap = imap
+        self.smtp = smtp
+        self.handler = handler
+        self.batch_size = batch_size
+        inbox_uids = [str(uid) for uid in imap.store["INBOX"].uids]
+        # Disjoint batches so destructive scenarios never reuse a UID:
+        # reads and flag changes walk from the oldest, moves/deletes/labels from the newest
+        self._read_uids = inbox_uids
+        self._spare_uids = inbox_uids[::-1]
+        self._spare_offset = 0
+
+    def read_batch(self, iteration: int) -> list[str]:
+        start = (iteration * self.batch_size) % max(len(self._read_uids) - self.batch_size, 1)
+        return self._read_uids[start : start + self.batch_size]
+
+    def take_batch(self) -> list[str]:
+        batch = self._spare_uids[self._spare_offset : self._spare_offset + self.batch_size]
+        self._spare_offset += self.batch_size
+        return batch
+
+    @property
+    def round_trips(self) -> int:
+        return self.imap.round_trips + self.smtp.round_trips
+
+
+Scenario = Callable[[BenchmarkContext, int], Awaitable[object]]
+
+
+async def _list_emails_metadata(ctx: BenchmarkContext, i: int) -> object:
+    return await ctx.handler.get_emails_metadata(page=1 + i % 50, page_size=ctx.batch_size)
+
+
+async def _get_emails_content(ctx: BenchmarkContext, i: int) -> object:
+    return await ctx.handler.get_emails_content(ctx.read_batch(i))
+
+
+async def _mark_emails(ctx: BenchmarkContext, i: int) -> object:
+    return await ctx.handler.mark_emails(ctx.read_batch(i), "read" if i % 2 else "unread")
+
+
+async def _move_emails(ctx: BenchmarkContext, i: int) -> object:
+    return await ctx.handler.move_emails(ctx.take_batch(), "Archive")
+
+
+async def _delete_emails(ctx: BenchmarkContext, i: int) -> object:
+    return await ctx.handler.delete_emails(ctx.take_batch())
+
+
+async def _send_email(ctx: BenchmarkContext, i: int) -> object:
+    return await ctx.handler.send_email(["recipient@example.com"], f"Benchmark {i}", "Benchmark body")
+
+
+async def _apply_label(ctx: BenchmarkContext, i: int) -> object:
+    return await ctx.handler.apply_label(ctx.read_batch(i), LABEL)
+
+
+async def _get_email_labels(ctx: BenchmarkContext, i: int) -> object:
+    return await ctx.handler.get_email_labels(ctx.read_batch(i)[0])
+
+
+async def _remove_label(ctx: BenchmarkContext, i: int) -> object:
+    return await ctx.handler.remove_label(ctx.read_batch(i), LABEL)
+
+
+# Run in this order: labels are applied before they are read and removed
+SCENARIOS: dict[str, Scenario] = {
+    "list_emails_metadata": _list_emails_metadata,
+    "get_emails_content": _get_emails_content,
+    "mark_emails": _mark_emails,
+    "move_emails": _move_emails,
+    "delete_emails": _delete_emails,
+    "send_email": _send_email,
+    "apply_label": _apply_label,
+    "get_email_labels": _get_email_labels,
+    "remove_label": _remove_label,
+}
+
+
+async def run_scenario(ctx: BenchmarkContext, name: str, iterations: int, warmup: int = 1) -> BenchmarkResult:
+    scenario = SCENARIOS[name]
+    for i in range(warmup):
+        await scenario(ctx, iterations + i)
+
+    ctx.imap.reset_stats()
+    ctx.smtp.reset_stats()
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        op_started = time.perf_counter()
+        await scenario(ctx, i)
+        latencies.append(time.perf_counter() - op_started)
+    elapsed = time.perf_counter() - started
+
+    return BenchmarkResult(
+        scenario=name,
+        operations=iterations,
+        seconds=elapsed,
+        ops_per_second=iterations / elapsed if elapsed else 0.0,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+        round_trips_per_op=ctx.round_trips / iterations,
+        logins=ctx.imap.logins,
+    )
+
+
+def _email_settings(imap: FakeIMAPServer, smtp: FakeSMTPServer) -> EmailSettings:
+    return EmailSettings(
+        account_name="benchmark",
+        full_name="Benchmark",
+        email_address="user@example.com",
+        incoming=EmailServer(
+            user_name=imap.user_name, password=imap.password, host=imap.host, port=imap.port, use_ssl=False
+        ),
+        outgoing=EmailServer(
+            user_name=smtp.user_name, password=smtp.password, host=smtp.host, port=smtp.port, use_ssl=False
+        ),
+    )
+
+
+async def run_benchmarks(
+    messages: int,
+    iterations: int,
+    batch_size: int = 10,
+    latency: float = 0.0,
+    capabilities: tuple[str, ...] = DEFAULT_CAPABILITIES,
+    body_size: int = 2048,
+    scenarios: list[str] | None = None,
+) -> list[BenchmarkResult]:
+    store = FakeMailStore()
+    store.seed("INBOX", messages, body_size)
+    store.create("Archive")
+    store.create(f"Labels/{LABEL}")
+
+    results = []
+    async with (
+        FakeIMAPServer(store, capabilities=capabilities, latency=latency) as imap,
+        FakeSMTPServer(latency=latency) as smtp,
+    ):
+        ctx = BenchmarkContext(imap, smtp, ClassicEmailHandler(_email_settings(imap, smtp)), batch_size)
+        try:
+            for name in scenarios or SCENARIOS:
+                results.append(await run_scenario(ctx, name, iterations))
+        finally:
+            await close_connection_pools()
+    return results
+
+
+def format_results(results: list[BenchmarkResult]) -> str:
+    lines = [
+        f"{'scenario':<22} {'ops':>5} {'ops/sec':>9} {'p50 ms':>9} {'p99 ms':>9} {'round trips/op':>15} {'logins':>7}"
+    ]
+    for r in results:
+        lines.append(
+            f"{r.scenario:<22} {r.operations:>5} {r.ops_per_second:>9.1f} {r.p50_ms:>9.2f} {r.p99_ms:>9.2f}"
+            f" {r.round_trips_per_op:>15.1f} {r.logins:>7}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10_000, help="synthetic messages in INBOX")
+    parser.add_argument("--iterations", type=int, default=20, help="timed operations per scenario")
+    parser.add_argument("--batch-size", type=int, default=10, help="emails per operation")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay before each server reply")
+    parser.add_argument("--body-size", type=int, default=2048, help="body size of synthetic messages")
+    parser.add_argument("--capabilities", choices=sorted(CAPABILITY_PRESETS), default="full")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="run only these (repeatable)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep capability profiles and other per-server state out of the real database
+        settings = get_settings()
+        settings.db_location = (Path(tmp) / "db.sqlite3").as_posix()
+        results = asyncio.run(
+            run_benchmarks(
+                messages=args.messages,
+                iterations=args.iterations,
+                batch_size=args.batch_size,
+                latency=args.latency_ms / 1000,
+                capabilities=CAPABILITY_PRESETS[args.capabilities],
+                body_size=args.body_size,
+                scenarios=args.scenario,
+            )
+        )
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+    else:
+        print(format_results(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Annotated, Literal
+from functools import partial
+from typing import Annotated, Any, Literal
+from urllib.parse import unquote
 
 from mcp.server.fastmcp import FastMCP
-from pydantic import Field
+from mcp.server.lowlevel import NotificationOptions
+from mcp.server.session import ServerSession
+from mcp.types import ServerCapabilities
+from pydantic import AnyUrl, Field
 
 from mcp_email_server.config import (
     AccountAttributes,
@@ -18,12 +26,43 @@ from mcp_email_server.emails.models import (
     EmailMarkResponse,
     EmailMetadataPageResponse,
     EmailMoveResponse,
+    EmailSearchResponse,
     FolderListResponse,
     FolderOperationResponse,
     LabelListResponse,
 )
+from mcp_email_server.emails.pool import close_connection_pools
+from mcp_email_server.emails.watcher import MailboxWatcher
+from mcp_email_server.log import logger
 
-mcp = FastMCP("email")
+
+async def _warm_pool(account: EmailSettings) -> None:
+    try:
+        pool = dispatch_handler(account.account_name).incoming_client.pool
+        if pool is not None:
+            await pool.warm()
+    except Exception as e:
+        logger.warning(f"Could not open IMAP sessions for {account.account_name} ahead of time: {e}")
+
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Open imap_pool_min_size sessions per account on startup; log out of pooled sessions on shutdown."""
+    if get_settings().imap_pool_min_size > 0:
+        accounts = [account for account in get_settings().get_accounts() if isinstance(account, EmailSettings)]
+        await asyncio.gather(*(_warm_pool(account) for account in accounts))
+    try:
+        yield
+    finally:
+        await close_connection_pools()
+
+
+mcp = FastMCP("email", lifespan=_lifespan)
+
+# account_name -> sessions subscribed to email://{account_name}, with the URI they subscribed to
+_subscriptions: dict[str, dict[ServerSession, AnyUrl]] = {}
+# account_name -> watchers running while the account has subscribers
+_watchers: dict[str, list[MailboxWatcher]] = {}
 
 
 @mcp.resource("email://{account_name}")
@@ -32,6 +71,75 @@ async def get_account(account_name: str) -> EmailSettings | ProviderSettings | N
     return settings.get_account(account_name, masked=True)
 
 
+def _account_from_uri(uri: AnyUrl) -> str:
+    """Map an ``email://{account_name}`` URI back to the configured account name.
+
+    URL parsing lower-cases the host part, so names are matched case-insensitively.
+    """
+    name = unquote(str(uri).removeprefix("email://").rstrip("/"))
+    for account in get_settings().get_accounts():
+        if account.account_name.lower() == name.lower():
+            return account.account_name
+    return name
+
+
+async def _notify_account(account_name: str, mailbox: str) -> None:
+    """Tell every subscriber of the account's resource that its mail changed."""
+    subscribers = _subscriptions.get(account_name, {})
+    for session, uri in list(subscribers.items()):
+        try:
+            await session.send_resource_updated(uri)
+        except Exception as e:
+            logger.debug(f"Dropping subscriber of {uri}: {e}")
+            subscribers.pop(session, None)
+    if not subscribers:
+        _stop_watching(account_name)
+
+
+def _stop_watching(account_name: str) -> None:
+    _subscriptions.pop(account_name, None)
+    for watcher in _watchers.pop(account_name, []):
+        watcher.stop()
+
+
+@mcp._mcp_server.subscribe_resource()
+async def subscribe_account(uri: AnyUrl) -> None:
+    """Watch the account's mailboxes and notify the subscriber when they change, instead of being polled."""
+    account_name = _account_from_uri(uri)
+    handler = dispatch_handler(account_name)
+    _subscriptions.setdefault(account_name, {})[mcp.get_context().session] = uri
+    if account_name not in _watchers:
+        _watchers[account_name] = handler.watch(get_settings().watch_mailboxes, partial(_notify_account, account_name))
+
+
+@mcp._mcp_server.unsubscribe_resource()
+async def unsubscribe_account(uri: AnyUrl) -> None:
+    account_name = _account_from_uri(uri)
+    subscribers = _subscriptions.get(account_name, {})
+    subscribers.pop(mcp.get_context().session, None)
+    if not subscribers:
+        _stop_watching(account_name)
+
+
+# FastMCP has no public hook for resource subscriptions, and its low-level server reports
+# resources.subscribe as False even with the handlers above; this relies on the mcp 1.x
+# internals, which is why pyproject.toml keeps mcp below 2
+_server_capabilities = mcp._mcp_server.get_capabilities
+
+
+def _get_capabilities(
+    notification_options: NotificationOptions, experimental_capabilities: dict[str, dict[str, Any]]
+) -> ServerCapabilities:
+    """Advertise resource subscriptions so clients know they can subscribe to an account."""
+    capabilities = _server_capabilities(notification_options, experimental_capabilities)
+    if capabilities.resources is not None:
+        capabilities.resources.subscribe = True
+    return capabilities
+
+
+mcp._mcp_server.get_capabilities = _get_capabilities
+
+
 @mcp.tool(description="List all configured email accounts with masked credentials.")
 async def list_available_accounts() -> list[AccountAttributes]:
     settings = get_settings()
@@ -72,7 +180,10 @@ async def list_emails_metadata(
     ] = None,
     order: Annotated[
         Literal["asc", "desc"],
-        Field(default=None, description="Order emails by field. `asc` or `desc`."),
+        Field(
+            default=None,
+            description="Order emails by date. `asc` or `desc`. Servers with ESEARCH but without SORT may order by arrival instead.",
+        ),
     ] = "desc",
     mailbox: Annotated[
         str, Field(default="INBOX", description="IMAP folder path. Standard: INBOX, Sent, Drafts, Trash. Provider-specific: Gmail uses '[Gmail]/...' prefix (e.g., '[Gmail]/Sent Mail'); ProtonMail Bridge exposes folders as 'Folders/<name>' and labels as 'Labels/<name>'.")
@@ -89,6 +200,13 @@ async def list_emails_metadata(
         bool | None,
         Field(default=None, description="Filter by replied status: True=replied, False=not replied, None=all."),
     ] = None,
+    gmail_query: Annotated[
+        str | None,
+        Field(
+            default=None,
+            description="Gmail only: a Gmail web search query such as 'has:attachment larger:5M' or 'label:work is:important', run on the server with X-GM-RAW.",
+        ),
+    ] = None,
 ) -> EmailMetadataPageResponse:
     handler = dispatch_handler(account_name)
 
@@ -105,11 +223,12 @@ async def list_emails_metadata(
         seen=seen,
         flagged=flagged,
         answered=answered,
+        gmail_query=gmail_query,
     )
 
 
 @mcp.tool(
-    description="Get the full content (including body) of one or more emails by their email_id. Use list_emails_metadata first to get the email_id."
+    description="Get the full content (including body) of one or more emails by their email_id. Use list_emails_metadata first to get the email_id. Long bodies are returned a page at a time; request the same email again with body_offset=next_offset to read on."
 )
 async def get_emails_content(
     account_name: Annotated[str, Field(description="The name of the email account.")],
@@ -120,9 +239,43 @@ async def get_emails_content(
         ),
     ],
     mailbox: Annotated[str, Field(default="INBOX", description="IMAP folder path. Standard: INBOX, Sent, Drafts, Trash. Provider-specific: Gmail uses '[Gmail]/...' prefix; ProtonMail Bridge uses 'Folders/<name>' and 'Labels/<name>'.")] = "INBOX",
+    body_offset: Annotated[
+        int,
+        Field(
+            default=0,
+            description="Character offset to start each body at. Pass an email's next_offset to read the next page of its body.",
+        ),
+    ] = 0,
+    body_length: Annotated[
+        int, Field(default=20000, description="Maximum number of body characters to return per email.")
+    ] = 20000,
 ) -> EmailContentBatchResponse:
     handler = dispatch_handler(account_name)
-    return await handler.get_emails_content(email_ids, mailbox)
+    return await handler.get_emails_content(email_ids, mailbox, body_offset, body_length)
+
+
+@mcp.tool(
+    description="Full-text search over the subjects, addresses and bodies of emails in the local index, ranked by relevance with highlighted snippets. Emails are indexed once listed or read. Requires full_text_index=true."
+)
+async def search_emails(
+    account_name: Annotated[str, Field(description="The name of the email account.")],
+    query: Annotated[
+        str, Field(description="Words that must all appear in the email. End a word with * to match prefixes.")
+    ],
+    mailbox: Annotated[
+        str | None,
+        Field(default=None, description="Only search this IMAP folder. Searches all indexed folders if not set."),
+    ] = None,
+    page: Annotated[int, Field(default=1, description="The page number to retrieve (starting from 1).")] = 1,
+    page_size: Annotated[int, Field(default=10, description="The number of results to retrieve per page.")] = 10,
+) -> EmailSearchResponse:
+    settings = get_settings()
+    if not settings.full_text_index:
+        msg = "Full-text search is disabled. Set 'full_text_index=true' in settings to enable this feature."
+        raise PermissionError(msg)
+
+    handler = dispatch_handler(account_name)
+    return await handler.search_emails(query, mailbox, page, page_size)
 
 
 @mcp.tool(
@@ -342,7 +495,7 @@ async def rename_folder(
 
 
 @mcp.tool(
-    description="List all labels for an email account (ProtonMail: folders under Labels/ prefix). Requires enable_folder_management=true."
+    description="List all labels for an email account (ProtonMail: folders under Labels/ prefix; Gmail: its X-GM-LABELS labels). Requires enable_folder_management=true."
 )
 async def list_labels(
     account_name: Annotated[str, Field(description="The name of the email account.")],
@@ -372,7 +525,7 @@ async def apply_label(
 
 
 @mcp.tool(
-    description="Remove a label from one or more emails. Deletes from label folder while preserving original emails. Requires enable_folder_management=true."
+    description="Remove a label from one or more emails. Deletes from label folder while preserving original emails (on Gmail, removes the label with X-GM-LABELS). Requires enable_folder_management=true."
 )
 async def remove_label(
     account_name: Annotated[str, Field(description="The name of the email account.")],
@@ -381,10 +534,13 @@ async def remove_label(
         Field(description="List of email_id to unlabel (obtained from list_emails_metadata)."),
     ],
     label_name: Annotated[str, Field(description="The label name (without Labels/ prefix).")],
+    source_mailbox: Annotated[
+        str, Field(default="INBOX", description="The mailbox the email_ids belong to.")
+    ] = "INBOX",
 ) -> EmailMoveResponse:
     _check_folder_management_enabled()
     handler = dispatch_handler(account_name)
-    return await handler.remove_label(email_ids, label_name)
+    return await handler.remove_label(email_ids, label_name, source_mailbox)
 
 
 @mcp.tool(description="Get all labels applied to a specific email. Requires enable_folder_management=true.")
@@ -3,7 +3,7 @@ from __future__ import annotations
 import datetime
 import os
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 from zoneinfo import ZoneInfo
 
 import tomli_w
@@ -29,6 +29,8 @@ class EmailServer(BaseModel):
     port: int
     use_ssl: bool = True  # Usually port 465
     start_ssl: bool = False  # Usually port 587
+    compress: bool = False  # Negotiate IMAP COMPRESS=DEFLATE (RFC 4978) when the server offers it
+    envelope_metadata: bool = False  # List metadata from IMAP ENVELOPE/BODYSTRUCTURE instead of full headers
 
     def masked(self) -> EmailServer:
         return self.model_copy(update={"password": "********"})
@@ -93,6 +95,8 @@ class EmailSettings(AccountAttributes):
         imap_password: str | None = None,
         imap_port: int = 993,
         imap_ssl: bool = True,
+        imap_compress: bool = False,
+        imap_envelope_metadata: bool = False,
         smtp_port: int = 465,
         smtp_ssl: bool = True,
         smtp_start_ssl: bool = False,
@@ -111,6 +115,8 @@ class EmailSettings(AccountAttributes):
                 host=imap_host,
                 port=imap_port,
                 use_ssl=imap_ssl,
+                compress=imap_compress,
+                envelope_metadata=imap_envelope_metadata,
             ),
             outgoing=EmailServer(
                 user_name=smtp_user_name or user_name,
@@ -137,6 +143,8 @@ class EmailSettings(AccountAttributes):
         - MCP_EMAIL_SERVER_IMAP_HOST
         - MCP_EMAIL_SERVER_IMAP_PORT (default: 993)
         - MCP_EMAIL_SERVER_IMAP_SSL (default: true)
+        - MCP_EMAIL_SERVER_IMAP_COMPRESS (default: false)
+        - MCP_EMAIL_SERVER_IMAP_ENVELOPE_METADATA (default: false)
         - MCP_EMAIL_SERVER_SMTP_HOST
         - MCP_EMAIL_SERVER_SMTP_PORT (default: 465)
         - MCP_EMAIL_SERVER_SMTP_SSL (default: true)
@@ -179,6 +187,8 @@ class EmailSettings(AccountAttributes):
                 imap_host=imap_host,
                 imap_port=int(os.getenv("MCP_EMAIL_SERVER_IMAP_PORT", "993")),
                 imap_ssl=parse_bool(os.getenv("MCP_EMAIL_SERVER_IMAP_SSL"), True),
+                imap_compress=parse_bool(os.getenv("MCP_EMAIL_SERVER_IMAP_COMPRESS"), False),
+                imap_envelope_metadata=parse_bool(os.getenv("MCP_EMAIL_SERVER_IMAP_ENVELOPE_METADATA"), False),
                 smtp_host=smtp_host,
                 smtp_port=int(os.getenv("MCP_EMAIL_SERVER_SMTP_PORT", "465")),
                 smtp_ssl=parse_bool(os.getenv("MCP_EMAIL_SERVER_SMTP_SSL"), True),
@@ -224,6 +234,27 @@ class Settings(BaseSettings):
     db_location: str = CONFIG_PATH.with_name("db.sqlite3").as_posix()
     enable_attachment_download: bool = False
     enable_folder_management: bool = False
+    # Pooled IMAP sessions per account; set imap_pool_max_size to 0 to open a fresh session per call
+    imap_pool_min_size: int = Field(default=0, ge=0)
+    imap_pool_max_size: int = Field(default=5, ge=0)
+    imap_pool_idle_timeout: float = Field(default=300.0, gt=0)
+    # Answer list_emails_metadata from a local index at db_location, fetching only new emails from the server
+    metadata_index: bool = True
+    # Keep the text of emails in an SQLite FTS5 index at db_location for search_emails
+    full_text_index: bool = False
+    # Mailboxes watched (IDLE, or a NOOP every imap_poll_interval seconds) while a client
+    # subscribes to email://{account_name}; IDLE is re-issued after imap_idle_timeout seconds
+    watch_mailboxes: list[str] = ["INBOX"]
+    imap_idle_timeout: float = Field(default=29 * 60.0, gt=0)
+    imap_poll_interval: float = Field(default=30.0, gt=0)
+    # IMAP sessions per account used at once for work spanning folders, such as finding an email's labels;
+    # also capped by imap_pool_max_size. Keep it under the provider's connection limit
+    folder_concurrency: int = Field(default=4, ge=1)
+    # Parse emails of at least parse_offload_min_size bytes in a pool of parse_workers threads
+    # (or processes, with parse_executor = "process") instead of on the event loop; 0 workers parses inline
+    parse_executor: Literal["thread", "process"] = "thread"
+    parse_workers: int = Field(default=2, ge=0)
+    parse_offload_min_size: int = Field(default=256 * 1024, ge=0)
 
     model_config = SettingsConfigDict(toml_file=CONFIG_PATH, validate_assignment=True, revalidate_instances="always")
 
@@ -10,10 +10,12 @@ if TYPE_CHECKING:
         EmailMarkResponse,
         EmailMetadataPageResponse,
         EmailMoveResponse,
+        EmailSearchResponse,
         FolderListResponse,
         FolderOperationResponse,
         LabelListResponse,
     )
+    from mcp_email_server.emails.watcher import MailboxCallback, MailboxWatcher
 
 
 class EmailHandler(abc.ABC):
@@ -32,6 +34,7 @@ class EmailHandler(abc.ABC):
         seen: bool | None = None,
         flagged: bool | None = None,
         answered: bool | None = None,
+        gmail_query: str | None = None,
     ) -> "EmailMetadataPageResponse":
         """
         Get email metadata only (without body content) for better performance.
@@ -49,12 +52,56 @@ class EmailHandler(abc.ABC):
             seen: Filter by read status (True=read, False=unread, None=all).
             flagged: Filter by flagged/starred status (True=flagged, False=unflagged, None=all).
             answered: Filter by replied status (True=replied, False=not replied, None=all).
+            gmail_query: Gmail search syntax run with X-GM-RAW (Gmail servers only).
         """
 
     @abc.abstractmethod
-    async def get_emails_content(self, email_ids: list[str], mailbox: str = "INBOX") -> "EmailContentBatchResponse":
+    async def get_emails_content(
+        self,
+        email_ids: list[str],
+        mailbox: str = "INBOX",
+        body_offset: int = 0,
+        body_length: int = 20000,
+    ) -> "EmailContentBatchResponse":
         """
         Get full content (including body) of multiple emails by their email IDs (IMAP UIDs)
+
+        Args:
+            email_ids: IMAP UIDs of the emails.
+            mailbox: Mailbox containing the emails.
+            body_offset: Character offset in each body to start the returned page at.
+            body_length: Maximum number of body characters to return per email.
+        """
+
+    @abc.abstractmethod
+    async def search_emails(
+        self,
+        query: str,
+        mailbox: str | None = None,
+        page: int = 1,
+        page_size: int = 10,
+    ) -> "EmailSearchResponse":
+        """
+        Search the text of emails in the local full-text index, best matches first.
+
+        Args:
+            query: Terms that must all match; ``term*`` matches prefixes.
+            mailbox: Only search this mailbox, or all indexed mailboxes if None.
+            page: Page number (starting from 1).
+            page_size: Number of results per page.
+        """
+
+    @abc.abstractmethod
+    def watch(self, mailboxes: list[str], on_change: "MailboxCallback") -> list["MailboxWatcher"]:
+        """
+        Start watching mailboxes for new, expunged or changed emails in the background.
+
+        Args:
+            mailboxes: Mailboxes to watch, each on its own IMAP session.
+            on_change: Awaited with the mailbox name whenever one of them changed.
+
+        Returns:
+            The started watchers; call ``stop()`` on each to stop watching.
         """
 
     @abc.abstractmethod
@@ -216,6 +263,7 @@ class EmailHandler(abc.ABC):
         self,
         email_ids: list[str],
         label_name: str,
+        source_mailbox: str = "INBOX",
     ) -> "EmailMoveResponse":
         """
         Remove a label from emails by deleting from the label folder.
@@ -223,6 +271,7 @@ class EmailHandler(abc.ABC):
         Args:
             email_ids: List of email UIDs to unlabel.
             label_name: The label name (without Labels/ prefix).
+            source_mailbox: The mailbox the email UIDs belong to (default: "INBOX").
 
         Returns:
             EmailMoveResponse with operation results.
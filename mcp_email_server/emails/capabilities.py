@@ -0,0 +1,227 @@
+"""Per-server IMAP capability profiles, persisted across restarts.
+
+Servers differ in which extensions they advertise and in which of them
+actually work (a MOVE that is advertised but rejected, a FETCH syntax a
+server does not understand). Probing those on every call costs round trips,
+so each server's profile is recorded once per session and kept in the SQLite
+database at ``Settings.db_location``. Operations then take a single path
+instead of trying alternatives one by one. Extensions that failed in practice
+are only skipped until the process restarts, so a server that was fixed, or
+a failure that was transient after all, does not disable them for good.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+from collections.abc import Iterable
+from contextlib import closing
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+
+from mcp_email_server.config import EmailServer, get_settings
+from mcp_email_server.log import logger
+
+# Fetch syntaxes tried, in order, until one returns the message body
+FETCH_FORMATS = ("RFC822", "BODY[]", "BODY.PEEK[]", "(BODY.PEEK[])")
+
+
+def server_key(email_server: EmailServer) -> str:
+    """Identify a server profile; capabilities can differ per authenticated user."""
+    return f"{email_server.user_name}@{email_server.host}:{email_server.port}"
+
+
+@dataclass(frozen=True)
+class ServerProfile:
+    """What an IMAP server supports, as advertised and as observed.
+
+    ``capabilities`` is None until a session has reported them. ``unsupported``
+    holds extensions that failed in practice and are not tried again for the
+    rest of the process; it is never persisted.
+    ``sent_folder`` is the folder LIST flagged ``\\Sent``, once it has been found.
+    """
+
+    key: str
+    capabilities: frozenset[str] | None = None
+    unsupported: frozenset[str] = frozenset()
+    fetch_format: str | None = None
+    sent_folder: str | None = None
+    updated_at: float = field(default=0.0, compare=False)
+
+    def supports(self, capability: str) -> bool | None:
+        """Return whether the server supports ``capability``, or None if unknown."""
+        capability = capability.upper()
+        if capability in self.unsupported:
+            return False
+        if self.capabilities is None:
+            return None
+        return capability in self.capabilities
+
+    @property
+    def sort(self) -> bool:
+        return bool(self.supports("SORT"))
+
+    @property
+    def move(self) -> bool:
+        return bool(self.supports("MOVE"))
+
+    @property
+    def uidplus(self) -> bool:
+        return bool(self.supports("UIDPLUS"))
+
+    @property
+    def condstore(self) -> bool:
+        return bool(self.supports("CONDSTORE"))
+
+    @property
+    def qresync(self) -> bool:
+        return bool(self.supports("QRESYNC"))
+
+    @property
+    def esearch(self) -> bool:
+        return bool(self.supports("ESEARCH"))
+
+    @property
+    def compress_deflate(self) -> bool:
+        return bool(self.supports("COMPRESS=DEFLATE"))
+
+    @property
+    def idle(self) -> bool:
+        return bool(self.supports("IDLE"))
+
+    @property
+    def gmail(self) -> bool:
+        """Gmail's IMAP extensions: X-GM-LABELS, X-GM-MSGID, X-GM-THRID and X-GM-RAW."""
+        return bool(self.supports("X-GM-EXT-1"))
+
+    def fetch_formats(self) -> list[str]:
+        """FETCH syntaxes to try, the one known to work first."""
+        if self.fetch_format is None:
+            return list(FETCH_FORMATS)
+        return [self.fetch_format, *(f for f in FETCH_FORMATS if f != self.fetch_format)]
+
+
+class CapabilityStore:
+    """Server profiles cached in memory and persisted to SQLite.
+
+    Args:
+        db_path: SQLite database file, or None to keep profiles in memory only.
+    """
+
+    def __init__(self, db_path: str | Path | None):
+        self.db_path = Path(db_path) if db_path is not None else None
+        self._profiles: dict[str, ServerProfile] = {}
+        self._initialized = False
+
+    def _connect(self, db_path: Path) -> sqlite3.Connection:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(db_path)
+        if not self._initialized:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS server_capabilities ("
+                " server_key TEXT PRIMARY KEY,"
+                " capabilities TEXT,"
+                " unsupported TEXT NOT NULL DEFAULT '',"
+                " fetch_format TEXT,"
+                " updated_at REAL NOT NULL,"
+                " sent_folder TEXT)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(server_capabilities)")}
+            if "sent_folder" not in columns:
+                conn.execute("ALTER TABLE server_capabilities ADD COLUMN sent_folder TEXT")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def get(self, key: str) -> ServerProfile:
+        """Return the profile for ``key``, loading it from disk on first use."""
+        profile = self._profiles.get(key)
+        if profile is None:
+            profile = self._load(key) or ServerProfile(key=key)
+            self._profiles[key] = profile
+        return profile
+
+    def _load(self, key: str) -> ServerProfile | None:
+        if self.db_path is None:
+            return None
+        try:
+            with closing(self._connect(self.db_path)) as conn, conn:
+                row = conn.execute(
+                    "SELECT capabilities, fetch_format, sent_folder, updated_at"
+                    " FROM server_capabilities WHERE server_key = ?",
+                    (key,),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not load capability profile for {key}: {e}")
+            return None
+        if row is None:
+            return None
+        capabilities, fetch_format, sent_folder, updated_at = row
+        return ServerProfile(
+            key=key,
+            capabilities=frozenset(capabilities.split()) if capabilities is not None else None,
+            fetch_format=fetch_format,
+            sent_folder=sent_folder,
+            updated_at=updated_at,
+        )
+
+    def _save(self, profile: ServerProfile) -> ServerProfile:
+        """Store ``profile`` if it differs from the current one; return the current profile."""
+        if profile == self._profiles.get(profile.key):
+            return self._profiles[profile.key]
+        profile = replace(profile, updated_at=time.time())
+        self._profiles[profile.key] = profile
+        if self.db_path is None:
+            return profile
+        try:
+            with closing(self._connect(self.db_path)) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO server_capabilities"
+                    " (server_key, capabilities, fetch_format, sent_folder, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (
+                        profile.key,
+                        " ".join(sorted(profile.capabilities)) if profile.capabilities is not None else None,
+                        profile.fetch_format,
+                        profile.sent_folder,
+                        profile.updated_at,
+                    ),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not persist capability profile for {profile.key}: {e}")
+        return profile
+
+    def record_capabilities(self, key: str, capabilities: Iterable[str]) -> ServerProfile:
+        """Record the capabilities a freshly authenticated session advertised."""
+        advertised = frozenset(str(c).upper() for c in capabilities)
+        return self._save(replace(self.get(key), capabilities=advertised))
+
+    def mark_unsupported(self, key: str, capability: str) -> ServerProfile:
+        """Stop trying ``capability`` for the rest of this process, after it failed."""
+        profile = self.get(key)
+        if capability.upper() in profile.unsupported:
+            return profile
+        logger.info(f"Server {key}: disabling {capability.upper()} after it failed")
+        profile = replace(profile, unsupported=profile.unsupported | {capability.upper()})
+        self._profiles[key] = profile
+        return profile
+
+    def record_fetch_format(self, key: str, fetch_format: str) -> ServerProfile:
+        """Remember the FETCH syntax that returned message content."""
+        return self._save(replace(self.get(key), fetch_format=fetch_format))
+
+    def record_sent_folder(self, key: str, sent_folder: str | None) -> ServerProfile:
+        """Remember the ``\\Sent`` folder sent emails are appended to; None forgets it."""
+        return self._save(replace(self.get(key), sent_folder=sent_folder))
+
+
+_stores: dict[str, CapabilityStore] = {}
+
+
+def get_capability_store() -> CapabilityStore:
+    """Return the store backed by the configured ``db_location``."""
+    db_location = get_settings().db_location
+    store = _stores.get(db_location)
+    if store is None:
+        store = _stores[db_location] = CapabilityStore(db_location)
+    return store
@@ -1,6 +1,17 @@
+import asyncio
+import binascii
 import email.utils
 import mimetypes
-from collections.abc import AsyncGenerator
+import os
+import quopri
+import re
+import sqlite3
+import tempfile
+import weakref
+from collections import OrderedDict
+from collections.abc import AsyncGenerator, AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager, suppress
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from email.header import Header
 from email.mime.application import MIMEApplication
@@ -9,13 +20,18 @@ from email.mime.text import MIMEText
 from email.parser import BytesParser
 from email.policy import default
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO
 
 import aioimaplib
 import aiosmtplib
 
-from mcp_email_server.config import EmailServer, EmailSettings
+from mcp_email_server.config import EmailServer, EmailSettings, get_settings
 from mcp_email_server.emails import EmailHandler
+from mcp_email_server.emails.capabilities import ServerProfile, get_capability_store, server_key
+from mcp_email_server.emails.executor import run_parser
+from mcp_email_server.emails.fanout import FolderResult, FolderWork, fan_out
+from mcp_email_server.emails.headers import METADATA_FIELDS, header_values, unfold_fields
+from mcp_email_server.emails.index import MetadataIndex, get_metadata_index
 from mcp_email_server.emails.models import (
     AttachmentDownloadResponse,
     EmailBodyResponse,
@@ -25,12 +41,25 @@ from mcp_email_server.emails.models import (
     EmailMetadata,
     EmailMetadataPageResponse,
     EmailMoveResponse,
+    EmailSearchResponse,
+    EmailSearchResult,
     Folder,
     FolderListResponse,
     FolderOperationResponse,
     Label,
     LabelListResponse,
 )
+from mcp_email_server.emails.pool import IMAPConnectionPool, get_connection_pool
+from mcp_email_server.emails.structure import (
+    BodyPart,
+    attachment_names,
+    parse_envelope,
+    parse_fetch_responses,
+    parse_internaldate,
+    walk_bodystructure,
+)
+from mcp_email_server.emails.watcher import MailboxCallback, MailboxWatcher
+from mcp_email_server.emails.wire import WireStats, WireTap, attach_wire_tap, enable_deflate, get_wire_stats
 from mcp_email_server.log import logger
 
 
@@ -52,6 +81,12 @@ def _quote_mailbox(mailbox: str) -> str:
     return f'"{escaped}"'
 
 
+def _quote_string(value: str) -> str:
+    """Quote ``value`` as an RFC 3501 quoted string."""
+    escaped = value.replace("\\", "\\\\").replace('"', r"\"")
+    return f'"{escaped}"'
+
+
 async def _send_imap_id(imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL) -> None:
     """Send IMAP ID command with fallback for strict servers like 163.com.
 
@@ -69,12 +104,13 @@ async def _send_imap_id(imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL) -> None:
         if response.result != "OK":
             # Fallback for strict servers (e.g., 163.com)
             # Send raw command with correct parenthesis format
-            await imap.protocol.execute(
+            await _execute(
+                imap,
                 aioimaplib.Command(
                     "ID",
                     imap.protocol.new_tag(),
                     '("name" "mcp-email-server" "version" "1.0.0")',
-                )
+                ),
             )
     except Exception as e:
         logger.warning(f"IMAP ID command failed: {e!s}")
@@ -93,97 +129,854 @@ def _has_sort_capability(imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL) -> bool:
         return False
 
 
-class EmailClient:
-    def __init__(self, email_server: EmailServer, sender: str | None = None):
-        self.email_server = email_server
-        self.sender = sender or email_server.user_name
+@dataclass
+class SelectedMailbox:
+    """Server-side state of the mailbox currently selected on an IMAP session."""
 
-        self.imap_class = aioimaplib.IMAP4_SSL if self.email_server.use_ssl else aioimaplib.IMAP4
+    name: str
+    readonly: bool
+    uidvalidity: int | None = None
+    exists: int | None = None
+    uidnext: int | None = None
+    highestmodseq: int | None = None
 
-        self.smtp_use_tls = self.email_server.use_ssl
-        self.smtp_start_tls = self.email_server.start_ssl
 
-    def _parse_email_data(self, raw_email: bytes, email_id: str | None = None) -> dict[str, Any]:  # noqa: C901
-        """Parse raw email data into a structured dictionary."""
-        parser = BytesParser(policy=default)
-        email_message = parser.parsebytes(raw_email)
+# Selected mailbox per live IMAP session, so reused (pooled) sessions can skip redundant SELECTs
+_selected_mailboxes: weakref.WeakKeyDictionary[Any, SelectedMailbox] = weakref.WeakKeyDictionary()
+
+# Sessions that have enabled QRESYNC (RFC 7162), so CHANGEDSINCE fetches can ask for VANISHED UIDs
+_qresync_sessions: weakref.WeakSet[Any] = weakref.WeakSet()
+
+_UIDVALIDITY_RE = re.compile(rb"\[UIDVALIDITY (\d+)\]", re.IGNORECASE)
+_UIDNEXT_RE = re.compile(rb"\[UIDNEXT (\d+)\]", re.IGNORECASE)
+_HIGHESTMODSEQ_RE = re.compile(rb"\[HIGHESTMODSEQ (\d+)\]", re.IGNORECASE)
+_EXISTS_RE = re.compile(rb"^(\d+) EXISTS", re.IGNORECASE)
+_STATUS_ITEM_RE = re.compile(rb"\b(MESSAGES|UIDNEXT|UIDVALIDITY) (\d+)", re.IGNORECASE)
+
+
+class CommandRejectedError(RuntimeError):
+    """The server answered NO or BAD to a command, as opposed to the command failing in transit."""
+
+
+def _response_status(response: Any) -> str:
+    """Return the upper-cased status of an aioimaplib response ('OK', 'NO', ...)."""
+    status = response[0] if isinstance(response, tuple) else getattr(response, "result", response)
+    return str(status).upper()
+
+
+async def _execute(imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, command: aioimaplib.Command) -> aioimaplib.Response:
+    """Send a raw ``command``, giving up after the session's timeout like aioimaplib's own methods.
+
+    On timeout the command stops being pending, as aioimaplib does for a
+    CommandTimeout, so later commands on the session do not wait for it.
+    """
+    try:
+        return await asyncio.wait_for(imap.protocol.execute(command), imap.timeout)
+    except asyncio.TimeoutError:
+        protocol = imap.protocol
+        if protocol.pending_sync_command is command:
+            protocol.pending_sync_command = None
+        elif protocol.pending_async_commands.get(command.untagged_resp_name) is command:
+            del protocol.pending_async_commands[command.untagged_resp_name]
+        raise
+
+
+def _parse_select_response(mailbox: str, readonly: bool, lines: list) -> SelectedMailbox:
+    """Extract UIDVALIDITY, UIDNEXT, HIGHESTMODSEQ and EXISTS from SELECT/EXAMINE response lines."""
+    state = SelectedMailbox(name=mailbox, readonly=readonly)
+    for line in lines or []:
+        if not isinstance(line, bytes | bytearray):
+            continue
+        if match := _UIDVALIDITY_RE.search(line):
+            state.uidvalidity = int(match.group(1))
+        elif match := _UIDNEXT_RE.search(line):
+            state.uidnext = int(match.group(1))
+        elif match := _HIGHESTMODSEQ_RE.search(line):
+            state.highestmodseq = int(match.group(1))
+        elif match := _EXISTS_RE.match(line):
+            state.exists = int(match.group(1))
+        elif b"[READ-ONLY]" in line.upper():
+            state.readonly = True
+    return state
+
+
+def _parse_status_response(lines: list) -> dict[str, int]:
+    """Extract MESSAGES, UIDNEXT and UIDVALIDITY from STATUS response lines."""
+    values: dict[str, int] = {}
+    for line in lines or []:
+        if isinstance(line, bytes | bytearray):
+            values.update((name.decode().upper(), int(value)) for name, value in _STATUS_ITEM_RE.findall(line))
+    return values
+
+
+def _forget_selected_mailbox(mailbox: str) -> None:
+    """Drop cached selection state for ``mailbox`` on every session (e.g. after delete/rename)."""
+    for imap, state in list(_selected_mailboxes.items()):
+        if state.name == mailbox:
+            _selected_mailboxes.pop(imap, None)
+
+
+_ESEARCH_COUNT_RE = re.compile(rb"\bCOUNT (\d+)", re.IGNORECASE)
+_ESEARCH_PARTIAL_RE = re.compile(rb"\bPARTIAL \((\S+) (\S+)\)", re.IGNORECASE)
+_ESEARCH_ALL_RE = re.compile(rb"\bALL (\S+)", re.IGNORECASE)
+# aioimaplib strips the ESEARCH name off responses it was told to collect, leaving "(TAG ...) UID COUNT ..."
+_ESEARCH_LINE_RE = re.compile(rb"^(?:\* )?(?:ESEARCH\b|\(TAG |UID\b|(?:MIN|MAX|ALL|COUNT|PARTIAL) )", re.IGNORECASE)
+
+
+def _expand_sequence_set(sequence_set: str) -> list[str]:
+    """Expand an IMAP sequence set such as ``"5,3:1,9"`` into UIDs, keeping the given order.
+
+    ESORT results (RFC 5267) are in sort order, so a descending range like
+    ``3:1`` is expanded as 3, 2, 1.
+    """
+    uids: list[str] = []
+    for part in sequence_set.split(","):
+        if not part:
+            continue
+        first, _, last = part.partition(":")
+        if not last:
+            uids.append(first)
+            continue
+        low, high = int(first), int(last)
+        step = 1 if high >= low else -1
+        uids.extend(str(uid) for uid in range(low, high + step, step))
+    return uids
+
+
+def _parse_esearch_response(lines: list) -> tuple[list[str], int | None]:
+    """Parse an untagged ESEARCH response (RFC 4731/5267) into (uids, count).
+
+    UIDs come from the PARTIAL or ALL result, in the order the server sent them.
+    """
+    for line in lines or []:
+        if isinstance(line, str):
+            line = line.encode()
+        if not isinstance(line, bytes | bytearray) or not _ESEARCH_LINE_RE.match(line):
+            continue
+        count_match = _ESEARCH_COUNT_RE.search(line)
+        count = int(count_match.group(1)) if count_match else None
+        uids: list[str] = []
+        if partial_match := _ESEARCH_PARTIAL_RE.search(line):
+            sequence_set = partial_match.group(2).decode()
+            if sequence_set.upper() != "NIL":
+                uids = _expand_sequence_set(sequence_set)
+        elif all_match := _ESEARCH_ALL_RE.search(line):
+            uids = _expand_sequence_set(all_match.group(1).decode())
+        return uids, count
+    return [], None
+
+
+# Longest UID set sent in one command; RFC 7162 asks clients to keep command lines under 8192 octets
+_MAX_UID_SET_LENGTH = 4000
+
+_COPYUID_RE = re.compile(rb"\[COPYUID \d+ ([\d:,]+) ([\d:,]+)\]", re.IGNORECASE)
+
+
+def _uid_set_chunks(email_ids: list[str]) -> list[tuple[str, list[str]]]:
+    """Collapse UIDs into compact sequence sets such as ``1:40,52,60:90``.
+
+    The sets are split so that none is longer than ``_MAX_UID_SET_LENGTH``.
+    Returns (sequence_set, uids) pairs; IDs that are not UIDs are left out.
+    """
+    ranges: list[list[int]] = []
+    for uid in sorted({int(email_id) for email_id in email_ids if email_id.isdigit()}):
+        if ranges and ranges[-1][1] == uid - 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+
+    chunks: list[tuple[str, list[str]]] = []
+    tokens: list[str] = []
+    uids: list[str] = []
+    length = 0
+    for low, high in ranges:
+        token = str(low) if low == high else f"{low}:{high}"
+        if tokens and length + 1 + len(token) > _MAX_UID_SET_LENGTH:
+            chunks.append((",".join(tokens), uids))
+            tokens, uids, length = [], [], 0
+        length += len(token) + (1 if tokens else 0)
+        tokens.append(token)
+        uids.extend(str(uid) for uid in range(low, high + 1))
+    if tokens:
+        chunks.append((",".join(tokens), uids))
+    return chunks
+
+
+def _copied_uids(response: Any, uids: list[str]) -> list[str]:
+    """Return which of ``uids`` a successful COPY/MOVE actually transferred.
+
+    With UIDPLUS (RFC 4315) the server lists them in COPYUID response codes;
+    UIDs missing there did not exist. Without COPYUID every UID counts.
+    """
+    lines = response[1] if isinstance(response, tuple) and len(response) > 1 else getattr(response, "lines", None)
+    copied: set[str] = set()
+    found = False
+    for line in lines or []:
+        if isinstance(line, str):
+            line = line.encode()
+        if not isinstance(line, bytes | bytearray):
+            continue
+        for match in _COPYUID_RE.finditer(line):
+            found = True
+            copied.update(_expand_sequence_set(match.group(1).decode()))
+    if not found:
+        return uids
+    return [uid for uid in uids if uid in copied]
+
+
+_FETCH_UID_RE = re.compile(rb"UID\s+(\d+)")
+
+
+def _iter_uid_literals(data: list) -> Iterator[tuple[str, bytes]]:
+    """Pair each literal in a UID FETCH response with its message's UID.
+
+    Note: Different IMAP servers return different response formats:
+    - Some include UID in the FETCH line: b'1 FETCH (UID 1 BODY[...]'
+    - Others (like Proton Bridge) return UID separately: b' UID 1)'
+    Both are handled.
+    """
+    pending_uid: str | None = None
+    pending_literal: bytes | None = None
+    for item in data or []:
+        if isinstance(item, bytearray):
+            # Store the literal; emit if we already have a UID
+            pending_literal = bytes(item)
+            if pending_uid is not None:
+                yield pending_uid, pending_literal
+                pending_uid, pending_literal = None, None
+        elif isinstance(item, bytes):
+            uid_match = _FETCH_UID_RE.search(item)
+            if not uid_match:
+                continue
+            if pending_literal is not None:
+                # UID came after the data
+                yield uid_match.group(1).decode(), pending_literal
+                pending_literal = None
+            else:
+                # UID came before the data - save it
+                pending_uid = uid_match.group(1).decode()
+
+
+_FETCH_START_RE = re.compile(rb"^\d+ FETCH\b", re.IGNORECASE)
+_FETCH_FLAGS_RE = re.compile(rb"FLAGS \(([^)]*)\)", re.IGNORECASE)
+_FETCH_SIZE_RE = re.compile(rb"RFC822\.SIZE (\d+)", re.IGNORECASE)
+_FETCH_INTERNALDATE_RE = re.compile(rb'INTERNALDATE "([^"]+)"', re.IGNORECASE)
+
+
+def _iter_fetch_messages(data: list) -> Iterator[tuple[str, bytes, bytes | None]]:
+    """Split a UID FETCH response into (uid, attributes, literal) per message.
+
+    ``attributes`` is the response text around the literal (UID, FLAGS,
+    RFC822.SIZE, ...), wherever the server put it; ``literal`` is None for
+    responses without one, such as ``(UID FLAGS)``.
+    """
+    attributes: list[bytes] = []
+    literal: bytes | None = None
+
+    def message() -> Iterator[tuple[str, bytes, bytes | None]]:
+        text = b" ".join(attributes)
+        if uid_match := _FETCH_UID_RE.search(text):
+            yield uid_match.group(1).decode(), text, literal
+
+    for item in data or []:
+        if isinstance(item, bytearray):
+            literal = bytes(item)
+        elif isinstance(item, bytes):
+            if _FETCH_START_RE.match(item) and attributes:
+                yield from message()
+                attributes, literal = [], None
+            attributes.append(item)
+    yield from message()
+
+
+_VANISHED_RE = re.compile(rb"^VANISHED(?: \(EARLIER\))? ([\d:,]+)", re.IGNORECASE)
+
+
+def _vanished_ranges(lines: list) -> list[tuple[int, int]]:
+    """Collect the UID ranges of QRESYNC ``VANISHED`` responses (RFC 7162 section 3.2.10)."""
+    ranges = []
+    for line in lines or []:
+        if not isinstance(line, bytes) or not (match := _VANISHED_RE.match(line)):
+            continue
+        for part in match.group(1).decode().split(","):
+            first, _, last = part.partition(":")
+            low, high = sorted((int(first), int(last or first)))
+            ranges.append((low, high))
+    return ranges
+
+
+def _fetch_flags(attributes: bytes) -> list[str]:
+    match = _FETCH_FLAGS_RE.search(attributes)
+    return match.group(1).decode(errors="replace").split() if match else []
+
+
+# Metadata straight from the server's parsed structures, instead of header blocks
+_HEADER_FETCH_ITEMS = "(UID FLAGS RFC822.SIZE INTERNALDATE BODY.PEEK[HEADER])"
+_ENVELOPE_FETCH_ITEMS = "(UID FLAGS RFC822.SIZE INTERNALDATE ENVELOPE BODYSTRUCTURE)"
+
+
+# Emails the index knows to be larger than this are read section by section
+_PARTIAL_FETCH_MIN_SIZE = 256 * 1024
+# Attachments are copied to disk in partial fetches of this many octets
+_ATTACHMENT_CHUNK_SIZE = 1024 * 1024
+_STRUCTURE_FETCH_ITEMS = "(UID RFC822.SIZE BODYSTRUCTURE)"
+
+
+def _as_bytes(value: Any) -> bytes:
+    """Return a FETCH nstring (literal, quoted string or NIL) as bytes."""
+    if value is None:
+        return b""
+    return value if isinstance(value, bytes) else str(value).encode()
+
+
+_BASE64_NOISE_RE = re.compile(rb"[^A-Za-z0-9+/=]")
+
+
+def _a2b_base64(data: bytes) -> bytes:
+    try:
+        # Surplus padding is ignored, missing padding is not
+        return binascii.a2b_base64(data + b"===")
+    except binascii.Error:
+        return b""
+
 
-        # Extract email parts
-        subject = email_message.get("Subject", "")
-        sender = email_message.get("From", "")
-        date_str = email_message.get("Date", "")
+class _TransferDecoder:
+    """Undo a Content-Transfer-Encoding over chunks that may split it anywhere.
 
-        # Extract Message-ID for reply threading
-        message_id = email_message.get("Message-ID")
+    Base64 is decoded in whole 4-character groups and quoted-printable in whole
+    lines; the rest of each chunk waits for the next one.
+    """
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self._pending = b""
+
+    def decode(self, chunk: bytes) -> bytes:
+        if self.encoding == "base64":
+            data = self._pending + _BASE64_NOISE_RE.sub(b"", chunk)
+            end = len(data) - len(data) % 4
+            self._pending = data[end:]
+            return _a2b_base64(data[:end])
+        if self.encoding == "quoted-printable":
+            data = self._pending + chunk
+            end = data.rfind(b"\n") + 1
+            self._pending = data[end:]
+            return quopri.decodestring(data[:end])
+        return chunk
+
+    def flush(self) -> bytes:
+        pending, self._pending = self._pending, b""
+        if self.encoding == "base64":
+            return _a2b_base64(pending) if pending else b""
+        if self.encoding == "quoted-printable":
+            return quopri.decodestring(pending)
+        return pending
+
+
+def _decode_transfer(data: bytes, encoding: str) -> bytes:
+    """Undo a part's Content-Transfer-Encoding as leniently as email.message does."""
+    decoder = _TransferDecoder(encoding)
+    return decoder.decode(data) + decoder.flush()
+
+
+@contextmanager
+def _atomic_file(path: Path) -> Iterator[BinaryIO]:
+    """Write to a temporary file next to ``path`` that replaces it only once complete."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(temp_path)
+        raise
+
+
+def _decode_text_part(data: bytes, charset: str | None) -> str:
+    try:
+        return data.decode(charset or "utf-8")
+    except (UnicodeDecodeError, LookupError):
+        return data.decode("utf-8", errors="replace")
+
+
+def _parse_date(date_str: str) -> datetime:
+    """Parse a date string from an email header into a datetime object."""
+    try:
+        date_tuple = email.utils.parsedate_tz(date_str)
+        if date_tuple:
+            return datetime.fromtimestamp(email.utils.mktime_tz(date_tuple), tz=timezone.utc)
+    except Exception as e:
+        logger.debug(f"Failed to parse date '{date_str}': {e}")
+    return datetime.now(timezone.utc)
+
+
+def _parse_email(raw_email: bytes, email_id: str | None = None) -> dict[str, Any]:  # noqa: C901
+    """Parse raw email data into a structured dictionary."""
+    parser = BytesParser(policy=default)
+    email_message = parser.parsebytes(raw_email)
+
+    # Extract email parts
+    subject = email_message.get("Subject", "")
+    sender = email_message.get("From", "")
+    date_str = email_message.get("Date", "")
+
+    # Extract Message-ID for reply threading
+    message_id = email_message.get("Message-ID")
+
+    # Extract recipients
+    to_addresses = []
+    to_header = email_message.get("To", "")
+    if to_header:
+        # Simple parsing - split by comma and strip whitespace
+        to_addresses = [addr.strip() for addr in to_header.split(",")]
+
+    # Also check CC recipients
+    cc_header = email_message.get("Cc", "")
+    if cc_header:
+        to_addresses.extend([addr.strip() for addr in cc_header.split(",")])
+
+    # Parse date
+    try:
+        date_tuple = email.utils.parsedate_tz(date_str)
+        date = (
+            datetime.fromtimestamp(email.utils.mktime_tz(date_tuple), tz=timezone.utc)
+            if date_tuple
+            else datetime.now(timezone.utc)
+        )
+    except Exception:
+        date = datetime.now(timezone.utc)
+
+    # Get body content
+    body = ""
+    attachments = []
+
+    if email_message.is_multipart():
+        for part in email_message.walk():
+            content_type = part.get_content_type()
+            content_disposition = str(part.get("Content-Disposition", ""))
+
+            # Handle attachments
+            if "attachment" in content_disposition:
+                filename = part.get_filename()
+                if filename:
+                    attachments.append(filename)
+            # Handle text parts
+            elif content_type == "text/plain":
+                body_part = part.get_payload(decode=True)
+                if body_part:
+                    charset = part.get_content_charset("utf-8")
+                    try:
+                        body += body_part.decode(charset)
+                    except UnicodeDecodeError:
+                        body += body_part.decode("utf-8", errors="replace")
+    else:
+        # Handle plain text emails
+        payload = email_message.get_payload(decode=True)
+        if payload:
+            charset = email_message.get_content_charset("utf-8")
+            try:
+                body = payload.decode(charset)
+            except UnicodeDecodeError:
+                body = payload.decode("utf-8", errors="replace")
+    return {
+        "email_id": email_id or "",
+        "message_id": message_id,
+        "subject": subject,
+        "from": sender,
+        "to": to_addresses,
+        "body": body,
+        "date": date,
+        "attachments": attachments,
+    }
+
+
+def _parse_headers(email_id: str, raw_headers: bytes) -> dict[str, Any] | None:
+    """Parse raw email headers into a metadata dictionary."""
+    try:
+        # Most header blocks are read without building an EmailMessage
+        headers = header_values(raw_headers)
+        if headers is None:
+            parser = BytesParser(policy=default)
+            email_message = parser.parsebytes(raw_headers)
+            headers = {name: str(value) for name in METADATA_FIELDS if (value := email_message.get(name)) is not None}
+
+        subject = headers.get("subject", "")
+        sender = headers.get("from", "")
+        date_str = headers.get("date", "")
+        message_id = headers.get("message-id")
 
-        # Extract recipients
         to_addresses = []
-        to_header = email_message.get("To", "")
+        to_header = headers.get("to", "")
         if to_header:
-            # Simple parsing - split by comma and strip whitespace
             to_addresses = [addr.strip() for addr in to_header.split(",")]
 
-        # Also check CC recipients
-        cc_header = email_message.get("Cc", "")
+        cc_addresses = []
+        cc_header = headers.get("cc", "")
         if cc_header:
-            to_addresses.extend([addr.strip() for addr in cc_header.split(",")])
+            cc_addresses = [addr.strip() for addr in cc_header.split(",")]
+            to_addresses.extend(cc_addresses)
+
+        date = _parse_date(date_str)
 
-        # Parse date
-        try:
-            date_tuple = email.utils.parsedate_tz(date_str)
-            date = (
-                datetime.fromtimestamp(email.utils.mktime_tz(date_tuple), tz=timezone.utc)
-                if date_tuple
-                else datetime.now(timezone.utc)
-            )
-        except Exception:
-            date = datetime.now(timezone.utc)
-
-        # Get body content
-        body = ""
-        attachments = []
-
-        if email_message.is_multipart():
-            for part in email_message.walk():
-                content_type = part.get_content_type()
-                content_disposition = str(part.get("Content-Disposition", ""))
-
-                # Handle attachments
-                if "attachment" in content_disposition:
-                    filename = part.get_filename()
-                    if filename:
-                        attachments.append(filename)
-                # Handle text parts
-                elif content_type == "text/plain":
-                    body_part = part.get_payload(decode=True)
-                    if body_part:
-                        charset = part.get_content_charset("utf-8")
-                        try:
-                            body += body_part.decode(charset)
-                        except UnicodeDecodeError:
-                            body += body_part.decode("utf-8", errors="replace")
-        else:
-            # Handle plain text emails
-            payload = email_message.get_payload(decode=True)
-            if payload:
-                charset = email_message.get_content_charset("utf-8")
-                try:
-                    body = payload.decode(charset)
-                except UnicodeDecodeError:
-                    body = payload.decode("utf-8", errors="replace")
-        # TODO: Allow retrieving full email body
-        if body and len(body) > 20000:
-            body = body[:20000] + "...[TRUNCATED]"
         return {
-            "email_id": email_id or "",
+            "email_id": email_id,
             "message_id": message_id,
             "subject": subject,
             "from": sender,
             "to": to_addresses,
-            "body": body,
+            "cc": cc_addresses,
             "date": date,
-            "attachments": attachments,
+            "attachments": [],
         }
+    except Exception as e:
+        logger.error(f"Error parsing header metadata: {e}")
+        return None
+
+
+def _parse_header_blocks(blocks: list[tuple[str, bytes]]) -> list[dict[str, Any] | None]:
+    """Parse many (UID, header block) pairs at once, so a FETCH response is one pool job."""
+    return [_parse_headers(uid, headers) for uid, headers in blocks]
+
+
+def _find_attachment(raw_email: bytes, attachment_name: str) -> tuple[bytes | None, str | None]:
+    """Find an attachment by name in a whole email. Returns (data, mime type)."""
+    email_message = BytesParser(policy=default).parsebytes(raw_email)
+    if email_message.is_multipart():
+        for part in email_message.walk():
+            content_disposition = str(part.get("Content-Disposition", ""))
+            if "attachment" in content_disposition and part.get_filename() == attachment_name:
+                return part.get_payload(decode=True), part.get_content_type()
+    return None, None
+
+
+def _header_message_id(raw_headers: bytes) -> str | None:
+    """The Message-ID in a fetched ``HEADER.FIELDS (MESSAGE-ID)`` block."""
+    fields = unfold_fields(raw_headers, ("message-id",))
+    if fields is None:
+        value = BytesParser(policy=default).parsebytes(raw_headers, headersonly=True)["Message-ID"]
+        fields = {"message-id": str(value) if value is not None else ""}
+    return fields.get("message-id", "").strip() or None
+
+
+def _message_id_search_term(message_id: str) -> str:
+    """A ``HEADER MESSAGE-ID`` SEARCH key."""
+    return f"HEADER MESSAGE-ID {_quote_string(message_id.strip())}"
+
+
+_GMAIL_LABELS_RE = re.compile(rb'X-GM-LABELS \(((?:[^()"]|"(?:[^"\\]|\\.)*")*)\)', re.IGNORECASE)
+_GMAIL_LABEL_RE = re.compile(rb'"((?:[^"\\]|\\.)*)"|([^\s"]+)')
+# Gmail's own folders; every other selectable folder is a label
+_GMAIL_SYSTEM_PREFIXES = ("[Gmail]", "[Google Mail]")
+
+
+def _gmail_labels(attributes: bytes) -> list[str]:
+    """The user labels in a FETCH response's ``X-GM-LABELS (...)``; system labels such as ``\\Inbox`` are left out."""
+    match = _GMAIL_LABELS_RE.search(attributes)
+    if match is None:
+        return []
+    labels = []
+    for quoted, atom in _GMAIL_LABEL_RE.findall(match.group(1)):
+        label = re.sub(rb"\\(.)", rb"\1", quoted) if quoted else atom
+        if label and not label.startswith(b"\\"):
+            labels.append(label.decode("utf-8", errors="replace"))
+    return labels
+
+
+def _is_gmail_label(folder: Folder) -> bool:
+    """Whether a Gmail folder is a user label rather than INBOX or a [Gmail]/ system folder."""
+    return (
+        folder.name.upper() != "INBOX"
+        and not folder.name.startswith(_GMAIL_SYSTEM_PREFIXES)
+        and "\\Noselect" not in folder.flags
+    )
+
+
+def _fetch_size(attributes: bytes) -> int | None:
+    match = _FETCH_SIZE_RE.search(attributes)
+    return int(match.group(1)) if match else None
+
+
+def _fetch_internaldate(attributes: bytes) -> datetime | None:
+    match = _FETCH_INTERNALDATE_RE.search(attributes)
+    return parse_internaldate(match.group(1)) if match else None
+
+
+def _split_results(email_ids: list[str], succeeded: set[str]) -> tuple[list[str], list[str]]:
+    """Split ``email_ids`` into (succeeded, failed), keeping the caller's order."""
+    return (
+        [email_id for email_id in email_ids if email_id in succeeded],
+        [email_id for email_id in email_ids if email_id not in succeeded],
+    )
+
+
+# UIDs whose headers, dates or flags are fetched per command. aioimaplib parses a
+# response with one nested call per line, so larger replies can exceed the recursion
+# limit and leave the command waiting forever
+_FETCH_BATCH = 200
+# New emails a listing adds to the index before it asks the server instead, so a
+# large mailbox is indexed over several calls rather than on the first one
+_INDEX_SYNC_STEP = 1000
+# Seconds a listing waits for the index to catch up before asking the server
+_INDEX_SYNC_TIMEOUT = 30.0
+# Metadata index query arguments that do not depend on flags
+_INDEX_FILTERS = ("before", "since", "subject", "from_address", "to_address")
+
+# Emails whose bodies are fetched per command while filling the full-text index
+_TEXT_SYNC_BATCH = 50
+
+# Message-IDs OR'd together per UID SEARCH when finding copies of emails in another folder
+_MESSAGE_ID_SEARCH_BATCH = 100
+
+# Characters of parsed bodies kept in memory, so paging through a long email does not refetch it
+_BODY_CACHE_CHARS = 4_000_000
+
+
+class _BodyCache:
+    """Recently parsed emails, least recently used evicted first.
+
+    Keyed by mailbox, UIDVALIDITY and UID, which together always name the
+    same email, and bounded by the total length of the cached bodies.
+    """
+
+    def __init__(self, max_chars: int = _BODY_CACHE_CHARS):
+        self.max_chars = max_chars
+        self._emails: OrderedDict[tuple[str, int, str], dict[str, Any]] = OrderedDict()
+        self._chars = 0
+
+    def get(self, mailbox: str, uidvalidity: int | None, email_id: str) -> dict[str, Any] | None:
+        key = (mailbox, uidvalidity, email_id)
+        if uidvalidity is None or key not in self._emails:
+            return None
+        self._emails.move_to_end(key)
+        return self._emails[key]
+
+    def put(self, mailbox: str, uidvalidity: int | None, email_data: dict[str, Any]) -> None:
+        size = len(email_data["body"])
+        if uidvalidity is None or size > self.max_chars:
+            return
+        key = (mailbox, uidvalidity, email_data["email_id"])
+        if (previous := self._emails.pop(key, None)) is not None:
+            self._chars -= len(previous["body"])
+        self._emails[key] = email_data
+        self._chars += size
+        while self._chars > self.max_chars:
+            _, evicted = self._emails.popitem(last=False)
+            self._chars -= len(evicted["body"])
+
+
+class EmailClient:
+    def __init__(
+        self,
+        email_server: EmailServer,
+        sender: str | None = None,
+        use_pool: bool = False,
+        use_index: bool = False,
+    ):
+        self.email_server = email_server
+        self.sender = sender or email_server.user_name
+
+        self.imap_class = aioimaplib.IMAP4_SSL if self.email_server.use_ssl else aioimaplib.IMAP4
+
+        self.smtp_use_tls = self.email_server.use_ssl
+        self.smtp_start_tls = self.email_server.start_ssl
+
+        # Shared authenticated sessions; None means every call opens and closes its own session
+        self.pool: IMAPConnectionPool | None = get_connection_pool(email_server, self._connect) if use_pool else None
+        self._server_key = server_key(email_server)
+        self.use_index = use_index
+        self._body_cache = _BodyCache()
+
+    @property
+    def capabilities(self) -> ServerProfile:
+        """What this account's IMAP server supports, as recorded so far."""
+        return get_capability_store().get(self._server_key)
+
+    def _record_capabilities(self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL) -> None:
+        """Update the server profile from the capabilities the session advertised."""
+        try:
+            capabilities = imap.protocol.capabilities
+        except Exception:
+            return
+        if isinstance(capabilities, set | frozenset | list | tuple):
+            get_capability_store().record_capabilities(self._server_key, capabilities)
+
+    def _disable_capability(self, capability: str) -> None:
+        get_capability_store().mark_unsupported(self._server_key, capability)
+
+    @property
+    def index(self) -> MetadataIndex | None:
+        """The local metadata index, or None if this client does not use one."""
+        if not self.use_index or not get_settings().metadata_index:
+            return None
+        return get_metadata_index()
+
+    @property
+    def text_index(self) -> MetadataIndex | None:
+        """The metadata index if it also keeps the text of emails for full-text search."""
+        index = self.index
+        if index is None or not get_settings().full_text_index or not index.full_text:
+            return None
+        return index
+
+    def _update_index(self, method: str, mailbox: str, *args: Any) -> None:
+        """Apply a change the server has confirmed to the metadata index, if there is one."""
+        index = self.index
+        if index is None:
+            return
+        try:
+            getattr(index, method)(self._server_key, mailbox, *args)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not update the metadata index of {mailbox}: {e}")
+
+    @property
+    def wire_stats(self) -> WireStats:
+        """Bytes sent and received by this account's IMAP sessions."""
+        return get_wire_stats(self._server_key)
+
+    @contextmanager
+    def wire_usage(self, operation: str) -> Iterator[None]:
+        """Log the bytes an operation moved, on the wire and before compression."""
+        before = self.wire_stats.snapshot()
+        try:
+            yield
+        finally:
+            used = self.wire_stats.since(before)
+            if used.bytes_on_wire:
+                logger.debug(
+                    f"{operation}: {used.bytes_on_wire} bytes on the wire, "
+                    f"{used.payload_bytes} IMAP bytes (ratio {used.compression_ratio:.2f})"
+                )
+
+    async def _authenticate(self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL) -> None:
+        """Wait for the server greeting, then log in and identify ourselves."""
+        # Wait for the connection to be established
+        await imap._client_task
+        tap = attach_wire_tap(imap, self.wire_stats)
+        await imap.wait_hello_from_server()
+        await imap.login(self.email_server.user_name, self.email_server.password)
+        await _send_imap_id(imap)
+        self._record_capabilities(imap)
+        if tap is not None and self.email_server.compress:
+            await self._enable_compression(imap, tap)
+        if self.use_index and self.capabilities.qresync:
+            await self._enable_qresync(imap)
+
+    async def _enable_compression(self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, tap: WireTap) -> None:
+        """Negotiate COMPRESS=DEFLATE (RFC 4978) if the server advertises it."""
+        if not self.capabilities.compress_deflate:
+            return
+        try:
+            status = await enable_deflate(imap, tap)
+        except asyncio.TimeoutError:
+            # The server may or may not have switched to DEFLATE; the session cannot be trusted
+            raise
+        except Exception as e:
+            logger.warning(f"COMPRESS DEFLATE failed: {e!s}")
+            return
+        if status != "OK":
+            logger.info(f"Server rejected COMPRESS DEFLATE: {status}")
+            self._disable_capability("COMPRESS=DEFLATE")
+
+    async def _enable_qresync(self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL) -> None:
+        """ENABLE QRESYNC (RFC 7162), so index syncs learn expunged UIDs without searching."""
+        try:
+            response = await _execute(imap, aioimaplib.Command("ENABLE", imap.protocol.new_tag(), "QRESYNC"))
+        except Exception as e:
+            logger.debug(f"ENABLE QRESYNC failed: {e!s}")
+            return
+        status = _response_status(response)
+        lines = getattr(response, "lines", None) or []
+        if status == "OK" and any(isinstance(line, bytes) and b"QRESYNC" in line.upper() for line in lines):
+            _qresync_sessions.add(imap)
+        elif status != "OK":
+            logger.info(f"Server rejected ENABLE QRESYNC: {status}")
+            self._disable_capability("QRESYNC")
+
+    async def _connect(self) -> aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL:
+        """Open a new authenticated IMAP session (used as the pool's connector)."""
+        imap = self.imap_class(self.email_server.host, self.email_server.port)
+        try:
+            await self._authenticate(imap)
+        except BaseException:
+            try:
+                await imap.logout()
+            except Exception as e:
+                logger.info(f"Error during logout: {e}")
+            raise
+        return imap
+
+    @asynccontextmanager
+    async def _imap_session(self) -> AsyncIterator[aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL]:
+        """Yield an authenticated IMAP session.
+
+        Pooled sessions go back to the pool afterwards; otherwise the session
+        is logged out when the block exits.
+        """
+        if self.pool is not None:
+            async with self.pool.acquire() as imap:
+                yield imap
+            return
+
+        imap = self.imap_class(self.email_server.host, self.email_server.port)
+        try:
+            await self._authenticate(imap)
+            yield imap
+        finally:
+            # Ensure we logout properly
+            try:
+                await imap.logout()
+            except Exception as e:
+                logger.info(f"Error during logout: {e}")
+
+    def for_each_mailbox(self, mailboxes: list[str], work: FolderWork) -> AsyncIterator[FolderResult]:
+        """Run ``work(imap, mailbox)`` for every mailbox on up to ``folder_concurrency`` sessions at once.
+
+        Results are yielded as they complete; see ``fan_out``.
+        """
+        concurrency = get_settings().folder_concurrency
+        if self.pool is not None:
+            concurrency = min(concurrency, self.pool.max_size)
+        return fan_out(self._imap_session, mailboxes, work, concurrency)
+
+    async def _select_mailbox(
+        self,
+        imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL,
+        mailbox: str,
+        readonly: bool = False,
+        refresh: bool = False,
+    ) -> SelectedMailbox | None:
+        """SELECT (or EXAMINE, if ``readonly``) a mailbox unless the session already has it open.
+
+        A session that has the mailbox selected read-write serves read-only
+        callers as well; one that only EXAMINEd it is re-SELECTed for writes.
+        ``refresh`` selects it again anyway, for current EXISTS/UIDNEXT counts.
+        Returns the tracked state, or None if the server refused the mailbox.
+        """
+        current = _selected_mailboxes.get(imap)
+        if not refresh and current is not None and current.name == mailbox and (readonly or not current.readonly):
+            return current
+
+        # A failed SELECT/EXAMINE leaves no mailbox selected (RFC 3501 6.3.1)
+        _selected_mailboxes.pop(imap, None)
+        if readonly:
+            response = await imap.examine(_quote_mailbox(mailbox))
+            # aioimaplib only tracks SELECT; without this, UID commands on an EXAMINEd mailbox abort in state AUTH
+            imap.protocol.state = "SELECTED" if _response_status(response) == "OK" else "AUTH"
+        else:
+            response = await imap.select(_quote_mailbox(mailbox))
+
+        if _response_status(response) != "OK":
+            return None
+        lines = response[1] if isinstance(response, tuple) and len(response) > 1 else []
+        state = _parse_select_response(mailbox, readonly, lines)
+        _selected_mailboxes[imap] = state
+        return state
+
+    def _parse_email_data(self, raw_email: bytes, email_id: str | None = None) -> dict[str, Any]:
+        """Parse raw email data into a structured dictionary."""
+        return _parse_email(raw_email, email_id)
 
     @staticmethod
     def _build_search_criteria(
@@ -197,22 +990,22 @@ class EmailClient:
         seen: bool | None = None,
         flagged: bool | None = None,
         answered: bool | None = None,
+        gmail_query: str | None = None,
     ):
         search_criteria = []
         if before:
             search_criteria.extend(["BEFORE", before.strftime("%d-%b-%Y").upper()])
         if since:
             search_criteria.extend(["SINCE", since.strftime("%d-%b-%Y").upper()])
-        if subject:
-            search_criteria.extend(["SUBJECT", subject])
-        if body:
-            search_criteria.extend(["BODY", body])
-        if text:
-            search_criteria.extend(["TEXT", text])
-        if from_address:
-            search_criteria.extend(["FROM", from_address])
-        if to_address:
-            search_criteria.extend(["TO", to_address])
+        for key, value in (
+            ("SUBJECT", subject),
+            ("BODY", body),
+            ("TEXT", text),
+            ("FROM", from_address),
+            ("TO", to_address),
+        ):
+            if value:
+                search_criteria.extend([key, _quote_string(value)])
 
         # Flag-based criteria using mapping to reduce complexity
         flag_criteria = [
@@ -224,18 +1017,16 @@ class EmailClient:
             if flag_value in criteria_map:
                 search_criteria.append(criteria_map[flag_value])
 
+        # Gmail web search syntax (X-GM-EXT-1), e.g. "has:attachment larger:5M"
+        if gmail_query:
+            search_criteria.extend(["X-GM-RAW", _quote_string(gmail_query)])
+
         return search_criteria or ["ALL"]
 
     @staticmethod
     def _parse_date_from_header(date_str: str) -> datetime:
         """Parse a date string from an email header into a datetime object."""
-        try:
-            date_tuple = email.utils.parsedate_tz(date_str)
-            if date_tuple:
-                return datetime.fromtimestamp(email.utils.mktime_tz(date_tuple), tz=timezone.utc)
-        except Exception as e:
-            logger.debug(f"Failed to parse date '{date_str}': {e}")
-        return datetime.now(timezone.utc)
+        return _parse_date(date_str)
 
     async def _batch_fetch_dates(
         self,
@@ -304,92 +1095,105 @@ class EmailClient:
         imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL,
         email_ids: list[str],
     ) -> list[dict[str, Any]]:
-        """Batch fetch full headers for a list of email UIDs.
-
-        Returns a list of metadata dictionaries.
+        """Batch fetch full headers, flags and sizes for a list of email UIDs.
 
-        Note: Different IMAP servers return different response formats:
-        - Some include UID in the FETCH line: b'1 FETCH (UID 1 BODY[...]'
-        - Others (like Proton Bridge) return UID separately: b' UID 1)'
-        This method handles both formats.
+        With ``envelope_metadata`` set on the server, ENVELOPE and BODYSTRUCTURE
+        are fetched instead of header blocks, which also yields attachment names.
+        Returns a list of metadata dictionaries, which also go into the
+        metadata index of the selected mailbox if the client keeps one.
         """
         if not email_ids:
             return []
 
-        # Join UIDs for batch fetch: "1,2,3,4,5"
-        uid_list = ",".join(email_ids)
-
+        use_envelope = self._use_envelope
+        results: list[dict[str, Any]] = []
+        uid_sets = [
+            uid_set
+            for start in range(0, len(email_ids), _FETCH_BATCH)
+            for uid_set, _ in _uid_set_chunks(email_ids[start : start + _FETCH_BATCH])
+        ]
         try:
-            import re
-
-            _, data = await imap.uid("fetch", uid_list, "BODY.PEEK[HEADER]")
-
-            results: list[dict[str, Any]] = []
-            pending_uid: str | None = None
-            pending_headers: bytes | None = None
-
-            for item in data:
-                if isinstance(item, bytearray):
-                    # Store headers; emit if we already have a UID
-                    pending_headers = bytes(item)
-                    if pending_uid is not None:
-                        self._append_header_metadata(results, pending_uid, pending_headers)
-                        pending_uid, pending_headers = None, None
-                elif isinstance(item, bytes):
-                    uid_match = re.search(r"UID\s+(\d+)", item.decode("utf-8", errors="replace"))
-                    if not uid_match:
-                        continue
-                    if pending_headers is not None:
-                        # UID came after the data
-                        self._append_header_metadata(results, uid_match.group(1), pending_headers)
-                        pending_headers = None
-                    else:
-                        # UID came before the data - save it
-                        pending_uid = uid_match.group(1)
-
-            return results
+            for uid_set in uid_sets:
+                if use_envelope:
+                    status, data = await imap.uid("fetch", uid_set, _ENVELOPE_FETCH_ITEMS)
+                    if status != "OK":
+                        logger.warning(f"Server rejected ENVELOPE fetch, falling back to headers: {data}")
+                        self._disable_capability("ENVELOPE")
+                        return await self._batch_fetch_headers(imap, email_ids)
+                    for attributes in parse_fetch_responses(data):
+                        self._append_envelope_metadata(results, attributes)
+                    continue
+                _, data = await imap.uid("fetch", uid_set, _HEADER_FETCH_ITEMS)
+                messages = [message for message in _iter_fetch_messages(data) if message[2] is not None]
+                await self._append_header_metadata(results, messages)
         except Exception as e:
             logger.error(f"Error in batch fetch headers: {e}")
             return []
 
-    def _append_header_metadata(self, results: list[dict[str, Any]], uid: str, headers: bytes) -> None:
-        """Parse headers and append to results if successful."""
-        metadata = self._parse_header_to_metadata(uid, headers)
-        if metadata:
-            results.append(metadata)
+        self._index_headers(imap, results)
+        return results
+
+    @property
+    def _use_envelope(self) -> bool:
+        return self.email_server.envelope_metadata and "ENVELOPE" not in self.capabilities.unsupported
+
+    def _append_envelope_metadata(self, results: list[dict[str, Any]], attributes: dict[str, Any]) -> None:
+        """Turn parsed ENVELOPE/BODYSTRUCTURE attributes into metadata and append it."""
+        uid = attributes.get("UID")
+        envelope = parse_envelope(attributes.get("ENVELOPE"))
+        if uid is None or envelope is None:
+            return
+        internaldate = parse_internaldate(attributes.get("INTERNALDATE"))
+        if email.utils.parsedate_tz(envelope.date):
+            date = self._parse_date_from_header(envelope.date)
+        else:
+            date = internaldate.astimezone(timezone.utc) if internaldate else datetime.now(timezone.utc)
+        flags = attributes.get("FLAGS")
+        size = attributes.get("RFC822.SIZE")
+        results.append({
+            "email_id": str(uid),
+            "message_id": envelope.message_id,
+            "subject": envelope.subject,
+            "from": ", ".join(envelope.sender),
+            "to": envelope.to + envelope.cc,
+            "cc": envelope.cc,
+            "date": date,
+            "attachments": attachment_names(attributes.get("BODYSTRUCTURE")),
+            "flags": [str(flag) for flag in flags] if isinstance(flags, list) else [],
+            "size": size if isinstance(size, int) else None,
+            "internaldate": internaldate,
+        })
+
+    async def _append_header_metadata(
+        self, results: list[dict[str, Any]], messages: list[tuple[str, bytes, bytes]]
+    ) -> None:
+        """Parse (UID, attributes, header block) messages and append the ones that parse to results."""
+        blocks = [(uid, headers) for uid, _, headers in messages]
+        parsed = await run_parser(_parse_header_blocks, sum(len(headers) for _, headers in blocks), blocks)
+        for (_, attributes, _), metadata in zip(messages, parsed, strict=True):
+            if metadata:
+                metadata["flags"] = _fetch_flags(attributes)
+                metadata["size"] = _fetch_size(attributes)
+                metadata["internaldate"] = _fetch_internaldate(attributes)
+                results.append(metadata)
+
+    def _index_headers(self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, results: list[dict[str, Any]]) -> None:
+        """Add freshly fetched metadata to the index of the session's selected mailbox."""
+        index = self.index
+        state = _selected_mailboxes.get(imap)
+        if index is None or state is None or state.uidvalidity is None or not results:
+            return
+        try:
+            indexed = index.mailbox_state(self._server_key, state.name)
+            if indexed is None or indexed.uidvalidity != state.uidvalidity:
+                index.reset_mailbox(self._server_key, state.name, state.uidvalidity)
+            index.add(self._server_key, state.name, results)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not index metadata of {state.name}: {e}")
 
     def _parse_header_to_metadata(self, email_id: str, raw_headers: bytes) -> dict[str, Any] | None:
         """Parse raw email headers into a metadata dictionary."""
-        try:
-            parser = BytesParser(policy=default)
-            email_message = parser.parsebytes(raw_headers)
-
-            subject = email_message.get("Subject", "")
-            sender = email_message.get("From", "")
-            date_str = email_message.get("Date", "")
-
-            to_addresses = []
-            to_header = email_message.get("To", "")
-            if to_header:
-                to_addresses = [addr.strip() for addr in to_header.split(",")]
-
-            cc_header = email_message.get("Cc", "")
-            if cc_header:
-                to_addresses.extend([addr.strip() for addr in cc_header.split(",")])
-
-            date = self._parse_date_from_header(date_str)
-
-            return {
-                "email_id": email_id,
-                "subject": subject,
-                "from": sender,
-                "to": to_addresses,
-                "date": date,
-                "attachments": [],
-            }
-        except Exception as e:
-            logger.error(f"Error parsing header metadata: {e}")
-            return None
+        return _parse_headers(email_id, raw_headers)
 
     async def get_email_count(
         self,
@@ -403,16 +1207,8 @@ class EmailClient:
         flagged: bool | None = None,
         answered: bool | None = None,
     ) -> int:
-        imap = self.imap_class(self.email_server.host, self.email_server.port)
-        try:
-            # Wait for the connection to be established
-            await imap._client_task
-            await imap.wait_hello_from_server()
-
-            # Login and select inbox
-            await imap.login(self.email_server.user_name, self.email_server.password)
-            await _send_imap_id(imap)
-            await imap.select(_quote_mailbox(mailbox))
+        async with self._imap_session() as imap:
+            await self._select_mailbox(imap, mailbox, readonly=True)
             search_criteria = self._build_search_criteria(
                 before,
                 since,
@@ -427,14 +1223,137 @@ class EmailClient:
             # Search for messages and count them - use UID SEARCH for consistency
             _, messages = await imap.uid_search(*search_criteria)
             return len(messages[0].split())
-        finally:
-            # Ensure we logout properly
-            try:
-                await imap.logout()
-            except Exception as e:
-                logger.info(f"Error during logout: {e}")
 
-    async def get_emails_metadata_stream(  # noqa: C901
+    @staticmethod
+    async def _uid_esearch(imap, command: str, return_options: str, *args: str) -> tuple[list[str], int]:
+        """Run ``UID SEARCH``/``UID SORT`` with a RETURN clause and parse the ESEARCH reply.
+
+        aioimaplib's uid() does not take SEARCH or SORT, so the command is sent raw.
+        Returns (uids, count); raises if the server rejects the command.
+        """
+        response = await _execute(
+            imap,
+            aioimaplib.Command(
+                "UID",
+                imap.protocol.new_tag(),
+                command,
+                "RETURN",
+                f"({return_options})",
+                *args,
+                untagged_resp_name="ESEARCH",
+            ),
+        )
+        if _response_status(response) != "OK":
+            raise CommandRejectedError(f"UID {command} RETURN failed: {_response_status(response)}")
+        uids, count = _parse_esearch_response(response.lines)
+        if count is None:
+            raise RuntimeError(f"UID {command} RETURN did not report a COUNT")
+        return uids, count
+
+    async def _search_page_window(
+        self,
+        imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL,
+        search_criteria: list[str],
+        order: str,
+        start: int,
+        end: int,
+        rejected: list[str],
+    ) -> tuple[list[str], int] | None:
+        """Ask the server for just one page of UIDs and the total match count.
+
+        Uses ESORT with PARTIAL (RFC 5267) ordered by date, or, on servers
+        without SORT, ESEARCH with PARTIAL in UID (arrival) order. Arrival order
+        is the documented ordering on such servers: it matches the date order of
+        the other paths except for emails that were imported, moved or
+        delivered late, and sorting by date would need every match. Returns
+        (page_uids, total), or None if the server offers neither and the
+        caller has to search for every match. An extension the server
+        rejected is added to ``rejected`` for the caller to disable once the
+        same search succeeds without it.
+        """
+        profile = self.capabilities
+        if profile.supports("ESORT") and profile.supports("CONTEXT=SORT"):
+            extension = "CONTEXT=SORT"
+        elif profile.supports("ESEARCH") and profile.supports("CONTEXT=SEARCH") and not profile.sort:
+            extension = "CONTEXT=SEARCH"
+        else:
+            return None
+
+        try:
+            if extension == "CONTEXT=SORT":
+                sort_order = "(REVERSE DATE)" if order == "desc" else "(DATE)"
+                logger.info(f"Using IMAP ESORT PARTIAL {start + 1}:{end} with {sort_order}")
+                return await self._uid_esearch(
+                    imap, "SORT", f"PARTIAL {start + 1}:{end} COUNT", sort_order, "UTF-8", *search_criteria
+                )
+
+            if order != "desc":
+                window = f"{start + 1}:{end}"
+            elif profile.supports("PARTIAL"):
+                # Negative ranges count from the newest match (RFC 9394)
+                window = f"-{end}:-{start + 1}"
+            else:
+                _, total = await self._uid_esearch(imap, "SEARCH", "COUNT", *search_criteria)
+                if start >= total:
+                    return [], total
+                window = f"{max(total - end, 0) + 1}:{total - start}"
+            logger.info(f"Using IMAP ESEARCH PARTIAL {window}")
+            uids, total = await self._uid_esearch(imap, "SEARCH", f"PARTIAL {window} COUNT", *search_criteria)
+            uids.sort(key=int, reverse=(order == "desc"))
+            return uids, total
+        except CommandRejectedError as e:
+            logger.warning(f"Windowed search rejected, falling back to full search: {e}")
+            rejected.append(extension)
+            return None
+        except Exception as e:
+            # Timeouts and dropped connections say nothing about the extension; only skip it this time
+            logger.warning(f"Windowed search failed, falling back to full search: {e}")
+            return None
+
+    async def _fetch_headers_in_order(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, page_uids: list[str]
+    ) -> list[dict[str, Any]]:
+        """Batch fetch headers for ``page_uids`` and return them in that order."""
+        if not page_uids:
+            return []
+        metadata_list = await self._batch_fetch_headers(imap, page_uids)
+        # Batch fetch may return results unordered
+        uid_order = {uid: i for i, uid in enumerate(page_uids)}
+        metadata_list.sort(key=lambda m: uid_order.get(m["email_id"], 999999))
+        return metadata_list
+
+    async def _uid_sort(self, imap, sort_order: str, search_criteria: list[str]) -> list[str]:
+        """Run UID SORT and return the sorted UIDs, raising if it fails.
+
+        aioimaplib's uid() does not take SORT, so the command is sent raw.
+        A NO or BAD from the server raises CommandRejectedError.
+        """
+        response = await _execute(
+            imap,
+            aioimaplib.Command(
+                "UID", imap.protocol.new_tag(), "SORT", sort_order, "UTF-8", *search_criteria, untagged_resp_name="SORT"
+            ),
+        )
+        if _response_status(response) in ("NO", "BAD"):
+            raise CommandRejectedError(f"SORT returned {_response_status(response)}")
+        # The untagged SORT lines (name stripped by aioimaplib) precede the completion text
+        return [uid.decode() for line in response.lines[:-1] for uid in bytes(line).split() if uid.isdigit()]
+
+    def _disable_rejected(self, rejected: list[str]) -> None:
+        """Disable the extensions in ``rejected``, now that the same search succeeded without them.
+
+        A NO or BAD can also come from the search criteria themselves, so an
+        extension is only blamed once a plainer command accepted the same criteria.
+        """
+        for capability in rejected:
+            self._disable_capability(capability)
+
+    def _require_gmail(self, gmail_query: str | None) -> None:
+        """Reject a Gmail search query on a server without X-GM-EXT-1."""
+        if gmail_query and not self.capabilities.gmail:
+            raise ValueError("gmail_query needs a Gmail server (X-GM-EXT-1)")
+
+    async def get_emails_metadata_page(
         self,
         page: int = 1,
         page_size: int = 10,
@@ -448,17 +1367,41 @@ class EmailClient:
         seen: bool | None = None,
         flagged: bool | None = None,
         answered: bool | None = None,
-    ) -> AsyncGenerator[dict[str, Any], None]:
-        imap = self.imap_class(self.email_server.host, self.email_server.port)
-        try:
-            # Wait for the connection to be established
-            await imap._client_task
-            await imap.wait_hello_from_server()
-
-            # Login and select inbox
-            await imap.login(self.email_server.user_name, self.email_server.password)
-            await _send_imap_id(imap)
-            await imap.select(_quote_mailbox(mailbox))
+        gmail_query: str | None = None,
+    ) -> tuple[list[dict[str, Any]], int]:
+        """Fetch one page of email metadata and the total number of matches.
+
+        Both come from the same session and the same SORT/SEARCH, so listing a
+        page does not need a separate get_email_count() round trip. With the
+        metadata index, both are answered locally once the index has caught up.
+        A ``gmail_query`` is always searched on the server, with X-GM-RAW.
+        Emails are ordered by date, except when servers with ESEARCH but
+        without SORT are asked directly: those page in arrival order (see
+        _search_page_window).
+        Returns (metadata_list, total).
+        """
+        async with self._imap_session() as imap:
+            self._require_gmail(gmail_query)
+            state = await self._select_mailbox(imap, mailbox, readonly=True, refresh=self.index is not None)
+
+            if self.index is not None and state is not None and not gmail_query:
+                indexed_page = await self._page_from_index(
+                    imap,
+                    state,
+                    offset=(page - 1) * page_size,
+                    limit=page_size,
+                    before=before,
+                    since=since,
+                    subject=subject,
+                    from_address=from_address,
+                    to_address=to_address,
+                    order=order,
+                    seen=seen,
+                    flagged=flagged,
+                    answered=answered,
+                )
+                if indexed_page is not None:
+                    return indexed_page
 
             search_criteria = self._build_search_criteria(
                 before,
@@ -469,6 +1412,7 @@ class EmailClient:
                 seen=seen,
                 flagged=flagged,
                 answered=answered,
+                gmail_query=gmail_query,
             )
             logger.info(f"Get metadata: Search criteria: {search_criteria}")
 
@@ -476,100 +1420,360 @@ class EmailClient:
             start = (page - 1) * page_size
             end = start + page_size
 
-            # Check if server supports SORT extension (RFC 5256)
-            if _has_sort_capability(imap):
+            rejected: list[str] = []
+            # Prefer asking the server for only this page and the COUNT (ESORT/ESEARCH)
+            window = await self._search_page_window(imap, search_criteria, order, start, end, rejected)
+            if window is not None:
+                page_uids, total = window
+                return await self._fetch_headers_in_order(imap, page_uids), total
+
+            # Check if server supports SORT extension (RFC 5256) and it has not failed before
+            if _has_sort_capability(imap) and self.capabilities.supports("SORT") is not False:
                 # Use server-side sorting - much more efficient
                 sort_order = "(REVERSE DATE)" if order == "desc" else "(DATE)"
                 logger.info(f"Using IMAP SORT with {sort_order}")
 
                 try:
-                    _, sort_response = await imap.uid("sort", sort_order, "UTF-8", *search_criteria)
+                    sorted_uids = await self._uid_sort(imap, sort_order, search_criteria)
+                    self._disable_rejected(rejected)
 
-                    if not sort_response or not sort_response[0]:
+                    if not sorted_uids:
                         logger.warning("No messages returned from SORT")
-                        return
+                        return [], 0
 
-                    # Parse sorted UIDs
-                    sorted_uids = sort_response[0].split()
-                    logger.info(f"SORT returned {len(sorted_uids)} UIDs")
+                    total = len(sorted_uids)
+                    logger.info(f"SORT returned {total} UIDs")
 
                     # Paginate the sorted UIDs
-                    page_uids = [uid.decode("utf-8") for uid in sorted_uids[start:end]]
-
-                    if not page_uids:
-                        return
-
-                    # Batch fetch full headers for just the page
-                    metadata_list = await self._batch_fetch_headers(imap, page_uids)
-
-                    # Sort the results to match the SORT order (batch fetch may return unordered)
-                    uid_order = {uid: i for i, uid in enumerate(page_uids)}
-                    metadata_list.sort(key=lambda m: uid_order.get(m["email_id"], 999999))
+                    page_uids = sorted_uids[start:end]
 
-                    for metadata in metadata_list:
-                        yield metadata
-                    return
+                    # Batch fetch full headers for just the page, keeping the SORT order
+                    return await self._fetch_headers_in_order(imap, page_uids), total
 
+                except CommandRejectedError as e:
+                    logger.warning(f"SORT command rejected, falling back to batch fetch: {e}")
+                    rejected.append("SORT")
                 except Exception as e:
                     logger.warning(f"SORT command failed, falling back to batch fetch: {e}")
                     # Fall through to batch fetch fallback
 
             # Fallback: Batch fetch approach (for servers without SORT)
-            # This is still much faster than the old N individual fetches
-            logger.info("Using batch fetch fallback (server doesn't support SORT)")
+            return await self._search_sorted_by_date(imap, search_criteria, order, start, end, rejected)
 
-            # Search for messages
-            _, messages = await imap.uid_search(*search_criteria)
+    async def _search_sorted_by_date(
+        self,
+        imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL,
+        search_criteria: list[str],
+        order: str,
+        start: int,
+        end: int,
+        rejected: list[str],
+    ) -> tuple[list[dict[str, Any]], int]:
+        """Search for every match, sort them by Date locally and fetch one page of headers."""
+        # This is still much faster than the old N individual fetches
+        logger.info("Using batch fetch fallback (server doesn't support SORT)")
+
+        # Search for messages
+        result, messages = await imap.uid_search(*search_criteria)
+        if result in ("NO", "BAD"):
+            logger.warning(f"Search failed: {result} {messages}")
+            return [], 0
+        if result == "OK":
+            self._disable_rejected(rejected)
+
+        if not messages or not messages[0]:
+            logger.warning("No messages returned from search")
+            return [], 0
+
+        email_ids = messages[0].split()
+        total = len(email_ids)
+        logger.info(f"Found {total} email IDs")
 
-            if not messages or not messages[0]:
-                logger.warning("No messages returned from search")
-                return
+        if not email_ids:
+            return [], 0
+
+        # Batch fetch just the Date headers for all emails (much smaller than full headers)
+        date_tuples = []
+        for batch_start in range(0, len(email_ids), _FETCH_BATCH):
+            batch = await self._batch_fetch_dates(imap, email_ids[batch_start : batch_start + _FETCH_BATCH])
+            if not batch:
+                date_tuples = []
+                break
+            date_tuples.extend(batch)
+
+        if not date_tuples:
+            # Fallback: if batch date fetch failed, try with full headers
+            logger.warning("Batch date fetch returned no results, using full header fetch")
+            all_uids = [uid.decode("utf-8") for uid in email_ids]
+            all_metadata = await self._batch_fetch_headers(imap, all_uids)
+            all_metadata.sort(key=lambda x: x["date"], reverse=(order == "desc"))
+            return all_metadata[start:end], total
+
+        # Sort by date
+        date_tuples.sort(key=lambda x: x[1], reverse=(order == "desc"))
+
+        # Paginate
+        page_tuples = date_tuples[start:end]
+        page_uids = [uid for uid, _ in page_tuples]
+
+        # Batch fetch full headers for just the page, keeping the date order
+        return await self._fetch_headers_in_order(imap, page_uids), total
+
+    async def _all_uids(self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL) -> set[int]:
+        """Every UID in the selected mailbox; as compact ranges when the server has ESEARCH."""
+        if self.capabilities.esearch:
+            try:
+                uids, _ = await self._uid_esearch(imap, "SEARCH", "ALL COUNT", "ALL")
+                return {int(uid) for uid in uids}
+            except Exception as e:
+                logger.debug(f"UID SEARCH RETURN (ALL) failed, using plain UID SEARCH: {e}")
+        result = await imap.uid_search("ALL")
+        if _response_status(result) != "OK":
+            raise RuntimeError(f"UID SEARCH ALL failed: {_response_status(result)}")
+        _, data = result
+        return {int(uid) for uid in (data[0] if data else b"").split() if uid.isdigit()}
+
+    async def _sync_index(
+        self,
+        imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL,
+        state: SelectedMailbox,
+        refresh_flags: bool = False,
+        limit: int | None = None,
+    ) -> bool:
+        """Bring the index of the selected mailbox up to date with the server.
+
+        On CONDSTORE servers (RFC 7162) a single ``UID FETCH 1:* (UID FLAGS)
+        (CHANGEDSINCE n)`` returns every email that arrived or changed flags
+        since the last sync, and with QRESYNC also the UIDs that were expunged.
+        Otherwise UIDs are diffed against a UID SEARCH, and ``refresh_flags``
+        re-reads the flags of indexed emails, which other clients may change.
+        Either way, headers are fetched only for new UIDs, newest first and at
+        most ``limit`` of them. Returns whether the index now holds every email;
+        if not, the next sync carries on where this one stopped.
+        """
+        index, account, mailbox = self.index, self._server_key, state.name
+        indexed = index.mailbox_state(account, mailbox)
+        if indexed is None or indexed.uidvalidity != state.uidvalidity:
+            if indexed is not None:
+                logger.info(f"UIDVALIDITY of {mailbox} changed, rebuilding its metadata index")
+            index.reset_mailbox(account, mailbox, state.uidvalidity)
+            indexed = None
+
+        modseq = state.highestmodseq if self.capabilities.condstore else None
+        if indexed is not None and modseq is not None and indexed.highestmodseq is not None:
+            try:
+                complete = await self._sync_index_changes(imap, state, indexed.highestmodseq, limit)
+                index.mark_synced(account, mailbox, state.uidnext, modseq)
+                return complete
+            except Exception as e:
+                logger.warning(f"CHANGEDSINCE sync of {mailbox} failed, diffing UIDs instead: {e}")
+                modseq = state.highestmodseq if self.capabilities.condstore else None
+
+        unchanged = (
+            indexed is not None
+            and state.uidnext is not None
+            and indexed.uidnext == state.uidnext
+            and index.count(account, mailbox) == state.exists
+        )
+        complete = unchanged or await self._sync_index_uids(imap, state, limit)
 
-            email_ids = messages[0].split()
-            logger.info(f"Found {len(email_ids)} email IDs")
+        # Flags of already indexed emails are only known to be current once re-read;
+        # that is also the starting point for tracking mod-sequences
+        if indexed is not None and state.exists and (refresh_flags or modseq is not None):
+            await self._refresh_flags(imap, state)
 
-            if not email_ids:
-                return
+        index.mark_synced(account, mailbox, state.uidnext, modseq)
+        return complete
 
-            # Batch fetch just the Date headers for all emails (much smaller than full headers)
-            date_tuples = await self._batch_fetch_dates(imap, email_ids)
+    async def _refresh_flags(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, state: SelectedMailbox, uids: list[int] | None = None
+    ) -> None:
+        """Re-read the flags of ``uids``, or of every indexed email, into the index."""
+        if uids is None:
+            uids = sorted(self.index.uids(self._server_key, state.name))
+        flags = {}
+        for start in range(0, len(uids), _FETCH_BATCH):
+            batch = [str(uid) for uid in uids[start : start + _FETCH_BATCH]]
+            for uid_set, _ in _uid_set_chunks(batch):
+                _, data = await imap.uid("fetch", uid_set, "(UID FLAGS)")
+                flags.update({int(uid): _fetch_flags(attributes) for uid, attributes, _ in _iter_fetch_messages(data)})
+        self.index.set_flags(self._server_key, state.name, flags)
+
+    async def _sync_index_changes(
+        self,
+        imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL,
+        state: SelectedMailbox,
+        highestmodseq: int,
+        limit: int | None = None,
+    ) -> bool:
+        """Apply the changes since mod-sequence ``highestmodseq`` to the index (CONDSTORE/QRESYNC).
 
-            if not date_tuples:
-                # Fallback: if batch date fetch failed, try with full headers
-                logger.warning("Batch date fetch returned no results, using full header fetch")
-                all_uids = [uid.decode("utf-8") for uid in email_ids]
-                all_metadata = await self._batch_fetch_headers(imap, all_uids)
-                all_metadata.sort(key=lambda x: x["date"], reverse=(order == "desc"))
-                for metadata in all_metadata[start:end]:
-                    yield metadata
-                return
+        Returns whether the index now holds every email, as ``_sync_index`` does.
+        """
+        index, account, mailbox = self.index, self._server_key, state.name
+        if state.highestmodseq == highestmodseq and index.count(account, mailbox) == state.exists:
+            return True
+        if not state.exists:
+            index.remove(account, mailbox, index.uids(account, mailbox))
+            return True
+
+        qresync = imap in _qresync_sessions
+        status, data = await self._uid_fetch_changedsince(imap, highestmodseq, qresync)
+        if status in ("NO", "BAD"):
+            _qresync_sessions.discard(imap)
+            self._disable_capability("QRESYNC" if qresync else "CONDSTORE")
+            raise RuntimeError(f"UID FETCH CHANGEDSINCE returned {status}")
+
+        local_uids = index.uids(account, mailbox)
+        vanished_ranges = _vanished_ranges(data)
+        vanished = {uid for uid in local_uids if any(low <= uid <= high for low, high in vanished_ranges)}
+        index.remove(account, mailbox, vanished)
+        local_uids -= vanished
+
+        changed = {int(uid): _fetch_flags(attributes) for uid, attributes, _ in _iter_fetch_messages(data)}
+        index.set_flags(account, mailbox, {uid: flags for uid, flags in changed.items() if uid in local_uids})
+        new_uids = sorted(uid for uid in changed if uid not in local_uids)
+        await self._index_new_emails(imap, new_uids[-limit:] if limit is not None else new_uids)
+        logger.info(
+            f"Metadata index of {mailbox}: {len(new_uids)} new, {len(changed) - len(new_uids)} changed, "
+            f"{len(vanished)} removed emails since MODSEQ {highestmodseq}"
+        )
 
-            # Sort by date
-            date_tuples.sort(key=lambda x: x[1], reverse=(order == "desc"))
+        # Without QRESYNC expunges are not reported, and an index still filling lacks older emails;
+        # find both by UID
+        if index.count(account, mailbox) != state.exists:
+            return await self._sync_index_uids(imap, state, limit)
+        return True
 
-            # Paginate
-            page_tuples = date_tuples[start:end]
-            page_uids = [uid for uid, _ in page_tuples]
+    @staticmethod
+    async def _uid_fetch_changedsince(imap, highestmodseq: int, qresync: bool) -> tuple[str, list]:
+        """Run ``UID FETCH 1:* (UID FLAGS) (CHANGEDSINCE n [VANISHED])``; return (status, lines).
 
-            if not page_uids:
-                return
+        aioimaplib's uid() drops FETCH modifiers, so the command is sent raw. Untagged
+        responses are routed by name, so VANISHED lines are collected alongside it.
+        """
+        protocol = imap.protocol
+        modifier = f"(CHANGEDSINCE {highestmodseq} VANISHED)" if qresync else f"(CHANGEDSINCE {highestmodseq})"
+        command = aioimaplib.FetchCommand(protocol.new_tag(), "1:*", "(UID FLAGS)", modifier, prefix="UID")
+        # Its tag never comes back from the server, so only the FETCH completion ends the exchange
+        vanished = aioimaplib.Command("VANISHED", f"{command.tag}.vanished")
+        if qresync:
+            protocol.pending_async_commands["VANISHED"] = vanished
+        try:
+            response = await _execute(imap, command)
+        finally:
+            if protocol.pending_async_commands.get("VANISHED") is vanished:
+                del protocol.pending_async_commands["VANISHED"]
+        # aioimaplib strips the response name off the lines it routes
+        lines = [b"VANISHED " + bytes(line) for line in vanished.response.lines]
+        return _response_status(response), lines + list(response.lines)
+
+    async def _sync_index_uids(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, state: SelectedMailbox, limit: int | None = None
+    ) -> bool:
+        """Diff the index against every UID on the server: drop the gone, fetch the newest ``limit`` new ones.
 
-            # Batch fetch full headers for just the page
-            metadata_list = await self._batch_fetch_headers(imap, page_uids)
+        Returns whether every new email was fetched.
+        """
+        index, account, mailbox = self.index, self._server_key, state.name
+        server_uids = await self._all_uids(imap)
+        local_uids = index.uids(account, mailbox)
+        index.remove(account, mailbox, local_uids - server_uids)
+        missing = sorted(server_uids - local_uids)
+        fetched = missing[-limit:] if limit is not None else missing
+        await self._index_new_emails(imap, fetched[::-1])
+        logger.info(
+            f"Metadata index of {mailbox}: {len(fetched)} new, {len(local_uids - server_uids)} removed emails"
+            + (f", {len(missing) - len(fetched)} still to index" if len(fetched) < len(missing) else "")
+        )
+        return len(fetched) == len(missing)
 
-            # Sort results to match the date order
-            uid_order = {uid: i for i, uid in enumerate(page_uids)}
-            metadata_list.sort(key=lambda m: uid_order.get(m["email_id"], 999999))
+    async def _index_new_emails(self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, uids: list[int]) -> None:
+        """Fetch headers for ``uids`` in batches; _batch_fetch_headers adds them to the index."""
+        for start in range(0, len(uids), _FETCH_BATCH):
+            batch = [str(uid) for uid in uids[start : start + _FETCH_BATCH]]
+            if not await self._batch_fetch_headers(imap, batch):
+                raise RuntimeError(f"Could not fetch headers for {len(batch)} emails")
 
-            for metadata in metadata_list:
-                yield metadata
+    async def _page_from_index(
+        self,
+        imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL,
+        state: SelectedMailbox,
+        **query: Any,
+    ) -> tuple[list[dict[str, Any]], int] | None:
+        """Sync the metadata index, then answer a page query from it.
+
+        Each call adds at most ``_INDEX_SYNC_STEP`` new emails to the index and
+        waits at most ``_INDEX_SYNC_TIMEOUT`` seconds for it. Returns None if
+        the mailbox cannot be indexed, syncing fails or times out, or the index
+        does not hold every email yet, so the caller asks the server instead.
+        """
+        if state.uidvalidity is None:
+            return None
+        try:
+            sync = self._sync_index(imap, state, limit=_INDEX_SYNC_STEP)
+            if not await asyncio.wait_for(sync, _INDEX_SYNC_TIMEOUT):
+                logger.info(f"Metadata index of {state.name} is still filling, asking the server")
+                return None
+            # Without CONDSTORE, flags other clients changed are only current once re-read,
+            # and only the emails the other filters leave can change the answer
+            flags_tracked = self.index.mailbox_state(self._server_key, state.name).highestmodseq is not None
+            if not flags_tracked and any(query.get(flag) is not None for flag in ("seen", "flagged", "answered")):
+                filters = {key: value for key, value in query.items() if key in _INDEX_FILTERS}
+                candidates = self.index.candidate_uids(self._server_key, state.name, **filters)
+                if candidates:
+                    await self._refresh_flags(imap, state, candidates)
+            return self.index.query(self._server_key, state.name, **query)
+        except Exception as e:
+            logger.warning(f"Metadata index unavailable for {state.name}, asking the server: {e}")
+            return None
 
-        finally:
-            # Ensure we logout properly
-            try:
-                await imap.logout()
-            except Exception as e:
-                logger.info(f"Error during logout: {e}")
+    async def refresh_index(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, mailbox: str, refresh_flags: bool = False
+    ) -> SelectedMailbox:
+        """Re-SELECT ``mailbox`` on ``imap`` and bring its metadata index up to date, if there is one.
+
+        The mailbox is selected read-write so that the session can IDLE on it
+        afterwards. Raises if the mailbox cannot be selected or synced.
+        """
+        state = await self._select_mailbox(imap, mailbox, refresh=True)
+        if state is None:
+            raise RuntimeError(f"Cannot select mailbox {mailbox}")
+        if self.index is not None and state.uidvalidity is not None:
+            await self._sync_index(imap, state, refresh_flags=refresh_flags)
+        return state
+
+    async def get_emails_metadata_stream(
+        self,
+        page: int = 1,
+        page_size: int = 10,
+        before: datetime | None = None,
+        since: datetime | None = None,
+        subject: str | None = None,
+        from_address: str | None = None,
+        to_address: str | None = None,
+        order: str = "desc",
+        mailbox: str = "INBOX",
+        seen: bool | None = None,
+        flagged: bool | None = None,
+        answered: bool | None = None,
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        metadata_list, _ = await self.get_emails_metadata_page(
+            page,
+            page_size,
+            before,
+            since,
+            subject,
+            from_address,
+            to_address,
+            order,
+            mailbox,
+            seen,
+            flagged,
+            answered,
+        )
+        for metadata in metadata_list:
+            yield metadata
 
     def _check_email_content(self, data: list) -> bool:
         """Check if the fetched data contains actual email content."""
@@ -599,14 +1803,19 @@ class EmailClient:
         return None
 
     async def _fetch_email_with_formats(self, imap, email_id: str) -> list | None:
-        """Try different fetch formats to get email data."""
-        fetch_formats = ["RFC822", "BODY[]", "BODY.PEEK[]", "(BODY.PEEK[])"]
+        """Fetch email data, starting with the format known to work on this server.
 
-        for fetch_format in fetch_formats:
+        Other formats are only tried if that one fails; the first format that
+        returns content is remembered for the next fetch.
+        """
+        profile = self.capabilities
+        for fetch_format in profile.fetch_formats():
             try:
                 _, data = await imap.uid("fetch", email_id, fetch_format)
 
                 if data and len(data) > 0 and self._check_email_content(data):
+                    if fetch_format != profile.fetch_format:
+                        get_capability_store().record_fetch_format(self._server_key, fetch_format)
                     return data
 
             except Exception as e:
@@ -614,17 +1823,251 @@ class EmailClient:
 
         return None
 
-    async def get_email_body_by_id(self, email_id: str, mailbox: str = "INBOX") -> dict[str, Any] | None:
-        imap = self.imap_class(self.email_server.host, self.email_server.port)
+    async def _fetch_raw_emails(self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, uid_set: str) -> dict[str, bytes]:
+        """Fetch the full messages in ``uid_set`` with a single UID FETCH.
+
+        Starts with the FETCH format known to work on this server and only
+        tries the next one if a format returns nothing at all.
+        Returns raw message bytes by UID; UIDs that did not come back are missing.
+        """
+        profile = self.capabilities
+        for fetch_format in profile.fetch_formats():
+            try:
+                result = await imap.uid("fetch", uid_set, fetch_format)
+            except Exception as e:
+                logger.debug(f"Fetch format {fetch_format} failed: {e}")
+                continue
+            if _response_status(result) in ("NO", "BAD"):
+                logger.debug(f"Fetch format {fetch_format} failed: {_response_status(result)}")
+                continue
+
+            raw_emails = dict(_iter_uid_literals(result[1] if isinstance(result, tuple) else []))
+            if raw_emails:
+                if fetch_format != profile.fetch_format:
+                    get_capability_store().record_fetch_format(self._server_key, fetch_format)
+                return raw_emails
+        return {}
+
+    async def _fetch_structure(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, email_id: str
+    ) -> list[BodyPart] | None:
+        """Fetch the BODYSTRUCTURE of one email as its flat list of parts; None if unavailable."""
+        if "BODYSTRUCTURE" in self.capabilities.unsupported:
+            return None
         try:
-            # Wait for the connection to be established
-            await imap._client_task
-            await imap.wait_hello_from_server()
+            result = await imap.uid("fetch", email_id, _STRUCTURE_FETCH_ITEMS)
+        except Exception as e:
+            logger.debug(f"BODYSTRUCTURE fetch of {email_id} failed: {e}")
+            return None
+        status = _response_status(result)
+        if status == "BAD":
+            self._disable_capability("BODYSTRUCTURE")
+        if status != "OK":
+            return None
+        for attributes in parse_fetch_responses(result[1]):
+            if str(attributes.get("UID")) == email_id:
+                return walk_bodystructure(attributes.get("BODYSTRUCTURE")) or None
+        return None
 
-            # Login and select inbox
-            await imap.login(self.email_server.user_name, self.email_server.password)
-            await _send_imap_id(imap)
-            await imap.select(_quote_mailbox(mailbox))
+    async def _fetch_sections(
+        self,
+        imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL,
+        email_id: str,
+        parts: list[BodyPart],
+        header: bool = False,
+        binary: bool | None = None,
+    ) -> dict[str, bytes] | None:
+        """Fetch only ``parts`` of one email, and its header block if ``header`` is set.
+
+        On servers with BINARY (RFC 3516) the server removes the transfer
+        encoding; otherwise it is decoded here. Returns content by section,
+        the header block under ``HEADER``, or None if the fetch failed.
+        """
+        if binary is None:
+            binary = self.capabilities.supports("BINARY") is True
+        kind = "BINARY" if binary else "BODY"
+        items = ["UID", *(["BODY.PEEK[HEADER]"] if header else []), *(f"{kind}.PEEK[{p.section}]" for p in parts)]
+        result = await imap.uid("fetch", email_id, f"({' '.join(items)})")
+        status = _response_status(result)
+        if status != "OK":
+            if not binary:
+                return None
+            # NO [UNKNOWN-CTE] is about this email only; BAD means BINARY does not work here
+            if status == "BAD":
+                self._disable_capability("BINARY")
+            return await self._fetch_sections(imap, email_id, parts, header, binary=False)
+
+        attributes = next((a for a in parse_fetch_responses(result[1]) if str(a.get("UID")) == email_id), None)
+        if attributes is None:
+            return None
+        names = {"HEADER": "BODY[HEADER]"} if header else {}
+        names.update((part.section, f"{kind}[{part.section}]") for part in parts)
+        if any(name not in attributes for name in names.values()):
+            return None
+        sections = {section: _as_bytes(attributes[name]) for section, name in names.items()}
+        if not binary:
+            for part in parts:
+                sections[part.section] = _decode_transfer(sections[part.section], part.encoding)
+        return sections
+
+    async def _fetch_email_by_parts(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, email_id: str
+    ) -> dict[str, Any] | None:
+        """Read an email from its header block and text parts, skipping attachments and HTML.
+
+        Returns the same dictionary as _parse_email_data, or None if the email
+        is not multipart or its structure could not be fetched.
+        """
+        parts = await self._fetch_structure(imap, email_id)
+        if parts is None or len(parts) < 2:
+            return None
+        text_parts = [part for part in parts if part.content_type == "text/plain" and part.disposition != "attachment"]
+        try:
+            contents = await self._fetch_sections(imap, email_id, text_parts, header=True)
+            metadata = self._parse_header_to_metadata(email_id, contents["HEADER"]) if contents else None
+        except Exception as e:
+            logger.debug(f"Section fetch of {email_id} failed: {e}")
+            return None
+        if metadata is None:
+            return None
+        body = "".join(_decode_text_part(contents[part.section], part.charset) for part in text_parts)
+        return {
+            "email_id": email_id,
+            "message_id": metadata["message_id"],
+            "subject": metadata["subject"],
+            "from": metadata["from"],
+            "to": metadata["to"],
+            "body": body,
+            "date": metadata["date"],
+            "attachments": [part.filename for part in parts if part.is_attachment],
+        }
+
+    def _known_large_uids(self, mailbox: str, state: SelectedMailbox | None) -> set[int]:
+        """UIDs of the selected mailbox that the index knows to be worth reading by parts."""
+        index = self.index
+        if index is None or state is None or state.uidvalidity is None:
+            return set()
+        try:
+            indexed = index.mailbox_state(self._server_key, mailbox)
+            if indexed is None or indexed.uidvalidity != state.uidvalidity:
+                return set()
+            return index.uids_larger_than(self._server_key, mailbox, _PARTIAL_FETCH_MIN_SIZE)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read the metadata index of {mailbox}: {e}")
+            return set()
+
+    def _index_email(self, mailbox: str, email_data: dict[str, Any]) -> None:
+        self._update_index("set_attachments", mailbox, email_data["email_id"], email_data["attachments"])
+        if self.text_index is not None:
+            self._update_index("add_text", mailbox, email_data)
+
+    async def _parse_and_index(
+        self, mailbox: str, uidvalidity: int | None, uid: str, raw_email: bytes
+    ) -> dict[str, Any] | None:
+        try:
+            email_data = await run_parser(_parse_email, len(raw_email), raw_email, uid)
+        except Exception as e:
+            logger.error(f"Error parsing email {uid}: {e!s}")
+            return None
+        self._index_email(mailbox, email_data)
+        self._body_cache.put(mailbox, uidvalidity, email_data)
+        return email_data
+
+    async def _read_cached_or_by_parts(
+        self,
+        imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL,
+        mailbox: str,
+        uidvalidity: int | None,
+        email_id: str,
+        large: bool,
+    ) -> dict[str, Any] | None:
+        """An email read recently, or a large one read by parts; None if it needs a full download."""
+        email_data = self._body_cache.get(mailbox, uidvalidity, email_id)
+        if email_data is None and large:
+            email_data = await self._fetch_email_by_parts(imap, email_id)
+            if email_data is not None:
+                self._index_email(mailbox, email_data)
+                self._body_cache.put(mailbox, uidvalidity, email_data)
+        return email_data
+
+    async def get_email_bodies(
+        self, email_ids: list[str], mailbox: str = "INBOX"
+    ) -> AsyncGenerator[tuple[str, dict[str, Any] | None], None]:
+        """Fetch and parse many emails on one session, one UID FETCH per UID set.
+
+        Emails the metadata index knows to be large are read by parts instead,
+        so their attachments are not downloaded, and emails read recently come
+        from memory, so paging through a long body costs one download.
+        Yields (email_id, parsed email) in the order the server returned them,
+        and (email_id, None) for each email that could not be fetched or parsed.
+        """
+        requested = list(dict.fromkeys(email_ids))
+        valid_ids = {uid for _, uids in _uid_set_chunks(requested) for uid in uids}
+        for email_id in requested:
+            if email_id not in valid_ids:
+                yield email_id, None
+
+        async with self._imap_session() as imap:
+            state = await self._select_mailbox(imap, mailbox, readonly=True)
+
+            uidvalidity = state.uidvalidity if state else None
+            large = self._known_large_uids(mailbox, state)
+            whole = []
+            for email_id in (uid for uid in requested if uid in valid_ids):
+                email_data = await self._read_cached_or_by_parts(
+                    imap, mailbox, uidvalidity, email_id, int(email_id) in large
+                )
+                if email_data is None:
+                    whole.append(email_id)
+                    continue
+                yield email_id, email_data
+
+            for uid_set, uids in _uid_set_chunks(whole):
+                raw_emails = await self._fetch_raw_emails(imap, uid_set)
+                for uid, raw_email in raw_emails.items():
+                    if uid in valid_ids:
+                        yield uid, await self._parse_and_index(mailbox, uidvalidity, uid, raw_email)
+                for uid in uids:
+                    if uid not in raw_emails:
+                        logger.error(f"Failed to fetch UID {uid}")
+                        yield uid, None
+
+    def search_text(
+        self, query: str, mailbox: str | None = None, page: int = 1, page_size: int = 10
+    ) -> tuple[list[dict[str, Any]], int]:
+        """Rank indexed emails matching ``query`` locally. Returns (results, total)."""
+        index = self.text_index
+        if index is None:
+            raise RuntimeError("The full-text index is not available (full_text_index disabled or SQLite without FTS5)")
+        return index.search(self._server_key, query, mailbox=mailbox, offset=(page - 1) * page_size, limit=page_size)
+
+    async def index_missing_text(self, mailbox: str) -> int:
+        """Fetch the bodies of indexed emails not yet in the full-text index; get_email_bodies adds them.
+
+        Returns the number of emails added. Stops once a batch adds nothing, so
+        emails that cannot be fetched are not retried forever.
+        """
+        index, added = self.text_index, 0
+        while index is not None:
+            uids = index.missing_text(self._server_key, mailbox, _TEXT_SYNC_BATCH)
+            if not uids:
+                break
+            fetched = 0
+            async for _, email_data in self.get_email_bodies([str(uid) for uid in uids], mailbox):
+                fetched += email_data is not None
+            if not fetched:
+                break
+            added += fetched
+        return added
+
+    async def get_email_body_by_id(self, email_id: str, mailbox: str = "INBOX") -> dict[str, Any] | None:
+        async with self._imap_session() as imap:
+            await self._select_mailbox(imap, mailbox, readonly=True)
+
+            # Multipart emails: only the header block and the text parts
+            email_data = await self._fetch_email_by_parts(imap, email_id)
+            if email_data is not None:
+                return email_data
 
             # Fetch the specific email by UID
             data = await self._fetch_email_with_formats(imap, email_id)
@@ -640,18 +2083,11 @@ class EmailClient:
 
             # Parse the email
             try:
-                return self._parse_email_data(raw_email, email_id)
+                return await run_parser(_parse_email, len(raw_email), raw_email, email_id)
             except Exception as e:
                 logger.error(f"Error parsing email: {e!s}")
                 return None
 
-        finally:
-            # Ensure we logout properly
-            try:
-                await imap.logout()
-            except Exception as e:
-                logger.info(f"Error during logout: {e}")
-
     async def download_attachment(
         self,
         email_id: str,
@@ -670,53 +2106,23 @@ class EmailClient:
         Returns:
             A dictionary with download result information.
         """
-        imap = self.imap_class(self.email_server.host, self.email_server.port)
-        try:
-            await imap._client_task
-            await imap.wait_hello_from_server()
-
-            await imap.login(self.email_server.user_name, self.email_server.password)
-            await _send_imap_id(imap)
-            await imap.select(_quote_mailbox(mailbox))
-
-            data = await self._fetch_email_with_formats(imap, email_id)
-            if not data:
-                msg = f"Failed to fetch email with UID {email_id}"
-                logger.error(msg)
-                raise ValueError(msg)
-
-            raw_email = self._extract_raw_email(data)
-            if not raw_email:
-                msg = f"Could not find email data for email ID: {email_id}"
-                logger.error(msg)
-                raise ValueError(msg)
-
-            parser = BytesParser(policy=default)
-            email_message = parser.parsebytes(raw_email)
-
-            # Find the attachment
-            attachment_data = None
-            mime_type = None
-
-            if email_message.is_multipart():
-                for part in email_message.walk():
-                    content_disposition = str(part.get("Content-Disposition", ""))
-                    if "attachment" in content_disposition:
-                        filename = part.get_filename()
-                        if filename == attachment_name:
-                            attachment_data = part.get_payload(decode=True)
-                            mime_type = part.get_content_type()
-                            break
-
-            if attachment_data is None:
-                msg = f"Attachment '{attachment_name}' not found in email {email_id}"
-                logger.error(msg)
-                raise ValueError(msg)
-
-            # Save to disk
-            save_file = Path(save_path)
-            save_file.parent.mkdir(parents=True, exist_ok=True)
-            save_file.write_bytes(attachment_data)
+        save_file = Path(save_path)
+        async with self._imap_session() as imap:
+            await self._select_mailbox(imap, mailbox)
+
+            # Stream only the attachment's section, if the server describes the email's structure
+            size, mime_type = await self._download_attachment_part(imap, email_id, attachment_name, save_file)
+            if size is None:
+                attachment_data, mime_type = await self._fetch_attachment_from_email(imap, email_id, attachment_name)
+                if attachment_data is None:
+                    msg = f"Attachment '{attachment_name}' not found in email {email_id}"
+                    logger.error(msg)
+                    raise ValueError(msg)
+
+                # Save to disk
+                with _atomic_file(save_file) as f:
+                    f.write(attachment_data)
+                size = len(attachment_data)
 
             logger.info(f"Attachment '{attachment_name}' saved to {save_path}")
 
@@ -724,15 +2130,94 @@ class EmailClient:
                 "email_id": email_id,
                 "attachment_name": attachment_name,
                 "mime_type": mime_type or "application/octet-stream",
-                "size": len(attachment_data),
+                "size": size,
                 "saved_path": str(save_file.resolve()),
             }
 
-        finally:
-            try:
-                await imap.logout()
-            except Exception as e:
-                logger.info(f"Error during logout: {e}")
+    async def _download_attachment_part(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, email_id: str, attachment_name: str, save_file: Path
+    ) -> tuple[int | None, str | None]:
+        """Copy just the attachment's MIME section to ``save_file``.
+
+        Returns (size, mime type), or (None, None) if the email's structure is
+        unavailable or the section could not be fetched; ``save_file`` is then untouched.
+        """
+        parts = await self._fetch_structure(imap, email_id)
+        part = next((p for p in parts or [] if p.is_attachment and p.filename == attachment_name), None)
+        if part is None:
+            return None, None
+        try:
+            with _atomic_file(save_file) as f:
+                size = await self._stream_section(imap, email_id, part, f)
+        except Exception as e:
+            logger.debug(f"Section fetch of {email_id} failed: {e}")
+            return None, None
+        return size, part.content_type
+
+    async def _stream_section(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, email_id: str, part: BodyPart, out: BinaryIO
+    ) -> int:
+        """Write one part's content to ``out``, one partial fetch of _ATTACHMENT_CHUNK_SIZE octets at a time.
+
+        Only one chunk is held in memory; its transfer encoding is removed by
+        the server with BINARY, and here otherwise. Returns the octets written.
+        """
+        binary = self.capabilities.supports("BINARY") is True
+        decoder = _TransferDecoder("binary" if binary else part.encoding)
+        offset = written = 0
+        while True:
+            chunk = await self._fetch_section_chunk(imap, email_id, part.section, offset, binary)
+            if chunk is None and binary and offset == 0:
+                binary, decoder = False, _TransferDecoder(part.encoding)
+                continue
+            if chunk is None:
+                raise ValueError(f"Could not fetch section {part.section} of email {email_id} at octet {offset}")
+            data = decoder.decode(chunk)
+            out.write(data)
+            written += len(data)
+            offset += len(chunk)
+            if len(chunk) < _ATTACHMENT_CHUNK_SIZE:
+                break
+        tail = decoder.flush()
+        out.write(tail)
+        return written + len(tail)
+
+    async def _fetch_section_chunk(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, email_id: str, section: str, offset: int, binary: bool
+    ) -> bytes | None:
+        """Fetch ``<offset.length>`` of one section; None if the server refused."""
+        kind = "BINARY" if binary else "BODY"
+        result = await imap.uid("fetch", email_id, f"(UID {kind}.PEEK[{section}]<{offset}.{_ATTACHMENT_CHUNK_SIZE}>)")
+        status = _response_status(result)
+        if status != "OK":
+            if binary and status == "BAD":
+                self._disable_capability("BINARY")
+            return None
+        for attributes in parse_fetch_responses(result[1]):
+            if str(attributes.get("UID")) != email_id:
+                continue
+            # The server labels the data with the origin octet, e.g. BODY[2]<0>
+            name = next((name for name in attributes if name.startswith(f"{kind}[{section}]")), None)
+            return _as_bytes(attributes[name]) if name is not None else None
+        return None
+
+    async def _fetch_attachment_from_email(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, email_id: str, attachment_name: str
+    ) -> tuple[bytes | None, str | None]:
+        """Fetch the whole email and find the attachment in it. Returns (data, mime type)."""
+        data = await self._fetch_email_with_formats(imap, email_id)
+        if not data:
+            msg = f"Failed to fetch email with UID {email_id}"
+            logger.error(msg)
+            raise ValueError(msg)
+
+        raw_email = self._extract_raw_email(data)
+        if not raw_email:
+            msg = f"Could not find email data for email ID: {email_id}"
+            logger.error(msg)
+            raise ValueError(msg)
+
+        return await run_parser(_find_attachment, len(raw_email), raw_email, attachment_name)
 
     def _validate_attachment(self, file_path: str) -> Path:
         """Validate attachment file path."""
@@ -882,25 +2367,29 @@ class EmailClient:
 
         return None
 
-    async def append_to_sent(
-        self,
-        msg: MIMEText | MIMEMultipart,
-        incoming_server: EmailServer,
-        sent_folder_name: str | None = None,
+    async def _append_sent_message(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, msg_bytes: bytes, folder: str
     ) -> bool:
-        """Append a sent message to the IMAP Sent folder.
-
-        Args:
-            msg: The email message that was sent
-            incoming_server: IMAP server configuration for accessing Sent folder
-            sent_folder_name: Override folder name, or None for auto-detection
-
-        Returns:
-            True if successfully saved, False otherwise
-        """
-        imap_class = aioimaplib.IMAP4_SSL if incoming_server.use_ssl else aioimaplib.IMAP4
-        imap = imap_class(incoming_server.host, incoming_server.port)
+        """APPEND a sent message to ``folder`` as seen; the folder does not need to be selected."""
+        try:
+            logger.debug(f"Appending message to '{folder}'")
+            # aioimaplib.append signature: (message_bytes, mailbox, flags, date)
+            append_result = await imap.append(msg_bytes, mailbox=_quote_mailbox(folder), flags=r"(\Seen)")
+        except Exception as e:
+            logger.debug(f"Folder '{folder}' not available: {e}")
+            return False
+        logger.debug(f"Append result: {append_result}")
+        # A missing folder is rejected with NO [TRYCREATE], so APPEND doubles as the existence check
+        if _response_status(append_result) == "OK":
+            logger.info(f"Saved sent email to '{folder}'")
+            return True
+        logger.debug(f"Failed to append to '{folder}': {_response_status(append_result)}")
+        return False
 
+    async def _sent_folder_candidates(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, sent_folder_name: str | None
+    ) -> tuple[list[str], str | None]:
+        """Sent folders to try in order, and the folder LIST flags ``\\Sent`` if there is one."""
         # Common Sent folder names across different providers
         sent_folder_candidates = [
             sent_folder_name,  # User-specified override (if provided)
@@ -914,92 +2403,94 @@ class EmailClient:
         # Filter out None values
         sent_folder_candidates = [f for f in sent_folder_candidates if f]
 
-        try:
-            await imap._client_task
-            await imap.wait_hello_from_server()
-            await imap.login(incoming_server.user_name, incoming_server.password)
-            await _send_imap_id(imap)
-
-            # Try to find Sent folder by IMAP \Sent flag first
-            flag_folder = await self._find_sent_folder_by_flag(imap)
-            if flag_folder and flag_folder not in sent_folder_candidates:
-                # Add it at the beginning (high priority)
-                sent_folder_candidates.insert(0, flag_folder)
-
-            # Try to find and use the Sent folder
-            for folder in sent_folder_candidates:
-                try:
-                    logger.debug(f"Trying Sent folder: '{folder}'")
-                    # Try to select the folder to verify it exists
-                    result = await imap.select(_quote_mailbox(folder))
-                    logger.debug(f"Select result for '{folder}': {result}")
-
-                    # aioimaplib returns (status, data) where status is a string like 'OK' or 'NO'
-                    status = result[0] if isinstance(result, tuple) else result
-                    if str(status).upper() == "OK":
-                        # Folder exists, append the message
-                        msg_bytes = msg.as_bytes()
-                        logger.debug(f"Appending message to '{folder}'")
-                        # aioimaplib.append signature: (message_bytes, mailbox, flags, date)
-                        append_result = await imap.append(
-                            msg_bytes,
-                            mailbox=_quote_mailbox(folder),
-                            flags=r"(\Seen)",
-                        )
-                        logger.debug(f"Append result: {append_result}")
-                        append_status = append_result[0] if isinstance(append_result, tuple) else append_result
-                        if str(append_status).upper() == "OK":
-                            logger.info(f"Saved sent email to '{folder}'")
-                            return True
-                        else:
-                            logger.warning(f"Failed to append to '{folder}': {append_status}")
-                    else:
-                        logger.debug(f"Folder '{folder}' select returned: {status}")
-                except Exception as e:
-                    logger.debug(f"Folder '{folder}' not available: {e}")
-                    continue
+        # The folder with the IMAP \Sent flag comes first (high priority)
+        flag_folder = await self._find_sent_folder_by_flag(imap)
+        if flag_folder:
+            sent_folder_candidates = [flag_folder, *(f for f in sent_folder_candidates if f != flag_folder)]
+        return sent_folder_candidates, flag_folder
 
-            logger.warning("Could not find a valid Sent folder to save the message")
-            return False
+    async def append_to_sent(
+        self,
+        msg: MIMEText | MIMEMultipart,
+        sent_folder_name: str | None = None,
+    ) -> bool:
+        """Append a sent message to the IMAP Sent folder, on a session of this (incoming) client.
+
+        The folder LIST flags ``\\Sent`` is remembered per account, so later
+        sends APPEND to it directly without LIST or SELECT.
+
+        Args:
+            msg: The email message that was sent
+            sent_folder_name: Override folder name, or None for auto-detection
 
+        Returns:
+            True if successfully saved, False otherwise
+        """
+        try:
+            async with self._imap_session() as imap:
+                if await self._append_to_sent_folder(imap, msg.as_bytes(), sent_folder_name):
+                    return True
         except Exception as e:
             logger.error(f"Error saving to Sent folder: {e}")
             return False
-        finally:
-            try:
-                await imap.logout()
-            except Exception as e:
-                logger.debug(f"Error during logout: {e}")
+        logger.warning("Could not find a valid Sent folder to save the message")
+        return False
+
+    async def _append_to_sent_folder(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, msg_bytes: bytes, sent_folder_name: str | None
+    ) -> bool:
+        """APPEND to the remembered Sent folder, or else to the first candidate that takes it."""
+        store = get_capability_store()
+        cached_folder = self.capabilities.sent_folder
+        if cached_folder:
+            if await self._append_sent_message(imap, msg_bytes, cached_folder):
+                return True
+            # Renamed or deleted since it was found; look it up again
+            store.record_sent_folder(self._server_key, None)
+
+        sent_folder_candidates, flag_folder = await self._sent_folder_candidates(imap, sent_folder_name)
+        for folder in sent_folder_candidates:
+            if folder == cached_folder:
+                continue
+            if await self._append_sent_message(imap, msg_bytes, folder):
+                if folder == flag_folder:
+                    store.record_sent_folder(self._server_key, folder)
+                return True
+        return False
 
     async def delete_emails(self, email_ids: list[str], mailbox: str = "INBOX") -> tuple[list[str], list[str]]:
         """Delete emails by their UIDs. Returns (deleted_ids, failed_ids)."""
-        imap = self.imap_class(self.email_server.host, self.email_server.port)
-        deleted_ids = []
-        failed_ids = []
+        async with self._imap_session() as imap:
+            await self._select_mailbox(imap, mailbox)
+            deleted_ids, failed_ids = await self._uid_store_batch(imap, email_ids, "+FLAGS", r"(\Deleted)")
+            await imap.expunge()
 
-        try:
-            await imap._client_task
-            await imap.wait_hello_from_server()
-            await imap.login(self.email_server.user_name, self.email_server.password)
-            await _send_imap_id(imap)
-            await imap.select(_quote_mailbox(mailbox))
+        self._update_index("remove", mailbox, deleted_ids)
+        return deleted_ids, failed_ids
 
-            for email_id in email_ids:
-                try:
-                    await imap.uid("store", email_id, "+FLAGS", r"(\Deleted)")
-                    deleted_ids.append(email_id)
-                except Exception as e:
-                    logger.error(f"Failed to delete email {email_id}: {e}")
-                    failed_ids.append(email_id)
+    async def _uid_store_batch(
+        self,
+        imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL,
+        email_ids: list[str],
+        flag_op: str,
+        flags: str,
+    ) -> tuple[list[str], list[str]]:
+        """UID STORE ``flags`` on many UIDs with a few compressed UID sets.
 
-            await imap.expunge()
-        finally:
+        Returns (stored_ids, failed_ids); a rejected command fails its whole set.
+        """
+        stored: set[str] = set()
+        for uid_set, uids in _uid_set_chunks(email_ids):
             try:
-                await imap.logout()
+                result = await imap.uid("store", uid_set, flag_op, flags)
+                status = _response_status(result)
+                if status in ("NO", "BAD"):
+                    logger.error(f"Failed to store {flag_op} {flags} on {len(uids)} emails: {status}")
+                    continue
+                stored.update(uids)
             except Exception as e:
-                logger.info(f"Error during logout: {e}")
-
-        return deleted_ids, failed_ids
+                logger.error(f"Failed to store {flag_op} {flags} on {len(uids)} emails: {e}")
+        return _split_results(email_ids, stored)
 
     def _parse_list_response(self, folder_data: bytes | str) -> Folder | None:
         """Parse a single IMAP LIST response line into a Folder object.
@@ -1040,15 +2531,9 @@ class EmailClient:
 
     async def list_folders(self) -> list[Folder]:
         """List all folders/mailboxes."""
-        imap = self.imap_class(self.email_server.host, self.email_server.port)
         folders = []
 
-        try:
-            await imap._client_task
-            await imap.wait_hello_from_server()
-            await imap.login(self.email_server.user_name, self.email_server.password)
-            await _send_imap_id(imap)
-
+        async with self._imap_session() as imap:
             # List all folders
             _, folder_data = await imap.list('""', "*")
 
@@ -1060,51 +2545,35 @@ class EmailClient:
             logger.info(f"Found {len(folders)} folders")
             return folders
 
-        finally:
-            try:
-                await imap.logout()
-            except Exception as e:
-                logger.info(f"Error during logout: {e}")
-
     async def copy_emails(
         self,
         email_ids: list[str],
         destination_folder: str,
         source_mailbox: str = "INBOX",
     ) -> tuple[list[str], list[str]]:
-        """Copy emails to a destination folder. Returns (copied_ids, failed_ids)."""
-        imap = self.imap_class(self.email_server.host, self.email_server.port)
-        copied_ids = []
-        failed_ids = []
+        """Copy emails to a destination folder. Returns (copied_ids, failed_ids).
 
-        try:
-            await imap._client_task
-            await imap.wait_hello_from_server()
-            await imap.login(self.email_server.user_name, self.email_server.password)
-            await _send_imap_id(imap)
-            await imap.select(_quote_mailbox(source_mailbox))
+        UIDs are sent as compressed sets, a few commands in total; with UIDPLUS
+        the per-email result comes from the COPYUID response code.
+        """
+        copied: set[str] = set()
 
-            for email_id in email_ids:
+        async with self._imap_session() as imap:
+            await self._select_mailbox(imap, source_mailbox)
+
+            for uid_set, uids in _uid_set_chunks(email_ids):
                 try:
-                    result = await imap.uid("copy", email_id, _quote_mailbox(destination_folder))
-                    status = result[0] if isinstance(result, tuple) else result
-                    if str(status).upper() == "OK":
-                        copied_ids.append(email_id)
-                        logger.debug(f"Copied email {email_id} to {destination_folder}")
+                    result = await imap.uid("copy", uid_set, _quote_mailbox(destination_folder))
+                    status = _response_status(result)
+                    if status == "OK":
+                        copied.update(_copied_uids(result, uids))
+                        logger.debug(f"Copied {len(uids)} emails to {destination_folder}")
                     else:
-                        logger.error(f"Failed to copy email {email_id}: {status}")
-                        failed_ids.append(email_id)
+                        logger.error(f"Failed to copy {len(uids)} emails: {status}")
                 except Exception as e:
-                    logger.error(f"Failed to copy email {email_id}: {e}")
-                    failed_ids.append(email_id)
-
-        finally:
-            try:
-                await imap.logout()
-            except Exception as e:
-                logger.info(f"Error during logout: {e}")
+                    logger.error(f"Failed to copy {len(uids)} emails: {e}")
 
-        return copied_ids, failed_ids
+        return _split_results(email_ids, copied)
 
     async def move_emails(
         self,
@@ -1114,69 +2583,59 @@ class EmailClient:
     ) -> tuple[list[str], list[str]]:
         """Move emails to a destination folder. Returns (moved_ids, failed_ids).
 
-        Attempts to use MOVE command first (RFC 6851), falls back to COPY + DELETE.
+        Uses the MOVE command (RFC 6851) unless the server is known not to
+        support it, falling back to COPY + DELETE. A MOVE that errors out or is
+        rejected as BAD is not tried again for this server. UIDs are sent as
+        compressed sets; with UIDPLUS the per-email result comes from COPYUID.
         """
-        imap = self.imap_class(self.email_server.host, self.email_server.port)
-        moved_ids = []
-        failed_ids = []
+        moved: set[str] = set()
 
-        try:
-            await imap._client_task
-            await imap.wait_hello_from_server()
-            await imap.login(self.email_server.user_name, self.email_server.password)
-            await _send_imap_id(imap)
-            await imap.select(_quote_mailbox(source_mailbox))
+        async with self._imap_session() as imap:
+            await self._select_mailbox(imap, source_mailbox)
 
-            for email_id in email_ids:
+            for uid_set, uids in _uid_set_chunks(email_ids):
                 try:
                     # Try MOVE command first (RFC 6851)
-                    try:
-                        result = await imap.uid("move", email_id, _quote_mailbox(destination_folder))
-                        status = result[0] if isinstance(result, tuple) else result
-                        if str(status).upper() == "OK":
-                            moved_ids.append(email_id)
-                            logger.debug(f"Moved email {email_id} to {destination_folder} using MOVE")
-                            continue
-                    except Exception as move_error:
-                        logger.debug(f"MOVE command failed, falling back to COPY+DELETE: {move_error}")
+                    if self.capabilities.supports("MOVE") is not False:
+                        try:
+                            result = await imap.uid("move", uid_set, _quote_mailbox(destination_folder))
+                            status = _response_status(result)
+                            if status == "OK":
+                                moved.update(_copied_uids(result, uids))
+                                logger.debug(f"Moved {len(uids)} emails to {destination_folder} using MOVE")
+                                continue
+                            if status == "BAD":
+                                self._disable_capability("MOVE")
+                        except Exception as move_error:
+                            # Not an answer from the server, so MOVE stays enabled for later calls
+                            logger.debug(f"MOVE command failed, falling back to COPY+DELETE: {move_error}")
 
                     # Fallback: COPY + mark as deleted
-                    copy_result = await imap.uid("copy", email_id, _quote_mailbox(destination_folder))
-                    copy_status = copy_result[0] if isinstance(copy_result, tuple) else copy_result
-                    if str(copy_status).upper() == "OK":
-                        await imap.uid("store", email_id, "+FLAGS", r"(\Deleted)")
-                        moved_ids.append(email_id)
-                        logger.debug(f"Moved email {email_id} to {destination_folder} using COPY+DELETE")
+                    copy_result = await imap.uid("copy", uid_set, _quote_mailbox(destination_folder))
+                    copy_status = _response_status(copy_result)
+                    if copy_status == "OK":
+                        copied = _copied_uids(copy_result, uids)
+                        for copied_set, _ in _uid_set_chunks(copied):
+                            await imap.uid("store", copied_set, "+FLAGS", r"(\Deleted)")
+                        moved.update(copied)
+                        logger.debug(f"Moved {len(copied)} emails to {destination_folder} using COPY+DELETE")
                     else:
-                        logger.error(f"Failed to copy email {email_id}: {copy_status}")
-                        failed_ids.append(email_id)
+                        logger.error(f"Failed to copy {len(uids)} emails: {copy_status}")
                 except Exception as e:
-                    logger.error(f"Failed to move email {email_id}: {e}")
-                    failed_ids.append(email_id)
+                    logger.error(f"Failed to move {len(uids)} emails: {e}")
 
             # Expunge deleted messages
-            if moved_ids:
+            if moved:
                 await imap.expunge()
 
-        finally:
-            try:
-                await imap.logout()
-            except Exception as e:
-                logger.info(f"Error during logout: {e}")
-
-        return moved_ids, failed_ids
+        self._update_index("remove", source_mailbox, moved)
+        return _split_results(email_ids, moved)
 
     async def create_folder(self, folder_name: str) -> tuple[bool, str]:
         """Create a new folder. Returns (success, message)."""
-        imap = self.imap_class(self.email_server.host, self.email_server.port)
-
         try:
-            await imap._client_task
-            await imap.wait_hello_from_server()
-            await imap.login(self.email_server.user_name, self.email_server.password)
-            await _send_imap_id(imap)
-
-            result = await imap.create(_quote_mailbox(folder_name))
+            async with self._imap_session() as imap:
+                result = await imap.create(_quote_mailbox(folder_name))
             status = result[0] if isinstance(result, tuple) else result
             if str(status).upper() == "OK":
                 logger.info(f"Created folder: {folder_name}")
@@ -1188,26 +2647,17 @@ class EmailClient:
         except Exception as e:
             logger.error(f"Error creating folder {folder_name}: {e}")
             return False, f"Error creating folder: {e}"
-        finally:
-            try:
-                await imap.logout()
-            except Exception as e:
-                logger.info(f"Error during logout: {e}")
 
     async def delete_folder(self, folder_name: str) -> tuple[bool, str]:
         """Delete a folder. Returns (success, message)."""
-        imap = self.imap_class(self.email_server.host, self.email_server.port)
-
         try:
-            await imap._client_task
-            await imap.wait_hello_from_server()
-            await imap.login(self.email_server.user_name, self.email_server.password)
-            await _send_imap_id(imap)
-
-            result = await imap.delete(_quote_mailbox(folder_name))
+            async with self._imap_session() as imap:
+                _forget_selected_mailbox(folder_name)
+                result = await imap.delete(_quote_mailbox(folder_name))
             status = result[0] if isinstance(result, tuple) else result
             if str(status).upper() == "OK":
                 logger.info(f"Deleted folder: {folder_name}")
+                self._update_index("drop_mailbox", folder_name)
                 return True, f"Folder '{folder_name}' deleted successfully"
             else:
                 logger.error(f"Failed to delete folder {folder_name}: {status}")
@@ -1216,26 +2666,17 @@ class EmailClient:
         except Exception as e:
             logger.error(f"Error deleting folder {folder_name}: {e}")
             return False, f"Error deleting folder: {e}"
-        finally:
-            try:
-                await imap.logout()
-            except Exception as e:
-                logger.info(f"Error during logout: {e}")
 
     async def rename_folder(self, old_name: str, new_name: str) -> tuple[bool, str]:
         """Rename a folder. Returns (success, message)."""
-        imap = self.imap_class(self.email_server.host, self.email_server.port)
-
         try:
-            await imap._client_task
-            await imap.wait_hello_from_server()
-            await imap.login(self.email_server.user_name, self.email_server.password)
-            await _send_imap_id(imap)
-
-            result = await imap.rename(_quote_mailbox(old_name), _quote_mailbox(new_name))
+            async with self._imap_session() as imap:
+                _forget_selected_mailbox(old_name)
+                result = await imap.rename(_quote_mailbox(old_name), _quote_mailbox(new_name))
             status = result[0] if isinstance(result, tuple) else result
             if str(status).upper() == "OK":
                 logger.info(f"Renamed folder '{old_name}' to '{new_name}'")
+                self._update_index("drop_mailbox", old_name)
                 return True, f"Folder renamed from '{old_name}' to '{new_name}'"
             else:
                 logger.error(f"Failed to rename folder {old_name}: {status}")
@@ -1244,15 +2685,17 @@ class EmailClient:
         except Exception as e:
             logger.error(f"Error renaming folder {old_name}: {e}")
             return False, f"Error renaming folder: {e}"
-        finally:
-            try:
-                await imap.logout()
-            except Exception as e:
-                logger.info(f"Error during logout: {e}")
 
     async def list_labels(self) -> list[Label]:
-        """List all labels (folders under Labels/ prefix)."""
+        """List all labels (folders under Labels/ prefix, or on Gmail the folders that are labels)."""
         folders = await self.list_folders()
+        # list_folders opened a session, so the server's capabilities are known
+        if self.capabilities.gmail:
+            return [
+                Label(name=folder.name, full_path=folder.name, delimiter=folder.delimiter, flags=folder.flags)
+                for folder in folders
+                if _is_gmail_label(folder)
+            ]
         labels = []
         for folder in folders:
             if folder.name.startswith("Labels/"):
@@ -1269,18 +2712,75 @@ class EmailClient:
                     )
         return labels
 
-    async def get_email_message_id(self, email_id: str, mailbox: str = "INBOX") -> str | None:
-        """Get the Message-ID header for an email."""
-        imap = self.imap_class(self.email_server.host, self.email_server.port)
+    async def server_profile(self) -> ServerProfile:
+        """The server's capabilities, connecting once first if they were never recorded."""
+        if self.capabilities.capabilities is None:
+            async with self._imap_session():
+                pass
+        return self.capabilities
 
+    async def store_gmail_labels(
+        self, email_ids: list[str], mailbox: str, labels: list[str], add: bool
+    ) -> tuple[list[str], list[str]]:
+        """Add or remove Gmail labels with ``UID STORE +/-X-GM-LABELS``. Returns (stored_ids, failed_ids)."""
+        flag_op = "+X-GM-LABELS" if add else "-X-GM-LABELS"
+        async with self._imap_session() as imap:
+            if await self._select_mailbox(imap, mailbox) is None:
+                logger.error(f"Cannot select mailbox {mailbox}")
+                return [], list(email_ids)
+            stored_ids, failed_ids = await self._uid_store_batch(
+                imap, email_ids, flag_op, "({})".format(" ".join(_quote_string(label) for label in labels))
+            )
+        # Labels are folders on Gmail; the index of the label folders catches up on its next sync
+        return stored_ids, failed_ids
+
+    async def fetch_gmail_labels(self, email_id: str, mailbox: str = "INBOX") -> list[str] | None:
+        """The user labels of an email, from one ``UID FETCH (X-GM-LABELS)``; None if it cannot be fetched."""
+        try:
+            async with self._imap_session() as imap:
+                if await self._select_mailbox(imap, mailbox, readonly=True) is None:
+                    return None
+                result = await imap.uid("fetch", email_id, "(UID X-GM-LABELS)")
+            if _response_status(result) != "OK":
+                logger.error(f"Failed to fetch labels of email {email_id}: {_response_status(result)}")
+                return None
+            for uid, attributes, _ in _iter_fetch_messages(result[1]):
+                if uid == email_id:
+                    labels = _gmail_labels(attributes)
+                    # The label being viewed is implied by the selected folder
+                    folder = Folder(name=mailbox, delimiter="/", flags=[])
+                    if _is_gmail_label(folder) and mailbox not in labels:
+                        labels.insert(0, mailbox)
+                    return labels
+            return None
+        except Exception as e:
+            logger.error(f"Error fetching labels of email {email_id}: {e}")
+            return None
+
+    def _indexed_message_id(self, state: SelectedMailbox | None, email_id: str) -> str | None:
+        """The Message-ID the index has for ``email_id``, if it indexed the mailbox under the same UIDVALIDITY."""
+        index = self.index
+        if index is None or state is None or state.uidvalidity is None or not email_id.isdigit():
+            return None
+        try:
+            indexed = index.mailbox_state(self._server_key, state.name)
+            if indexed is None or indexed.uidvalidity != state.uidvalidity:
+                return None
+            return index.message_id(self._server_key, state.name, email_id)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read the metadata index of {state.name}: {e}")
+            return None
+
+    async def get_email_message_id(self, email_id: str, mailbox: str = "INBOX") -> str | None:
+        """Get the Message-ID header for an email, from the metadata index if it has it."""
         try:
-            await imap._client_task
-            await imap.wait_hello_from_server()
-            await imap.login(self.email_server.user_name, self.email_server.password)
-            await _send_imap_id(imap)
-            await imap.select(_quote_mailbox(mailbox))
+            async with self._imap_session() as imap:
+                state = await self._select_mailbox(imap, mailbox)
+                message_id = self._indexed_message_id(state, email_id)
+                if message_id:
+                    return message_id
 
-            _, data = await imap.uid("fetch", email_id, "BODY.PEEK[HEADER.FIELDS (MESSAGE-ID)]")
+                _, data = await imap.uid("fetch", email_id, "BODY.PEEK[HEADER.FIELDS (MESSAGE-ID)]")
 
             for item in data:
                 if isinstance(item, bytearray):
@@ -1293,61 +2793,241 @@ class EmailClient:
         except Exception as e:
             logger.error(f"Error getting Message-ID for email {email_id}: {e}")
             return None
-        finally:
-            try:
-                await imap.logout()
-            except Exception as e:
-                logger.info(f"Error during logout: {e}")
 
     async def search_by_message_id(self, message_id: str, mailbox: str) -> str | None:
         """Search for an email by Message-ID in a specific mailbox. Returns email UID or None."""
         import re
 
-        imap = self.imap_class(self.email_server.host, self.email_server.port)
-
         try:
-            await imap._client_task
-            await imap.wait_hello_from_server()
-            await imap.login(self.email_server.user_name, self.email_server.password)
-            await _send_imap_id(imap)
-            await imap.select(_quote_mailbox(mailbox))
-
-            # Search by Message-ID header (returns sequence numbers, not UIDs)
-            _, data = await imap.search(f'HEADER MESSAGE-ID "{message_id}"')
-
-            # data[0] contains space-separated sequence numbers
-            if data and data[0]:
-                seq_nums = data[0].decode("utf-8") if isinstance(data[0], bytes) else str(data[0])
-                seq_list = seq_nums.split()
-                if seq_list:
-                    # Fetch the UID for this sequence number
-                    _, fetch_data = await imap.fetch(seq_list[0], "(UID)")
-                    for item in fetch_data:
-                        if isinstance(item, bytes):
-                            item_str = item.decode("utf-8", errors="replace")
-                            uid_match = re.search(r"UID\s+(\d+)", item_str)
-                            if uid_match:
-                                return uid_match.group(1)
+            async with self._imap_session() as imap:
+                await self._select_mailbox(imap, mailbox)
+
+                # Search by Message-ID header (returns sequence numbers, not UIDs)
+                _, data = await imap.search(f'HEADER MESSAGE-ID "{message_id}"')
+
+                # data[0] contains space-separated sequence numbers
+                if data and data[0]:
+                    seq_nums = data[0].decode("utf-8") if isinstance(data[0], bytes) else str(data[0])
+                    seq_list = seq_nums.split()
+                    if seq_list:
+                        # Fetch the UID for this sequence number
+                        _, fetch_data = await imap.fetch(seq_list[0], "(UID)")
+                        for item in fetch_data:
+                            if isinstance(item, bytes):
+                                item_str = item.decode("utf-8", errors="replace")
+                                uid_match = re.search(r"UID\s+(\d+)", item_str)
+                                if uid_match:
+                                    return uid_match.group(1)
 
             return None
 
         except Exception as e:
             logger.debug(f"Error searching for Message-ID in {mailbox}: {e}")
             return None
-        finally:
+
+    async def locate_message_id(self, message_id: str, mailboxes: list[str]) -> dict[str, list[str]]:
+        """Find the UIDs of the email with ``message_id`` in each of ``mailboxes``.
+
+        The mailboxes are handled in parallel over a few sessions. The email
+        is looked up in the metadata index of every mailbox a STATUS shows to
+        be unchanged since it was indexed; only the others are selected and
+        their index brought up to date, and those that cannot be indexed are
+        searched on the server. Returns {mailbox: UIDs} for the mailboxes
+        holding the email.
+        """
+
+        async def lookup(imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, mailbox: str) -> list[str] | None:
+            if await self._sync_for_lookup(imap, mailbox):
+                return None
+            return await self._search_message_id(imap, message_id, mailbox)
+
+        locations: dict[str, list[str]] = {}
+        indexed: list[str] = []
+        async for result in self.for_each_mailbox(mailboxes, lookup):
+            if result.error is not None:
+                logger.error(f"Error locating Message-ID {message_id} in {result.mailbox}: {result.error}")
+            elif result.value is None:
+                indexed.append(result.mailbox)
+            elif result.value:
+                locations[result.mailbox] = result.value
+
+        if indexed:
+            locations.update(self._indexed_locations(message_id, indexed))
+        return {mailbox: locations[mailbox] for mailbox in mailboxes if mailbox in locations}
+
+    def _indexed_locations(self, message_id: str, mailboxes: list[str]) -> dict[str, list[str]]:
+        """The UIDs the metadata index has for ``message_id`` in each of ``mailboxes``."""
+        try:
+            found = self.index.locate(self._server_key, message_id)
+        except sqlite3.Error as e:
+            logger.error(f"Error reading the metadata index: {e}")
+            return {}
+        return {mailbox: [str(uid) for uid in found[mailbox]] for mailbox in mailboxes if found.get(mailbox)}
+
+    async def _sync_for_lookup(self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, mailbox: str) -> bool:
+        """Make sure the index of ``mailbox`` is current; False if the mailbox must be searched on the server."""
+        if self.index is None:
+            return False
+        if await self._index_is_current(imap, mailbox):
+            return True
+        state = await self._select_mailbox(imap, mailbox, readonly=True, refresh=True)
+        if state is None or state.uidvalidity is None:
+            return False
+        try:
+            return await self._sync_index(imap, state, limit=_INDEX_SYNC_STEP)
+        except Exception as e:
+            logger.warning(f"Could not sync the metadata index of {mailbox}, searching it on the server: {e}")
+            return False
+
+    async def _index_is_current(self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, mailbox: str) -> bool:
+        """Whether the index of ``mailbox`` holds just what the server has, going by a STATUS instead of a SELECT.
+
+        No email arrived or was expunged since the last sync if UIDVALIDITY
+        and UIDNEXT are unchanged and the message count matches the index.
+        """
+        indexed = self.index.mailbox_state(self._server_key, mailbox)
+        if indexed is None or indexed.uidnext is None:
+            return False
+        try:
+            response = await imap.status(_quote_mailbox(mailbox), "(MESSAGES UIDNEXT UIDVALIDITY)")
+        except Exception as e:
+            logger.debug(f"STATUS of {mailbox} failed: {e}")
+            return False
+        if _response_status(response) != "OK":
+            return False
+        status = _parse_status_response(response[1])
+        return (
+            status.get("UIDVALIDITY") == indexed.uidvalidity
+            and status.get("UIDNEXT") == indexed.uidnext
+            and status.get("MESSAGES") == self.index.count(self._server_key, mailbox)
+        )
+
+    async def _search_message_id(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, message_id: str, mailbox: str
+    ) -> list[str]:
+        """UID SEARCH ``mailbox`` for emails with ``message_id``."""
+        if await self._select_mailbox(imap, mailbox, readonly=True) is None:
+            return []
+        result = await imap.uid_search(_message_id_search_term(message_id))
+        if _response_status(result) != "OK":
+            logger.debug(f"UID SEARCH for Message-ID in {mailbox} failed: {_response_status(result)}")
+            return []
+        _, data = result
+        return [uid.decode() for uid in (data[0] if data else b"").split() if uid.isdigit()]
+
+    async def remove_copies(
+        self, email_ids: list[str], source_mailbox: str, folder: str
+    ) -> tuple[list[str], list[str]]:
+        """Delete the copies in ``folder`` of emails ``email_ids`` in ``source_mailbox``, on one session.
+
+        The Message-IDs come from the metadata index or one UID FETCH. Copies
+        are found through ``folder``'s index or, if it cannot be indexed (yet), one
+        UID SEARCH of OR'd ``HEADER MESSAGE-ID`` terms, and are deleted with a
+        single UID STORE and UID EXPUNGE. Returns (removed_ids, failed_ids)
+        in terms of ``email_ids``.
+        """
+        try:
+            async with self._imap_session() as imap:
+                message_ids = await self._fetch_message_ids(imap, source_mailbox, email_ids)
+                copies = await self._find_copies(imap, folder, set(message_ids.values()))
+                deleted: list[str] = []
+                if copies:
+                    deleted, _ = await self._uid_store_batch(imap, list(copies), "+FLAGS", r"(\Deleted)")
+                if deleted:
+                    await self._expunge_uids(imap, deleted)
+        except Exception as e:
+            logger.error(f"Error removing {len(email_ids)} emails from {folder}: {e}")
+            return [], list(email_ids)
+
+        self._update_index("remove", folder, deleted)
+        removed_message_ids = {copies[uid] for uid in deleted}
+        removed, failed = _split_results(
+            email_ids, {email_id for email_id, mid in message_ids.items() if mid in removed_message_ids}
+        )
+        if failed:
+            logger.warning(f"{len(failed)} emails from {source_mailbox} not found in {folder}")
+        return removed, failed
+
+    async def _fetch_message_ids(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, mailbox: str, email_ids: list[str]
+    ) -> dict[str, str]:
+        """Message-IDs of ``email_ids`` in ``mailbox``, from the index where it has them, else one UID FETCH."""
+        state = await self._select_mailbox(imap, mailbox, readonly=True)
+        if state is None:
+            raise RuntimeError(f"Cannot select mailbox {mailbox}")
+        message_ids = {}
+        for email_id in email_ids:
+            if message_id := self._indexed_message_id(state, email_id):
+                message_ids[email_id] = message_id
+        missing = [email_id for email_id in email_ids if email_id not in message_ids]
+        message_ids.update(await self._fetch_message_id_headers(imap, missing))
+        return message_ids
+
+    async def _fetch_message_id_headers(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, uids: list[str]
+    ) -> dict[str, str]:
+        """UID FETCH the Message-ID headers of ``uids`` in the selected mailbox."""
+        message_ids = {}
+        for uid_set, chunk in _uid_set_chunks(uids):
+            result = await imap.uid("fetch", uid_set, "(UID BODY.PEEK[HEADER.FIELDS (MESSAGE-ID)])")
+            if _response_status(result) != "OK":
+                logger.error(f"Failed to fetch Message-IDs of {len(chunk)} emails: {_response_status(result)}")
+                continue
+            for uid, raw_headers in _iter_uid_literals(result[1]):
+                if message_id := _header_message_id(raw_headers):
+                    message_ids[uid] = message_id
+        return message_ids
+
+    async def _find_copies(
+        self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, folder: str, message_ids: set[str]
+    ) -> dict[str, str]:
+        """Select ``folder`` for writing and find the emails with ``message_ids`` in it, as {UID: Message-ID}."""
+        state = await self._select_mailbox(imap, folder, refresh=True)
+        if state is None:
+            raise RuntimeError(f"Cannot select mailbox {folder}")
+        if not message_ids:
+            return {}
+        if self.index is not None and state.uidvalidity is not None:
             try:
-                await imap.logout()
+                if await self._sync_index(imap, state, limit=_INDEX_SYNC_STEP):
+                    return {
+                        str(uid): message_id
+                        for message_id in message_ids
+                        for uid in self.index.locate(self._server_key, message_id).get(folder, [])
+                    }
             except Exception as e:
-                logger.info(f"Error during logout: {e}")
+                logger.warning(f"Could not sync the metadata index of {folder}, searching it on the server: {e}")
+
+        ordered = sorted(message_ids)
+        found: list[str] = []
+        for start in range(0, len(ordered), _MESSAGE_ID_SEARCH_BATCH):
+            terms = [_message_id_search_term(mid) for mid in ordered[start : start + _MESSAGE_ID_SEARCH_BATCH]]
+            result = await imap.uid_search("OR " * (len(terms) - 1) + " ".join(terms))
+            if _response_status(result) != "OK":
+                raise RuntimeError(f"UID SEARCH for Message-IDs failed: {_response_status(result)}")
+            found += [uid.decode() for uid in (result[1][0] if result[1] else b"").split() if uid.isdigit()]
+        # HEADER matches substrings; keep only exact Message-IDs
+        copies = await self._fetch_message_id_headers(imap, found)
+        return {uid: message_id for uid, message_id in copies.items() if message_id in message_ids}
+
+    async def _expunge_uids(self, imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, uids: list[str]) -> None:
+        """Expunge just ``uids`` with UID EXPUNGE (UIDPLUS, RFC 4315), else everything marked \\Deleted."""
+        if self.capabilities.uidplus:
+            try:
+                statuses = [
+                    _response_status(await imap.uid("expunge", uid_set)) for uid_set, _ in _uid_set_chunks(uids)
+                ]
+                if all(status == "OK" for status in statuses):
+                    return
+                logger.debug(f"UID EXPUNGE returned {statuses}, using EXPUNGE")
+            except Exception as e:
+                logger.debug(f"UID EXPUNGE failed, using EXPUNGE: {e}")
+        await imap.expunge()
 
     async def mark_emails(
         self, email_ids: list[str], mark_as: str, mailbox: str = "INBOX"
     ) -> tuple[list[str], list[str]]:
         """Mark emails as read or unread. Returns (marked_ids, failed_ids)."""
-        imap = self.imap_class(self.email_server.host, self.email_server.port)
-        marked_ids = []
-        failed_ids = []
-
         # Determine flag operation: +FLAGS for read, -FLAGS for unread
         if mark_as == "read":
             flag_op = "+FLAGS"
@@ -1356,27 +3036,11 @@ class EmailClient:
         else:
             raise ValueError(f"Invalid mark_as value: {mark_as}. Must be 'read' or 'unread'.")
 
-        try:
-            await imap._client_task
-            await imap.wait_hello_from_server()
-            await imap.login(self.email_server.user_name, self.email_server.password)
-            await _send_imap_id(imap)
-            await imap.select(_quote_mailbox(mailbox))
-
-            for email_id in email_ids:
-                try:
-                    await imap.uid("store", email_id, flag_op, r"(\Seen)")
-                    marked_ids.append(email_id)
-                except Exception as e:
-                    logger.error(f"Failed to mark email {email_id} as {mark_as}: {e}")
-                    failed_ids.append(email_id)
-
-        finally:
-            try:
-                await imap.logout()
-            except Exception as e:
-                logger.info(f"Error during logout: {e}")
+        async with self._imap_session() as imap:
+            await self._select_mailbox(imap, mailbox)
+            marked_ids, failed_ids = await self._uid_store_batch(imap, email_ids, flag_op, r"(\Seen)")
 
+        self._update_index("update_flag", mailbox, marked_ids, "\\Seen", mark_as == "read")
         return marked_ids, failed_ids
 
     async def delete_from_folder(self, email_ids: list[str], folder: str) -> tuple[list[str], list[str]]:
@@ -1387,13 +3051,14 @@ class EmailClient:
 class ClassicEmailHandler(EmailHandler):
     def __init__(self, email_settings: EmailSettings):
         self.email_settings = email_settings
-        self.incoming_client = EmailClient(email_settings.incoming)
+        self.incoming_client = EmailClient(email_settings.incoming, use_pool=True, use_index=True)
         self.outgoing_client = EmailClient(
             email_settings.outgoing,
             sender=f"{email_settings.full_name} <{email_settings.email_address}>",
         )
         self.save_to_sent = email_settings.save_to_sent
         self.sent_folder_name = email_settings.sent_folder_name
+        self._text_sync: asyncio.Task | None = None
 
     async def get_emails_metadata(
         self,
@@ -1409,34 +3074,26 @@ class ClassicEmailHandler(EmailHandler):
         seen: bool | None = None,
         flagged: bool | None = None,
         answered: bool | None = None,
+        gmail_query: str | None = None,
     ) -> EmailMetadataPageResponse:
-        emails = []
-        async for email_data in self.incoming_client.get_emails_metadata_stream(
-            page,
-            page_size,
-            before,
-            since,
-            subject,
-            from_address,
-            to_address,
-            order,
-            mailbox,
-            seen,
-            flagged,
-            answered,
-        ):
-            emails.append(EmailMetadata.from_email(email_data))
-        total = await self.incoming_client.get_email_count(
-            before,
-            since,
-            subject,
-            from_address=from_address,
-            to_address=to_address,
-            mailbox=mailbox,
-            seen=seen,
-            flagged=flagged,
-            answered=answered,
-        )
+        with self.incoming_client.wire_usage("Metadata page"):
+            metadata_list, total = await self.incoming_client.get_emails_metadata_page(
+                page,
+                page_size,
+                before,
+                since,
+                subject,
+                from_address,
+                to_address,
+                order,
+                mailbox,
+                seen,
+                flagged,
+                answered,
+                gmail_query,
+            )
+        emails = [EmailMetadata.from_email(email_data) for email_data in metadata_list]
+        self._start_text_sync()
         return EmailMetadataPageResponse(
             page=page,
             page_size=page_size,
@@ -1447,32 +3104,52 @@ class ClassicEmailHandler(EmailHandler):
             total=total,
         )
 
-    async def get_emails_content(self, email_ids: list[str], mailbox: str = "INBOX") -> EmailContentBatchResponse:
-        """Batch retrieve email body content"""
+    async def get_emails_content(
+        self,
+        email_ids: list[str],
+        mailbox: str = "INBOX",
+        body_offset: int = 0,
+        body_length: int = 20000,
+    ) -> EmailContentBatchResponse:
+        """Batch retrieve email body content on one IMAP session, one page of each body"""
+        if body_offset < 0 or body_length < 1:
+            raise ValueError("body_offset must be at least 0 and body_length at least 1")
         emails = []
         failed_ids = []
+        seen_ids = set()
 
-        for email_id in email_ids:
-            try:
-                email_data = await self.incoming_client.get_email_body_by_id(email_id, mailbox)
-                if email_data:
-                    emails.append(
-                        EmailBodyResponse(
-                            email_id=email_data["email_id"],
-                            message_id=email_data.get("message_id"),
-                            subject=email_data["subject"],
-                            sender=email_data["from"],
-                            recipients=email_data["to"],
-                            date=email_data["date"],
-                            body=email_data["body"],
-                            attachments=email_data["attachments"],
+        try:
+            with self.incoming_client.wire_usage("Email bodies"):
+                async for email_id, email_data in self.incoming_client.get_email_bodies(email_ids, mailbox):
+                    seen_ids.add(email_id)
+                    if email_data:
+                        body = email_data["body"]
+                        end = body_offset + body_length
+                        emails.append(
+                            EmailBodyResponse(
+                                email_id=email_data["email_id"],
+                                message_id=email_data.get("message_id"),
+                                subject=email_data["subject"],
+                                sender=email_data["from"],
+                                recipients=email_data["to"],
+                                date=email_data["date"],
+                                body=body[body_offset:end],
+                                attachments=email_data["attachments"],
+                                body_offset=body_offset,
+                                body_total_length=len(body),
+                                next_offset=end if end < len(body) else None,
+                            )
                         )
-                    )
-                else:
-                    failed_ids.append(email_id)
-            except Exception as e:
-                logger.error(f"Failed to retrieve email {email_id}: {e}")
-                failed_ids.append(email_id)
+                    else:
+                        failed_ids.append(email_id)
+        except Exception as e:
+            logger.error(f"Failed to retrieve emails: {e}")
+            failed_ids.extend(email_id for email_id in dict.fromkeys(email_ids) if email_id not in seen_ids)
+
+        # Report in the order the emails were requested
+        position = {email_id: i for i, email_id in enumerate(email_ids)}
+        emails.sort(key=lambda email: position.get(email.email_id, len(position)))
+        failed_ids.sort(key=lambda email_id: position.get(email_id, len(position)))
 
         return EmailContentBatchResponse(
             emails=emails,
@@ -1481,6 +3158,57 @@ class ClassicEmailHandler(EmailHandler):
             failed_ids=failed_ids,
         )
 
+    async def search_emails(
+        self,
+        query: str,
+        mailbox: str | None = None,
+        page: int = 1,
+        page_size: int = 10,
+    ) -> EmailSearchResponse:
+        results, total = self.incoming_client.search_text(query, mailbox, page, page_size)
+        self._start_text_sync()
+        return EmailSearchResponse(
+            query=query,
+            page=page,
+            page_size=page_size,
+            results=[
+                EmailSearchResult(
+                    email_id=result["email_id"],
+                    mailbox=result["mailbox"],
+                    subject=result["subject"],
+                    sender=result["from"],
+                    date=result["date"],
+                    snippet=result["snippet"],
+                    score=result["score"],
+                )
+                for result in results
+            ],
+            total=total,
+        )
+
+    def watch(self, mailboxes: list[str], on_change: MailboxCallback) -> list[MailboxWatcher]:
+        watchers = [MailboxWatcher(self.incoming_client, mailbox, on_change) for mailbox in mailboxes]
+        for watcher in watchers:
+            watcher.start()
+        return watchers
+
+    def _start_text_sync(self) -> None:
+        """Fill the full-text index with the emails listed so far, in the background."""
+        if self.incoming_client.text_index is None or (self._text_sync is not None and not self._text_sync.done()):
+            return
+        self._text_sync = asyncio.create_task(self._sync_text())
+
+    async def _sync_text(self) -> None:
+        client = self.incoming_client
+        for mailbox in client.text_index.mailboxes(client._server_key):
+            try:
+                added = await client.index_missing_text(mailbox)
+            except Exception as e:
+                logger.warning(f"Full-text indexing of {mailbox} failed: {e}")
+                continue
+            if added:
+                logger.info(f"Added {added} emails of {mailbox} to the full-text index")
+
     async def send_email(
         self,
         recipients: list[str],
@@ -1500,11 +3228,7 @@ class ClassicEmailHandler(EmailHandler):
         # Save to Sent folder if enabled
         if self.save_to_sent and msg:
             try:
-                await self.outgoing_client.append_to_sent(
-                    msg,
-                    self.email_settings.incoming,
-                    self.sent_folder_name,
-                )
+                await self.incoming_client.append_to_sent(msg, self.sent_folder_name)
             except Exception as e:
                 logger.error(f"Failed to save email to Sent folder: {e}", exc_info=True)
 
@@ -1608,15 +3332,33 @@ class ClassicEmailHandler(EmailHandler):
         labels = await self.incoming_client.list_labels()
         return LabelListResponse(labels=labels, total=len(labels))
 
+    async def _uses_gmail_labels(self) -> bool:
+        """Whether labels are Gmail labels (X-GM-EXT-1) rather than folders under Labels/."""
+        try:
+            return (await self.incoming_client.server_profile()).gmail
+        except Exception as e:
+            logger.debug(f"Could not read the server's capabilities: {e}")
+            return False
+
+    async def _label_folder(self, label_name: str) -> str:
+        """The folder that holds the emails with a label; on Gmail that is the label itself."""
+        return label_name if await self._uses_gmail_labels() else f"Labels/{label_name}"
+
     async def apply_label(
         self,
         email_ids: list[str],
         label_name: str,
         source_mailbox: str = "INBOX",
     ) -> EmailMoveResponse:
-        """Apply a label to emails by copying to the label folder."""
-        label_folder = f"Labels/{label_name}"
-        copied_ids, failed_ids = await self.incoming_client.copy_emails(email_ids, label_folder, source_mailbox)
+        """Apply a label to emails by copying to the label folder, or on Gmail with X-GM-LABELS."""
+        if await self._uses_gmail_labels():
+            label_folder = label_name
+            copied_ids, failed_ids = await self.incoming_client.store_gmail_labels(
+                email_ids, source_mailbox, [label_name], add=True
+            )
+        else:
+            label_folder = f"Labels/{label_name}"
+            copied_ids, failed_ids = await self.incoming_client.copy_emails(email_ids, label_folder, source_mailbox)
         return EmailMoveResponse(
             success=len(failed_ids) == 0,
             moved_ids=copied_ids,
@@ -1629,41 +3371,22 @@ class ClassicEmailHandler(EmailHandler):
         self,
         email_ids: list[str],
         label_name: str,
+        source_mailbox: str = "INBOX",
     ) -> EmailMoveResponse:
         """Remove a label from emails by deleting from the label folder.
 
         This finds the emails in the label folder by their Message-ID and deletes them.
-        The original emails in other folders are preserved.
+        The original emails in other folders are preserved. On Gmail the label
+        is removed from the emails in ``source_mailbox`` with X-GM-LABELS.
         """
-        label_folder = f"Labels/{label_name}"
-        removed_ids = []
-        failed_ids = []
-
-        for email_id in email_ids:
-            # Get the Message-ID from the source email
-            # Note: We need to find this email in the label folder
-            # The email_id provided is from the source mailbox, not the label folder
-            # We need to search by Message-ID to find the copy in the label folder
-            message_id = await self.incoming_client.get_email_message_id(email_id, "INBOX")
-            if not message_id:
-                logger.warning(f"Could not get Message-ID for email {email_id}")
-                failed_ids.append(email_id)
-                continue
-
-            # Find the email in the label folder
-            label_uid = await self.incoming_client.search_by_message_id(message_id, label_folder)
-            if not label_uid:
-                logger.warning(f"Email {email_id} not found in label {label_name}")
-                failed_ids.append(email_id)
-                continue
-
-            # Delete from label folder
-            deleted, _failed = await self.incoming_client.delete_from_folder([label_uid], label_folder)
-            if deleted:
-                removed_ids.append(email_id)
-            else:
-                failed_ids.append(email_id)
-
+        if await self._uses_gmail_labels():
+            label_folder = label_name
+            removed_ids, failed_ids = await self.incoming_client.store_gmail_labels(
+                email_ids, source_mailbox, [label_name], add=False
+            )
+        else:
+            label_folder = f"Labels/{label_name}"
+            removed_ids, failed_ids = await self.incoming_client.remove_copies(email_ids, source_mailbox, label_folder)
         return EmailMoveResponse(
             success=len(failed_ids) == 0,
             moved_ids=removed_ids,
@@ -1678,26 +3401,25 @@ class ClassicEmailHandler(EmailHandler):
         source_mailbox: str = "INBOX",
     ) -> EmailLabelsResponse:
         """Get all labels applied to a specific email."""
+        if await self._uses_gmail_labels():
+            labels = await self.incoming_client.fetch_gmail_labels(email_id, source_mailbox)
+            return EmailLabelsResponse(email_id=email_id, labels=labels or [])
+
         # Get Message-ID from the source email
         message_id = await self.incoming_client.get_email_message_id(email_id, source_mailbox)
         if not message_id:
             return EmailLabelsResponse(email_id=email_id, labels=[])
 
-        # Get all labels
+        # Find the email in every label folder at once
         labels = await self.incoming_client.list_labels()
-        applied_labels = []
-
-        # Search each label folder for this email
-        for label in labels:
-            found_uid = await self.incoming_client.search_by_message_id(message_id, label.full_path)
-            if found_uid:
-                applied_labels.append(label.name)
+        locations = await self.incoming_client.locate_message_id(message_id, [label.full_path for label in labels])
+        applied_labels = [label.name for label in labels if label.full_path in locations]
 
         return EmailLabelsResponse(email_id=email_id, labels=applied_labels)
 
     async def create_label(self, label_name: str) -> FolderOperationResponse:
-        """Create a new label (creates Labels/name folder)."""
-        label_folder = f"Labels/{label_name}"
+        """Create a new label (creates Labels/name folder, or on Gmail the label itself)."""
+        label_folder = await self._label_folder(label_name)
         success, message = await self.incoming_client.create_folder(label_folder)
         return FolderOperationResponse(
             success=success,
@@ -1706,8 +3428,8 @@ class ClassicEmailHandler(EmailHandler):
         )
 
     async def delete_label(self, label_name: str) -> FolderOperationResponse:
-        """Delete a label (deletes Labels/name folder)."""
-        label_folder = f"Labels/{label_name}"
+        """Delete a label (deletes Labels/name folder, or on Gmail the label itself)."""
+        label_folder = await self._label_folder(label_name)
         success, message = await self.incoming_client.delete_folder(label_folder)
         return FolderOperationResponse(
             success=success,
@@ -8,13 +8,36 @@ from mcp_email_server.emails.classic import ClassicEmailHandler
 if TYPE_CHECKING:
     from mcp_email_server.emails import EmailHandler
 
+# account_name -> (settings snapshot the handler was built from, handler)
+_handlers: dict[str, tuple[EmailSettings, ClassicEmailHandler]] = {}
+
 
 def dispatch_handler(account_name: str) -> EmailHandler:
+    """Return the handler for an account, reusing it while its settings are unchanged.
+
+    Handlers hold long-lived state (pooled sessions, capability and folder
+    caches), so they are built once per account and rebuilt only when that
+    account's EmailSettings differ from the snapshot they were built with.
+    """
     settings = get_settings()
     account = settings.get_account(account_name)
     if isinstance(account, ProviderSettings):
         raise NotImplementedError
     if isinstance(account, EmailSettings):
-        return ClassicEmailHandler(account)
+        cached = _handlers.get(account_name)
+        if cached is not None and cached[0] == account:
+            return cached[1]
+        handler = ClassicEmailHandler(account)
+        _handlers[account_name] = (account.model_copy(deep=True), handler)
+        return handler
 
+    _handlers.pop(account_name, None)
     raise ValueError(f"Account {account_name} not found, available accounts: {settings.get_accounts()}")
+
+
+def clear_handler_cache(account_name: str | None = None) -> None:
+    """Forget cached handlers for one account, or for all accounts."""
+    if account_name is None:
+        _handlers.clear()
+    else:
+        _handlers.pop(account_name, None)
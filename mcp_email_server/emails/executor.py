@@ -0,0 +1,67 @@
+"""A worker pool for MIME parsing, so large emails do not stall the event loop.
+
+``BytesParser(policy=default)`` is pure Python. Parsing a batch of emails with
+HTML bodies and attachments takes hundreds of milliseconds, during which no
+other tool call is served. Inputs of at least ``parse_offload_min_size`` bytes
+are parsed in a pool of ``parse_workers`` threads or, with
+``parse_executor = "process"``, processes; smaller ones stay inline, where a
+pool round trip would cost more than the parse. Functions sent to a process
+pool must be module-level so they can be pickled.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from mcp_email_server.config import get_settings
+from mcp_email_server.log import logger
+
+T = TypeVar("T")
+
+_executor: Executor | None = None
+_executor_config: tuple[str, int] | None = None
+
+
+def get_parse_executor() -> Executor | None:
+    """Return the shared parse pool, creating it on first use.
+
+    Returns None when offloading is disabled (``parse_workers = 0``).
+    A pool whose kind or size no longer matches the settings is replaced.
+    """
+    global _executor, _executor_config
+    settings = get_settings()
+    if settings.parse_workers < 1:
+        shutdown_parse_executor()
+        return None
+
+    config = (settings.parse_executor, settings.parse_workers)
+    if _executor is not None and _executor_config == config:
+        return _executor
+
+    shutdown_parse_executor()
+    if settings.parse_executor == "process":
+        _executor = ProcessPoolExecutor(max_workers=settings.parse_workers)
+    else:
+        _executor = ThreadPoolExecutor(max_workers=settings.parse_workers, thread_name_prefix="mime-parse")
+    _executor_config = config
+    logger.debug(f"Started MIME parse pool: {settings.parse_workers} {settings.parse_executor} workers")
+    return _executor
+
+
+def shutdown_parse_executor() -> None:
+    """Stop the parse pool; parses already running finish first."""
+    global _executor, _executor_config
+    executor, _executor, _executor_config = _executor, None, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+async def run_parser(func: Callable[..., T], size: int, *args: Any) -> T:
+    """Call ``func(*args)``, in the parse pool if ``size`` bytes are worth offloading."""
+    executor = get_parse_executor() if size >= get_settings().parse_offload_min_size else None
+    if executor is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
@@ -0,0 +1,95 @@
+"""Run folder-scoped work over several IMAP sessions at once.
+
+A session has one mailbox selected at a time, so work spanning many folders
+(syncing every label folder's index, for example) is serialized on a single
+session and each folder waits for the previous one's round trips. The fan-out
+opens up to ``concurrency`` sessions, each taking the next folder from a
+shared queue until none are left, and yields results as they complete.
+
+Providers limit concurrent connections per account (Gmail allows about 15,
+Proton Mail Bridge fewer), so the cap is kept small; pooled sessions are also
+bounded by the account's pool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+from mcp_email_server.emails.pool import _CONNECTION_ERRORS
+from mcp_email_server.log import logger
+
+T = TypeVar("T")
+
+SessionFactory = Callable[[], AbstractAsyncContextManager[Any]]
+FolderWork = Callable[[Any, str], Awaitable[T]]
+
+
+@dataclass
+class FolderResult(Generic[T]):
+    """The outcome of the work for one folder: its value, or the error it raised."""
+
+    mailbox: str
+    value: T | None = None
+    error: BaseException | None = None
+
+
+async def fan_out(  # noqa: C901
+    session: SessionFactory,
+    mailboxes: list[str],
+    work: FolderWork[T],
+    concurrency: int,
+) -> AsyncIterator[FolderResult[T]]:
+    """Call ``work(imap, mailbox)`` for every mailbox over up to ``concurrency`` sessions.
+
+    Yields one FolderResult per mailbox, in completion order. A folder whose
+    work raises gets the error in its result; after a connection-level error
+    the session is dropped and its worker stops, leaving the remaining
+    folders to the others. Folders no session could take fail as well.
+    """
+    queue = deque(dict.fromkeys(mailboxes))
+    total = len(queue)
+    results: asyncio.Queue[FolderResult[T]] = asyncio.Queue()
+    workers = max(1, min(concurrency, total))
+    alive = workers
+
+    async def worker() -> None:
+        nonlocal alive
+        try:
+            async with session() as imap:
+                while queue:
+                    mailbox = queue.popleft()
+                    try:
+                        value = await work(imap, mailbox)
+                    except Exception as e:
+                        results.put_nowait(FolderResult(mailbox, error=e))
+                        if isinstance(e, _CONNECTION_ERRORS):
+                            raise
+                        continue
+                    results.put_nowait(FolderResult(mailbox, value))
+        except Exception as e:
+            logger.warning(f"Fan-out session failed: {e}")
+        finally:
+            alive -= 1
+            if not alive:
+                while queue:
+                    results.put_nowait(FolderResult(queue.popleft(), error=RuntimeError("No IMAP session available")))
+
+    if not total:
+        return
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    finished = False
+    try:
+        for _ in range(total):
+            yield await results.get()
+        finished = True
+    finally:
+        # Once every result is in the workers are only closing their sessions; stop them only if the caller gave up
+        if not finished:
+            for task in tasks:
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
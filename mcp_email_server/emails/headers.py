@@ -0,0 +1,218 @@
+"""Read the header fields that email metadata needs straight from a raw header block.
+
+``BytesParser(policy=default)`` builds a full ``EmailMessage`` and runs every
+field it is asked for through the header registry, whose address parser is
+by far the slowest part of listing metadata. Metadata only needs Subject,
+From, To, Cc, Date and Message-ID. This module unfolds just those fields and
+renders the common shapes (plain or RFC 2047 encoded text, ``Name <addr>``
+lists, ``<id@host>``) exactly as ``str(message[name])`` would. Anything more
+unusual, such as comments, groups, domain literals, 8-bit bytes or malformed
+encoded words, is left to the header registry, so the output never differs
+from the full parser.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import re
+from collections.abc import Callable
+from email.policy import default
+
+METADATA_FIELDS = ("subject", "from", "to", "cc", "date", "message-id")
+
+_LINE_END_RE = re.compile(r"\r\n|\r|\n")
+# Header field names as the email package's feed parser recognizes them
+_FIELD_RE = re.compile(r"([\041-\071\073-\176]+):")
+# Characters the email package treats as line breaks or mangles in headers
+_IRREGULAR_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+_WSP_RE = re.compile(r"([ \t]+)")
+_ENCODED_WORD_RE = re.compile(r"=\?([^?\s*]+)(?:\*[^?\s]*)?\?([bBqQ])\?([^?\s]*)\?=")
+_Q_ESCAPE_RE = re.compile(rb"=([a-fA-F0-9]{2})")
+
+_ATEXT = r"[A-Za-z0-9!#$%&'*+\-/=?^_`{|}~]"
+_DOT_ATOM = rf"{_ATEXT}+(?:\.{_ATEXT}+)*"
+_ADDR_SPEC_RE = re.compile(rf"{_DOT_ATOM}@{_DOT_ATOM}")
+_MSG_ID_RE = re.compile(rf"<{_DOT_ATOM}@{_DOT_ATOM}>[ \t]*")
+_MAILBOX_RE = re.compile(rf"(?P<phrase>[^<>]*?)[ \t]*<(?P<addr>{_DOT_ATOM}@{_DOT_ATOM})>")
+_PHRASE_WORD_RE = re.compile(
+    rf'(?P<space>[ \t]*)(?:(?P<encoded>=\?[^?\s]+\?[bBqQ]\?[^?\s]*\?=)(?![^ \t])|"(?P<quoted>(?:[^"\\]|\\.)*)"|(?P<atom>{_ATEXT}+))'
+)
+_ADDRESS_LIST_RE = re.compile(r'(?:[^,"\\]|"(?:[^"\\]|\\.)*")*(?:,(?:[^,"\\]|"(?:[^"\\]|\\.)*")*)*')
+_ADDRESS_RE = re.compile(r'(?:[^,"\\]|"(?:[^"\\]|\\.)*")+')
+
+# RFC 5322 specials that force a display name into quotes, as email.headerregistry.Address has it
+_SPECIALS = frozenset('()<>@,:;."\\[]')
+
+
+def unfold_fields(raw_headers: bytes, names: tuple[str, ...] = METADATA_FIELDS) -> dict[str, str] | None:
+    """Return the first occurrence of each field in ``names``, unfolded as the email package does.
+
+    Returns None if the block is not plain 7-bit ``Name: value`` lines, in
+    which case the email package's recovery rules apply and it should parse
+    the block itself.
+    """
+    try:
+        text = raw_headers.decode("ascii")
+    except UnicodeDecodeError:
+        return None
+    if _IRREGULAR_RE.search(text):
+        return None
+
+    fields: dict[str, str] = {}
+    # The field continuation lines belong to; "" while skipping a field
+    current: str | None = None
+    for line in _LINE_END_RE.split(text):
+        if not line:
+            break
+        if line[0] in " \t":
+            if current is None:
+                return None
+            if current:
+                fields[current] += line
+            continue
+        match = _FIELD_RE.match(line)
+        if match is None:
+            return None
+        current = match.group(1).lower()
+        if current in names and current not in fields:
+            fields[current] = line[match.end() :].lstrip(" \t")
+        else:
+            current = ""
+    return fields
+
+
+def _decode_encoded_word(word: str) -> str | None:
+    """Decode one well-formed RFC 2047 encoded word; None if it needs the email package's leniency."""
+    match = _ENCODED_WORD_RE.fullmatch(word)
+    if match is None:
+        return None
+    charset, encoding, text = match.groups()
+    try:
+        if encoding in "bB":
+            data = base64.b64decode(text, validate=True)
+        else:
+            data = _Q_ESCAPE_RE.sub(lambda m: bytes.fromhex(m.group(1).decode()), text.replace("_", " ").encode())
+        return data.decode(charset)
+    except (binascii.Error, ValueError, LookupError):
+        return None
+
+
+def render_unstructured(value: str) -> str | None:
+    """Decode encoded words in unstructured text such as a Subject, keeping all other whitespace."""
+    if "=?" not in value:
+        return value
+    rendered: list[str] = []
+    previous_encoded = False
+    pending_space = ""
+    for token in _WSP_RE.split(value):
+        if not token:
+            continue
+        if token[0] in " \t":
+            pending_space = token
+            continue
+        if "=?" in token:
+            decoded = _decode_encoded_word(token)
+            if decoded is None:
+                return None
+            # Whitespace between two encoded words is not part of the text
+            rendered.append(("" if previous_encoded else pending_space) + decoded)
+            previous_encoded = True
+        else:
+            rendered.append(pending_space + token)
+            previous_encoded = False
+        pending_space = ""
+    rendered.append(pending_space)
+    return "".join(rendered)
+
+
+def _display_name(phrase: str) -> str | None:
+    """Join the words of a display name with single spaces, decoding quoted strings and encoded words."""
+    words = []
+    pos = 0
+    while pos < len(phrase):
+        match = _PHRASE_WORD_RE.match(phrase, pos)
+        if match is None or (words and not match.group("space")):
+            return None
+        pos = match.end()
+        if (word := match.group("encoded")) is not None:
+            decoded = _decode_encoded_word(word)
+            if decoded is None:
+                return None
+            words.append(decoded)
+        elif (quoted := match.group("quoted")) is not None:
+            if "=?" in quoted:
+                return None
+            words.append(re.sub(r"\\(.)", r"\1", quoted))
+        elif "=?" in (word := match.group("atom")):
+            return None
+        else:
+            words.append(word)
+    return " ".join(words)
+
+
+def _render_mailbox(mailbox: str) -> str | None:
+    if _ADDR_SPEC_RE.fullmatch(mailbox):
+        return mailbox
+    match = _MAILBOX_RE.fullmatch(mailbox)
+    if match is None:
+        return None
+    name = _display_name(match.group("phrase"))
+    if name is None:
+        return None
+    address = match.group("addr")
+    if not name:
+        return address
+    if not _SPECIALS.isdisjoint(name):
+        name = '"' + name.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return f"{name} <{address}>"
+
+
+def render_addresses(value: str) -> str | None:
+    """Render an address list field such as To as ``Name <addr>, addr``."""
+    if not _ADDRESS_LIST_RE.fullmatch(value):
+        return None
+    rendered = []
+    for element in _ADDRESS_RE.findall(value):
+        element = element.strip(" \t")
+        if not element:
+            continue
+        mailbox = _render_mailbox(element)
+        if mailbox is None:
+            return None
+        rendered.append(mailbox)
+    return ", ".join(rendered)
+
+
+def render_message_id(value: str) -> str | None:
+    return value if _MSG_ID_RE.fullmatch(value) else None
+
+
+_RENDERERS: dict[str, Callable[[str], str | None]] = {
+    "subject": render_unstructured,
+    "from": render_addresses,
+    "to": render_addresses,
+    "cc": render_addresses,
+    "message-id": render_message_id,
+}
+
+
+def header_values(raw_headers: bytes) -> dict[str, str] | None:
+    """Return the metadata fields of a header block, rendered as ``str(message[name])``.
+
+    Date is returned as written; only its parsed value is ever used. Fields
+    the fast paths do not cover go through the header registry. Returns None
+    if the block itself needs the email package's parser.
+    """
+    fields = unfold_fields(raw_headers)
+    if fields is None:
+        return None
+    values = {}
+    for name, value in fields.items():
+        render = _RENDERERS.get(name)
+        if render is None:
+            values[name] = value
+            continue
+        rendered = render(value)
+        values[name] = rendered if rendered is not None else str(default.header_factory(name, value))
+    return values
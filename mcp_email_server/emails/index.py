@@ -0,0 +1,496 @@
+"""Local index of email metadata, persisted in SQLite.
+
+Listing a mailbox page by page means searching, sorting and fetching headers
+on the server for every call. Instead, the headers fetched for each message
+are kept per account and mailbox in the SQLite database at
+``Settings.db_location``, keyed by UID and invalidated when the mailbox's
+UIDVALIDITY changes. Filters, sorting and pagination are then answered
+locally; the server is only asked for messages the index has not seen yet
+and for UIDs that have disappeared.
+
+When SQLite has FTS5, the decoded bodies of emails that were read can also be
+kept in a full-text index next to their subject and addresses, for ranked
+search without asking the server.
+
+Message-IDs are indexed as well, so the mailboxes holding a copy of an email,
+such as its label folders, are found without searching each one on the server.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from mcp_email_server.config import get_settings
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS indexed_mailboxes ("
+    " account TEXT NOT NULL,"
+    " mailbox TEXT NOT NULL,"
+    " uidvalidity INTEGER NOT NULL,"
+    " uidnext INTEGER,"
+    " highestmodseq INTEGER,"
+    " synced_at REAL NOT NULL,"
+    " PRIMARY KEY (account, mailbox))",
+    "CREATE TABLE IF NOT EXISTS email_metadata ("
+    " account TEXT NOT NULL,"
+    " mailbox TEXT NOT NULL,"
+    " uid INTEGER NOT NULL,"
+    " message_id TEXT,"
+    " subject TEXT NOT NULL DEFAULT '',"
+    " sender TEXT NOT NULL DEFAULT '',"
+    " to_addrs TEXT NOT NULL DEFAULT '[]',"
+    " cc_addrs TEXT NOT NULL DEFAULT '[]',"
+    " date REAL NOT NULL,"
+    " flags TEXT NOT NULL DEFAULT '',"
+    " size INTEGER,"
+    " attachments TEXT,"
+    " internaldate REAL,"
+    " PRIMARY KEY (account, mailbox, uid))",
+    "CREATE INDEX IF NOT EXISTS email_metadata_date ON email_metadata (account, mailbox, date)",
+    "CREATE INDEX IF NOT EXISTS email_metadata_message_id ON email_metadata (account, message_id)",
+)
+
+# Full-text rows live in email_fts under the rowid of their email_text entry, so they
+# can be found and deleted by (account, mailbox, uid) without scanning the FTS table
+_TEXT_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS email_text ("
+    " id INTEGER PRIMARY KEY,"
+    " account TEXT NOT NULL,"
+    " mailbox TEXT NOT NULL,"
+    " uid INTEGER NOT NULL,"
+    " date REAL NOT NULL,"
+    " UNIQUE (account, mailbox, uid))",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS email_fts"
+    " USING fts5(subject, sender, recipients, body, tokenize = 'unicode61 remove_diacritics 2')",
+)
+
+# bm25() weights for subject, sender, recipients and body
+_FTS_RANK = "bm25(email_fts, 5.0, 3.0, 2.0, 1.0)"
+
+_COLUMNS = "uid, message_id, subject, sender, to_addrs, cc_addrs, date, flags, size, attachments"
+
+
+@dataclass(frozen=True)
+class IndexedMailbox:
+    """What the index last saw of a mailbox's SELECT state."""
+
+    uidvalidity: int
+    uidnext: int | None
+    synced_at: float
+    # CONDSTORE (RFC 7162) mod-sequence the indexed flags are current as of, if known
+    highestmodseq: int | None = None
+
+
+def _like(value: str) -> str:
+    """Turn ``value`` into a case-insensitive substring pattern, as IMAP SEARCH matches."""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _fts_query(text: str) -> str:
+    """Quote each term of ``text`` for FTS5 MATCH, so all terms must match; ``term*`` matches prefixes."""
+    terms = []
+    for term in text.split():
+        prefix = len(term) > 1 and term.endswith("*")
+        term = term.rstrip("*")
+        if term:
+            terms.append('"{}"{}'.format(term.replace('"', '""'), "*" if prefix else ""))
+    return " ".join(terms)
+
+
+def _day_start(value: datetime) -> float:
+    """IMAP SINCE/BEFORE compare whole days; return the start of ``value``'s day."""
+    return datetime(value.year, value.month, value.day, tzinfo=timezone.utc).timestamp()
+
+
+class MetadataIndex:
+    """Email metadata per account and mailbox, kept in SQLite.
+
+    Args:
+        db_path: SQLite database file, or None to keep the index in memory only.
+    """
+
+    def __init__(self, db_path: str | Path | None):
+        self.db_path = Path(db_path) if db_path is not None else None
+        self._conn: sqlite3.Connection | None = None
+        self._full_text = False
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.db_path is not None:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path if self.db_path is not None else ":memory:", check_same_thread=False)
+            with conn:
+                for statement in _SCHEMA:
+                    conn.execute(statement)
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(indexed_mailboxes)")}
+                if "highestmodseq" not in columns:
+                    conn.execute("ALTER TABLE indexed_mailboxes ADD COLUMN highestmodseq INTEGER")
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(email_metadata)")}
+                if "internaldate" not in columns:
+                    # Older entries lack INTERNALDATE and hold ASCII-escaped recipients; index them again
+                    conn.execute("ALTER TABLE email_metadata ADD COLUMN internaldate REAL")
+                    conn.execute("DELETE FROM email_metadata")
+                    conn.execute("DELETE FROM indexed_mailboxes")
+            try:
+                with conn:
+                    for statement in _TEXT_SCHEMA:
+                        conn.execute(statement)
+                self._full_text = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5
+                self._full_text = False
+            self._conn = conn
+        return self._conn
+
+    @property
+    def full_text(self) -> bool:
+        """Whether this SQLite build supports the full-text index."""
+        self.conn  # noqa: B018 - opening the database detects FTS5
+        return self._full_text
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def mailbox_state(self, account: str, mailbox: str) -> IndexedMailbox | None:
+        row = self.conn.execute(
+            "SELECT uidvalidity, uidnext, synced_at, highestmodseq FROM indexed_mailboxes"
+            " WHERE account = ? AND mailbox = ?",
+            (account, mailbox),
+        ).fetchone()
+        return IndexedMailbox(*row) if row else None
+
+    def reset_mailbox(self, account: str, mailbox: str, uidvalidity: int) -> None:
+        """Forget everything indexed for ``mailbox`` and start over under ``uidvalidity``."""
+        with self.conn:
+            self.conn.execute("DELETE FROM email_metadata WHERE account = ? AND mailbox = ?", (account, mailbox))
+            self._delete_text("account = ? AND mailbox = ?", [(account, mailbox)])
+            self.conn.execute(
+                "INSERT OR REPLACE INTO indexed_mailboxes (account, mailbox, uidvalidity, uidnext, synced_at)"
+                " VALUES (?, ?, ?, NULL, ?)",
+                (account, mailbox, uidvalidity, time.time()),
+            )
+
+    def mark_synced(self, account: str, mailbox: str, uidnext: int | None, highestmodseq: int | None = None) -> None:
+        with self.conn:
+            self.conn.execute(
+                "UPDATE indexed_mailboxes SET uidnext = ?, highestmodseq = ?, synced_at = ?"
+                " WHERE account = ? AND mailbox = ?",
+                (uidnext, highestmodseq, time.time(), account, mailbox),
+            )
+
+    def drop_mailbox(self, account: str, mailbox: str) -> None:
+        """Remove a mailbox from the index (after it was deleted or renamed)."""
+        with self.conn:
+            self.conn.execute("DELETE FROM email_metadata WHERE account = ? AND mailbox = ?", (account, mailbox))
+            self._delete_text("account = ? AND mailbox = ?", [(account, mailbox)])
+            self.conn.execute("DELETE FROM indexed_mailboxes WHERE account = ? AND mailbox = ?", (account, mailbox))
+
+    def mailboxes(self, account: str) -> list[str]:
+        rows = self.conn.execute("SELECT mailbox FROM indexed_mailboxes WHERE account = ? ORDER BY mailbox", (account,))
+        return [mailbox for (mailbox,) in rows]
+
+    def count(self, account: str, mailbox: str) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM email_metadata WHERE account = ? AND mailbox = ?", (account, mailbox)
+        ).fetchone()[0]
+
+    def uids(self, account: str, mailbox: str) -> set[int]:
+        rows = self.conn.execute("SELECT uid FROM email_metadata WHERE account = ? AND mailbox = ?", (account, mailbox))
+        return {uid for (uid,) in rows}
+
+    def uids_larger_than(self, account: str, mailbox: str, size: int) -> set[int]:
+        """UIDs whose indexed RFC822.SIZE exceeds ``size``."""
+        rows = self.conn.execute(
+            "SELECT uid FROM email_metadata WHERE account = ? AND mailbox = ? AND size > ?", (account, mailbox, size)
+        )
+        return {uid for (uid,) in rows}
+
+    def message_id(self, account: str, mailbox: str, uid: int | str) -> str | None:
+        row = self.conn.execute(
+            "SELECT message_id FROM email_metadata WHERE account = ? AND mailbox = ? AND uid = ?",
+            (account, mailbox, int(uid)),
+        ).fetchone()
+        return row[0] if row else None
+
+    def locate(self, account: str, message_id: str) -> dict[str, list[int]]:
+        """Where the email with ``message_id`` is, as {mailbox: UIDs}, across every indexed mailbox."""
+        rows = self.conn.execute(
+            "SELECT mailbox, uid FROM email_metadata WHERE account = ? AND message_id = ? ORDER BY mailbox, uid",
+            (account, message_id.strip()),
+        )
+        locations: dict[str, list[int]] = {}
+        for mailbox, uid in rows:
+            locations.setdefault(mailbox, []).append(uid)
+        return locations
+
+    def add(self, account: str, mailbox: str, entries: Iterable[dict[str, Any]]) -> None:
+        """Store metadata dicts as returned by ``EmailClient._batch_fetch_headers``."""
+        rows = []
+        for entry in entries:
+            to_addrs = list(entry.get("to", []))
+            cc_addrs = list(entry.get("cc", []))
+            # "to" lists To and Cc together; keep them apart so TO searches only To
+            if cc_addrs and to_addrs[-len(cc_addrs) :] == cc_addrs:
+                to_addrs = to_addrs[: -len(cc_addrs)]
+            internaldate = entry.get("internaldate")
+            rows.append((
+                account,
+                mailbox,
+                int(entry["email_id"]),
+                str(entry["message_id"]).strip() if entry.get("message_id") else None,
+                str(entry.get("subject") or ""),
+                str(entry.get("from") or ""),
+                # Unescaped, so TO searches match non-ASCII addresses and names
+                json.dumps(to_addrs, ensure_ascii=False),
+                json.dumps(cc_addrs, ensure_ascii=False),
+                entry["date"].timestamp(),
+                " ".join(entry.get("flags", [])),
+                entry.get("size"),
+                json.dumps(entry["attachments"]) if entry.get("attachments") else None,
+                internaldate.timestamp() if internaldate else None,
+            ))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO email_metadata"
+                " (account, mailbox, uid, message_id, subject, sender, to_addrs, cc_addrs, date, flags, size,"
+                " attachments, internaldate) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def remove(self, account: str, mailbox: str, uids: Iterable[int | str]) -> None:
+        rows = [(account, mailbox, int(uid)) for uid in uids]
+        with self.conn:
+            self.conn.executemany("DELETE FROM email_metadata WHERE account = ? AND mailbox = ? AND uid = ?", rows)
+            self._delete_text("account = ? AND mailbox = ? AND uid = ?", rows)
+
+    def _delete_text(self, where: str, rows: list[tuple]) -> None:
+        if not self.full_text:
+            return
+        self.conn.executemany(
+            f"DELETE FROM email_fts WHERE rowid IN (SELECT id FROM email_text WHERE {where})",  # noqa: S608
+            rows,
+        )
+        self.conn.executemany(f"DELETE FROM email_text WHERE {where}", rows)  # noqa: S608
+
+    def add_text(self, account: str, mailbox: str, email: dict[str, Any]) -> None:
+        """Add a parsed email, as returned by ``EmailClient._parse_email_data``, to the full-text index."""
+        if not self.full_text:
+            return
+        uid = int(email["email_id"])
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO email_text (id, account, mailbox, uid, date) VALUES ("
+                "(SELECT id FROM email_text WHERE account = ? AND mailbox = ? AND uid = ?), ?, ?, ?, ?)",
+                (account, mailbox, uid, account, mailbox, uid, email["date"].timestamp()),
+            )
+            (rowid,) = self.conn.execute(
+                "SELECT id FROM email_text WHERE account = ? AND mailbox = ? AND uid = ?", (account, mailbox, uid)
+            ).fetchone()
+            self.conn.execute("DELETE FROM email_fts WHERE rowid = ?", (rowid,))
+            self.conn.execute(
+                "INSERT INTO email_fts (rowid, subject, sender, recipients, body) VALUES (?, ?, ?, ?, ?)",
+                (
+                    rowid,
+                    str(email.get("subject") or ""),
+                    str(email.get("from") or ""),
+                    ", ".join(email.get("to", [])),
+                    email.get("body") or "",
+                ),
+            )
+
+    def missing_text(self, account: str, mailbox: str, limit: int) -> list[int]:
+        """UIDs of indexed emails whose text is not in the full-text index yet, newest first."""
+        if not self.full_text:
+            return []
+        rows = self.conn.execute(
+            "SELECT uid FROM email_metadata m WHERE account = ? AND mailbox = ? AND NOT EXISTS"
+            " (SELECT 1 FROM email_text t WHERE t.account = m.account AND t.mailbox = m.mailbox AND t.uid = m.uid)"
+            " ORDER BY date DESC LIMIT ?",
+            (account, mailbox, limit),
+        )
+        return [uid for (uid,) in rows]
+
+    def search(
+        self, account: str, text: str, mailbox: str | None = None, offset: int = 0, limit: int = 10
+    ) -> tuple[list[dict[str, Any]], int]:
+        """Rank emails matching every term of ``text`` by BM25, best first.
+
+        Returns (results, total); each result has email_id, mailbox, subject,
+        from, date, a one-line snippet with matches wrapped in ``**`` and a score.
+        """
+        match = _fts_query(text)
+        if not self.full_text or not match:
+            return [], 0
+        where = "email_fts MATCH ? AND email_text.account = ?"
+        params: list[Any] = [match, account]
+        if mailbox is not None:
+            where += " AND email_text.mailbox = ?"
+            params.append(mailbox)
+
+        source = f"FROM email_fts JOIN email_text ON email_text.id = email_fts.rowid WHERE {where}"
+        total = self.conn.execute(f"SELECT COUNT(*) {source}", params).fetchone()[0]
+        select = (
+            "SELECT email_text.uid, email_text.mailbox, email_text.date, email_fts.subject, email_fts.sender,"
+            f" snippet(email_fts, -1, '**', '**', '...', 16), {_FTS_RANK} AS rank {source}"
+        )
+        rows = self.conn.execute(f"{select} ORDER BY rank LIMIT ? OFFSET ?", [*params, limit, offset]).fetchall()
+        return [
+            {
+                "email_id": str(uid),
+                "mailbox": result_mailbox,
+                "subject": subject,
+                "from": sender,
+                "date": datetime.fromtimestamp(date, tz=timezone.utc),
+                "snippet": " ".join(snippet.split()),
+                # bm25() is lower for better matches
+                "score": -rank,
+            }
+            for uid, result_mailbox, date, subject, sender, snippet, rank in rows
+        ], total
+
+    def set_flags(self, account: str, mailbox: str, flags: dict[int, list[str]]) -> None:
+        """Replace the flags of the given UIDs."""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE email_metadata SET flags = ? WHERE account = ? AND mailbox = ? AND uid = ?",
+                [(" ".join(uid_flags), account, mailbox, uid) for uid, uid_flags in flags.items()],
+            )
+
+    def update_flag(self, account: str, mailbox: str, uids: Iterable[int | str], flag: str, add: bool) -> None:
+        """Add or remove one flag on the given UIDs, mirroring a UID STORE +FLAGS/-FLAGS."""
+        updated = {}
+        for uid in uids:
+            row = self.conn.execute(
+                "SELECT flags FROM email_metadata WHERE account = ? AND mailbox = ? AND uid = ?",
+                (account, mailbox, int(uid)),
+            ).fetchone()
+            if row is None:
+                continue
+            current = [f for f in row[0].split() if f.lower() != flag.lower()]
+            updated[int(uid)] = [*current, flag] if add else current
+        self.set_flags(account, mailbox, updated)
+
+    def set_attachments(self, account: str, mailbox: str, uid: int | str, attachments: list[str]) -> None:
+        with self.conn:
+            self.conn.execute(
+                "UPDATE email_metadata SET attachments = ? WHERE account = ? AND mailbox = ? AND uid = ?",
+                (json.dumps(attachments), account, mailbox, int(uid)),
+            )
+
+    def query(
+        self,
+        account: str,
+        mailbox: str,
+        offset: int = 0,
+        limit: int = 10,
+        before: datetime | None = None,
+        since: datetime | None = None,
+        subject: str | None = None,
+        from_address: str | None = None,
+        to_address: str | None = None,
+        order: str = "desc",
+        seen: bool | None = None,
+        flagged: bool | None = None,
+        answered: bool | None = None,
+    ) -> tuple[list[dict[str, Any]], int]:
+        """Filter, sort by date and paginate locally, with IMAP SEARCH semantics.
+
+        Like SEARCH SINCE/BEFORE, ``since`` and ``before`` compare the
+        INTERNALDATE (arrival), not the Date header the results are sorted by.
+        Returns (metadata_list, total) in the shape ``get_emails_metadata_page`` returns.
+        """
+        where, params = self._filters(account, mailbox, before, since, subject, from_address, to_address)
+        for flag, value in (("\\Seen", seen), ("\\Flagged", flagged), ("\\Answered", answered)):
+            if value is not None:
+                where.append(f"instr(' ' || flags || ' ', ?) {'>' if value else '='} 0")
+                params.append(f" {flag} ")
+
+        clause = " AND ".join(where)
+        direction = "DESC" if order == "desc" else "ASC"
+        total = self.conn.execute(f"SELECT COUNT(*) FROM email_metadata WHERE {clause}", params).fetchone()[0]  # noqa: S608
+        select = f"SELECT {_COLUMNS} FROM email_metadata WHERE {clause}"  # noqa: S608
+        rows = self.conn.execute(
+            f"{select} ORDER BY date {direction}, uid {direction} LIMIT ? OFFSET ?", [*params, limit, offset]
+        ).fetchall()
+        return [self._to_metadata(row) for row in rows], total
+
+    def candidate_uids(
+        self,
+        account: str,
+        mailbox: str,
+        before: datetime | None = None,
+        since: datetime | None = None,
+        subject: str | None = None,
+        from_address: str | None = None,
+        to_address: str | None = None,
+    ) -> list[int]:
+        """UIDs that match the filters of ``query`` other than flags, whose flags decide the rest."""
+        where, params = self._filters(account, mailbox, before, since, subject, from_address, to_address)
+        rows = self.conn.execute(
+            f"SELECT uid FROM email_metadata WHERE {' AND '.join(where)} ORDER BY uid",  # noqa: S608
+            params,
+        )
+        return [uid for (uid,) in rows]
+
+    @staticmethod
+    def _filters(
+        account: str,
+        mailbox: str,
+        before: datetime | None,
+        since: datetime | None,
+        subject: str | None,
+        from_address: str | None,
+        to_address: str | None,
+    ) -> tuple[list[str], list[Any]]:
+        where = ["account = ?", "mailbox = ?"]
+        params: list[Any] = [account, mailbox]
+        # Entries from servers that did not report INTERNALDATE fall back to the Date header
+        if before:
+            where.append("COALESCE(internaldate, date) < ?")
+            params.append(_day_start(before))
+        if since:
+            where.append("COALESCE(internaldate, date) >= ?")
+            params.append(_day_start(since))
+        for column, value in (("subject", subject), ("sender", from_address), ("to_addrs", to_address)):
+            if value:
+                where.append(f"{column} LIKE ? ESCAPE '\\'")
+                params.append(_like(value))
+        return where, params
+
+    @staticmethod
+    def _to_metadata(row: tuple) -> dict[str, Any]:
+        uid, message_id, subject, sender, to_addrs, cc_addrs, date, flags, size, attachments = row
+        return {
+            "email_id": str(uid),
+            "message_id": message_id,
+            "subject": subject,
+            "from": sender,
+            "to": json.loads(to_addrs) + json.loads(cc_addrs),
+            "date": datetime.fromtimestamp(date, tz=timezone.utc),
+            "attachments": json.loads(attachments) if attachments else [],
+            "flags": flags.split(),
+            "size": size,
+        }
+
+
+_indexes: dict[str, MetadataIndex] = {}
+
+
+def get_metadata_index() -> MetadataIndex:
+    """Return the index backed by the configured ``db_location``."""
+    db_location = get_settings().db_location
+    index = _indexes.get(db_location)
+    if index is None:
+        index = _indexes[db_location] = MetadataIndex(db_location)
+    return index
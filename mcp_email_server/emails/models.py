@@ -49,8 +49,33 @@ class EmailBodyResponse(BaseModel):
     sender: str
     recipients: list[str]
     date: datetime
-    body: str
+    body: str  # The requested page of the plain-text body
     attachments: list[str]
+    body_offset: int = 0  # Character offset of this page in the whole body
+    body_total_length: int | None = None  # Length of the whole body in characters
+    next_offset: int | None = None  # body_offset of the next page; None once the body is complete
+
+
+class EmailSearchResult(BaseModel):
+    """Single full-text search hit"""
+
+    email_id: str
+    mailbox: str
+    subject: str
+    sender: str
+    date: datetime
+    snippet: str  # Matching text, with matched terms wrapped in **
+    score: float  # Higher is a better match
+
+
+class EmailSearchResponse(BaseModel):
+    """Ranked full-text search response"""
+
+    query: str
+    page: int
+    page_size: int
+    results: list[EmailSearchResult]
+    total: int
 
 
 class EmailContentBatchResponse(BaseModel):
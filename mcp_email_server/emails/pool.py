@@ -0,0 +1,283 @@
+"""Pooled, authenticated IMAP sessions shared across EmailClient calls.
+
+Opening an IMAP session costs a TCP + TLS handshake, the server greeting,
+LOGIN and ID before the first useful command is sent. The pool keeps
+authenticated sessions around per ``EmailServer`` so that consecutive tool
+calls can reuse them, and evicts sessions that went idle for too long or that
+fail a NOOP health check.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import Any
+
+import aioimaplib
+
+from mcp_email_server.config import EmailServer, get_settings
+from mcp_email_server.log import logger
+
+ImapConnector = Callable[[], Awaitable[Any]]
+
+# Errors after which a session can no longer be trusted and must be dropped
+_CONNECTION_ERRORS = (
+    OSError,
+    EOFError,
+    asyncio.TimeoutError,
+    asyncio.CancelledError,
+    aioimaplib.Abort,
+    aioimaplib.CommandTimeout,
+)
+
+
+class PooledConnection:
+    """An authenticated IMAP session owned by a pool."""
+
+    def __init__(self, imap: Any):
+        self.imap = imap
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+    @property
+    def idle_for(self) -> float:
+        return time.monotonic() - self.last_used
+
+    def is_closed(self) -> bool:
+        """Check the protocol state without talking to the server."""
+        try:
+            return self.imap.protocol.state == "LOGOUT"
+        except Exception:
+            return False
+
+
+class IMAPConnectionPool:
+    """A bounded pool of authenticated IMAP sessions for one server/account.
+
+    Args:
+        connect: Coroutine factory that returns a connected, logged-in session.
+        min_size: Number of idle sessions that are kept even past ``idle_timeout``.
+        max_size: Maximum number of concurrent sessions (callers wait beyond that).
+        idle_timeout: Seconds after which surplus idle sessions are closed.
+        health_check_interval: Idle seconds after which a session is NOOP-checked before reuse.
+    """
+
+    def __init__(
+        self,
+        connect: ImapConnector,
+        *,
+        min_size: int = 0,
+        max_size: int = 5,
+        idle_timeout: float = 300.0,
+        health_check_interval: float = 30.0,
+        name: str = "",
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.connect = connect
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.name = name
+
+        self._idle: deque[PooledConnection] = deque()
+        self._in_use = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        # Logouts of pruned sessions still in flight; close() waits for them
+        self._closing: set[asyncio.Task] = set()
+
+    @property
+    def size(self) -> int:
+        """Total number of open sessions (idle + in use)."""
+        return len(self._idle) + self._in_use
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    def _bind_loop(self) -> asyncio.Semaphore:
+        """Bind pool state to the running event loop.
+
+        Sessions are tied to the loop that opened them, so if the pool is used
+        from a new loop the idle sessions are abandoned and state is reset.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._semaphore is None:
+            if self._loop is not None:
+                logger.debug(f"IMAP pool {self.name}: event loop changed, dropping {len(self._idle)} idle sessions")
+            self._loop = loop
+            self._idle.clear()
+            self._in_use = 0
+            self._semaphore = asyncio.Semaphore(self.max_size)
+        return self._semaphore
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Any]:
+        """Check out a session for the duration of the ``async with`` block.
+
+        The session goes back to the pool afterwards, unless the block raised a
+        connection-level error, in which case it is closed and evicted.
+        """
+        semaphore = self._bind_loop()
+        async with semaphore:
+            conn = await self._checkout()
+            self._in_use += 1
+            try:
+                yield conn.imap
+            except BaseException as e:
+                self._in_use -= 1
+                if isinstance(e, _CONNECTION_ERRORS) or conn.is_closed():
+                    logger.info(f"IMAP pool {self.name}: evicting session after error: {e!r}")
+                    await self._close(conn)
+                else:
+                    self._checkin(conn)
+                raise
+            else:
+                self._in_use -= 1
+                self._checkin(conn)
+
+    async def _checkout(self) -> PooledConnection:
+        self._prune_idle()
+        while self._idle:
+            conn = self._idle.pop()
+            if await self._is_healthy(conn):
+                return conn
+            await self._close(conn)
+        logger.debug(f"IMAP pool {self.name}: opening new session ({self.size + 1}/{self.max_size})")
+        return PooledConnection(await self.connect())
+
+    def _checkin(self, conn: PooledConnection) -> None:
+        if conn.is_closed():
+            return
+        conn.last_used = time.monotonic()
+        self._idle.append(conn)
+
+    async def _is_healthy(self, conn: PooledConnection) -> bool:
+        if conn.is_closed():
+            return False
+        if conn.idle_for < self.health_check_interval:
+            return True
+        try:
+            response = await conn.imap.noop()
+            return getattr(response, "result", "OK") == "OK"
+        except Exception as e:
+            logger.info(f"IMAP pool {self.name}: health check failed: {e!r}")
+            return False
+
+    def _prune_idle(self) -> None:
+        """Drop surplus sessions that have been idle longer than ``idle_timeout``."""
+        keep: deque[PooledConnection] = deque()
+        stale: list[PooledConnection] = []
+        # Most recently used sessions are at the right end; keep those first
+        for conn in reversed(self._idle):
+            if conn.idle_for > self.idle_timeout and len(keep) + self._in_use >= self.min_size:
+                stale.append(conn)
+            else:
+                keep.appendleft(conn)
+        self._idle = keep
+        for conn in stale:
+            # Logging out of a stale session must not delay the caller
+            _track(self._closing, self._close(conn), f"IMAP pool {self.name}: logout of a pruned session")
+
+    async def _close(self, conn: PooledConnection) -> None:
+        try:
+            await conn.imap.logout()
+        except Exception as e:
+            logger.debug(f"IMAP pool {self.name}: error during logout: {e}")
+
+    async def warm(self) -> None:
+        """Open sessions until ``min_size`` idle sessions are available."""
+        self._bind_loop()
+        while self.size < self.min_size:
+            self._checkin(PooledConnection(await self.connect()))
+
+    async def close(self) -> None:
+        """Log out of all idle sessions."""
+        idle, self._idle = list(self._idle), deque()
+        for conn in idle:
+            await self._close(conn)
+        await _wait_for(self._closing)
+
+
+def _track(tasks: set[asyncio.Task], coro: Awaitable[None], description: str) -> None:
+    """Run ``coro`` in the background, keeping a reference in ``tasks`` until it is done."""
+
+    def done(task: asyncio.Task) -> None:
+        tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"{description} failed: {task.exception()!r}")
+
+    task = asyncio.get_running_loop().create_task(coro)
+    tasks.add(task)
+    task.add_done_callback(done)
+
+
+async def _wait_for(tasks: set[asyncio.Task]) -> None:
+    """Wait for the background ``tasks`` started on the running loop."""
+    loop = asyncio.get_running_loop()
+    pending = [task for task in tasks if task.get_loop() is loop]
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+_pools: dict[tuple[str, int, str, bool], IMAPConnectionPool] = {}
+_pool_servers: dict[tuple[str, int, str, bool], EmailServer] = {}
+# Closes of replaced pools still in flight
+_discarding: set[asyncio.Task] = set()
+
+
+def _pool_key(email_server: EmailServer) -> tuple[str, int, str, bool]:
+    return (email_server.host, email_server.port, email_server.user_name, email_server.use_ssl)
+
+
+def get_connection_pool(email_server: EmailServer, connect: ImapConnector) -> IMAPConnectionPool | None:
+    """Return the shared pool for ``email_server``, creating it on first use.
+
+    Returns None when pooling is disabled (``imap_pool_max_size = 0``).
+    A pool whose credentials no longer match ``email_server`` is replaced.
+    """
+    settings = get_settings()
+    if settings.imap_pool_max_size < 1:
+        return None
+
+    key = _pool_key(email_server)
+    pool = _pools.get(key)
+    if pool is not None and _pool_servers[key] == email_server:
+        return pool
+
+    if pool is not None:
+        logger.info(f"IMAP pool {pool.name}: server settings changed, replacing pool")
+        _discard_pool(pool)
+
+    pool = IMAPConnectionPool(
+        connect,
+        min_size=settings.imap_pool_min_size,
+        max_size=settings.imap_pool_max_size,
+        idle_timeout=settings.imap_pool_idle_timeout,
+        name=f"{email_server.user_name}@{email_server.host}:{email_server.port}",
+    )
+    _pools[key] = pool
+    _pool_servers[key] = email_server
+    return pool
+
+
+def _discard_pool(pool: IMAPConnectionPool) -> None:
+    # Without a running loop the sessions belong to a loop that is gone anyway
+    with contextlib.suppress(RuntimeError):
+        _track(_discarding, pool.close(), f"IMAP pool {pool.name}: close of a replaced pool")
+
+
+async def close_connection_pools() -> None:
+    """Close every pooled session, e.g. on server shutdown."""
+    pools = list(_pools.values())
+    _pools.clear()
+    _pool_servers.clear()
+    for pool in pools:
+        await pool.close()
+    await _wait_for(_discarding)
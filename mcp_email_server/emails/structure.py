@@ -0,0 +1,282 @@
+"""Parse IMAP FETCH responses: ENVELOPE, BODYSTRUCTURE and friends.
+
+Listing metadata from ``BODY.PEEK[HEADER]`` downloads every header block,
+DKIM signatures and Received chains included, and runs the email parser on
+each. The server already knows the parts that matter: ENVELOPE (RFC 3501
+section 7.4.2) carries date, subject, addresses and Message-ID, and
+BODYSTRUCTURE describes the MIME tree, attachment names included, without
+transferring it. This module turns those parenthesized structures into
+Python values.
+"""
+
+from __future__ import annotations
+
+import re
+import urllib.parse
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.header import decode_header, make_header
+from typing import Any
+
+_FETCH_START_RE = re.compile(rb"^\d+ FETCH\b", re.IGNORECASE)
+_TOKEN_RE = re.compile(
+    rb"""\s*(?:
+        (\()
+        |(\))
+        |"((?:[^"\\]|\\.)*)"
+        |\{(\d+)\+?\}(?:\r\n)?
+        |((?:[^\s()"\[{]|\[[^\]]*\])+)
+        |(\S)
+    )""",
+    re.VERBOSE,
+)
+_OPEN = object()
+_CLOSE = object()
+
+# RFC 5322 specials that force a display name into quotes
+_NAME_SPECIALS = frozenset('()<>[]:;@\\,."')
+
+
+def _tokens(segments: list) -> Iterator[Any]:  # noqa: C901
+    """Tokenize response segments; a ``{n}`` literal takes the next bytearray segment."""
+    items = iter(segments)
+    for segment in items:
+        if isinstance(segment, bytearray):
+            # A literal whose ``{n}`` marker the client library already consumed
+            yield bytes(segment)
+            continue
+        if not isinstance(segment, bytes):
+            continue
+        pos = 0
+        while match := _TOKEN_RE.match(segment, pos):
+            pos = match.end()
+            opening, closing, quoted, size, atom, _ = match.groups()
+            if opening:
+                yield _OPEN
+            elif closing:
+                yield _CLOSE
+            elif quoted is not None:
+                yield re.sub(rb"\\(.)", rb"\1", quoted).decode("utf-8", errors="replace")
+            elif size is not None:
+                if pos < len(segment):
+                    # Literal inline in the same segment
+                    yield segment[pos : pos + int(size)]
+                    pos += int(size)
+                else:
+                    literal = next(items, b"")
+                    yield bytes(literal) if isinstance(literal, bytearray) else b""
+            elif atom is not None:
+                text = atom.decode("utf-8", errors="replace")
+                yield None if text.upper() == "NIL" else int(text) if text.isdigit() else text
+
+
+def parse_response(segments: list) -> list[Any]:
+    """Parse response segments into nested lists of str, bytes (literals), int and None."""
+    root: list[Any] = []
+    stack = [root]
+    for token in _tokens(segments):
+        if token is _OPEN:
+            stack[-1].append([])
+            stack.append(stack[-1][-1])
+        elif token is _CLOSE:
+            if len(stack) > 1:
+                stack.pop()
+        else:
+            stack[-1].append(token)
+    return root
+
+
+def parse_fetch_responses(data: list) -> Iterator[dict[str, Any]]:
+    """Yield the attributes of each FETCH response in ``data``, keyed by upper-case name."""
+
+    def message(segments: list) -> dict[str, Any]:
+        attributes = next((item for item in parse_response(segments) if isinstance(item, list)), [])
+        return {str(name).upper(): value for name, value in zip(attributes[::2], attributes[1::2], strict=False)}
+
+    segments: list | None = None
+    for item in data or []:
+        if isinstance(item, bytes) and _FETCH_START_RE.match(item):
+            if segments:
+                yield message(segments)
+            segments = [item]
+        elif segments is not None:
+            segments.append(item)
+    if segments:
+        yield message(segments)
+
+
+def _string(value: Any) -> str:
+    if value is None:
+        return ""
+    return value.decode("utf-8", errors="replace") if isinstance(value, bytes) else str(value)
+
+
+def decode_text(value: Any) -> str:
+    """Return an nstring as text, with RFC 2047 encoded words decoded."""
+    text = _string(value)
+    if "=?" not in text:
+        return text
+    try:
+        return str(make_header(decode_header(text)))
+    except Exception:
+        return text
+
+
+def _format_address(name: str, address: str) -> str:
+    if not name:
+        return address
+    if any(char in _NAME_SPECIALS for char in name):
+        name = '"' + name.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return f"{name} <{address}>"
+
+
+def format_addresses(addresses: Any) -> list[str]:
+    """Format ENVELOPE address structures as ``Name <mailbox@host>``, skipping group markers."""
+    formatted = []
+    for address in addresses if isinstance(addresses, list) else []:
+        if not isinstance(address, list) or len(address) < 4 or address[3] is None:
+            continue
+        name, _, mailbox, host = address[:4]
+        formatted.append(_format_address(decode_text(name), f"{decode_text(mailbox)}@{decode_text(host)}"))
+    return formatted
+
+
+@dataclass(frozen=True)
+class Envelope:
+    """The fields of an IMAP ENVELOPE that metadata listings use."""
+
+    date: str
+    subject: str
+    sender: list[str]
+    to: list[str]
+    cc: list[str]
+    message_id: str | None
+
+
+def parse_envelope(envelope: Any) -> Envelope | None:
+    """Decode an ENVELOPE structure, or return None if it is malformed."""
+    if not isinstance(envelope, list) or len(envelope) < 10:
+        return None
+    return Envelope(
+        date=decode_text(envelope[0]),
+        subject=decode_text(envelope[1]),
+        sender=format_addresses(envelope[2]),
+        to=format_addresses(envelope[5]),
+        cc=format_addresses(envelope[6]),
+        message_id=decode_text(envelope[9]) or None,
+    )
+
+
+def parse_internaldate(value: Any) -> datetime | None:
+    """Parse an INTERNALDATE such as ``17-Jul-1996 02:44:25 -0700``."""
+    try:
+        return datetime.strptime(decode_text(value).strip(), "%d-%b-%Y %H:%M:%S %z")
+    except ValueError:
+        return None
+
+
+def _params(value: Any) -> dict[str, str]:
+    if not isinstance(value, list):
+        return {}
+    return {_string(key).lower(): _string(item) for key, item in zip(value[::2], value[1::2], strict=False)}
+
+
+def _param(params: dict[str, str], name: str) -> str | None:
+    """Return parameter ``name``, joining RFC 2231 continuations and charsets."""
+    if (value := params.get(name)) is not None:
+        return decode_text(value)
+    pieces = sorted(
+        (int(match.group(1) or 0), bool(match.group(2)), value)
+        for key, value in params.items()
+        if (match := re.fullmatch(rf"{re.escape(name)}(?:\*(\d+))?(\*?)", key))
+    )
+    if not pieces:
+        return None
+    charset, raw = "utf-8", b""
+    for index, (_, encoded, value) in enumerate(pieces):
+        if not encoded:
+            raw += value.encode()
+            continue
+        if index == 0 and value.count("'") >= 2:
+            charset, _, value = value.split("'", 2)
+        raw += urllib.parse.unquote_to_bytes(value)
+    try:
+        return raw.decode(charset or "utf-8", errors="replace")
+    except LookupError:
+        return raw.decode("utf-8", errors="replace")
+
+
+@dataclass(frozen=True)
+class BodyPart:
+    """One non-multipart entity of a BODYSTRUCTURE, addressable as ``BODY[section]``."""
+
+    section: str
+    content_type: str
+    params: dict[str, str] = field(default_factory=dict)
+    encoding: str = "7bit"
+    size: int = 0
+    disposition: str | None = None
+    disposition_params: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def filename(self) -> str | None:
+        return _param(self.disposition_params, "filename") or _param(self.params, "name")
+
+    @property
+    def charset(self) -> str | None:
+        return self.params.get("charset")
+
+    @property
+    def is_attachment(self) -> bool:
+        return self.disposition == "attachment" and bool(self.filename)
+
+
+def _is_multipart(structure: Any) -> bool:
+    return isinstance(structure, list) and bool(structure) and isinstance(structure[0], list)
+
+
+def walk_bodystructure(structure: Any, section: str = "") -> list[BodyPart]:
+    """Flatten a BODYSTRUCTURE into its parts, numbered as RFC 3501 section 6.4.5.
+
+    A single-part message is section ``1``. Parts of an attached message/rfc822
+    are listed after the attachment itself.
+    """
+    if not isinstance(structure, list) or not structure:
+        return []
+    if _is_multipart(structure):
+        parts = []
+        for number, child in enumerate(structure, 1):
+            if not isinstance(child, list):
+                break
+            parts.extend(walk_bodystructure(child, f"{section}.{number}" if section else str(number)))
+        return parts
+
+    section = section or "1"
+    fields = structure + [None] * max(0, 7 - len(structure))
+    maintype, subtype = decode_text(fields[0]).lower(), decode_text(fields[1]).lower()
+    content_type = f"{maintype}/{subtype}"
+    nested: list[BodyPart] = []
+    extension = 7
+    if maintype == "text":
+        extension = 8
+    elif content_type == "message/rfc822" and len(fields) > 8:
+        body = fields[8]
+        nested = walk_bodystructure(body, section if _is_multipart(body) else f"{section}.1")
+        extension = 10
+    disposition = fields[extension + 1] if len(fields) > extension + 1 else None
+    part = BodyPart(
+        section=section,
+        content_type=content_type,
+        params=_params(fields[2]),
+        encoding=decode_text(fields[5]).lower() or "7bit",
+        size=fields[6] if isinstance(fields[6], int) else 0,
+        disposition=decode_text(disposition[0]).lower() if isinstance(disposition, list) and disposition else None,
+        disposition_params=_params(disposition[1]) if isinstance(disposition, list) and len(disposition) > 1 else {},
+    )
+    return [part, *nested]
+
+
+def attachment_names(structure: Any) -> list[str]:
+    """Names of the parts of a BODYSTRUCTURE that are attachments."""
+    return [part.filename for part in walk_bodystructure(structure) if part.is_attachment and part.filename]
@@ -0,0 +1,146 @@
+"""Background watchers that push mailbox changes instead of being polled.
+
+Polling ``list_emails_metadata`` for new mail costs a login and a search per
+poll. A ``MailboxWatcher`` instead keeps one dedicated session per mailbox in
+IMAP IDLE (RFC 2177), re-issued before the server's 30 minute limit, and falls
+back to a NOOP every few seconds on servers without IDLE. When the server
+reports new, expunged or changed messages, the watcher brings the metadata
+index up to date on its own session and calls ``on_change`` with the mailbox
+name, which the MCP layer turns into resource-updated notifications.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import re
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Any
+
+from mcp_email_server.config import get_settings
+from mcp_email_server.log import logger
+
+if TYPE_CHECKING:
+    from mcp_email_server.emails.classic import EmailClient, SelectedMailbox
+
+MailboxCallback = Callable[[str], Awaitable[None]]
+
+# Untagged responses that mean the selected mailbox changed
+_CHANGE_RE = re.compile(rb"^(?:\d+ (EXISTS|EXPUNGE|FETCH)\b|(VANISHED)\b)", re.IGNORECASE)
+
+_MAX_RETRY_DELAY = 300.0
+
+
+def _mailbox_changes(lines: Any) -> set[str]:
+    """Return the kinds of change (EXISTS, EXPUNGE, FETCH, VANISHED) among untagged ``lines``."""
+    changes = set()
+    for line in lines if isinstance(lines, list) else []:
+        if isinstance(line, bytes | bytearray) and (match := _CHANGE_RE.match(line)):
+            changes.add((match.group(1) or match.group(2)).decode().upper())
+    return changes
+
+
+class MailboxWatcher:
+    """Watch one mailbox of an account on a dedicated IMAP session.
+
+    Args:
+        client: The account's incoming EmailClient; used to connect and to sync its index.
+        mailbox: Mailbox to watch.
+        on_change: Awaited with the mailbox name after each change was synced.
+        idle_timeout: Seconds after which IDLE is re-issued (servers drop it after 30 minutes).
+        poll_interval: Seconds between NOOPs on servers without IDLE.
+    """
+
+    def __init__(
+        self,
+        client: EmailClient,
+        mailbox: str,
+        on_change: MailboxCallback,
+        *,
+        idle_timeout: float | None = None,
+        poll_interval: float | None = None,
+        retry_delay: float = 5.0,
+    ):
+        settings = get_settings()
+        self.client = client
+        self.mailbox = mailbox
+        self.on_change = on_change
+        self.idle_timeout = idle_timeout if idle_timeout is not None else settings.imap_idle_timeout
+        self.poll_interval = poll_interval if poll_interval is not None else settings.imap_poll_interval
+        self.retry_delay = retry_delay
+        self._task: asyncio.Task | None = None
+        self._state: tuple | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        """Stop watching; the session is logged out in the background."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        delay = self.retry_delay
+        while True:
+            try:
+                await self._watch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Watching {self.mailbox} failed, reconnecting in {delay:.0f}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _MAX_RETRY_DELAY)
+
+    async def _watch(self) -> None:
+        imap = await self.client._connect()
+        try:
+            # Changes made while (re)connecting are only visible in the SELECT state
+            try:
+                await self._sync(imap, set())
+            except Exception as e:
+                logger.error(f"Could not sync {self.mailbox} before watching it: {e}")
+                raise
+            use_idle = self.client.capabilities.idle
+            logger.info(f"Watching {self.mailbox} with {'IDLE' if use_idle else 'NOOP polling'}")
+            while True:
+                changes = await (self._idle(imap) if use_idle else self._poll(imap))
+                if changes:
+                    await self._sync(imap, changes)
+        finally:
+            with contextlib.suppress(Exception):
+                await asyncio.wait_for(imap.logout(), timeout=5)
+
+    async def _idle(self, imap: Any) -> set[str]:
+        """IDLE until the server pushes something or ``idle_timeout`` passes."""
+        idle = await imap.idle_start(timeout=self.idle_timeout)
+        try:
+            lines = await imap.wait_server_push(timeout=self.idle_timeout)
+        except asyncio.TimeoutError:
+            lines = []
+        finally:
+            if imap.has_pending_idle():
+                imap.idle_done()
+            await asyncio.wait_for(idle, timeout=30)
+        return _mailbox_changes(lines)
+
+    async def _poll(self, imap: Any) -> set[str]:
+        await asyncio.sleep(self.poll_interval)
+        response = await imap.noop()
+        return _mailbox_changes(getattr(response, "lines", None))
+
+    async def _sync(self, imap: Any, changes: set[str]) -> None:
+        """Sync the index from the re-selected mailbox; report a change if its state moved."""
+        state: SelectedMailbox = await self.client.refresh_index(imap, self.mailbox, refresh_flags="FETCH" in changes)
+        previous, self._state = self._state, (state.uidvalidity, state.uidnext, state.exists, state.highestmodseq)
+        if previous is None or (previous == self._state and not changes):
+            return
+        try:
+            await self.on_change(self.mailbox)
+        except Exception as e:
+            logger.warning(f"Change callback for {self.mailbox} failed: {e}")
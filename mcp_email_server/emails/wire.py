@@ -0,0 +1,146 @@
+"""Bytes-on-wire accounting and COMPRESS=DEFLATE (RFC 4978) for IMAP sessions.
+
+Every session's transport is wrapped so the bytes it writes and receives are
+counted per account, both as IMAP protocol bytes and as bytes on the wire.
+Once a session has negotiated COMPRESS=DEFLATE the same wrapper compresses
+outgoing and inflates incoming data, so the two counters show the saving.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import zlib
+from dataclasses import dataclass, replace
+from typing import Any
+
+import aioimaplib
+
+from mcp_email_server.log import logger
+
+
+@dataclass
+class WireStats:
+    """Byte counters for one account's IMAP sessions.
+
+    ``bytes_*`` are what went over the socket (after compression);
+    ``payload_bytes_*`` are the IMAP protocol bytes before compression.
+    """
+
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    payload_bytes_sent: int = 0
+    payload_bytes_received: int = 0
+
+    @property
+    def bytes_on_wire(self) -> int:
+        return self.bytes_sent + self.bytes_received
+
+    @property
+    def payload_bytes(self) -> int:
+        return self.payload_bytes_sent + self.payload_bytes_received
+
+    @property
+    def compression_ratio(self) -> float:
+        """Payload bytes per byte on the wire; 1.0 without compression."""
+        if self.bytes_on_wire == 0:
+            return 1.0
+        return self.payload_bytes / self.bytes_on_wire
+
+    def snapshot(self) -> WireStats:
+        return replace(self)
+
+    def since(self, earlier: WireStats) -> WireStats:
+        """Counters accumulated after ``earlier`` was taken."""
+        return WireStats(
+            bytes_sent=self.bytes_sent - earlier.bytes_sent,
+            bytes_received=self.bytes_received - earlier.bytes_received,
+            payload_bytes_sent=self.payload_bytes_sent - earlier.payload_bytes_sent,
+            payload_bytes_received=self.payload_bytes_received - earlier.payload_bytes_received,
+        )
+
+
+_wire_stats: dict[str, WireStats] = {}
+
+
+def get_wire_stats(key: str) -> WireStats:
+    """Return the counters for the server identified by ``key`` (see ``server_key``)."""
+    stats = _wire_stats.get(key)
+    if stats is None:
+        stats = _wire_stats[key] = WireStats()
+    return stats
+
+
+class _WireTransport:
+    """Transport proxy that counts, and optionally deflates, what the protocol writes."""
+
+    def __init__(self, transport: Any, stats: WireStats):
+        self._transport = transport
+        self._stats = stats
+        self._compressor: Any = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._transport, name)
+
+    def write(self, data: bytes) -> None:
+        self._stats.payload_bytes_sent += len(data)
+        if self._compressor is not None:
+            data = self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        self._stats.bytes_sent += len(data)
+        self._transport.write(data)
+
+
+class WireTap:
+    """Counts one session's traffic and applies DEFLATE once it is negotiated."""
+
+    def __init__(self, protocol: Any, stats: WireStats):
+        self._protocol = protocol
+        self._stats = stats
+        self._decompressor: Any = None
+        self._data_received = protocol.data_received
+        self._transport = _WireTransport(protocol.transport, stats)
+        protocol.transport = self._transport
+        protocol.data_received = self.data_received
+
+    @property
+    def compressed(self) -> bool:
+        return self._decompressor is not None
+
+    def data_received(self, data: bytes) -> None:
+        self._stats.bytes_received += len(data)
+        if self._decompressor is not None:
+            data = self._decompressor.decompress(data)
+        self._stats.payload_bytes_received += len(data)
+        if data:
+            self._data_received(data)
+
+    def start_deflate(self) -> None:
+        """Switch both directions to raw DEFLATE (no zlib header, RFC 4978 section 4)."""
+        self._transport._compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        self._decompressor = zlib.decompressobj(-15)
+
+
+def attach_wire_tap(imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, stats: WireStats) -> WireTap | None:
+    """Start counting a connected session's traffic into ``stats``.
+
+    Returns None if the session has no transport to wrap.
+    """
+    protocol = getattr(imap, "protocol", None)
+    if not isinstance(getattr(protocol, "transport", None), asyncio.BaseTransport):
+        return None
+    return WireTap(protocol, stats)
+
+
+async def enable_deflate(imap: aioimaplib.IMAP4 | aioimaplib.IMAP4_SSL, tap: WireTap) -> str:
+    """Send COMPRESS DEFLATE and switch ``tap`` to compression if the server agrees.
+
+    Returns the server's status (``"OK"``, ``"NO"`` or ``"BAD"``). Raises
+    TimeoutError if the server does not answer within the session's timeout;
+    the session's stream state is unknown then, so it must not be used.
+    """
+    command = aioimaplib.Command("COMPRESS", imap.protocol.new_tag(), "DEFLATE")
+    response = await asyncio.wait_for(imap.protocol.execute(command), imap.timeout)
+    status = str(response.result).upper()
+    if status == "OK":
+        tap.start_deflate()
+        logger.debug("IMAP session switched to COMPRESS=DEFLATE")
+    return status
@@ -15,12 +15,18 @@ from unittest.mock import AsyncMock
 
 import pytest
 
-from mcp_email_server.config import EmailServer, EmailSettings, ProviderSettings, delete_settings
+from mcp_email_server.config import EmailServer, EmailSettings, ProviderSettings, delete_settings, get_settings
+from mcp_email_server.emails import capabilities, index
 
 
 @pytest.fixture(autouse=True)
 def patch_env(monkeypatch: pytest.MonkeyPatch, tmp_path: pytest.TempPathFactory):
     delete_settings()
+    # Keep per-server state (e.g. capability profiles) out of the shared database
+    db_location = get_settings().db_location
+    db_path = (tmp_path / "db.sqlite3").as_posix()
+    monkeypatch.setitem(capabilities._stores, db_location, capabilities.CapabilityStore(db_path))
+    monkeypatch.setitem(index._indexes, db_location, index.MetadataIndex(db_path))
     yield
 
 
@@ -0,0 +1,234 @@
+"""Tests for per-server capability profiles."""
+
+import asyncio
+import sqlite3
+from contextlib import closing
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from mcp_email_server.config import EmailServer
+from mcp_email_server.emails.capabilities import (
+    FETCH_FORMATS,
+    CapabilityStore,
+    ServerProfile,
+    get_capability_store,
+    server_key,
+)
+from mcp_email_server.emails.classic import EmailClient
+
+
+@pytest.fixture
+def email_server():
+    return EmailServer(
+        user_name="caps_user",
+        password="caps_password",
+        host="imap.caps.example.com",
+        port=993,
+        use_ssl=True,
+    )
+
+
+@pytest.fixture
+def email_client(email_server):
+    return EmailClient(email_server)
+
+
+def _make_imap(capabilities):
+    imap = AsyncMock()
+    imap._client_task = asyncio.Future()
+    imap._client_task.set_result(None)
+    imap.protocol = MagicMock()
+    imap.timeout = 10
+    imap.protocol.capabilities = capabilities
+    imap.id = AsyncMock(return_value=MagicMock(result="OK"))
+    imap.uid_search = AsyncMock(return_value=("OK", [b"1 2 3"]))
+    imap.select = AsyncMock(return_value=("OK", [b"3 EXISTS"]))
+    imap.examine = AsyncMock(return_value=("OK", [b"3 EXISTS"]))
+    return imap
+
+
+class TestServerProfile:
+    def test_unknown_until_reported(self):
+        profile = ServerProfile(key="k")
+        assert profile.supports("MOVE") is None
+        assert profile.move is False
+
+    def test_supports_advertised(self):
+        profile = ServerProfile(key="k", capabilities=frozenset({"IMAP4REV1", "MOVE", "COMPRESS=DEFLATE"}))
+        assert profile.supports("move") is True
+        assert profile.compress_deflate is True
+        assert profile.supports("SORT") is False
+
+    def test_unsupported_overrides_advertised(self):
+        profile = ServerProfile(key="k", capabilities=frozenset({"MOVE"}), unsupported=frozenset({"MOVE"}))
+        assert profile.supports("MOVE") is False
+
+    def test_gmail_extensions(self):
+        assert ServerProfile(key="k", capabilities=frozenset({"IMAP4REV1", "X-GM-EXT-1"})).gmail is True
+        assert ServerProfile(key="k", capabilities=frozenset({"IMAP4REV1"})).gmail is False
+        assert ServerProfile(key="k").gmail is False
+
+    def test_fetch_formats_prefers_known_format(self):
+        assert ServerProfile(key="k").fetch_formats() == list(FETCH_FORMATS)
+        formats = ServerProfile(key="k", fetch_format="BODY.PEEK[]").fetch_formats()
+        assert formats[0] == "BODY.PEEK[]"
+        assert sorted(formats) == sorted(FETCH_FORMATS)
+
+
+class TestCapabilityStore:
+    def test_persists_across_instances(self, tmp_path):
+        db_path = tmp_path / "db.sqlite3"
+        store = CapabilityStore(db_path)
+        store.record_capabilities("k", ["IMAP4rev1", "Move", "IDLE"])
+        store.mark_unsupported("k", "sort")
+        store.record_fetch_format("k", "BODY[]")
+
+        assert store.get("k").unsupported == frozenset({"SORT"})
+        profile = CapabilityStore(db_path).get("k")
+        assert profile.capabilities == frozenset({"IMAP4REV1", "MOVE", "IDLE"})
+        assert profile.fetch_format == "BODY[]"
+        # A failed extension is only skipped until the process restarts
+        assert profile.unsupported == frozenset()
+        assert profile.sort is False
+
+    def test_sent_folder_persists(self, tmp_path):
+        CapabilityStore(tmp_path / "caps.db").record_sent_folder("k", "Gesendete Objekte")
+        assert CapabilityStore(tmp_path / "caps.db").get("k").sent_folder == "Gesendete Objekte"
+
+        CapabilityStore(tmp_path / "caps.db").record_sent_folder("k", None)
+        assert CapabilityStore(tmp_path / "caps.db").get("k").sent_folder is None
+
+    def test_adds_sent_folder_to_existing_database(self, tmp_path):
+        with closing(sqlite3.connect(tmp_path / "caps.db")) as conn, conn:
+            conn.execute(
+                "CREATE TABLE server_capabilities (server_key TEXT PRIMARY KEY, capabilities TEXT,"
+                " unsupported TEXT NOT NULL DEFAULT '', fetch_format TEXT, updated_at REAL NOT NULL)"
+            )
+            conn.execute("INSERT INTO server_capabilities VALUES ('k', 'IMAP4REV1', '', NULL, 1.0)")
+
+        store = CapabilityStore(tmp_path / "caps.db")
+        assert store.get("k").capabilities == frozenset({"IMAP4REV1"})
+        store.record_sent_folder("k", "Sent")
+        assert CapabilityStore(tmp_path / "caps.db").get("k").sent_folder == "Sent"
+
+    def test_in_memory_store(self):
+        store = CapabilityStore(None)
+        store.record_capabilities("k", ["SORT"])
+        assert store.get("k").sort is True
+
+    def test_unchanged_profile_is_not_rewritten(self, tmp_path):
+        store = CapabilityStore(tmp_path / "db.sqlite3")
+        first = store.record_capabilities("k", ["SORT"])
+        second = store.record_capabilities("k", ["SORT"])
+        assert second is first
+
+    def test_store_follows_db_location(self, tmp_path):
+        assert get_capability_store().db_path == tmp_path / "db.sqlite3"
+
+
+class TestEmailClientCapabilities:
+    @pytest.mark.asyncio
+    async def test_records_capabilities_after_login(self, email_client, email_server):
+        imap = _make_imap({"IMAP4rev1", "UIDPLUS", "CONDSTORE"})
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            await email_client.get_email_count()
+
+        profile = get_capability_store().get(server_key(email_server))
+        assert profile.uidplus is True
+        assert profile.condstore is True
+        assert profile.qresync is False
+
+    @pytest.mark.asyncio
+    async def test_move_not_retried_after_failure(self, email_client):
+        imap = _make_imap({"IMAP4rev1", "MOVE"})
+        imap.uid = AsyncMock(
+            side_effect=[
+                ("BAD", [b"Unknown command MOVE"]),  # MOVE for 1
+                ("OK", []),  # COPY 1
+                ("OK", []),  # STORE 1
+                ("OK", []),  # COPY 3
+                ("OK", []),  # STORE 3
+            ]
+        )
+
+        # One UID set per command (1 and 3 do not collapse into a range), so the second shows whether MOVE is retried
+        with (
+            patch.object(email_client, "imap_class", return_value=imap),
+            patch("mcp_email_server.emails.classic._MAX_UID_SET_LENGTH", 1),
+        ):
+            moved_ids, failed_ids = await email_client.move_emails(["1", "3"], "Archive")
+
+        assert moved_ids == ["1", "3"]
+        assert failed_ids == []
+        commands = [call.args[:2] for call in imap.uid.call_args_list]
+        assert commands == [("move", "1"), ("copy", "1"), ("store", "1"), ("copy", "3"), ("store", "3")]
+        assert email_client.capabilities.supports("MOVE") is False
+
+    @pytest.mark.asyncio
+    async def test_move_kept_after_transient_error(self, email_client):
+        imap = _make_imap({"IMAP4rev1", "MOVE"})
+        imap.uid = AsyncMock(side_effect=[asyncio.TimeoutError(), ("OK", []), ("OK", [])])
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            moved_ids, _ = await email_client.move_emails(["1"], "Archive")
+
+        assert moved_ids == ["1"]
+        assert [call.args[0] for call in imap.uid.call_args_list] == ["move", "copy", "store"]
+        assert email_client.capabilities.supports("MOVE") is True
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        ("sort_result", "disabled"),
+        [(MagicMock(result="NO", lines=[b"SORT failed"]), True), (asyncio.TimeoutError(), False)],
+    )
+    async def test_sort_disabled_only_when_rejected(self, email_client, sort_result, disabled):
+        imap = _make_imap({"IMAP4rev1", "SORT"})
+        imap.protocol.execute = AsyncMock(side_effect=[sort_result])
+        imap.uid = AsyncMock(return_value=("OK", []))
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            _, total = await email_client.get_emails_metadata_page()
+
+        assert total == 3
+        imap.uid_search.assert_called_once()
+        assert email_client.capabilities.supports("SORT") is not disabled
+
+    @pytest.mark.asyncio
+    async def test_sort_kept_when_plain_search_rejects_criteria_too(self, email_client):
+        imap = _make_imap({"IMAP4rev1", "SORT"})
+        imap.protocol.execute = AsyncMock(return_value=MagicMock(result="BAD", lines=[b"Invalid criteria"]))
+        imap.uid_search = AsyncMock(return_value=("BAD", [b"Invalid criteria"]))
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            assert await email_client.get_emails_metadata_page(subject="x") == ([], 0)
+
+        assert email_client.capabilities.supports("SORT") is True
+
+    @pytest.mark.asyncio
+    async def test_move_skipped_when_not_advertised(self, email_client):
+        imap = _make_imap({"IMAP4rev1"})
+        imap.uid = AsyncMock(return_value=("OK", []))
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            moved_ids, _ = await email_client.move_emails(["1"], "Archive")
+
+        assert moved_ids == ["1"]
+        assert [call.args[0] for call in imap.uid.call_args_list] == ["copy", "store"]
+
+    @pytest.mark.asyncio
+    async def test_fetch_format_is_remembered(self, email_client):
+        raw = b"Subject: Hi\r\nFrom: a@example.com\r\n\r\n" + b"x" * 200
+        content = [b"1 FETCH (UID 1 BODY[] {250}", bytearray(raw), b")"]
+        imap = _make_imap({"IMAP4rev1"})
+        # A server without BODYSTRUCTURE is only asked for it once
+        imap.uid = AsyncMock(side_effect=[("BAD", []), ("NO", []), ("OK", content), ("OK", content)])
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            await email_client.get_email_body_by_id("1")
+            await email_client.get_email_body_by_id("1")
+
+        formats = [call.args[2] for call in imap.uid.call_args_list]
+        assert formats == ["(UID RFC822.SIZE BODYSTRUCTURE)", "RFC822", "BODY[]", "BODY[]"]
+        assert email_client.capabilities.fetch_format == "BODY[]"
@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -14,6 +14,11 @@ from mcp_email_server.emails.models import (
 )
 
 
+async def _async_iter(items):
+    for item in items:
+        yield item
+
+
 @pytest.fixture
 def email_settings():
     return EmailSettings(
@@ -70,15 +75,14 @@ class TestClassicEmailHandler:
             "attachments": [],
         }
 
-        # Mock the get_emails_stream method to yield our test data
-        mock_stream = AsyncMock()
-        mock_stream.__aiter__.return_value = [email_data]
+        # Mock the page fetch to return our test data and the total
+        mock_page = AsyncMock(return_value=([email_data], 1))
 
-        # Mock the get_email_count method
+        # get_email_count must not be needed for the total
         mock_count = AsyncMock(return_value=1)
 
         # Apply the mocks
-        with patch.object(classic_handler.incoming_client, "get_emails_metadata_stream", return_value=mock_stream):
+        with patch.object(classic_handler.incoming_client, "get_emails_metadata_page", mock_page):
             with patch.object(classic_handler.incoming_client, "get_email_count", mock_count):
                 # Call the method
                 result = await classic_handler.get_emails_metadata(
@@ -107,20 +111,10 @@ class TestClassicEmailHandler:
                 assert result.total == 1
 
                 # Verify the client methods were called correctly
-                classic_handler.incoming_client.get_emails_metadata_stream.assert_called_once_with(
-                    1, 10, now, None, "Test", "sender@example.com", None, "desc", "INBOX", None, None, None
-                )
-                mock_count.assert_called_once_with(
-                    now,
-                    None,
-                    "Test",
-                    from_address="sender@example.com",
-                    to_address=None,
-                    mailbox="INBOX",
-                    seen=None,
-                    flagged=None,
-                    answered=None,
+                mock_page.assert_called_once_with(
+                    1, 10, now, None, "Test", "sender@example.com", None, "desc", "INBOX", None, None, None, None
                 )
+                mock_count.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_get_emails_with_mailbox(self, classic_handler):
@@ -135,11 +129,10 @@ class TestClassicEmailHandler:
             "attachments": [],
         }
 
-        mock_stream = AsyncMock()
-        mock_stream.__aiter__.return_value = [email_data]
+        mock_page = AsyncMock(return_value=([email_data], 1))
         mock_count = AsyncMock(return_value=1)
 
-        with patch.object(classic_handler.incoming_client, "get_emails_metadata_stream", return_value=mock_stream):
+        with patch.object(classic_handler.incoming_client, "get_emails_metadata_page", mock_page):
             with patch.object(classic_handler.incoming_client, "get_email_count", mock_count):
                 result = await classic_handler.get_emails_metadata(
                     page=1,
@@ -151,20 +144,10 @@ class TestClassicEmailHandler:
                 assert len(result.emails) == 1
 
                 # Verify mailbox parameter was passed correctly
-                classic_handler.incoming_client.get_emails_metadata_stream.assert_called_once_with(
-                    1, 10, None, None, None, None, None, "desc", "Sent", None, None, None
-                )
-                mock_count.assert_called_once_with(
-                    None,
-                    None,
-                    None,
-                    from_address=None,
-                    to_address=None,
-                    mailbox="Sent",
-                    seen=None,
-                    flagged=None,
-                    answered=None,
+                mock_page.assert_called_once_with(
+                    1, 10, None, None, None, None, None, "desc", "Sent", None, None, None, None
                 )
+                mock_count.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_send_email(self, classic_handler):
@@ -379,10 +362,10 @@ class TestClassicEmailHandler:
             "attachments": [],
         }
 
-        # Mock the get_email_body_by_id method to return our test data
-        mock_get_body = AsyncMock(return_value=email_data)
+        # Mock the batched body fetch to yield our test data
+        mock_get_bodies = MagicMock(side_effect=lambda *args: _async_iter([("123", email_data)]))
 
-        with patch.object(classic_handler.incoming_client, "get_email_body_by_id", mock_get_body):
+        with patch.object(classic_handler.incoming_client, "get_email_bodies", mock_get_bodies):
             result = await classic_handler.get_emails_content(
                 email_ids=["123"],
                 mailbox="INBOX",
@@ -398,16 +381,16 @@ class TestClassicEmailHandler:
             assert result.emails[0].sender == "sender@example.com"
             assert result.emails[0].body == "Test email body"
 
-            # Verify the client method was called correctly
-            mock_get_body.assert_called_once_with("123", "INBOX")
+            # Verify all IDs were fetched in one call
+            mock_get_bodies.assert_called_once_with(["123"], "INBOX")
 
     @pytest.mark.asyncio
     async def test_get_emails_content_returns_none(self, classic_handler):
         """Test get_emails_content handles None response (covers 1107-1108)."""
-        # Mock the get_email_body_by_id method to return None
-        mock_get_body = AsyncMock(return_value=None)
+        # Mock the batched body fetch to report the email as failed
+        mock_get_bodies = MagicMock(side_effect=lambda *args: _async_iter([("123", None)]))
 
-        with patch.object(classic_handler.incoming_client, "get_email_body_by_id", mock_get_body):
+        with patch.object(classic_handler.incoming_client, "get_email_bodies", mock_get_bodies):
             result = await classic_handler.get_emails_content(
                 email_ids=["123"],
                 mailbox="INBOX",
@@ -423,10 +406,10 @@ class TestClassicEmailHandler:
     @pytest.mark.asyncio
     async def test_get_emails_content_exception(self, classic_handler):
         """Test get_emails_content handles exception (covers 1109-1111)."""
-        # Mock the get_email_body_by_id method to raise an exception
-        mock_get_body = AsyncMock(side_effect=Exception("Connection error"))
+        # Mock the batched body fetch to raise an exception
+        mock_get_bodies = MagicMock(side_effect=Exception("Connection error"))
 
-        with patch.object(classic_handler.incoming_client, "get_email_body_by_id", mock_get_body):
+        with patch.object(classic_handler.incoming_client, "get_email_bodies", mock_get_bodies):
             result = await classic_handler.get_emails_content(
                 email_ids=["123", "456"],
                 mailbox="INBOX",
@@ -438,3 +421,59 @@ class TestClassicEmailHandler:
             assert result.requested_count == 2
             assert result.retrieved_count == 0
             assert result.failed_ids == ["123", "456"]
+
+    @pytest.mark.asyncio
+    async def test_get_emails_content_keeps_request_order(self, classic_handler):
+        """Test get_emails_content reports results in request order, whatever order they arrive in."""
+        now = datetime.now(timezone.utc)
+
+        def email_data(email_id):
+            return {
+                "email_id": email_id,
+                "subject": f"Subject {email_id}",
+                "from": "sender@example.com",
+                "to": ["recipient@example.com"],
+                "date": now,
+                "body": "Body",
+                "attachments": [],
+            }
+
+        results = [("3", email_data("3")), ("2", None), ("1", email_data("1"))]
+        mock_get_bodies = MagicMock(side_effect=lambda *args: _async_iter(results))
+
+        with patch.object(classic_handler.incoming_client, "get_email_bodies", mock_get_bodies):
+            result = await classic_handler.get_emails_content(email_ids=["1", "2", "3"], mailbox="INBOX")
+
+        assert [email.email_id for email in result.emails] == ["1", "3"]
+        assert result.failed_ids == ["2"]
+
+    @pytest.mark.asyncio
+    async def test_get_emails_content_pages_long_bodies(self, classic_handler):
+        """Test get_emails_content returns one page of each body and where the next one starts."""
+        now = datetime.now(timezone.utc)
+        long_email = {
+            "email_id": "1",
+            "subject": "Long",
+            "from": "sender@example.com",
+            "to": [],
+            "date": now,
+            "body": "0123456789",
+            "attachments": [],
+        }
+        short_email = {**long_email, "email_id": "2", "body": "abc"}
+        mock_get_bodies = MagicMock(side_effect=lambda *args: _async_iter([("1", long_email), ("2", short_email)]))
+
+        with patch.object(classic_handler.incoming_client, "get_email_bodies", mock_get_bodies):
+            first = await classic_handler.get_emails_content(["1", "2"], body_length=4)
+            last = await classic_handler.get_emails_content(["1"], body_offset=8, body_length=4)
+
+        assert [(email.body, email.next_offset) for email in first.emails] == [("0123", 4), ("abc", None)]
+        assert first.emails[0].body_total_length == 10
+        assert (last.emails[0].body, last.emails[0].body_offset, last.emails[0].next_offset) == ("89", 8, None)
+
+    @pytest.mark.asyncio
+    async def test_get_emails_content_rejects_bad_page(self, classic_handler):
+        with pytest.raises(ValueError, match="body_offset"):
+            await classic_handler.get_emails_content(["1"], body_offset=-1)
+        with pytest.raises(ValueError, match="body_length"):
+            await classic_handler.get_emails_content(["1"], body_length=0)
@@ -0,0 +1,250 @@
+"""Tests for the pooled IMAP connection manager."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from mcp_email_server.config import EmailServer
+from mcp_email_server.emails.classic import ClassicEmailHandler, EmailClient
+from mcp_email_server.emails.pool import IMAPConnectionPool, get_connection_pool
+
+
+def _make_imap():
+    imap = AsyncMock()
+    imap._client_task = asyncio.Future()
+    imap._client_task.set_result(None)
+    imap.protocol = MagicMock()
+    imap.protocol.state = "SELECTED"
+    imap.noop = AsyncMock(return_value=MagicMock(result="OK"))
+    imap.uid_search = AsyncMock(return_value=(None, [b"1 2 3"]))
+    imap.select = AsyncMock(return_value=("OK", [b"3 EXISTS"]))
+    imap.examine = AsyncMock(return_value=("OK", [b"3 EXISTS"]))
+    return imap
+
+
+@pytest.fixture
+def email_server():
+    return EmailServer(
+        user_name="pool_user",
+        password="pool_password",
+        host="imap.pool.example.com",
+        port=993,
+        use_ssl=True,
+    )
+
+
+class TestIMAPConnectionPool:
+    @pytest.mark.asyncio
+    async def test_reuses_idle_session(self):
+        imap = _make_imap()
+        connect = AsyncMock(return_value=imap)
+        pool = IMAPConnectionPool(connect, max_size=2)
+
+        async with pool.acquire() as first:
+            assert first is imap
+        async with pool.acquire() as second:
+            assert second is imap
+
+        connect.assert_called_once()
+        assert pool.idle_count == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_acquire_opens_separate_sessions(self):
+        imaps = [_make_imap(), _make_imap()]
+        connect = AsyncMock(side_effect=imaps)
+        pool = IMAPConnectionPool(connect, max_size=2)
+
+        async with pool.acquire() as first, pool.acquire() as second:
+            assert first is not second
+            assert pool.size == 2
+
+        assert pool.idle_count == 2
+
+    @pytest.mark.asyncio
+    async def test_max_size_blocks_extra_callers(self):
+        connect = AsyncMock(side_effect=lambda: _make_imap())
+        pool = IMAPConnectionPool(connect, max_size=1)
+        entered = asyncio.Event()
+
+        async def hold():
+            async with pool.acquire():
+                entered.set()
+                await asyncio.sleep(0.05)
+
+        holder = asyncio.create_task(hold())
+        await entered.wait()
+        waiter = asyncio.create_task(pool.acquire().__aenter__())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        await holder
+        await asyncio.wait_for(waiter, timeout=1)
+        assert connect.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_connection_error_evicts_session(self):
+        broken = _make_imap()
+        fresh = _make_imap()
+        connect = AsyncMock(side_effect=[broken, fresh])
+        pool = IMAPConnectionPool(connect, max_size=2)
+
+        with pytest.raises(OSError):
+            async with pool.acquire():
+                raise OSError("connection reset")
+
+        broken.logout.assert_called_once()
+        assert pool.idle_count == 0
+
+        async with pool.acquire() as imap:
+            assert imap is fresh
+
+    @pytest.mark.asyncio
+    async def test_application_error_keeps_session(self):
+        imap = _make_imap()
+        pool = IMAPConnectionPool(AsyncMock(return_value=imap), max_size=1)
+
+        with pytest.raises(ValueError):
+            async with pool.acquire():
+                raise ValueError("attachment not found")
+
+        imap.logout.assert_not_called()
+        assert pool.idle_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_health_check_replaces_session(self):
+        stale = _make_imap()
+        stale.noop = AsyncMock(side_effect=OSError("broken pipe"))
+        fresh = _make_imap()
+        connect = AsyncMock(side_effect=[stale, fresh])
+        pool = IMAPConnectionPool(connect, max_size=1, health_check_interval=0)
+
+        async with pool.acquire():
+            pass
+        async with pool.acquire() as imap:
+            assert imap is fresh
+
+        stale.noop.assert_called_once()
+        assert connect.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_idle_timeout_prunes_surplus_sessions(self):
+        imaps = [_make_imap(), _make_imap()]
+        pool = IMAPConnectionPool(AsyncMock(side_effect=imaps), max_size=2, idle_timeout=0.01)
+
+        async with pool.acquire():
+            pass
+        await asyncio.sleep(0.02)
+        async with pool.acquire() as imap:
+            assert imap is imaps[1]
+        await asyncio.sleep(0)
+
+        imaps[0].logout.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_close_waits_for_pruned_logouts(self):
+        imaps = [_make_imap(), _make_imap()]
+        logged_out = asyncio.Event()
+
+        async def slow_logout():
+            await asyncio.sleep(0.01)
+            logged_out.set()
+
+        imaps[0].logout = AsyncMock(side_effect=slow_logout)
+        pool = IMAPConnectionPool(AsyncMock(side_effect=imaps), max_size=2, idle_timeout=0.01)
+
+        async with pool.acquire():
+            pass
+        await asyncio.sleep(0.02)
+        async with pool.acquire():
+            pass
+        await pool.close()
+
+        assert logged_out.is_set()
+        assert not pool._closing
+
+    @pytest.mark.asyncio
+    async def test_failed_pruned_logout_is_logged(self):
+        imaps = [_make_imap(), _make_imap()]
+        # _close() already swallows Exception; anything else reaches the done callback
+        imaps[0].logout = AsyncMock(side_effect=GeneratorExit())
+        pool = IMAPConnectionPool(AsyncMock(side_effect=imaps), max_size=2, idle_timeout=0.01)
+
+        async with pool.acquire():
+            pass
+        await asyncio.sleep(0.02)
+        with patch("mcp_email_server.emails.pool.logger") as logger:
+            async with pool.acquire():
+                pass
+            await pool.close()
+
+        assert not pool._closing
+        logger.warning.assert_called_once()
+        assert "logout of a pruned session failed" in logger.warning.call_args.args[0]
+
+    @pytest.mark.asyncio
+    async def test_min_size_survives_idle_timeout(self):
+        imap = _make_imap()
+        connect = AsyncMock(return_value=imap)
+        pool = IMAPConnectionPool(connect, min_size=1, max_size=2, idle_timeout=0.01, health_check_interval=60)
+
+        await pool.warm()
+        await asyncio.sleep(0.02)
+        async with pool.acquire() as reused:
+            assert reused is imap
+
+        connect.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_close_logs_out_idle_sessions(self):
+        imap = _make_imap()
+        pool = IMAPConnectionPool(AsyncMock(return_value=imap), max_size=1)
+        async with pool.acquire():
+            pass
+
+        await pool.close()
+
+        imap.logout.assert_called_once()
+        assert pool.idle_count == 0
+
+    def test_invalid_max_size(self):
+        with pytest.raises(ValueError):
+            IMAPConnectionPool(AsyncMock(), max_size=0)
+
+
+class TestGetConnectionPool:
+    def test_same_server_shares_pool(self, email_server):
+        first = get_connection_pool(email_server, AsyncMock())
+        second = get_connection_pool(email_server.model_copy(), AsyncMock())
+        assert first is second
+
+    def test_changed_credentials_replace_pool(self, email_server):
+        first = get_connection_pool(email_server, AsyncMock())
+        second = get_connection_pool(email_server.model_copy(update={"password": "rotated"}), AsyncMock())
+        assert first is not second
+
+    def test_disabled_by_settings(self, email_server):
+        mock_settings = MagicMock(imap_pool_max_size=0)
+        with patch("mcp_email_server.emails.pool.get_settings", return_value=mock_settings):
+            assert get_connection_pool(email_server, AsyncMock()) is None
+
+
+class TestEmailClientWithPool:
+    @pytest.mark.asyncio
+    async def test_consecutive_calls_share_one_login(self, email_server):
+        imap = _make_imap()
+        client = EmailClient(email_server)
+        client.pool = IMAPConnectionPool(client._connect, max_size=1)
+
+        with patch.object(client, "imap_class", return_value=imap):
+            assert await client.get_email_count() == 3
+            assert await client.get_email_count() == 3
+
+        imap.login.assert_called_once()
+        imap.logout.assert_not_called()
+        # The second call reuses the session's EXAMINEd INBOX
+        imap.examine.assert_called_once_with('"INBOX"')
+
+    def test_handler_incoming_client_is_pooled(self, email_settings):
+        handler = ClassicEmailHandler(email_settings)
+        assert handler.incoming_client.pool is not None
+        assert handler.outgoing_client.pool is None
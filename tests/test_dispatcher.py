@@ -4,7 +4,7 @@ import pytest
 
 from mcp_email_server.config import EmailServer, EmailSettings, ProviderSettings
 from mcp_email_server.emails.classic import ClassicEmailHandler
-from mcp_email_server.emails.dispatcher import dispatch_handler
+from mcp_email_server.emails.dispatcher import clear_handler_cache, dispatch_handler
 
 
 class TestDispatcher:
@@ -85,3 +85,55 @@ class TestDispatcher:
             # Verify get_account was called correctly
             mock_settings.get_account.assert_called_once_with("nonexistent_account")
             mock_settings.get_accounts.assert_called_once()
+
+
+class TestDispatcherHandlerCache:
+    @pytest.fixture(autouse=True)
+    def _clear_cache(self):
+        clear_handler_cache()
+        yield
+        clear_handler_cache()
+
+    def test_handler_reused_across_calls(self, email_settings):
+        mock_settings = MagicMock()
+        mock_settings.get_account.return_value = email_settings
+
+        with patch("mcp_email_server.emails.dispatcher.get_settings", return_value=mock_settings):
+            first = dispatch_handler("test_account")
+            second = dispatch_handler("test_account")
+
+        assert first is second
+
+    def test_handler_rebuilt_when_settings_change(self, email_settings):
+        mock_settings = MagicMock()
+        mock_settings.get_account.return_value = email_settings
+
+        with patch("mcp_email_server.emails.dispatcher.get_settings", return_value=mock_settings):
+            first = dispatch_handler("test_account")
+            mock_settings.get_account.return_value = email_settings.model_copy(update={"full_name": "Renamed User"})
+            second = dispatch_handler("test_account")
+
+        assert first is not second
+        assert second.email_settings.full_name == "Renamed User"
+
+    def test_in_place_mutation_invalidates_handler(self, email_settings):
+        mock_settings = MagicMock()
+        mock_settings.get_account.return_value = email_settings
+
+        with patch("mcp_email_server.emails.dispatcher.get_settings", return_value=mock_settings):
+            first = dispatch_handler("test_account")
+            email_settings.incoming.password = "rotated"  # noqa: S105
+            second = dispatch_handler("test_account")
+
+        assert first is not second
+
+    def test_clear_handler_cache(self, email_settings):
+        mock_settings = MagicMock()
+        mock_settings.get_account.return_value = email_settings
+
+        with patch("mcp_email_server.emails.dispatcher.get_settings", return_value=mock_settings):
+            first = dispatch_handler("test_account")
+            clear_handler_cache("test_account")
+            second = dispatch_handler("test_account")
+
+        assert first is not second
@@ -1,13 +1,31 @@
 import asyncio
+import base64
 import email
+import quopri
 from datetime import datetime, timezone
 from email.mime.text import MIMEText
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import aioimaplib
 import pytest
 
-from mcp_email_server.config import EmailServer
-from mcp_email_server.emails.classic import EmailClient, _has_sort_capability
+from mcp_email_server.config import EmailServer, get_settings
+from mcp_email_server.emails.capabilities import get_capability_store
+from mcp_email_server.emails.classic import (
+    EmailClient,
+    SelectedMailbox,
+    _BodyCache,
+    _copied_uids,
+    _execute,
+    _expand_sequence_set,
+    _forget_selected_mailbox,
+    _has_sort_capability,
+    _parse_esearch_response,
+    _parse_select_response,
+    _TransferDecoder,
+    _uid_set_chunks,
+)
+from mcp_email_server.emails.executor import shutdown_parse_executor
 
 
 @pytest.fixture
@@ -115,29 +133,29 @@ class TestEmailClient:
 
         # Test with subject
         criteria = EmailClient._build_search_criteria(subject="Test")
-        assert criteria == ["SUBJECT", "Test"]
+        assert criteria == ["SUBJECT", '"Test"']
 
         # Test with body
         criteria = EmailClient._build_search_criteria(body="Test")
-        assert criteria == ["BODY", "Test"]
+        assert criteria == ["BODY", '"Test"']
 
         # Test with text
         criteria = EmailClient._build_search_criteria(text="Test")
-        assert criteria == ["TEXT", "Test"]
+        assert criteria == ["TEXT", '"Test"']
 
         # Test with from_address
         criteria = EmailClient._build_search_criteria(from_address="test@example.com")
-        assert criteria == ["FROM", "test@example.com"]
+        assert criteria == ["FROM", '"test@example.com"']
 
         # Test with to_address
         criteria = EmailClient._build_search_criteria(to_address="test@example.com")
-        assert criteria == ["TO", "test@example.com"]
+        assert criteria == ["TO", '"test@example.com"']
 
         # Test with multiple criteria
         criteria = EmailClient._build_search_criteria(
             subject="Test", from_address="test@example.com", since=datetime(2023, 1, 1, tzinfo=timezone.utc)
         )
-        assert criteria == ["SINCE", "01-JAN-2023", "SUBJECT", "Test", "FROM", "test@example.com"]
+        assert criteria == ["SINCE", "01-JAN-2023", "SUBJECT", '"Test"', "FROM", '"test@example.com"']
 
         # Test with seen=True (read emails)
         criteria = EmailClient._build_search_criteria(seen=True)
@@ -171,7 +189,7 @@ class TestEmailClient:
         criteria = EmailClient._build_search_criteria(seen=False, from_address="sender@example.com")
         assert "UNSEEN" in criteria
         assert "FROM" in criteria
-        assert "sender@example.com" in criteria
+        assert '"sender@example.com"' in criteria
 
         # Test compound criteria: flagged and answered
         criteria = EmailClient._build_search_criteria(flagged=True, answered=True)
@@ -185,9 +203,9 @@ class TestEmailClient:
         assert "UNSEEN" in criteria
         assert "FLAGGED" in criteria
         assert "FROM" in criteria
-        assert "test@example.com" in criteria
+        assert '"test@example.com"' in criteria
         assert "SUBJECT" in criteria
-        assert "Important" in criteria
+        assert '"Important"' in criteria
 
     @pytest.mark.asyncio
     async def test_get_emails_stream(self, email_client):
@@ -261,7 +279,7 @@ class TestEmailClient:
             mock_imap.login.assert_called_once_with(
                 email_client.email_server.user_name, email_client.email_server.password
             )
-            mock_imap.select.assert_called_once_with('"INBOX"')
+            mock_imap.examine.assert_called_once_with('"INBOX"')
             mock_imap.uid_search.assert_called_once_with("ALL")
             # Batch fetch: 2 calls (dates + headers) instead of 3 individual calls
             assert mock_imap.uid.call_count == 2
@@ -291,7 +309,7 @@ class TestEmailClient:
             mock_imap.login.assert_called_once_with(
                 email_client.email_server.user_name, email_client.email_server.password
             )
-            mock_imap.select.assert_called_once_with('"INBOX"')
+            mock_imap.examine.assert_called_once_with('"INBOX"')
             mock_imap.uid_search.assert_called_once_with("ALL")
             mock_imap.logout.assert_called_once()
 
@@ -363,6 +381,12 @@ Test body content
         result = email_client._parse_email_data(raw_email, email_id="1")
         assert result["message_id"] is None
 
+    def test_parse_email_keeps_whole_body(self, email_client):
+        """Long bodies are returned whole; get_emails_content pages them."""
+        raw_email = b"Subject: Long\r\n\r\n" + b"x" * 50000
+        result = email_client._parse_email_data(raw_email, email_id="1")
+        assert result["body"] == "x" * 50000
+
 
 class TestSendEmailReplyHeaders:
     @pytest.mark.asyncio
@@ -563,6 +587,24 @@ class TestBatchFetchHeaders:
         assert result[1]["email_id"] == "2"
         assert result[1]["subject"] == "Test 2"
 
+    @pytest.mark.asyncio
+    async def test_large_header_batches_parsed_off_the_event_loop(self, email_client, monkeypatch):
+        """Header blocks of a big FETCH response are parsed in the parse pool as one job."""
+        monkeypatch.setattr(get_settings(), "parse_offload_min_size", 0)
+        header = b"From: sender@example.com\r\nSubject: Pooled\r\nDate: Mon, 1 Jan 2024 00:00:00 +0000\r\n\r\n"
+        mock_imap = AsyncMock()
+        mock_imap.uid = AsyncMock(
+            return_value=("OK", [b"1 FETCH (UID 1 FLAGS (\\Seen) RFC822.SIZE 42 BODY[HEADER] {80}", bytearray(header)])
+        )
+        loop = asyncio.get_running_loop()
+
+        with patch.object(loop, "run_in_executor", wraps=loop.run_in_executor) as run_in_executor:
+            result = await email_client._batch_fetch_headers(mock_imap, ["1"])
+
+        shutdown_parse_executor()
+        run_in_executor.assert_called_once()
+        assert (result[0]["subject"], result[0]["flags"], result[0]["size"]) == ("Pooled", ["\\Seen"], 42)
+
     @pytest.mark.asyncio
     async def test_batch_fetch_headers_empty_list(self, email_client):
         """Test batch fetch with empty email list."""
@@ -579,6 +621,64 @@ class TestBatchFetchHeaders:
         result = await email_client._batch_fetch_headers(mock_imap, ["1", "2"])
         assert result == []
 
+    @pytest.mark.asyncio
+    async def test_batch_fetch_envelopes(self, email_server):
+        """With envelope_metadata, ENVELOPE and BODYSTRUCTURE replace header blocks."""
+        client = EmailClient(email_server.model_copy(update={"envelope_metadata": True}))
+        mock_imap = AsyncMock()
+        envelope_response = [
+            b'1 FETCH (UID 1 FLAGS (\\Seen) RFC822.SIZE 2048 INTERNALDATE "01-Jan-2024 00:00:00 +0000" ENVELOPE '
+            b'("Mon, 1 Jan 2024 00:00:00 +0000" {6}',
+            bytearray(b"Test 1"),
+            b' (("Sender" NIL "sender" "example.com")) NIL NIL ((NIL NIL "recipient" "example.com")) '
+            b'((NIL NIL "cc" "example.com")) NIL NIL "<1@example.com>") BODYSTRUCTURE (("TEXT" "PLAIN" '
+            b'("CHARSET" "utf-8") NIL NIL "7BIT" 10 1 NIL NIL NIL NIL)("APPLICATION" "PDF" ("NAME" "report.pdf") '
+            b'NIL NIL "BASE64" 100 NIL ("ATTACHMENT" ("FILENAME" "report.pdf")) NIL NIL) "MIXED" NIL NIL NIL NIL))',
+            b'2 FETCH (UID 2 FLAGS () RFC822.SIZE 512 INTERNALDATE "02-Jan-2024 08:00:00 +0100" ENVELOPE '
+            b'(NIL "Test 2" NIL NIL NIL NIL NIL NIL NIL NIL) BODYSTRUCTURE ("TEXT" "PLAIN" NIL NIL NIL "7BIT" 5 1))',
+            b"FETCH completed",
+        ]
+        mock_imap.uid = AsyncMock(return_value=("OK", envelope_response))
+
+        result = await client._batch_fetch_headers(mock_imap, ["1", "2"])
+
+        mock_imap.uid.assert_called_once_with(
+            "fetch", "1:2", "(UID FLAGS RFC822.SIZE INTERNALDATE ENVELOPE BODYSTRUCTURE)"
+        )
+        assert result[0] == {
+            "email_id": "1",
+            "message_id": "<1@example.com>",
+            "subject": "Test 1",
+            "from": "Sender <sender@example.com>",
+            "to": ["recipient@example.com", "cc@example.com"],
+            "cc": ["cc@example.com"],
+            "date": datetime(2024, 1, 1, tzinfo=timezone.utc),
+            "attachments": ["report.pdf"],
+            "flags": ["\\Seen"],
+            "size": 2048,
+            "internaldate": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        }
+        assert result[1]["subject"] == "Test 2"
+        assert result[1]["date"] == datetime(2024, 1, 2, 7, tzinfo=timezone.utc)
+        assert result[1]["attachments"] == []
+
+    @pytest.mark.asyncio
+    async def test_batch_fetch_envelopes_falls_back_to_headers(self, email_server):
+        """A server that rejects the ENVELOPE fetch is asked for headers, now and later."""
+        client = EmailClient(email_server.model_copy(update={"envelope_metadata": True}))
+        mock_imap = AsyncMock()
+        header_response = [
+            b"1 FETCH (UID 1 BODY[HEADER] {30}",
+            bytearray(b"Subject: Test 1\r\nFrom: a@b.c\r\n\r\n"),
+        ]
+        mock_imap.uid = AsyncMock(side_effect=[("BAD", [b"Unknown fetch item"]), ("OK", header_response)])
+
+        result = await client._batch_fetch_headers(mock_imap, ["1"])
+
+        assert [email["subject"] for email in result] == ["Test 1"]
+        assert mock_imap.uid.call_args.args[2] == "(UID FLAGS RFC822.SIZE INTERNALDATE BODY.PEEK[HEADER])"
+        assert client._use_envelope is False
+
 
 class TestParseHeaderToMetadata:
     """Tests for header parsing helper."""
@@ -630,9 +730,10 @@ class TestGetEmailsStreamWithSort:
         mock_protocol = MagicMock()
         mock_protocol.capabilities = {"SORT", "IMAP4rev1"}
         mock_imap.protocol = mock_protocol
+        mock_imap.timeout = 10
 
-        # Mock SORT response (already sorted by date desc)
-        sort_response = [b"3 2 1"]  # UIDs in sorted order
+        # Mock SORT response (already sorted by date desc), sent raw as UID SORT
+        mock_protocol.execute = AsyncMock(return_value=MagicMock(result="OK", lines=[b"3 2 1", b"SORT completed"]))
 
         # Mock header fetch for the page
         header_response = [
@@ -650,13 +751,7 @@ class TestGetEmailsStreamWithSort:
             ),
         ]
 
-        def uid_side_effect(cmd, *args):
-            if cmd == "sort":
-                return (None, sort_response)
-            else:  # fetch
-                return (None, header_response)
-
-        mock_imap.uid = AsyncMock(side_effect=uid_side_effect)
+        mock_imap.uid = AsyncMock(return_value=(None, header_response))
 
         with patch.object(email_client, "imap_class", return_value=mock_imap):
             emails = []
@@ -670,8 +765,9 @@ class TestGetEmailsStreamWithSort:
             assert emails[2]["email_id"] == "1"
 
             # Verify SORT was called
-            calls = mock_imap.uid.call_args_list
-            assert calls[0][0][0] == "sort"
+            command = mock_protocol.execute.call_args.args[0]
+            assert command.name == "UID"
+            assert command.args[:3] == ("SORT", "(REVERSE DATE)", "UTF-8")
 
     @pytest.mark.asyncio
     async def test_get_emails_stream_sort_fallback_on_error(self, email_client):
@@ -710,11 +806,11 @@ class TestGetEmailsStreamWithSort:
             ),
         ]
 
+        mock_protocol.execute = AsyncMock(side_effect=RuntimeError("SORT not supported"))
+
         def uid_side_effect(cmd, *args):
             call_count[0] += 1
-            if cmd == "sort":
-                raise RuntimeError("SORT not supported")
-            elif "HEADER.FIELDS" in args[-1] if args else False:
+            if "HEADER.FIELDS" in args[-1] if args else False:
                 return (None, date_response)
             else:
                 return (None, header_response)
@@ -869,6 +965,46 @@ class TestGetEmailsStreamWithSort:
             assert emails[0]["email_id"] == "3"
             assert emails[1]["email_id"] == "2"
 
+    @pytest.mark.asyncio
+    async def test_get_emails_metadata_page_returns_total(self, email_client):
+        """Test the page and the total come from one session and one search."""
+        mock_imap = AsyncMock()
+        mock_imap._client_task = asyncio.Future()
+        mock_imap._client_task.set_result(None)
+        mock_imap.uid_search = AsyncMock(return_value=(None, [b"1 2 3 4 5"]))
+
+        mock_protocol = MagicMock()
+        mock_protocol.capabilities = set()
+        mock_imap.protocol = mock_protocol
+
+        date_response = [
+            b"4 FETCH (UID 4 BODY[HEADER.FIELDS (DATE)] {30}",
+            bytearray(b"Date: Thu, 4 Jan 2024 00:00:00 +0000\r\n"),
+            b"5 FETCH (UID 5 BODY[HEADER.FIELDS (DATE)] {30}",
+            bytearray(b"Date: Fri, 5 Jan 2024 00:00:00 +0000\r\n"),
+        ]
+        header_response = [
+            b"5 FETCH (UID 5 BODY[HEADER] {100}",
+            bytearray(
+                b"From: sender@example.com\r\nTo: recipient@example.com\r\nSubject: Test 5\r\nDate: Fri, 5 Jan 2024 00:00:00 +0000\r\n\r\n"
+            ),
+        ]
+
+        def uid_side_effect(cmd, uid_list, fetch_type):
+            if "HEADER.FIELDS" in fetch_type:
+                return (None, date_response)
+            return (None, header_response)
+
+        mock_imap.uid = AsyncMock(side_effect=uid_side_effect)
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            emails, total = await email_client.get_emails_metadata_page(page=1, page_size=1)
+
+        assert [e["email_id"] for e in emails] == ["5"]
+        assert total == 5
+        mock_imap.login.assert_called_once()
+        mock_imap.uid_search.assert_called_once_with("ALL")
+
     @pytest.mark.asyncio
     async def test_get_emails_stream_date_fetch_fallback(self, email_client):
         """Test fallback to full header fetch when date fetch fails."""
@@ -962,7 +1098,11 @@ class TestDeleteEmails:
 
         mock_imap.uid = AsyncMock(side_effect=uid_side_effect)
 
-        with patch.object(email_client, "imap_class", return_value=mock_imap):
+        # Force one UID per command so the two emails get separate results
+        with (
+            patch.object(email_client, "imap_class", return_value=mock_imap),
+            patch("mcp_email_server.emails.classic._MAX_UID_SET_LENGTH", 3),
+        ):
             deleted_ids, failed_ids = await email_client.delete_emails(["123", "456"])
             assert deleted_ids == ["123"]
             assert failed_ids == ["456"]
@@ -1010,11 +1150,10 @@ class TestMarkEmails:
 
             assert marked_ids == ["123", "456"]
             assert failed_ids == []
-            # Verify +FLAGS was used for marking as read
+            # Verify +FLAGS was used for marking as read, in one command
             calls = mock_imap.uid.call_args_list
-            assert len(calls) == 2
-            assert calls[0][0] == ("store", "123", "+FLAGS", r"(\Seen)")
-            assert calls[1][0] == ("store", "456", "+FLAGS", r"(\Seen)")
+            assert len(calls) == 1
+            assert calls[0][0] == ("store", "123,456", "+FLAGS", r"(\Seen)")
 
     @pytest.mark.asyncio
     async def test_mark_emails_as_unread_success(self, email_client):
@@ -1037,11 +1176,10 @@ class TestMarkEmails:
 
             assert marked_ids == ["123", "456"]
             assert failed_ids == []
-            # Verify -FLAGS was used for marking as unread
+            # Verify -FLAGS was used for marking as unread, in one command
             calls = mock_imap.uid.call_args_list
-            assert len(calls) == 2
-            assert calls[0][0] == ("store", "123", "-FLAGS", r"(\Seen)")
-            assert calls[1][0] == ("store", "456", "-FLAGS", r"(\Seen)")
+            assert len(calls) == 1
+            assert calls[0][0] == ("store", "123,456", "-FLAGS", r"(\Seen)")
 
     @pytest.mark.asyncio
     async def test_mark_emails_partial_failure(self, email_client):
@@ -1056,7 +1194,11 @@ class TestMarkEmails:
         mock_imap.uid = AsyncMock(side_effect=[None, Exception("Email not found")])
         mock_imap.logout = AsyncMock()
 
-        with patch.object(email_client, "imap_class", return_value=mock_imap):
+        # Force one UID per command so the two emails get separate results
+        with (
+            patch.object(email_client, "imap_class", return_value=mock_imap),
+            patch("mcp_email_server.emails.classic._MAX_UID_SET_LENGTH", 3),
+        ):
             marked_ids, failed_ids = await email_client.mark_emails(
                 email_ids=["123", "456"],
                 mark_as="read",
@@ -1129,3 +1271,567 @@ class TestMarkEmails:
             )
             assert marked_ids == ["123"]
             assert failed_ids == []
+
+
+class TestSelectedMailboxTracking:
+    """Tests for per-session selected mailbox tracking."""
+
+    @pytest.fixture
+    def mock_imap(self):
+        mock_imap = AsyncMock()
+        select_lines = [
+            b"172 EXISTS",
+            b"1 RECENT",
+            b"OK [UIDVALIDITY 3857529045] UIDs valid",
+            b"OK [UIDNEXT 4392] Predicted next UID",
+            b"[READ-WRITE] SELECT completed",
+        ]
+        mock_imap.select = AsyncMock(return_value=("OK", select_lines))
+        mock_imap.examine = AsyncMock(return_value=("OK", [*select_lines[:4], b"[READ-ONLY] EXAMINE completed"]))
+        return mock_imap
+
+    def test_parse_select_response(self):
+        state = _parse_select_response(
+            "INBOX",
+            False,
+            [b"172 EXISTS", b"OK [UIDVALIDITY 3857529045] UIDs valid", b"OK [UIDNEXT 4392] Predicted next UID"],
+        )
+        assert state == SelectedMailbox(name="INBOX", readonly=False, uidvalidity=3857529045, exists=172, uidnext=4392)
+
+    @pytest.mark.asyncio
+    async def test_select_skipped_when_already_selected(self, email_client, mock_imap):
+        first = await email_client._select_mailbox(mock_imap, "INBOX")
+        second = await email_client._select_mailbox(mock_imap, "INBOX")
+
+        assert first is second
+        assert first.uidvalidity == 3857529045
+        assert first.exists == 172
+        mock_imap.select.assert_called_once_with('"INBOX"')
+
+    @pytest.mark.asyncio
+    async def test_readonly_uses_examine(self, email_client, mock_imap):
+        state = await email_client._select_mailbox(mock_imap, "INBOX", readonly=True)
+
+        assert state.readonly is True
+        mock_imap.examine.assert_called_once_with('"INBOX"')
+        mock_imap.select.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_read_write_selection_serves_readonly_callers(self, email_client, mock_imap):
+        await email_client._select_mailbox(mock_imap, "INBOX")
+        await email_client._select_mailbox(mock_imap, "INBOX", readonly=True)
+
+        mock_imap.select.assert_called_once()
+        mock_imap.examine.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_examined_mailbox_is_selected_for_writes(self, email_client, mock_imap):
+        await email_client._select_mailbox(mock_imap, "INBOX", readonly=True)
+        state = await email_client._select_mailbox(mock_imap, "INBOX")
+
+        assert state.readonly is False
+        mock_imap.examine.assert_called_once()
+        mock_imap.select.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_switching_mailbox_selects_again(self, email_client, mock_imap):
+        await email_client._select_mailbox(mock_imap, "INBOX")
+        await email_client._select_mailbox(mock_imap, "Archive")
+
+        assert mock_imap.select.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_select_clears_state(self, email_client, mock_imap):
+        await email_client._select_mailbox(mock_imap, "INBOX")
+        mock_imap.select = AsyncMock(return_value=("NO", [b"Mailbox does not exist"]))
+
+        assert await email_client._select_mailbox(mock_imap, "Missing") is None
+        # INBOX is no longer selected on the server, so the next call must SELECT again
+        mock_imap.select = AsyncMock(return_value=("OK", []))
+        await email_client._select_mailbox(mock_imap, "INBOX")
+        mock_imap.select.assert_called_once_with('"INBOX"')
+
+    @pytest.mark.asyncio
+    async def test_forget_selected_mailbox(self, email_client, mock_imap):
+        await email_client._select_mailbox(mock_imap, "Archive")
+        _forget_selected_mailbox("Archive")
+        await email_client._select_mailbox(mock_imap, "Archive")
+
+        assert mock_imap.select.call_count == 2
+
+
+_WINDOW_HEADERS = [
+    b"7 FETCH (UID 7 BODY[HEADER] {100}",
+    bytearray(b"From: a@example.com\r\nSubject: Seven\r\nDate: Sun, 7 Jan 2024 00:00:00 +0000\r\n\r\n"),
+    b"5 FETCH (UID 5 BODY[HEADER] {100}",
+    bytearray(b"From: a@example.com\r\nSubject: Five\r\nDate: Fri, 5 Jan 2024 00:00:00 +0000\r\n\r\n"),
+]
+
+
+class TestWindowedSearch:
+    """Tests for ESORT/ESEARCH PARTIAL pagination (RFC 4731/5267)."""
+
+    def _make_imap(self, capabilities, execute_lines, execute_result="OK"):
+        mock_imap = AsyncMock()
+        mock_imap._client_task = asyncio.Future()
+        mock_imap._client_task.set_result(None)
+        mock_imap.protocol = MagicMock()
+        mock_imap.timeout = 10
+        mock_imap.protocol.capabilities = capabilities
+        mock_imap.id = AsyncMock(return_value=MagicMock(result="OK"))
+        mock_imap.protocol.execute = AsyncMock(return_value=MagicMock(result=execute_result, lines=execute_lines))
+        mock_imap.uid = AsyncMock(return_value=("OK", _WINDOW_HEADERS))
+        return mock_imap
+
+    def test_expand_sequence_set(self):
+        assert _expand_sequence_set("5,3:1,9") == ["5", "3", "2", "1", "9"]
+        assert _expand_sequence_set("10:12") == ["10", "11", "12"]
+
+    def test_parse_esearch_response(self):
+        lines = [b'ESEARCH (TAG "A1") UID PARTIAL (1:3 7,5:4) COUNT 400000', b"SORT completed"]
+        assert _parse_esearch_response(lines) == (["7", "5", "4"], 400000)
+
+    def test_parse_esearch_response_empty_window(self):
+        lines = [b'ESEARCH (TAG "A1") UID PARTIAL (11:20 NIL) COUNT 3']
+        assert _parse_esearch_response(lines) == ([], 3)
+
+    def test_parse_esearch_response_without_name(self):
+        # aioimaplib strips the untagged response name it was asked to collect
+        lines = [b'(TAG "A1") UID COUNT 5 ALL 1:5', b"SEARCH completed"]
+        assert _parse_esearch_response(lines) == (["1", "2", "3", "4", "5"], 5)
+        assert _parse_esearch_response([b"SEARCH completed"]) == ([], None)
+
+    @pytest.mark.asyncio
+    async def test_esort_partial_requests_only_the_page(self, email_client):
+        mock_imap = self._make_imap(
+            {"IMAP4rev1", "SORT", "ESORT", "CONTEXT=SORT"},
+            [b'ESEARCH (TAG "A1") UID PARTIAL (1:2 7,5) COUNT 400000'],
+        )
+
+        with (
+            patch.object(email_client, "imap_class", return_value=mock_imap),
+            patch("mcp_email_server.emails.classic.aioimaplib.Command") as mock_command,
+        ):
+            emails, total = await email_client.get_emails_metadata_page(page=1, page_size=2)
+
+        assert [e["email_id"] for e in emails] == ["7", "5"]
+        assert total == 400000
+        args = mock_command.call_args[0]
+        assert args[0] == "UID"
+        assert args[2:] == ("SORT", "RETURN", "(PARTIAL 1:2 COUNT)", "(REVERSE DATE)", "UTF-8", "ALL")
+        mock_imap.uid_search.assert_not_called()
+        # Only the header fetch goes through uid(); no plain SORT
+        assert [call.args[0] for call in mock_imap.uid.call_args_list] == ["fetch"]
+
+    @pytest.mark.asyncio
+    async def test_esearch_partial_desc_with_count_first(self, email_client):
+        mock_imap = self._make_imap({"IMAP4rev1", "ESEARCH", "CONTEXT=SEARCH"}, [])
+        mock_imap.protocol.execute = AsyncMock(
+            side_effect=[
+                MagicMock(result="OK", lines=[b'ESEARCH (TAG "A1") UID COUNT 7']),
+                MagicMock(result="OK", lines=[b'ESEARCH (TAG "A2") UID PARTIAL (6:7 5,7) COUNT 7']),
+            ]
+        )
+
+        with (
+            patch.object(email_client, "imap_class", return_value=mock_imap),
+            patch("mcp_email_server.emails.classic.aioimaplib.Command") as mock_command,
+        ):
+            emails, total = await email_client.get_emails_metadata_page(page=1, page_size=2)
+
+        assert [e["email_id"] for e in emails] == ["7", "5"]
+        assert total == 7
+        assert mock_command.call_args_list[1][0][4] == "(PARTIAL 6:7 COUNT)"
+        mock_imap.uid_search.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_rejected_esort_falls_back_to_sort(self, email_client):
+        mock_imap = self._make_imap({"IMAP4rev1", "SORT", "ESORT", "CONTEXT=SORT"}, [])
+        mock_imap.protocol.execute = AsyncMock(
+            side_effect=lambda command: (
+                MagicMock(result="BAD", lines=[b"Unknown RETURN option"])
+                if "RETURN" in command.args
+                else MagicMock(result="OK", lines=[b"7 5 1", b"SORT completed"])
+            )
+        )
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            emails, total = await email_client.get_emails_metadata_page(page=1, page_size=2)
+
+        assert [e["email_id"] for e in emails] == ["7", "5"]
+        assert total == 3
+        assert email_client.capabilities.supports("CONTEXT=SORT") is False
+
+    @pytest.mark.asyncio
+    async def test_esort_timeout_keeps_extension(self, email_client):
+        mock_imap = self._make_imap({"IMAP4rev1", "SORT", "ESORT", "CONTEXT=SORT"}, [])
+        mock_imap.timeout = 0.05
+
+        async def execute(command):
+            if "RETURN" in command.args:
+                await asyncio.Event().wait()  # never answered
+            return MagicMock(result="OK", lines=[b"7 5 1", b"SORT completed"])
+
+        mock_imap.protocol.execute = AsyncMock(side_effect=execute)
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            _, total = await email_client.get_emails_metadata_page(page=1, page_size=2)
+
+        assert total == 3
+        assert email_client.capabilities.supports("CONTEXT=SORT") is True
+
+    @pytest.mark.asyncio
+    async def test_unanswered_raw_command_stops_being_pending(self):
+        imap = MagicMock()
+        imap.timeout = 0.05
+        command = aioimaplib.Command("ENABLE", "A1", "QRESYNC")
+
+        async def execute(command):
+            imap.protocol.pending_sync_command = command
+            await asyncio.Event().wait()  # never answered
+
+        imap.protocol.execute = execute
+
+        with pytest.raises(asyncio.TimeoutError):
+            await _execute(imap, command)
+        assert imap.protocol.pending_sync_command is None
+
+
+class TestBatchedUidCommands:
+    """Tests for compressed UID sets in STORE/COPY/MOVE."""
+
+    def _make_imap(self):
+        mock_imap = AsyncMock()
+        mock_imap._client_task = asyncio.Future()
+        mock_imap._client_task.set_result(None)
+        mock_imap.protocol = MagicMock()
+        mock_imap.protocol.capabilities = {"IMAP4rev1", "MOVE", "UIDPLUS"}
+        return mock_imap
+
+    def test_uid_set_chunks_compresses_ranges(self):
+        email_ids = [str(uid) for uid in [*range(1, 41), 52, *range(60, 91)]]
+        chunks = _uid_set_chunks(email_ids)
+
+        assert len(chunks) == 1
+        assert chunks[0][0] == "1:40,52,60:90"
+        assert len(chunks[0][1]) == 72
+
+    def test_uid_set_chunks_respects_length_limit(self):
+        email_ids = [str(uid) for uid in range(1000, 1100, 2)]
+        with patch("mcp_email_server.emails.classic._MAX_UID_SET_LENGTH", 50):
+            chunks = _uid_set_chunks(email_ids)
+
+        assert len(chunks) > 1
+        assert all(len(uid_set) <= 50 for uid_set, _ in chunks)
+        assert [uid for _, uids in chunks for uid in uids] == email_ids
+
+    def test_uid_set_chunks_skips_invalid_ids(self):
+        assert _uid_set_chunks(["5", "abc", "4"]) == [("4:5", ["4", "5"])]
+
+    def test_copied_uids_from_copyuid(self):
+        response = ("OK", [b"OK [COPYUID 1234 10:11 200:201] Moved", b"1 EXPUNGE"])
+        assert _copied_uids(response, ["10", "11", "12"]) == ["10", "11"]
+        assert _copied_uids(("OK", [b"COPY completed"]), ["10", "12"]) == ["10", "12"]
+
+    @pytest.mark.asyncio
+    async def test_move_sends_one_command_and_reads_copyuid(self, email_client):
+        mock_imap = self._make_imap()
+        mock_imap.uid = AsyncMock(return_value=("OK", [b"OK [COPYUID 1234 10:11 200:201]", b"1 EXPUNGE"]))
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            moved_ids, failed_ids = await email_client.move_emails(["12", "10", "11"], "Archive")
+
+        mock_imap.uid.assert_called_once_with("move", "10:12", '"Archive"')
+        assert moved_ids == ["10", "11"]
+        assert failed_ids == ["12"]
+
+    @pytest.mark.asyncio
+    async def test_delete_sends_one_store(self, email_client):
+        mock_imap = self._make_imap()
+        mock_imap.uid = AsyncMock(return_value=("OK", []))
+        email_ids = [str(uid) for uid in range(1, 5001)]
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            deleted_ids, failed_ids = await email_client.delete_emails(email_ids)
+
+        mock_imap.uid.assert_called_once_with("store", "1:5000", "+FLAGS", r"(\Deleted)")
+        assert deleted_ids == email_ids
+        assert failed_ids == []
+
+    @pytest.mark.asyncio
+    async def test_rejected_store_fails_whole_set(self, email_client):
+        mock_imap = self._make_imap()
+        mock_imap.uid = AsyncMock(return_value=("NO", [b"Mailbox is read-only"]))
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            marked_ids, failed_ids = await email_client.mark_emails(["1", "2"], "read")
+
+        assert marked_ids == []
+        assert failed_ids == ["1", "2"]
+
+
+class TestBatchedBodyFetch:
+    """Tests for fetching many email bodies with one UID FETCH."""
+
+    @staticmethod
+    def _raw_email(uid):
+        return (
+            f"From: sender@example.com\r\nTo: recipient@example.com\r\nSubject: Email {uid}\r\n"
+            f"Date: Mon, 1 Jan 2024 00:00:00 +0000\r\n\r\nBody {uid}\r\n"
+        ).encode()
+
+    def _make_imap(self):
+        mock_imap = AsyncMock()
+        mock_imap._client_task = asyncio.Future()
+        mock_imap._client_task.set_result(None)
+        mock_imap.protocol = MagicMock()
+        mock_imap.examine = AsyncMock(return_value=("OK", [b"3 EXISTS"]))
+        return mock_imap
+
+    @pytest.mark.asyncio
+    async def test_one_fetch_for_all_ids(self, email_client):
+        mock_imap = self._make_imap()
+        mock_imap.uid = AsyncMock(
+            return_value=(
+                "OK",
+                [
+                    b"1 FETCH (UID 2 RFC822 {100}",
+                    bytearray(self._raw_email(2)),
+                    b")",
+                    b"2 FETCH (RFC822 {100}",
+                    bytearray(self._raw_email(1)),
+                    b" UID 1)",
+                ],
+            )
+        )
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            results = [item async for item in email_client.get_email_bodies(["1", "2"])]
+
+        mock_imap.uid.assert_called_once_with("fetch", "1:2", "RFC822")
+        assert [email_id for email_id, _ in results] == ["2", "1"]
+        assert results[0][1]["subject"] == "Email 2"
+        assert results[1][1]["body"].strip() == "Body 1"
+
+    @pytest.mark.asyncio
+    async def test_reports_missing_and_invalid_ids(self, email_client):
+        mock_imap = self._make_imap()
+        mock_imap.uid = AsyncMock(return_value=("OK", [b"1 FETCH (UID 5 RFC822 {100}", bytearray(self._raw_email(5))]))
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            results = dict([item async for item in email_client.get_email_bodies(["5", "7", "bogus"])])
+
+        mock_imap.uid.assert_called_once_with("fetch", "5,7", "RFC822")
+        assert results["5"]["subject"] == "Email 5"
+        assert results["7"] is None
+        assert results["bogus"] is None
+
+    @pytest.mark.asyncio
+    async def test_recently_read_emails_are_not_refetched(self, email_client):
+        mock_imap = self._make_imap()
+        mock_imap.examine = AsyncMock(return_value=("OK", [b"OK [UIDVALIDITY 9] UIDs valid", b"3 EXISTS"]))
+        mock_imap.uid = AsyncMock(return_value=("OK", [b"1 FETCH (UID 5 RFC822 {100}", bytearray(self._raw_email(5))]))
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            first = dict([item async for item in email_client.get_email_bodies(["5"])])
+            second = dict([item async for item in email_client.get_email_bodies(["5"])])
+            # Another mailbox is another email
+            [item async for item in email_client.get_email_bodies(["5"], "Archive")]
+
+        assert second["5"] == first["5"]
+        assert [call.args[1] for call in mock_imap.uid.call_args_list] == ["5", "5"]
+
+    def test_body_cache_evicts_least_recently_used(self):
+        cache = _BodyCache(max_chars=10)
+        cache.put("INBOX", 1, {"email_id": "1", "body": "aaaa"})
+        cache.put("INBOX", 1, {"email_id": "2", "body": "bbbb"})
+        assert cache.get("INBOX", 1, "1") is not None
+        cache.put("INBOX", 1, {"email_id": "3", "body": "cccc"})
+
+        assert cache.get("INBOX", 1, "2") is None
+        assert cache.get("INBOX", 1, "1")["body"] == "aaaa"
+        assert cache.get("INBOX", 2, "1") is None
+        cache.put("INBOX", None, {"email_id": "4", "body": "d"})
+        assert cache.get("INBOX", None, "4") is None
+
+
+class TestPartialFetch:
+    """Tests for reading emails and attachments by BODYSTRUCTURE section."""
+
+    STRUCTURE = (
+        "OK",
+        [
+            b'1 FETCH (UID 7 RFC822.SIZE 31457280 BODYSTRUCTURE ((("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "BASE64" '
+            b'16 1 NIL NIL NIL NIL)("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "7BIT" 40 1 NIL NIL NIL NIL) '
+            b'"ALTERNATIVE" NIL NIL NIL NIL)("APPLICATION" "PDF" NIL NIL NIL "BASE64" 31457000 NIL '
+            b'("ATTACHMENT" ("FILENAME" "big.pdf")) NIL NIL) "MIXED" NIL NIL NIL NIL))',
+            b"FETCH completed",
+        ],
+    )
+    HEADER = b"From: sender@example.com\r\nTo: recipient@example.com\r\nSubject: Big one\r\n\r\n"
+
+    def _make_imap(self, *responses):
+        mock_imap = AsyncMock()
+        mock_imap._client_task = asyncio.Future()
+        mock_imap._client_task.set_result(None)
+        mock_imap.protocol = MagicMock()
+        mock_imap.examine = AsyncMock(return_value=("OK", [b"[UIDVALIDITY 1] UIDs valid", b"8 EXISTS"]))
+        mock_imap.select = AsyncMock(return_value=("OK", [b"[UIDVALIDITY 1] UIDs valid", b"8 EXISTS"]))
+        mock_imap.uid = AsyncMock(side_effect=list(responses))
+        return mock_imap
+
+    def _sections(self, *items):
+        data = [b"1 FETCH (UID 7"]
+        for name, content in items:
+            data[-1] += b" %s {%d}" % (name, len(content))
+            data.extend([bytearray(content), b""])
+        data[-1] += b")"
+        return "OK", [*data, b"FETCH completed"]
+
+    @pytest.mark.asyncio
+    async def test_body_reads_only_header_and_text(self, email_client):
+        mock_imap = self._make_imap(
+            self.STRUCTURE, self._sections((b"BODY[HEADER]", self.HEADER), (b"BODY[1.1]", b"SGVsbG8gd29ybGQ="))
+        )
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            result = await email_client.get_email_body_by_id("7")
+
+        assert [call.args[2] for call in mock_imap.uid.call_args_list] == [
+            "(UID RFC822.SIZE BODYSTRUCTURE)",
+            "(UID BODY.PEEK[HEADER] BODY.PEEK[1.1])",
+        ]
+        assert result["subject"] == "Big one"
+        assert result["body"] == "Hello world"
+        assert result["attachments"] == ["big.pdf"]
+
+    @pytest.mark.asyncio
+    async def test_attachment_uses_binary(self, email_client, tmp_path):
+        get_capability_store().record_capabilities(email_client._server_key, ["IMAP4rev1", "BINARY"])
+        mock_imap = self._make_imap(self.STRUCTURE, self._sections((b"BINARY[2]<0>", b"%PDF-1.4")))
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            result = await email_client.download_attachment("7", "big.pdf", str(tmp_path / "big.pdf"))
+
+        assert mock_imap.uid.call_args.args[2] == "(UID BINARY.PEEK[2]<0.1048576>)"
+        assert (tmp_path / "big.pdf").read_bytes() == b"%PDF-1.4"
+        assert result["mime_type"] == "application/pdf"
+        assert result["size"] == 8
+
+    @pytest.mark.asyncio
+    async def test_attachment_decoded_locally_when_binary_fails(self, email_client, tmp_path):
+        get_capability_store().record_capabilities(email_client._server_key, ["IMAP4rev1", "BINARY"])
+        mock_imap = self._make_imap(
+            self.STRUCTURE,
+            ("NO", [b"[UNKNOWN-CTE] Cannot decode"]),
+            self._sections((b"BODY[2]<0>", b"JVBERi0x\r\nLjQ=")),
+        )
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            await email_client.download_attachment("7", "big.pdf", str(tmp_path / "big.pdf"))
+
+        assert mock_imap.uid.call_args.args[2] == "(UID BODY.PEEK[2]<0.1048576>)"
+        assert (tmp_path / "big.pdf").read_bytes() == b"%PDF-1.4"
+        # UNKNOWN-CTE is specific to one email
+        assert email_client.capabilities.supports("BINARY") is True
+
+    @pytest.mark.asyncio
+    async def test_attachment_streamed_in_chunks(self, email_client, tmp_path):
+        encoded = base64.encodebytes(bytes(range(256)) * 16)
+        chunks = [encoded[i : i + 1000] for i in range(0, len(encoded), 1000)]
+        mock_imap = self._make_imap(
+            self.STRUCTURE, *(self._sections((b"BODY[2]<%d>" % (i * 1000), chunk)) for i, chunk in enumerate(chunks))
+        )
+
+        with (
+            patch("mcp_email_server.emails.classic._ATTACHMENT_CHUNK_SIZE", 1000),
+            patch.object(email_client, "imap_class", return_value=mock_imap),
+        ):
+            result = await email_client.download_attachment("7", "big.pdf", str(tmp_path / "out" / "big.pdf"))
+
+        assert [call.args[2] for call in mock_imap.uid.call_args_list[1:]] == [
+            f"(UID BODY.PEEK[2]<{i * 1000}.1000>)" for i in range(len(chunks))
+        ]
+        assert (tmp_path / "out" / "big.pdf").read_bytes() == bytes(range(256)) * 16
+        assert result["size"] == 4096
+        assert [path.name for path in (tmp_path / "out").iterdir()] == ["big.pdf"]
+
+    @pytest.mark.asyncio
+    async def test_failed_stream_leaves_no_file(self, email_client, tmp_path):
+        save_file = tmp_path / "out" / "big.pdf"
+        save_file.parent.mkdir()
+        save_file.write_bytes(b"previous")
+        mock_imap = self._make_imap(
+            self.STRUCTURE,
+            self._sections((b"BODY[2]<0>", b"A" * 1000)),
+            ("NO", [b"Message expunged"]),
+        )
+
+        with (
+            patch("mcp_email_server.emails.classic._ATTACHMENT_CHUNK_SIZE", 1000),
+            patch.object(email_client, "_fetch_email_with_formats", return_value=None),
+            patch.object(email_client, "imap_class", return_value=mock_imap),
+            pytest.raises(ValueError, match="Failed to fetch email"),
+        ):
+            await email_client.download_attachment("7", "big.pdf", str(save_file))
+
+        assert [path.name for path in save_file.parent.iterdir()] == ["big.pdf"]
+        assert save_file.read_bytes() == b"previous"
+
+    @pytest.mark.asyncio
+    async def test_batch_reads_large_indexed_emails_by_parts(self, email_server):
+        email_client = EmailClient(email_server, use_index=True)
+        index = email_client.index
+        index.reset_mailbox(email_client._server_key, "INBOX", 1)
+        date = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        index.add(
+            email_client._server_key,
+            "INBOX",
+            [
+                {"email_id": "7", "subject": "Big one", "date": date, "size": 31457280, "attachments": []},
+                {"email_id": "8", "subject": "Small", "date": date, "size": 2048, "attachments": []},
+            ],
+        )
+        small = b"From: sender@example.com\r\nSubject: Small\r\n\r\nShort note\r\n"
+        mock_imap = self._make_imap(
+            self.STRUCTURE,
+            self._sections((b"BODY[HEADER]", self.HEADER), (b"BODY[1.1]", b"SGVsbG8gd29ybGQ=")),
+            ("OK", [b"1 FETCH (UID 8 RFC822 {%d}" % len(small), bytearray(small), b")"]),
+        )
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            results = dict([item async for item in email_client.get_email_bodies(["7", "8"])])
+
+        assert [call.args[1:] for call in mock_imap.uid.call_args_list] == [
+            ("7", "(UID RFC822.SIZE BODYSTRUCTURE)"),
+            ("7", "(UID BODY.PEEK[HEADER] BODY.PEEK[1.1])"),
+            ("8", "RFC822"),
+        ]
+        assert results["7"]["body"] == "Hello world"
+        assert results["8"]["body"].strip() == "Short note"
+        indexed, _ = index.query(email_client._server_key, "INBOX")
+        assert {email["email_id"]: email["attachments"] for email in indexed} == {"7": ["big.pdf"], "8": []}
+
+
+class TestTransferDecoder:
+    """Tests for decoding transfer encodings chunk by chunk."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 76, 10000])
+    def test_base64_split_anywhere(self, chunk_size):
+        payload = bytes(range(256)) * 10
+        assert self._decode(base64.encodebytes(payload), "base64", chunk_size) == payload
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 5, 80, 10000])
+    def test_quoted_printable_split_anywhere(self, chunk_size):
+        payload = "Café au lait, s'il vous plaît. " * 20
+        encoded = quopri.encodestring(payload.encode())
+        assert self._decode(encoded, "quoted-printable", chunk_size) == quopri.decodestring(encoded)
+
+    def test_identity_encodings(self):
+        assert self._decode(b"plain\r\ntext", "7bit", 3) == b"plain\r\ntext"
+
+    @staticmethod
+    def _decode(data, encoding, chunk_size):
+        decoder = _TransferDecoder(encoding)
+        decoded = b"".join(decoder.decode(data[i : i + chunk_size]) for i in range(0, len(data), chunk_size))
+        return decoded + decoder.flush()
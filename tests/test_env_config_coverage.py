@@ -84,6 +84,8 @@ def test_from_env_with_all_vars_set(monkeypatch):
         "MCP_EMAIL_SERVER_IMAP_HOST": "imap.example.com",
         "MCP_EMAIL_SERVER_IMAP_PORT": "143",
         "MCP_EMAIL_SERVER_IMAP_SSL": "false",
+        "MCP_EMAIL_SERVER_IMAP_COMPRESS": "true",
+        "MCP_EMAIL_SERVER_IMAP_ENVELOPE_METADATA": "true",
         "MCP_EMAIL_SERVER_SMTP_HOST": "smtp.example.com",
         "MCP_EMAIL_SERVER_SMTP_PORT": "587",
         "MCP_EMAIL_SERVER_SMTP_SSL": "no",
@@ -105,6 +107,8 @@ def test_from_env_with_all_vars_set(monkeypatch):
     assert result.incoming.password == "imap_pass"  # noqa: S105
     assert result.incoming.port == 143
     assert result.incoming.use_ssl is False
+    assert result.incoming.compress is True
+    assert result.incoming.envelope_metadata is True
     assert result.outgoing.user_name == "smtp_john"
     assert result.outgoing.password == "smtp_pass"  # noqa: S105
     assert result.outgoing.port == 587
@@ -0,0 +1,63 @@
+"""Tests for the MIME parse pool."""
+
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from mcp_email_server.config import get_settings
+from mcp_email_server.emails.classic import _parse_email
+from mcp_email_server.emails.executor import get_parse_executor, run_parser, shutdown_parse_executor
+
+RAW_EMAIL = (
+    b"Message-ID: <1@example.com>\r\nFrom: sender@example.com\r\nTo: a@example.com, b@example.com\r\n"
+    b"Subject: Pooled\r\nDate: Mon, 1 Jan 2024 00:00:00 +0000\r\n\r\nHello from a worker\r\n"
+)
+
+
+@pytest.fixture(autouse=True)
+def parse_pool(monkeypatch):
+    monkeypatch.setattr(get_settings(), "parse_workers", 1)
+    monkeypatch.setattr(get_settings(), "parse_offload_min_size", 100)
+    yield
+    shutdown_parse_executor()
+
+
+def _thread_id(_data=None):
+    return threading.get_ident()
+
+
+class TestRunParser:
+    @pytest.mark.asyncio
+    async def test_small_input_parsed_inline(self):
+        assert await run_parser(_thread_id, 99) == threading.get_ident()
+
+    @pytest.mark.asyncio
+    async def test_large_input_parsed_in_pool(self):
+        assert await run_parser(_thread_id, 100) != threading.get_ident()
+
+    @pytest.mark.asyncio
+    async def test_no_workers_parses_inline(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "parse_workers", 0)
+        assert await run_parser(_thread_id, 10**9) == threading.get_ident()
+        assert get_parse_executor() is None
+
+    @pytest.mark.asyncio
+    async def test_process_pool_parses_emails(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "parse_executor", "process")
+        assert isinstance(get_parse_executor(), ProcessPoolExecutor)
+
+        result = await run_parser(_parse_email, len(RAW_EMAIL), RAW_EMAIL, "7")
+
+        assert result == _parse_email(RAW_EMAIL, "7")
+        assert result["body"].strip() == "Hello from a worker"
+
+
+class TestGetParseExecutor:
+    def test_reused_until_settings_change(self, monkeypatch):
+        executor = get_parse_executor()
+        assert isinstance(executor, ThreadPoolExecutor)
+        assert get_parse_executor() is executor
+
+        monkeypatch.setattr(get_settings(), "parse_workers", 2)
+        assert get_parse_executor() is not executor
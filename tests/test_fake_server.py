@@ -0,0 +1,332 @@
+"""End-to-end tests of the email handler against the fake IMAP and SMTP servers."""
+
+import asyncio
+from email.message import EmailMessage
+
+import pytest
+import pytest_asyncio
+
+from benchmarks.fake_server import (
+    BASIC_CAPABILITIES,
+    DEFAULT_CAPABILITIES,
+    FakeIMAPServer,
+    FakeMailStore,
+    FakeSMTPServer,
+    format_sequence_set,
+)
+from benchmarks.run import percentile, run_benchmarks
+from mcp_email_server.config import EmailServer, EmailSettings, get_settings
+from mcp_email_server.emails.classic import ClassicEmailHandler, _response_status
+from mcp_email_server.emails.pool import close_connection_pools
+
+
+def _handler(imap: FakeIMAPServer, smtp: FakeSMTPServer, **incoming) -> ClassicEmailHandler:
+    return ClassicEmailHandler(
+        EmailSettings(
+            account_name="fake",
+            full_name="Fake User",
+            email_address="user@example.com",
+            incoming=EmailServer(
+                user_name=imap.user_name,
+                password=imap.password,
+                host=imap.host,
+                port=imap.port,
+                use_ssl=False,
+                **incoming,
+            ),
+            outgoing=EmailServer(
+                user_name=smtp.user_name, password=smtp.password, host=smtp.host, port=smtp.port, use_ssl=False
+            ),
+        )
+    )
+
+
+@pytest.fixture
+def store():
+    store = FakeMailStore()
+    store.seed("INBOX", 50, body_size=256)
+    store.create("Archive")
+    store.create("Labels/Work")
+    return store
+
+
+@pytest_asyncio.fixture
+async def servers(store, request):
+    capabilities = getattr(request, "param", DEFAULT_CAPABILITIES)
+    async with FakeIMAPServer(store, capabilities=capabilities) as imap, FakeSMTPServer() as smtp:
+        yield imap, smtp
+        await close_connection_pools()
+
+
+@pytest.fixture
+def handler(servers):
+    return _handler(*servers)
+
+
+class TestFormatSequenceSet:
+    def test_sorted_runs(self):
+        assert format_sequence_set([9, 1, 2, 3, 5, 10, 7]) == "1:3,5,7,9:10"
+
+    def test_keep_order(self):
+        assert format_sequence_set([5, 4, 3, 1], keep_order=True) == "5:3,1"
+
+
+class TestHandlerAgainstFakeServer:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("servers", [DEFAULT_CAPABILITIES, BASIC_CAPABILITIES], indirect=True)
+    async def test_metadata_page(self, handler):
+        response = await handler.get_emails_metadata(page=2, page_size=10)
+
+        assert response.total == 50
+        assert [email.email_id for email in response.emails] == [str(uid) for uid in range(40, 30, -1)]
+
+    @pytest.mark.asyncio
+    async def test_metadata_page_uses_windowed_sort(self, servers, handler, monkeypatch):
+        monkeypatch.setattr(get_settings(), "metadata_index", False)
+        imap, _ = servers
+
+        response = await handler.get_emails_metadata(page=2, page_size=10)
+
+        assert response.total == 50
+        assert [email.email_id for email in response.emails] == [str(uid) for uid in range(40, 30, -1)]
+        assert imap.commands["UID SORT"] == 1
+        assert imap.commands["UID SEARCH"] == 0
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("servers", [("IMAP4rev1", "SORT")], indirect=True)
+    async def test_metadata_page_uses_plain_sort(self, servers, handler, monkeypatch):
+        monkeypatch.setattr(get_settings(), "metadata_index", False)
+        imap, _ = servers
+
+        response = await handler.get_emails_metadata(page=2, page_size=10)
+
+        assert response.total == 50
+        assert [email.email_id for email in response.emails] == [str(uid) for uid in range(40, 30, -1)]
+        assert imap.commands["UID SORT"] == 1
+        assert imap.commands["UID SEARCH"] == 0
+        assert handler.incoming_client.capabilities.supports("SORT") is True
+
+    @pytest.mark.asyncio
+    async def test_search_values_are_quoted(self, servers, handler, monkeypatch):
+        monkeypatch.setattr(get_settings(), "metadata_index", False)
+
+        response = await handler.get_emails_metadata(page=1, page_size=10, subject='Synthetic message 4"')
+
+        assert response.total == 0
+        response = await handler.get_emails_metadata(page=1, page_size=10, subject="Synthetic message 4")
+
+        assert response.total == 11
+        assert handler.incoming_client.capabilities.supports("CONTEXT=SORT") is True
+
+    @pytest.mark.asyncio
+    async def test_metadata_index_fetches_only_new_emails(self, store, servers, handler):
+        imap, _ = servers
+        await handler.get_emails_metadata(page=1, page_size=10)
+        store["INBOX"].seed(1, body_size=256)
+        imap.reset_stats()
+
+        first = await handler.get_emails_metadata(page=1, page_size=10)
+        second = await handler.get_emails_metadata(page=2, page_size=10, subject="Synthetic")
+
+        assert first.total == 51
+        assert first.emails[0].email_id == "51"
+        assert second.total == 51
+        assert imap.commands["UID FETCH"] == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("servers", [DEFAULT_CAPABILITIES, BASIC_CAPABILITIES], indirect=True)
+    async def test_large_mailbox_is_indexed_in_steps(self, store, servers, handler):
+        imap, _ = servers
+        store["INBOX"].seed(2950, body_size=64)
+        client = handler.incoming_client
+        expected = [str(uid) for uid in range(2990, 2980, -1)]
+
+        indexed = []
+        for _ in range(3):
+            response = await asyncio.wait_for(handler.get_emails_metadata(page=2, page_size=10), 60)
+            indexed.append(client.index.count(client._server_key, "INBOX"))
+
+            assert response.total == 3000
+            assert [email.email_id for email in response.emails] == expected
+        imap.reset_stats()
+
+        response = await handler.get_emails_metadata(page=2, page_size=10)
+
+        assert indexed == [1000, 2000, 3000]
+        assert [email.email_id for email in response.emails] == expected
+        assert imap.commands["UID FETCH"] == imap.commands["UID SORT"] == imap.commands["UID SEARCH"] == 0
+
+    @pytest.mark.asyncio
+    async def test_envelope_metadata_matches_headers(self, store, servers, monkeypatch):
+        monkeypatch.setattr(get_settings(), "metadata_index", False)
+        message = EmailMessage()
+        message["From"] = '"Doe, Jane" <jane@example.com>'
+        message["To"] = "user@example.com"
+        message["Subject"] = "Quarterly report"
+        # Newer than the seeded mail so it heads the date-sorted page
+        message["Date"] = "Tue, 2 Jan 2024 00:00:00 +0000"
+        message.set_content("See attached.")
+        message.add_attachment(b"%PDF-1.4", maintype="application", subtype="pdf", filename="report.pdf")
+        store["INBOX"].add(message.as_bytes())
+
+        headers = await _handler(*servers).get_emails_metadata(page=1, page_size=10)
+        envelopes = await _handler(*servers, envelope_metadata=True).get_emails_metadata(page=1, page_size=10)
+
+        assert envelopes.emails[0].attachments == ["report.pdf"]
+        assert envelopes.emails[0].sender == '"Doe, Jane" <jane@example.com>'
+        assert [email.model_dump(exclude={"attachments"}) for email in envelopes.emails] == [
+            email.model_dump(exclude={"attachments"}) for email in headers.emails
+        ]
+
+    @pytest.mark.asyncio
+    async def test_full_text_search(self, store, handler, monkeypatch):
+        monkeypatch.setattr(get_settings(), "full_text_index", True)
+        store["INBOX"].add(
+            b"From: finance@example.com\r\nTo: user@example.com\r\nSubject: Budget review\r\n"
+            b"Date: Mon, 1 Jan 2024 00:00:00 +0000\r\n\r\nThe quarterly spreadsheet is attached.\r\n"
+        )
+
+        await handler.get_emails_metadata(page=1, page_size=10)
+        await handler._text_sync
+        response = await handler.search_emails("quarterly spread*")
+
+        assert response.total == 1
+        assert response.results[0].email_id == "51"
+        assert response.results[0].snippet == "The **quarterly** **spreadsheet** is attached."
+
+    @pytest.mark.asyncio
+    async def test_watch_pushes_new_mail(self, store, handler):
+        changed = asyncio.Queue()
+        await handler.get_emails_metadata(page=1, page_size=10)
+
+        watchers = handler.watch(["INBOX"], changed.put)
+        try:
+            while not store["INBOX"].listeners:
+                await asyncio.sleep(0.01)
+            store["INBOX"].seed(1, body_size=256)
+            assert await asyncio.wait_for(changed.get(), 5) == "INBOX"
+        finally:
+            for watcher in watchers:
+                watcher.stop()
+
+        client = handler.incoming_client
+        assert client.index.count(client._server_key, "INBOX") == 51
+
+    @pytest.mark.asyncio
+    async def test_content_uses_one_fetch(self, servers, handler):
+        imap, _ = servers
+        await handler.get_emails_metadata(page=1, page_size=1)
+        imap.reset_stats()
+
+        response = await handler.get_emails_content(["3", "1", "2"])
+
+        assert [email.email_id for email in response.emails] == ["3", "1", "2"]
+        assert response.failed_ids == []
+        assert imap.commands["UID FETCH"] == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("servers", [DEFAULT_CAPABILITIES, BASIC_CAPABILITIES], indirect=True)
+    async def test_reads_sections_of_large_email(self, store, handler, tmp_path):
+        message = EmailMessage()
+        message["From"] = "sender@example.com"
+        message["To"] = "user@example.com"
+        message["Subject"] = "Scans"
+        message.set_content("Two-line note.\nSee attached.")
+        message.add_alternative("<p>Two-line note.</p>", subtype="html")
+        scan = bytes(range(256)) * 8192
+        message.add_attachment(scan, maintype="application", subtype="octet-stream", filename="scan.bin")
+        uid = str(store["INBOX"].add(message.as_bytes()))
+        client = handler.incoming_client
+
+        email_data = await client.get_email_body_by_id(uid)
+        received = client.wire_stats.bytes_received
+        result = await handler.download_attachment(uid, "scan.bin", str(tmp_path / "scan.bin"))
+
+        assert email_data["body"].strip() == "Two-line note.\nSee attached."
+        assert email_data["attachments"] == ["scan.bin"]
+        assert received < len(scan) / 10
+        assert (tmp_path / "scan.bin").read_bytes() == scan
+        assert result.size == len(scan)
+
+    @pytest.mark.asyncio
+    async def test_move_mark_delete(self, store, handler):
+        moved = await handler.move_emails(["1", "2"], "Archive")
+        marked = await handler.mark_emails(["5"], "read")
+        deleted, failed = await handler.delete_emails(["7"])
+
+        assert moved.moved_ids == ["1", "2"]
+        assert len(store["Archive"]) == 2
+        assert marked.marked_ids == ["5"]
+        assert "\\Seen" in store["INBOX"].flags(5)
+        assert (deleted, failed) == (["7"], [])
+        assert 7 not in store["INBOX"].uids
+        assert len(store["INBOX"]) == 47
+
+    @pytest.mark.asyncio
+    async def test_send_saves_to_sent(self, store, servers, handler):
+        imap, smtp = servers
+        await handler.get_emails_metadata(page=1, page_size=1)
+        imap.reset_stats()
+
+        await handler.send_email(["recipient@example.com"], "Hello", "Body")
+
+        assert len(smtp.messages) == 1
+        assert smtp.messages[0].recipients == ["recipient@example.com"]
+        assert len(store["Sent"]) == 1
+        # The APPEND reuses the account's pooled session
+        assert imap.commands["LOGIN"] == 0
+        assert imap.commands["APPEND"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_labels(self, store, handler):
+        applied = await handler.apply_label(["4"], "Work")
+        labels = await handler.get_email_labels("4")
+        removed = await handler.remove_label(["4"], "Work")
+
+        assert applied.moved_ids == ["4"]
+        assert labels.labels == ["Work"]
+        assert removed.moved_ids == ["4"]
+        assert len(store["Labels/Work"]) == 0
+
+    @pytest.mark.asyncio
+    async def test_labels_answered_from_index(self, servers, handler):
+        imap, _ = servers
+        await handler.apply_label(["4"], "Work")
+        await handler.get_email_labels("4")
+        imap.reset_stats()
+
+        labels = await handler.get_email_labels("4")
+
+        assert labels.labels == ["Work"]
+        # Only the source email's Message-ID is fetched; the label folder is checked with STATUS alone
+        assert imap.commands["STATUS"] == 1
+        assert imap.commands["EXAMINE"] == imap.commands["UID SEARCH"] == 0
+
+
+class TestEmailClientAgainstFakeServer:
+    @pytest.mark.asyncio
+    async def test_examined_mailbox_takes_uid_commands(self, handler):
+        client = handler.incoming_client
+
+        async with client._imap_session() as imap:
+            state = await client._select_mailbox(imap, "INBOX", readonly=True)
+            assert state.exists == 50
+            assert imap.protocol.state == "SELECTED"
+            assert _response_status(await imap.uid("fetch", "1", "(UID FLAGS)")) == "OK"
+
+            assert await client._select_mailbox(imap, "Missing", readonly=True) is None
+            assert imap.protocol.state == "AUTH"
+
+
+class TestBenchmarks:
+    def test_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+
+    @pytest.mark.asyncio
+    async def test_run_benchmarks(self):
+        results = await run_benchmarks(messages=100, iterations=2, batch_size=5)
+
+        assert [result.scenario for result in results][:2] == ["list_emails_metadata", "get_emails_content"]
+        assert all(result.operations == 2 and result.round_trips_per_op > 0 for result in results)
@@ -0,0 +1,124 @@
+"""Tests for running folder-scoped work over several IMAP sessions."""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from mcp_email_server.emails.fanout import fan_out
+
+
+class Sessions:
+    """A session factory that counts open sessions and can fail to connect."""
+
+    def __init__(self, fail_connect: int = 0):
+        self.opened = 0
+        self.open = 0
+        self.most_open = 0
+        self.fail_connect = fail_connect
+
+    @asynccontextmanager
+    async def session(self):
+        if self.fail_connect:
+            self.fail_connect -= 1
+            raise OSError("connection refused")
+        self.opened += 1
+        self.open += 1
+        self.most_open = max(self.most_open, self.open)
+        try:
+            yield f"imap{self.opened}"
+        finally:
+            self.open -= 1
+
+
+async def _collect(results):
+    return {result.mailbox: result async for result in results}
+
+
+class TestFanOut:
+    @pytest.mark.asyncio
+    async def test_concurrency_is_capped(self):
+        sessions = Sessions()
+        running = []
+        most_running = 0
+
+        async def work(imap, mailbox):
+            nonlocal most_running
+            running.append(mailbox)
+            most_running = max(most_running, len(running))
+            await asyncio.sleep(0.01)
+            running.remove(mailbox)
+            return mailbox.upper()
+
+        results = await _collect(fan_out(sessions.session, [f"f{n}" for n in range(10)], work, 3))
+
+        assert {mailbox: r.value for mailbox, r in results.items()} == {f"f{n}": f"F{n}" for n in range(10)}
+        assert sessions.opened == 3
+        assert most_running == 3
+
+    @pytest.mark.asyncio
+    async def test_results_arrive_as_they_complete(self):
+        delays = {"slow": 0.05, "fast": 0.0}
+
+        async def work(imap, mailbox):
+            await asyncio.sleep(delays[mailbox])
+            return mailbox
+
+        order = [r.mailbox async for r in fan_out(Sessions().session, ["slow", "fast"], work, 2)]
+
+        assert order == ["fast", "slow"]
+
+    @pytest.mark.asyncio
+    async def test_folder_errors_are_reported_per_folder(self):
+        sessions = Sessions()
+
+        async def work(imap, mailbox):
+            if mailbox == "bad":
+                raise ValueError("no such folder")
+            return imap
+
+        results = await _collect(fan_out(sessions.session, ["bad", "a", "b"], work, 1))
+
+        assert isinstance(results["bad"].error, ValueError)
+        assert results["a"].value == results["b"].value == "imap1"
+        assert sessions.opened == 1
+
+    @pytest.mark.asyncio
+    async def test_broken_session_leaves_folders_to_others(self):
+        sessions = Sessions()
+
+        async def work(imap, mailbox):
+            await asyncio.sleep(0)
+            if imap == "imap1":
+                raise OSError("connection reset")
+            return imap
+
+        results = await _collect(fan_out(sessions.session, ["a", "b", "c", "d"], work, 2))
+
+        assert sum(r.error is not None for r in results.values()) == 1
+        assert all(r.value == "imap2" for r in results.values() if r.error is None)
+
+    @pytest.mark.asyncio
+    async def test_folders_fail_without_any_session(self):
+        async def work(imap, mailbox):
+            return mailbox
+
+        results = await _collect(fan_out(Sessions(fail_connect=2).session, ["a", "b", "c"], work, 2))
+
+        assert all(isinstance(r.error, RuntimeError) for r in results.values())
+        assert sorted(results) == ["a", "b", "c"]
+
+    @pytest.mark.asyncio
+    async def test_stopping_early_closes_sessions(self):
+        sessions = Sessions()
+
+        async def work(imap, mailbox):
+            await asyncio.sleep(0 if mailbox == "a" else 10)
+            return mailbox
+
+        results = fan_out(sessions.session, ["a", "b", "c"], work, 3)
+        first = await anext(results)
+        await results.aclose()
+
+        assert first.mailbox == "a"
+        assert sessions.open == 0
@@ -483,7 +483,7 @@ class TestEmailClientFolders:
         mock_imap.wait_hello_from_server = AsyncMock()
         mock_imap.login = AsyncMock()
         mock_imap.select = AsyncMock()
-        mock_imap.uid = AsyncMock(return_value=("OK", [b"[COPYUID 1234 1:2 100:101]"]))
+        mock_imap.uid = AsyncMock(return_value=("OK", [b"[COPYUID 1234 123,456 100:101]"]))
         mock_imap.logout = AsyncMock()
 
         with patch.object(email_client, "imap_class", return_value=mock_imap):
@@ -587,7 +587,11 @@ class TestEmailClientFolderEdgeCases:
         mock_imap.uid = AsyncMock(side_effect=[("OK", []), ("NO", [b"Message not found"])])
         mock_imap.logout = AsyncMock()
 
-        with patch.object(email_client, "imap_class", return_value=mock_imap):
+        # Force one UID per command so the two emails get separate results
+        with (
+            patch.object(email_client, "imap_class", return_value=mock_imap),
+            patch("mcp_email_server.emails.classic._MAX_UID_SET_LENGTH", 3),
+        ):
             copied_ids, failed_ids = await email_client.copy_emails(["123", "456"], "Archive", "INBOX")
 
             # First email succeeds, second fails with NO status
@@ -655,7 +659,7 @@ class TestEmailClientFolderEdgeCases:
         mock_imap.uid = AsyncMock(
             side_effect=[
                 ("NO", [b"MOVE not supported"]),  # MOVE returns NO status
-                ("OK", [b"[COPYUID 1234 1 100]"]),  # COPY succeeds
+                ("OK", [b"[COPYUID 1234 123 100]"]),  # COPY succeeds
                 ("OK", []),  # STORE \\Deleted succeeds
             ]
         )
@@ -685,7 +689,7 @@ class TestEmailClientFolderEdgeCases:
         mock_imap.uid = AsyncMock(
             side_effect=[
                 Exception("MOVE not supported"),  # MOVE fails
-                ("OK", [b"[COPYUID 1234 1 100]"]),  # COPY succeeds
+                ("OK", [b"[COPYUID 1234 123 100]"]),  # COPY succeeds
                 ("OK", []),  # STORE \\Deleted succeeds
             ]
         )
@@ -0,0 +1,93 @@
+"""Tests for the lean header extractor, checked against the email package's parser."""
+
+from email.parser import BytesParser
+from email.policy import default
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.headers import header_block
+from mcp_email_server.emails.classic import _parse_headers
+from mcp_email_server.emails.headers import (
+    METADATA_FIELDS,
+    header_values,
+    render_addresses,
+    render_unstructured,
+    unfold_fields,
+)
+
+SUBJECTS = [
+    "Plain subject",
+    "  spaced\tout  ",
+    "=?utf-8?q?J=C3=B6rg?= and =?UTF-8?B?w6k=?=",
+    "=?utf-8?q?a?=  =?utf-8?q?b?=  c",
+    "=?iso-8859-1?q?caf=E9?=",
+    "x=?utf-8?q?a?=y",
+    "=?utf-8?b?w6?=",
+    "=?x-unknown?q?a?=",
+    "=?utf-8?q?broken",
+]
+ADDRESSES = [
+    "jane@example.com",
+    "Jane   Doe <jane@example.com>",
+    '"Doe, Jane" <jane@example.com>, "Bob" <bob@example.com>,',
+    '"a \\"b\\"" <q@example.com>',
+    "=?utf-8?q?J=C3=B6rg?= <j@example.com>, =?utf-8?q?Doe=2C_J?= <d@example.com>",
+    "J. Doe <j@example.com>",
+    "jane@example.com (Jane)",
+    "Team: a@example.com, b@example.com;",
+    "<bare@example.com>, A <a@[192.0.2.1]>",
+    '"" <empty@example.com>, , x@example.com',
+    '"unterminated <u@example.com>',
+]
+MESSAGE_IDS = ["<abc@example.com>", "<a.b+c=d@example.com>  ", "abc@example.com", "<a b@x>", "<a@x> (comment)", ""]
+
+
+def _full(raw: bytes) -> dict[str, str]:
+    message = BytesParser(policy=default).parsebytes(raw)
+    return {name: str(message[name]) for name in METADATA_FIELDS if name != "date" and message[name] is not None}
+
+
+def _blocks():
+    for subject in SUBJECTS:
+        yield f"Subject: {subject}\r\n\r\n".encode()
+    for address in ADDRESSES:
+        yield f"From: {address}\r\nTo: {address}\r\nCc:\r\n {address}\r\n\r\n".encode()
+    for message_id in MESSAGE_IDS:
+        yield f"Message-ID: {message_id}\r\n\r\n".encode()
+    yield b"Subject: first\r\nX-Long: a\r\n b\r\nsubject: second\r\n\r\n"
+    yield b"Subject:\r\n folded\r\n\tagain\nTo: a@example.com\r\n\r\n"
+
+
+class TestHeaderValues:
+    @pytest.mark.parametrize("raw", list(_blocks()))
+    def test_matches_email_package(self, raw):
+        values = header_values(raw)
+        assert {name: value for name, value in values.items() if name != "date"} == _full(raw)
+
+    @pytest.mark.parametrize("n", range(30))
+    def test_realistic_headers_take_the_fast_paths(self, n):
+        raw = header_block(n)
+        fields = unfold_fields(raw)
+        assert render_unstructured(fields["subject"]) is not None
+        assert render_addresses(fields["from"]) is not None
+        assert render_addresses(fields["to"]) is not None
+        assert {name: value for name, value in header_values(raw).items() if name != "date"} == _full(raw)
+
+    def test_irregular_blocks_are_left_to_the_parser(self):
+        assert unfold_fields("Subject: caf\xe9\r\n\r\n".encode("latin-1")) is None
+        assert unfold_fields(b" continued\r\nSubject: x\r\n\r\n") is None
+        assert unfold_fields(b"From sender Mon Jan  1 00:00:00 2024\r\nSubject: x\r\n\r\n") is None
+        assert unfold_fields(b"Subject: x\r\nnot a header\r\n\r\n") is None
+
+    def test_stops_at_the_body(self):
+        assert unfold_fields(b"Subject: x\r\n\r\nTo: body@example.com\r\n") == {"subject": "x"}
+
+
+class TestParseHeaders:
+    @pytest.mark.parametrize("raw", [*_blocks(), header_block(1), header_block(2)])
+    def test_same_metadata_as_full_parser(self, raw):
+        raw = b"Date: Mon, 1 Jan 2024 00:00:00 +0000\r\n" + raw
+        with patch("mcp_email_server.emails.classic.header_values", return_value=None):
+            expected = _parse_headers("1", raw)
+        assert _parse_headers("1", raw) == expected
@@ -14,7 +14,8 @@ from mcp_email_server.app import (
     remove_label,
 )
 from mcp_email_server.config import EmailServer, EmailSettings
-from mcp_email_server.emails.classic import ClassicEmailHandler, EmailClient
+from mcp_email_server.emails.capabilities import get_capability_store
+from mcp_email_server.emails.classic import ClassicEmailHandler, EmailClient, _expand_sequence_set, _gmail_labels
 from mcp_email_server.emails.models import (
     EmailLabelsResponse,
     EmailMoveResponse,
@@ -207,7 +208,7 @@ class TestLabelManagementEnabled:
 
                 assert result == remove_response
                 assert result.success is True
-                mock_handler.remove_label.assert_called_once_with(["123"], "Important")
+                mock_handler.remove_label.assert_called_once_with(["123"], "Important", "INBOX")
 
     @pytest.mark.asyncio
     async def test_get_email_labels_enabled(self):
@@ -317,7 +318,17 @@ def email_settings():
 
 @pytest.fixture
 def classic_handler(email_settings):
-    return ClassicEmailHandler(email_settings)
+    handler = ClassicEmailHandler(email_settings)
+    # A server without X-GM-EXT-1, where labels are folders under Labels/
+    get_capability_store().record_capabilities(handler.incoming_client._server_key, ["IMAP4rev1"])
+    return handler
+
+
+@pytest.fixture
+def gmail_handler(email_settings):
+    handler = ClassicEmailHandler(email_settings)
+    get_capability_store().record_capabilities(handler.incoming_client._server_key, ["IMAP4rev1", "X-GM-EXT-1"])
+    return handler
 
 
 class TestClassicEmailHandlerLabels:
@@ -362,24 +373,20 @@ class TestClassicEmailHandlerLabels:
     @pytest.mark.asyncio
     async def test_remove_label(self, classic_handler):
         """Test remove_label handler method."""
-        mock_get_message_id = AsyncMock(return_value="<msg123@example.com>")
-        mock_search = AsyncMock(return_value="456")
-        mock_delete = AsyncMock(return_value=(["456"], []))
+        mock_remove = AsyncMock(return_value=(["123"], []))
 
-        with patch.object(classic_handler.incoming_client, "get_email_message_id", mock_get_message_id):
-            with patch.object(classic_handler.incoming_client, "search_by_message_id", mock_search):
-                with patch.object(classic_handler.incoming_client, "delete_from_folder", mock_delete):
-                    result = await classic_handler.remove_label(
-                        email_ids=["123"],
-                        label_name="Important",
-                    )
+        with patch.object(classic_handler.incoming_client, "remove_copies", mock_remove):
+            result = await classic_handler.remove_label(
+                email_ids=["123"],
+                label_name="Important",
+                source_mailbox="Archive",
+            )
 
-                    assert isinstance(result, EmailMoveResponse)
-                    assert result.success is True
-                    assert result.moved_ids == ["123"]
-                    mock_get_message_id.assert_called_once_with("123", "INBOX")
-                    mock_search.assert_called_once_with("<msg123@example.com>", "Labels/Important")
-                    mock_delete.assert_called_once_with(["456"], "Labels/Important")
+            assert isinstance(result, EmailMoveResponse)
+            assert result.success is True
+            assert result.moved_ids == ["123"]
+            assert result.source_mailbox == "Labels/Important"
+            mock_remove.assert_called_once_with(["123"], "Archive", "Labels/Important")
 
     @pytest.mark.asyncio
     async def test_get_email_labels(self, classic_handler):
@@ -391,11 +398,11 @@ class TestClassicEmailHandlerLabels:
         mock_get_message_id = AsyncMock(return_value="<msg123@example.com>")
         mock_list_labels = AsyncMock(return_value=mock_labels)
         # Email found in Important but not Work
-        mock_search = AsyncMock(side_effect=["789", None])
+        mock_locate = AsyncMock(return_value={"Labels/Important": ["789"]})
 
         with patch.object(classic_handler.incoming_client, "get_email_message_id", mock_get_message_id):
             with patch.object(classic_handler.incoming_client, "list_labels", mock_list_labels):
-                with patch.object(classic_handler.incoming_client, "search_by_message_id", mock_search):
+                with patch.object(classic_handler.incoming_client, "locate_message_id", mock_locate):
                     result = await classic_handler.get_email_labels(
                         email_id="123",
                         source_mailbox="INBOX",
@@ -404,6 +411,7 @@ class TestClassicEmailHandlerLabels:
                     assert isinstance(result, EmailLabelsResponse)
                     assert result.email_id == "123"
                     assert result.labels == ["Important"]
+                    mock_locate.assert_called_once_with("<msg123@example.com>", ["Labels/Important", "Labels/Work"])
 
     @pytest.mark.asyncio
     async def test_create_label(self, classic_handler):
@@ -437,6 +445,63 @@ class TestClassicEmailHandlerLabels:
 # ============================================================================
 
 
+class TestClassicEmailHandlerGmailLabels:
+    """Test label operations on a Gmail server, where labels are X-GM-LABELS."""
+
+    @pytest.mark.asyncio
+    async def test_apply_label(self, gmail_handler):
+        mock_store = AsyncMock(return_value=(["123", "456"], []))
+        mock_copy = AsyncMock()
+
+        with patch.object(gmail_handler.incoming_client, "store_gmail_labels", mock_store):
+            with patch.object(gmail_handler.incoming_client, "copy_emails", mock_copy):
+                result = await gmail_handler.apply_label(["123", "456"], "Work/Projects")
+
+        assert result.success is True
+        assert result.moved_ids == ["123", "456"]
+        assert result.destination_folder == "Work/Projects"
+        mock_store.assert_called_once_with(["123", "456"], "INBOX", ["Work/Projects"], add=True)
+        mock_copy.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_remove_label(self, gmail_handler):
+        mock_store = AsyncMock(return_value=(["123"], ["456"]))
+        mock_remove = AsyncMock()
+
+        with patch.object(gmail_handler.incoming_client, "store_gmail_labels", mock_store):
+            with patch.object(gmail_handler.incoming_client, "remove_copies", mock_remove):
+                result = await gmail_handler.remove_label(["123", "456"], "Work", source_mailbox="[Gmail]/All Mail")
+
+        assert result.success is False
+        assert result.failed_ids == ["456"]
+        assert result.source_mailbox == "Work"
+        mock_store.assert_called_once_with(["123", "456"], "[Gmail]/All Mail", ["Work"], add=False)
+        mock_remove.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_email_labels(self, gmail_handler):
+        mock_fetch = AsyncMock(return_value=["Work", "Receipts"])
+        mock_locate = AsyncMock()
+
+        with patch.object(gmail_handler.incoming_client, "fetch_gmail_labels", mock_fetch):
+            with patch.object(gmail_handler.incoming_client, "locate_message_id", mock_locate):
+                result = await gmail_handler.get_email_labels("123")
+
+        assert result.labels == ["Work", "Receipts"]
+        mock_fetch.assert_called_once_with("123", "INBOX")
+        mock_locate.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_create_label_without_prefix(self, gmail_handler):
+        mock_create = AsyncMock(return_value=(True, "Folder 'Work' created successfully"))
+
+        with patch.object(gmail_handler.incoming_client, "create_folder", mock_create):
+            result = await gmail_handler.create_label("Work")
+
+        assert result.success is True
+        mock_create.assert_called_once_with("Work")
+
+
 @pytest.fixture
 def email_server():
     return EmailServer(
@@ -555,6 +620,168 @@ class TestEmailClientLabels:
             assert result is None
 
 
+def _remove_copies_imap(capabilities=("IMAP4rev1", "UIDPLUS")):
+    """INBOX UIDs 1-3 and their copies in a label folder as UIDs 10 and 11, plus an unrelated UID 12."""
+    mock_imap = AsyncMock()
+    mock_imap._client_task = asyncio.Future()
+    mock_imap._client_task.set_result(None)
+    mock_imap.protocol = MagicMock()
+    mock_imap.protocol.capabilities = set(capabilities)
+    mock_imap.select = AsyncMock(return_value=("OK", [b"3 EXISTS", b"OK [UIDVALIDITY 1] UIDs valid"]))
+    mock_imap.examine = mock_imap.select
+    mock_imap.uid_search = AsyncMock(return_value=("OK", [b"10 11 12"]))
+    message_ids = {
+        "1": "<a@example.com>",
+        "2": "<b@example.com>",
+        "3": "<c@example.com>",
+        "10": "<a@example.com>",
+        "11": "<b@example.com>",
+        "12": "<b@example.com.au>",
+    }
+
+    async def uid(command, uid_set, *args):
+        if command != "fetch":
+            return ("OK", [])
+        data = []
+        for email_id in _expand_sequence_set(uid_set):
+            header = f"Message-ID: {message_ids[email_id]}\r\n\r\n".encode()
+            data += [f"1 FETCH (UID {email_id} BODY[HEADER.FIELDS (MESSAGE-ID)] {{{len(header)}}}".encode()]
+            data += [bytearray(header), b")"]
+        return ("OK", data)
+
+    mock_imap.uid = AsyncMock(side_effect=uid)
+    return mock_imap
+
+
+class TestEmailClientRemoveCopies:
+    """Test removing label copies in batches on one session."""
+
+    @pytest.mark.asyncio
+    async def test_one_search_store_and_expunge(self, email_client):
+        mock_imap = _remove_copies_imap()
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap) as imap_class:
+            removed, failed = await email_client.remove_copies(["1", "2", "3"], "Archive", "Labels/Work")
+
+        assert (removed, failed) == (["1", "2"], ["3"])
+        assert imap_class.call_count == 1
+        mock_imap.uid_search.assert_called_once_with(
+            'OR OR HEADER MESSAGE-ID "<a@example.com>" HEADER MESSAGE-ID "<b@example.com>"'
+            ' HEADER MESSAGE-ID "<c@example.com>"'
+        )
+        assert [c.args for c in mock_imap.uid.call_args_list] == [
+            ("fetch", "1:3", "(UID BODY.PEEK[HEADER.FIELDS (MESSAGE-ID)])"),
+            ("fetch", "10:12", "(UID BODY.PEEK[HEADER.FIELDS (MESSAGE-ID)])"),
+            ("store", "10:11", "+FLAGS", r"(\Deleted)"),
+            ("expunge", "10:11"),
+        ]
+        assert mock_imap.select.call_args_list[0].args == ('"Archive"',)
+        mock_imap.expunge.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_expunge_without_uidplus(self, email_client):
+        mock_imap = _remove_copies_imap(capabilities=("IMAP4rev1",))
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            removed, _ = await email_client.remove_copies(["1"], "INBOX", "Labels/Work")
+
+        assert removed == ["1"]
+        mock_imap.expunge.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_missing_label_folder_fails_all(self, email_client):
+        mock_imap = _remove_copies_imap()
+        mock_imap.select = AsyncMock(side_effect=[("OK", [b"3 EXISTS"]), ("NO", [b"No such mailbox"])])
+        mock_imap.examine = mock_imap.select
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            removed, failed = await email_client.remove_copies(["1", "2"], "INBOX", "Labels/Gone")
+
+        assert (removed, failed) == ([], ["1", "2"])
+        mock_imap.uid_search.assert_not_called()
+
+
+def _gmail_imap(fetch_data=None):
+    mock_imap = AsyncMock()
+    mock_imap._client_task = asyncio.Future()
+    mock_imap._client_task.set_result(None)
+    mock_imap.protocol = MagicMock()
+    mock_imap.protocol.capabilities = {"IMAP4rev1", "UIDPLUS", "X-GM-EXT-1"}
+    mock_imap.select = AsyncMock(return_value=("OK", [b"3 EXISTS", b"OK [UIDVALIDITY 1] UIDs valid"]))
+    mock_imap.examine = mock_imap.select
+    mock_imap.uid = AsyncMock(return_value=("OK", fetch_data or []))
+    return mock_imap
+
+
+class TestEmailClientGmailLabels:
+    """Test X-GM-LABELS STORE and FETCH on a Gmail server."""
+
+    def test_parse_labels(self):
+        attributes = b'1 FETCH (X-GM-LABELS (\\Inbox \\Important "Work/Q3 plans" Receipts "say \\"hi\\"") UID 7)'
+
+        assert _gmail_labels(attributes) == ["Work/Q3 plans", "Receipts", 'say "hi"']
+        assert _gmail_labels(b"1 FETCH (X-GM-LABELS () UID 7)") == []
+
+    @pytest.mark.asyncio
+    async def test_store_labels_on_one_session(self, email_client):
+        mock_imap = _gmail_imap()
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap) as imap_class:
+            stored, failed = await email_client.store_gmail_labels(["1", "2", "3"], "INBOX", ["Work", "Q3 plans"], True)
+
+        assert (stored, failed) == (["1", "2", "3"], [])
+        assert imap_class.call_count == 1
+        mock_imap.uid.assert_called_once_with("store", "1:3", "+X-GM-LABELS", '("Work" "Q3 plans")')
+
+    @pytest.mark.asyncio
+    async def test_remove_labels_rejected(self, email_client):
+        mock_imap = _gmail_imap()
+        mock_imap.uid = AsyncMock(return_value=("NO", [b"STORE failed"]))
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            stored, failed = await email_client.store_gmail_labels(["5"], "INBOX", ["Work"], False)
+
+        assert (stored, failed) == ([], ["5"])
+        mock_imap.uid.assert_called_once_with("store", "5", "-X-GM-LABELS", '("Work")')
+
+    @pytest.mark.asyncio
+    async def test_fetch_labels(self, email_client):
+        mock_imap = _gmail_imap([b'1 FETCH (UID 7 X-GM-LABELS (\\Inbox "Work"))', b"Fetch completed"])
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            labels = await email_client.fetch_gmail_labels("7", "Receipts")
+
+        # The label folder being read is a label of the email too
+        assert labels == ["Receipts", "Work"]
+        mock_imap.uid.assert_called_once_with("fetch", "7", "(UID X-GM-LABELS)")
+
+    @pytest.mark.asyncio
+    async def test_fetch_labels_missing_email(self, email_client):
+        mock_imap = _gmail_imap([b"Fetch completed"])
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            assert await email_client.fetch_gmail_labels("7") is None
+
+    @pytest.mark.asyncio
+    async def test_list_labels_skips_system_folders(self, email_client):
+        get_capability_store().record_capabilities(email_client._server_key, ["IMAP4rev1", "X-GM-EXT-1"])
+        mock_folders = [
+            Folder(name="INBOX", delimiter="/", flags=[]),
+            Folder(name="[Gmail]", delimiter="/", flags=["\\Noselect"]),
+            Folder(name="[Gmail]/Sent Mail", delimiter="/", flags=["\\Sent"]),
+            Folder(name="Work", delimiter="/", flags=[]),
+            Folder(name="Work/Projects", delimiter="/", flags=[]),
+        ]
+
+        with patch.object(email_client, "list_folders", AsyncMock(return_value=mock_folders)):
+            result = await email_client.list_labels()
+
+        assert [(label.name, label.full_path) for label in result] == [
+            ("Work", "Work"),
+            ("Work/Projects", "Work/Projects"),
+        ]
+
+
 class TestEmailClientLabelEdgeCases:
     """Test edge cases for EmailClient label operations."""
 
@@ -578,20 +805,19 @@ class TestEmailClientLabelEdgeCases:
     @pytest.mark.asyncio
     async def test_remove_label_email_not_in_label(self, classic_handler):
         """Test remove_label when email is not in the label folder."""
-        mock_get_message_id = AsyncMock(return_value="<msg123@example.com>")
-        mock_search = AsyncMock(return_value=None)  # Email not found in label
+        mock_remove = AsyncMock(return_value=([], ["123"]))  # Email not found in label
 
-        with patch.object(classic_handler.incoming_client, "get_email_message_id", mock_get_message_id):
-            with patch.object(classic_handler.incoming_client, "search_by_message_id", mock_search):
-                result = await classic_handler.remove_label(
-                    email_ids=["123"],
-                    label_name="Important",
-                )
+        with patch.object(classic_handler.incoming_client, "remove_copies", mock_remove):
+            result = await classic_handler.remove_label(
+                email_ids=["123"],
+                label_name="Important",
+            )
 
-                assert isinstance(result, EmailMoveResponse)
-                assert result.success is False
-                assert result.failed_ids == ["123"]
-                assert result.moved_ids == []
+            assert isinstance(result, EmailMoveResponse)
+            assert result.success is False
+            assert result.failed_ids == ["123"]
+            assert result.moved_ids == []
+            mock_remove.assert_called_once_with(["123"], "INBOX", "Labels/Important")
 
     @pytest.mark.asyncio
     async def test_get_email_labels_no_message_id(self, classic_handler):
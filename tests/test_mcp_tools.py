@@ -2,7 +2,10 @@ from datetime import datetime, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+from pydantic import AnyUrl
 
+from mcp_email_server import app
 from mcp_email_server.app import (
     add_email_account,
     delete_emails,
@@ -11,6 +14,7 @@ from mcp_email_server.app import (
     list_available_accounts,
     list_emails_metadata,
     mark_emails,
+    search_emails,
     send_email,
 )
 from mcp_email_server.config import EmailServer, EmailSettings, ProviderSettings
@@ -21,6 +25,8 @@ from mcp_email_server.emails.models import (
     EmailMarkResponse,
     EmailMetadata,
     EmailMetadataPageResponse,
+    EmailSearchResponse,
+    EmailSearchResult,
 )
 
 
@@ -174,6 +180,7 @@ class TestMcpTools:
                 seen=None,
                 flagged=None,
                 answered=None,
+                gmail_query=None,
             )
 
     @pytest.mark.asyncio
@@ -222,6 +229,7 @@ class TestMcpTools:
                 seen=None,
                 flagged=None,
                 answered=None,
+                gmail_query=None,
             )
 
     @pytest.mark.asyncio
@@ -267,7 +275,7 @@ class TestMcpTools:
             assert result.emails[0].subject == "Test Subject"
 
             # Verify dispatch_handler and get_emails_content were called correctly
-            mock_handler.get_emails_content.assert_called_once_with(["12345"], "INBOX")
+            mock_handler.get_emails_content.assert_called_once_with(["12345"], "INBOX", 0, 20000)
 
     @pytest.mark.asyncio
     async def test_get_emails_content_batch(self):
@@ -323,7 +331,7 @@ class TestMcpTools:
             assert result.emails[1].email_id == "12346"
 
             # Verify dispatch_handler and get_emails_content were called correctly
-            mock_handler.get_emails_content.assert_called_once_with(["12345", "12346", "12347"], "INBOX")
+            mock_handler.get_emails_content.assert_called_once_with(["12345", "12346", "12347"], "INBOX", 0, 20000)
 
     @pytest.mark.asyncio
     async def test_get_emails_content_with_mailbox(self):
@@ -357,7 +365,31 @@ class TestMcpTools:
             )
 
             assert result == batch_response
-            mock_handler.get_emails_content.assert_called_once_with(["12345"], "Sent")
+            mock_handler.get_emails_content.assert_called_once_with(["12345"], "Sent", 0, 20000)
+
+    @pytest.mark.asyncio
+    async def test_get_emails_content_body_page(self):
+        """Test get_emails_content MCP tool reading a later page of the body."""
+        batch_response = EmailContentBatchResponse(
+            emails=[],
+            requested_count=1,
+            retrieved_count=0,
+            failed_ids=["12345"],
+        )
+
+        mock_handler = AsyncMock()
+        mock_handler.get_emails_content.return_value = batch_response
+
+        with patch("mcp_email_server.app.dispatch_handler", return_value=mock_handler):
+            result = await get_emails_content(
+                account_name="test_account",
+                email_ids=["12345"],
+                body_offset=20000,
+                body_length=5000,
+            )
+
+            assert result == batch_response
+            mock_handler.get_emails_content.assert_called_once_with(["12345"], "INBOX", 20000, 5000)
 
     @pytest.mark.asyncio
     async def test_send_email(self):
@@ -587,6 +619,52 @@ class TestMcpTools:
                     "12345", "document.pdf", "/var/downloads/document.pdf", "INBOX"
                 )
 
+    @pytest.mark.asyncio
+    async def test_search_emails_disabled(self):
+        """Test search_emails MCP tool when the full-text index is disabled."""
+        mock_settings = MagicMock()
+        mock_settings.full_text_index = False
+
+        with patch("mcp_email_server.app.get_settings", return_value=mock_settings):
+            with pytest.raises(PermissionError) as exc_info:
+                await search_emails(account_name="test_account", query="invoice")
+
+            assert "Full-text search is disabled" in str(exc_info.value)
+
+    @pytest.mark.asyncio
+    async def test_search_emails_enabled(self):
+        """Test search_emails MCP tool when the full-text index is enabled."""
+        search_response = EmailSearchResponse(
+            query="invoice",
+            page=1,
+            page_size=10,
+            results=[
+                EmailSearchResult(
+                    email_id="12345",
+                    mailbox="INBOX",
+                    subject="Invoice",
+                    sender="billing@example.com",
+                    date=datetime.now(timezone.utc),
+                    snippet="**Invoice**",
+                    score=1.5,
+                )
+            ],
+            total=1,
+        )
+
+        mock_settings = MagicMock()
+        mock_settings.full_text_index = True
+
+        mock_handler = AsyncMock()
+        mock_handler.search_emails.return_value = search_response
+
+        with patch("mcp_email_server.app.get_settings", return_value=mock_settings):
+            with patch("mcp_email_server.app.dispatch_handler", return_value=mock_handler):
+                result = await search_emails(account_name="test_account", query="invoice", mailbox="Archive")
+
+                assert result == search_response
+                mock_handler.search_emails.assert_called_once_with("invoice", "Archive", 1, 10)
+
     @pytest.mark.asyncio
     async def test_send_email_with_reply_headers(self):
         """Test send_email MCP tool with reply headers."""
@@ -642,3 +720,114 @@ class TestMcpTools:
             )
 
             assert result.emails[0].message_id == "<test@example.com>"
+
+
+class TestLifespan:
+    @pytest.mark.asyncio
+    async def test_lifespan_warms_and_closes_pools(self, email_settings, provider_settings):
+        mock_settings = MagicMock(imap_pool_min_size=1)
+        mock_settings.get_accounts.return_value = [email_settings, provider_settings]
+        mock_handler = MagicMock()
+        mock_handler.incoming_client.pool.warm = AsyncMock()
+
+        with (
+            patch("mcp_email_server.app.get_settings", return_value=mock_settings),
+            patch("mcp_email_server.app.dispatch_handler", return_value=mock_handler) as dispatch,
+            patch("mcp_email_server.app.close_connection_pools", new_callable=AsyncMock) as close,
+        ):
+            async with app._lifespan(app.mcp):
+                dispatch.assert_called_once_with("test_account")
+                mock_handler.incoming_client.pool.warm.assert_awaited_once()
+                close.assert_not_called()
+
+            close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_lifespan_survives_unreachable_server(self, email_settings):
+        mock_settings = MagicMock(imap_pool_min_size=1)
+        mock_settings.get_accounts.return_value = [email_settings]
+        mock_handler = MagicMock()
+        mock_handler.incoming_client.pool.warm = AsyncMock(side_effect=OSError("unreachable"))
+
+        with (
+            patch("mcp_email_server.app.get_settings", return_value=mock_settings),
+            patch("mcp_email_server.app.dispatch_handler", return_value=mock_handler),
+            patch("mcp_email_server.app.close_connection_pools", new_callable=AsyncMock) as close,
+        ):
+            async with app._lifespan(app.mcp):
+                pass
+
+            close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_lifespan_skips_warming_without_min_size(self, email_settings):
+        mock_settings = MagicMock(imap_pool_min_size=0)
+        mock_settings.get_accounts.return_value = [email_settings]
+
+        with (
+            patch("mcp_email_server.app.get_settings", return_value=mock_settings),
+            patch("mcp_email_server.app.dispatch_handler") as dispatch,
+            patch("mcp_email_server.app.close_connection_pools", new_callable=AsyncMock),
+        ):
+            async with app._lifespan(app.mcp):
+                dispatch.assert_not_called()
+
+
+class TestResourceSubscriptions:
+    @pytest.mark.asyncio
+    async def test_notify_account_drops_closed_sessions(self):
+        """Subscribers are notified; failing sessions are dropped and the watchers stopped with the last one."""
+        uri = "email://work"
+        alive, closed = AsyncMock(), AsyncMock()
+        closed.send_resource_updated.side_effect = RuntimeError("closed")
+        watcher = MagicMock()
+
+        with (
+            patch.dict(app._subscriptions, {"work": {alive: uri, closed: uri}}),
+            patch.dict(app._watchers, {"work": [watcher]}),
+        ):
+            await app._notify_account("work", "INBOX")
+
+            alive.send_resource_updated.assert_called_once_with(uri)
+            assert app._subscriptions["work"] == {alive: uri}
+            watcher.stop.assert_not_called()
+
+            alive.send_resource_updated.side_effect = RuntimeError("closed")
+            await app._notify_account("work", "INBOX")
+
+            assert "work" not in app._subscriptions
+            watcher.stop.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_subscribe_request_starts_watchers(self):
+        """The server advertises resources.subscribe and a resources/subscribe request watches the account."""
+        watcher = MagicMock()
+        handler = MagicMock()
+        handler.watch.return_value = [watcher]
+        uri = AnyUrl("email://work")
+
+        with (
+            patch("mcp_email_server.app.dispatch_handler", return_value=handler),
+            patch.dict(app._subscriptions),
+            patch.dict(app._watchers),
+        ):
+            async with create_connected_server_and_client_session(app.mcp._mcp_server) as client:
+                initialized = await client.initialize()
+                await client.subscribe_resource(uri)
+
+                assert list(app._subscriptions["work"].values()) == [uri]
+                assert app._watchers["work"] == [watcher]
+
+                await client.unsubscribe_resource(uri)
+
+        assert initialized.capabilities.resources.subscribe is True
+        watcher.stop.assert_called_once()
+
+    def test_account_from_uri_matches_case_insensitively(self, email_settings):
+        mock_settings = MagicMock()
+        mock_settings.get_accounts.return_value = [email_settings]
+
+        with patch("mcp_email_server.app.get_settings", return_value=mock_settings):
+            assert app._account_from_uri("email://test_account") == "test_account"
+            assert app._account_from_uri("email://TEST_ACCOUNT/") == "test_account"
+            assert app._account_from_uri("email://unknown") == "unknown"
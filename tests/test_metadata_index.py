@@ -0,0 +1,587 @@
+"""Tests for the local email metadata index."""
+
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, call, patch
+
+import pytest
+
+from mcp_email_server.config import EmailServer, get_settings
+from mcp_email_server.emails.classic import EmailClient, _expand_sequence_set
+from mcp_email_server.emails.index import MetadataIndex, get_metadata_index
+
+
+def _entry(uid, subject="Hello", flags=(), cc=()):
+    return {
+        "email_id": str(uid),
+        "message_id": f"<{uid}@example.com>",
+        "subject": subject,
+        "from": "Sender <sender@example.com>",
+        "to": ["to@example.com", *cc],
+        "cc": list(cc),
+        "date": datetime(2024, 1, uid, 12, tzinfo=timezone.utc),
+        "attachments": [],
+        "flags": list(flags),
+        "size": 100,
+    }
+
+
+def _headers_response(uids):
+    data = []
+    for uid in uids:
+        data.append(f"{uid} FETCH (UID {uid} FLAGS () RFC822.SIZE 100 BODY[HEADER] {{80}}".encode())
+        data.append(bytearray(f"Subject: Email {uid}\r\nDate: Mon, {uid} Jan 2024 00:00:00 +0000\r\n\r\n".encode()))
+        data.append(b")")
+    return ("OK", data)
+
+
+def _make_imap(uids, uidvalidity=1, highestmodseq=None, capabilities=("IMAP4rev1",), changes=("OK", [])):
+    imap = AsyncMock()
+    imap._client_task = asyncio.Future()
+    imap._client_task.set_result(None)
+    imap.protocol = MagicMock()
+    imap.timeout = 10
+    imap.protocol.capabilities = set(capabilities)
+    imap.protocol.new_tag = MagicMock(return_value="A1")
+    imap.protocol.pending_async_commands = {}
+
+    async def execute(command):
+        if command.name != "FETCH":
+            return MagicMock(result="OK", lines=[b"ENABLED QRESYNC"])
+        # Like aioimaplib, hand VANISHED lines to the command waiting for them, minus the name
+        status, lines = changes
+        collector = imap.protocol.pending_async_commands.get("VANISHED")
+        for line in lines:
+            if collector is not None and line.startswith(b"VANISHED "):
+                collector.append_to_resp(line.removeprefix(b"VANISHED "))
+        return MagicMock(result=status, lines=[line for line in lines if not line.startswith(b"VANISHED ")])
+
+    imap.protocol.execute = AsyncMock(side_effect=execute)
+    select_lines = [
+        f"{len(uids)} EXISTS".encode(),
+        f"OK [UIDVALIDITY {uidvalidity}] UIDs valid".encode(),
+        f"OK [UIDNEXT {max(uids, default=0) + 1}] Predicted next UID".encode(),
+    ]
+    if highestmodseq is not None:
+        select_lines.append(f"OK [HIGHESTMODSEQ {highestmodseq}] Highest".encode())
+    imap.examine = AsyncMock(return_value=("OK", select_lines))
+    imap.uid_search = AsyncMock(return_value=("OK", [" ".join(map(str, uids)).encode()]))
+
+    def uid(command, uid_set, *args):
+        requested = {int(u) for u in _expand_sequence_set(uid_set)} if uid_set != "1:*" else set(uids)
+        return _headers_response([u for u in uids if u in requested])
+
+    imap.uid = AsyncMock(side_effect=uid)
+    return imap
+
+
+def _changedsince_fetches(imap):
+    return [str(c.args[0]) for c in imap.protocol.execute.call_args_list if c.args[0].name == "FETCH"]
+
+
+@pytest.fixture
+def email_client():
+    server = EmailServer(user_name="index_user", password="pw", host="imap.index.example.com", port=993)
+    return EmailClient(server, use_index=True)
+
+
+class TestMetadataIndex:
+    def test_query_filters_sorts_and_pages(self):
+        index = MetadataIndex(None)
+        index.reset_mailbox("acct", "INBOX", 1)
+        index.add("acct", "INBOX", [_entry(uid, flags=["\\Seen"] if uid % 2 else []) for uid in range(1, 11)])
+
+        page, total = index.query("acct", "INBOX", offset=2, limit=3)
+        assert total == 10
+        assert [m["email_id"] for m in page] == ["8", "7", "6"]
+
+        page, total = index.query("acct", "INBOX", order="asc", limit=2, seen=True)
+        assert total == 5
+        assert [m["email_id"] for m in page] == ["1", "3"]
+
+        _, total = index.query("acct", "INBOX", since=datetime(2024, 1, 4), before=datetime(2024, 1, 6))
+        assert total == 2
+
+    def test_text_filters_match_substrings(self):
+        index = MetadataIndex(None)
+        index.reset_mailbox("acct", "INBOX", 1)
+        index.add("acct", "INBOX", [_entry(1, subject="Invoice 100%"), _entry(2, cc=["boss@example.com"])])
+
+        assert index.query("acct", "INBOX", subject="invoice")[1] == 1
+        assert index.query("acct", "INBOX", subject="0%")[1] == 1
+        assert index.query("acct", "INBOX", subject="_")[1] == 0
+        # TO matches only To; Cc addresses are still returned as recipients
+        assert index.query("acct", "INBOX", to_address="boss")[1] == 0
+        page, _ = index.query("acct", "INBOX", subject="Hello")
+        assert page[0]["to"] == ["to@example.com", "boss@example.com"]
+
+    def test_date_filters_use_internaldate(self):
+        index = MetadataIndex(None)
+        index.reset_mailbox("acct", "INBOX", 1)
+        # Written on the 10th, arrived on the 2nd; no INTERNALDATE falls back to the Date header
+        index.add(
+            "acct", "INBOX", [{**_entry(10), "internaldate": datetime(2024, 1, 2, tzinfo=timezone.utc)}, _entry(3)]
+        )
+
+        assert index.query("acct", "INBOX", since=datetime(2024, 1, 5))[1] == 0
+        page, total = index.query("acct", "INBOX", before=datetime(2024, 1, 5))
+        assert total == 2
+        assert page[0]["date"] == datetime(2024, 1, 10, 12, tzinfo=timezone.utc)
+
+    def test_non_ascii_recipients_match(self):
+        index = MetadataIndex(None)
+        index.reset_mailbox("acct", "INBOX", 1)
+        index.add("acct", "INBOX", [{**_entry(1), "to": ["Zoë Müller <zoe@exämple.com>"]}])
+
+        page, total = index.query("acct", "INBOX", to_address="zoë müller")
+        assert total == 1
+        assert page[0]["to"] == ["Zoë Müller <zoe@exämple.com>"]
+        assert index.query("acct", "INBOX", to_address="exämple")[1] == 1
+
+    def test_index_without_internaldate_is_rebuilt(self, tmp_path):
+        index = MetadataIndex(tmp_path / "db.sqlite3")
+        index.reset_mailbox("acct", "INBOX", 1)
+        index.add("acct", "INBOX", [_entry(1)])
+        index.conn.execute("ALTER TABLE email_metadata DROP COLUMN internaldate")
+        index.close()
+
+        reopened = MetadataIndex(tmp_path / "db.sqlite3")
+        assert reopened.count("acct", "INBOX") == 0
+        assert reopened.mailbox_state("acct", "INBOX") is None
+
+    def test_reset_and_flag_updates(self, tmp_path):
+        index = MetadataIndex(tmp_path / "db.sqlite3")
+        index.reset_mailbox("acct", "INBOX", 1)
+        index.add("acct", "INBOX", [_entry(1), _entry(2)])
+        index.update_flag("acct", "INBOX", ["1"], "\\Seen", add=True)
+        index.close()
+
+        reopened = MetadataIndex(tmp_path / "db.sqlite3")
+        assert reopened.query("acct", "INBOX", seen=True)[1] == 1
+        reopened.reset_mailbox("acct", "INBOX", 2)
+        assert reopened.count("acct", "INBOX") == 0
+        assert reopened.mailbox_state("acct", "INBOX").uidvalidity == 2
+
+    def test_index_follows_db_location(self, tmp_path):
+        assert get_metadata_index().db_path == tmp_path / "db.sqlite3"
+
+
+class TestEmailClientIndex:
+    @pytest.mark.asyncio
+    async def test_first_listing_fills_index(self, email_client):
+        imap = _make_imap([1, 2, 3])
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            metadata, total = await email_client.get_emails_metadata_page(page=1, page_size=2)
+
+        assert total == 3
+        assert [m["email_id"] for m in metadata] == ["3", "2"]
+        imap.uid.assert_called_once_with("fetch", "1:3", "(UID FLAGS RFC822.SIZE INTERNALDATE BODY.PEEK[HEADER])")
+        assert email_client.index.count(email_client._server_key, "INBOX") == 3
+
+    @pytest.mark.asyncio
+    async def test_only_new_emails_are_fetched(self, email_client):
+        with patch.object(email_client, "imap_class", return_value=_make_imap([1, 2, 3])):
+            await email_client.get_emails_metadata_page()
+
+        imap = _make_imap([2, 3, 4])
+        with patch.object(email_client, "imap_class", return_value=imap):
+            metadata, total = await email_client.get_emails_metadata_page()
+
+        assert total == 3
+        assert [m["email_id"] for m in metadata] == ["4", "3", "2"]
+        imap.uid.assert_called_once_with("fetch", "4", "(UID FLAGS RFC822.SIZE INTERNALDATE BODY.PEEK[HEADER])")
+
+    @pytest.mark.asyncio
+    async def test_unchanged_mailbox_is_answered_locally(self, email_client):
+        with patch.object(email_client, "imap_class", return_value=_make_imap([1, 2, 3])):
+            await email_client.get_emails_metadata_page()
+
+        imap = _make_imap([1, 2, 3])
+        with patch.object(email_client, "imap_class", return_value=imap):
+            metadata, total = await email_client.get_emails_metadata_page(subject="Email 2")
+
+        assert total == 1
+        assert metadata[0]["email_id"] == "2"
+        imap.uid_search.assert_not_called()
+        imap.uid.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_flag_filter_rereads_only_candidate_flags(self, email_client):
+        with patch.object(email_client, "imap_class", return_value=_make_imap([1, 2, 3, 4, 5])):
+            await email_client.get_emails_metadata_page()
+
+        imap = _make_imap([1, 2, 3, 4, 5])
+        with patch.object(email_client, "imap_class", return_value=imap):
+            metadata, total = await email_client.get_emails_metadata_page(subject="Email 2", seen=False)
+
+        assert total == 1
+        assert metadata[0]["email_id"] == "2"
+        assert imap.uid.call_args_list == [call("fetch", "2", "(UID FLAGS)")]
+
+    @pytest.mark.asyncio
+    async def test_uidvalidity_change_rebuilds_index(self, email_client):
+        with patch.object(email_client, "imap_class", return_value=_make_imap([1, 2, 3])):
+            await email_client.get_emails_metadata_page()
+
+        imap = _make_imap([1, 2], uidvalidity=2)
+        with patch.object(email_client, "imap_class", return_value=imap):
+            _, total = await email_client.get_emails_metadata_page()
+
+        assert total == 2
+        imap.uid.assert_called_once_with("fetch", "1:2", "(UID FLAGS RFC822.SIZE INTERNALDATE BODY.PEEK[HEADER])")
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_server_without_uidvalidity(self, email_client):
+        imap = _make_imap([1])
+        imap.examine = AsyncMock(return_value=("OK", [b"1 EXISTS"]))
+        imap.uid_search = AsyncMock(return_value=("OK", [b"1"]))
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            _, total = await email_client.get_emails_metadata_page()
+
+        assert total == 1
+        assert email_client.index.count(email_client._server_key, "INBOX") == 0
+
+    @pytest.mark.asyncio
+    async def test_gmail_query_is_searched_on_server(self, email_client):
+        gmail = ("IMAP4rev1", "X-GM-EXT-1")
+        with patch.object(email_client, "imap_class", return_value=_make_imap([1, 2, 3], capabilities=gmail)):
+            await email_client.get_emails_metadata_page()
+
+        imap = _make_imap([1, 2, 3], capabilities=gmail)
+        imap.uid_search = AsyncMock(return_value=("OK", [b"2"]))
+        with patch.object(email_client, "imap_class", return_value=imap):
+            metadata, total = await email_client.get_emails_metadata_page(gmail_query='has:attachment "Q3 plan"')
+
+        assert total == 1
+        assert metadata[0]["email_id"] == "2"
+        assert imap.uid_search.call_args.args[-2:] == ("X-GM-RAW", '"has:attachment \\"Q3 plan\\""')
+
+    @pytest.mark.asyncio
+    async def test_gmail_query_needs_gmail(self, email_client):
+        imap = _make_imap([1])
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            with pytest.raises(ValueError, match="X-GM-EXT-1"):
+                await email_client.get_emails_metadata_page(gmail_query="is:starred")
+
+        imap.uid_search.assert_not_called()
+
+
+class TestIncrementalSync:
+    CONDSTORE = ("IMAP4rev1", "CONDSTORE")
+    QRESYNC = ("IMAP4rev1", "CONDSTORE", "QRESYNC")
+
+    async def _fill(self, email_client, capabilities):
+        imap = _make_imap([1, 2, 3], highestmodseq=10, capabilities=capabilities)
+        with patch.object(email_client, "imap_class", return_value=imap):
+            await email_client.get_emails_metadata_page()
+
+    @pytest.mark.asyncio
+    async def test_changedsince_fetches_only_changes(self, email_client):
+        await self._fill(email_client, self.CONDSTORE)
+        changes = ("OK", [b"2 FETCH (UID 2 MODSEQ (11) FLAGS (\\Seen))", b"4 FETCH (UID 4 MODSEQ (12) FLAGS ())"])
+        imap = _make_imap([1, 2, 3, 4], highestmodseq=12, capabilities=self.CONDSTORE, changes=changes)
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            metadata, total = await email_client.get_emails_metadata_page(seen=True)
+
+        assert total == 1
+        assert metadata[0]["email_id"] == "2"
+        assert _changedsince_fetches(imap) == ["A1 UID FETCH 1:* (UID FLAGS) (CHANGEDSINCE 10)"]
+        assert imap.uid.call_args_list == [call("fetch", "4", "(UID FLAGS RFC822.SIZE INTERNALDATE BODY.PEEK[HEADER])")]
+        imap.uid_search.assert_not_called()
+        assert email_client.index.mailbox_state(email_client._server_key, "INBOX").highestmodseq == 12
+
+    @pytest.mark.asyncio
+    async def test_unchanged_modseq_needs_no_fetch(self, email_client):
+        await self._fill(email_client, self.CONDSTORE)
+        imap = _make_imap([1, 2, 3], highestmodseq=10, capabilities=self.CONDSTORE)
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            _, total = await email_client.get_emails_metadata_page(flagged=True)
+
+        assert total == 0
+        imap.uid.assert_not_called()
+        imap.uid_search.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_qresync_vanished_removes_without_search(self, email_client):
+        await self._fill(email_client, self.QRESYNC)
+        changes = ("OK", [b"VANISHED (EARLIER) 1", b"Fetch completed"])
+        imap = _make_imap([2, 3], highestmodseq=11, capabilities=self.QRESYNC, changes=changes)
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            metadata, total = await email_client.get_emails_metadata_page()
+
+        assert total == 2
+        assert [m["email_id"] for m in metadata] == ["3", "2"]
+        assert _changedsince_fetches(imap) == ["A1 UID FETCH 1:* (UID FLAGS) (CHANGEDSINCE 10 VANISHED)"]
+        imap.uid.assert_not_called()
+        assert imap.protocol.pending_async_commands == {}
+        imap.uid_search.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_expunge_without_qresync_is_found_by_uid(self, email_client):
+        await self._fill(email_client, self.CONDSTORE)
+        imap = _make_imap([2, 3], highestmodseq=11, capabilities=self.CONDSTORE)
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            _, total = await email_client.get_emails_metadata_page()
+
+        assert total == 2
+        imap.uid_search.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_rejected_changedsince_falls_back_to_uid_diff(self, email_client):
+        await self._fill(email_client, self.CONDSTORE)
+        imap = _make_imap([1, 2, 3, 4], highestmodseq=12, capabilities=self.CONDSTORE, changes=("BAD", []))
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            _, total = await email_client.get_emails_metadata_page()
+
+        assert total == 4
+        imap.uid_search.assert_called_once()
+        assert email_client.capabilities.supports("CONDSTORE") is False
+
+
+def _raw_email(uid, body):
+    return f"Subject: Email {uid}\r\nFrom: sender@example.com\r\nDate: Mon, {uid} Jan 2024 00:00:00 +0000\r\n\r\n{body}\r\n".encode()
+
+
+class TestFullTextIndex:
+    def _index(self):
+        index = MetadataIndex(None)
+        index.add_text("acct", "INBOX", {**_entry(1, subject="Quarterly budget"), "body": "Numbers inside"})
+        index.add_text("acct", "INBOX", {**_entry(2, subject="Lunch"), "body": "Bring the budget report"})
+        index.add_text("acct", "Archive", {**_entry(3, subject="Old"), "body": "budget from last year"})
+        return index
+
+    def test_search_ranks_and_highlights(self):
+        index = self._index()
+
+        results, total = index.search("acct", "budget")
+        assert total == 3
+        assert results[0]["email_id"] == "1"
+        assert results[0]["snippet"] == "Quarterly **budget**"
+        assert results[0]["score"] > results[1]["score"]
+
+        results, total = index.search("acct", 'budg* "report', mailbox="INBOX")
+        assert total == 1
+        assert results[0]["snippet"] == "Bring the **budget** **report**"
+        assert index.search("other", "budget")[1] == 0
+
+    def test_removed_emails_leave_the_text_index(self):
+        index = self._index()
+        index.remove("acct", "INBOX", [1])
+        index.drop_mailbox("acct", "Archive")
+
+        results, total = index.search("acct", "budget")
+        assert total == 1
+        assert results[0]["email_id"] == "2"
+
+    @pytest.mark.asyncio
+    async def test_missing_bodies_are_fetched_once(self, email_client, monkeypatch):
+        monkeypatch.setattr(get_settings(), "full_text_index", True)
+        with patch.object(email_client, "imap_class", return_value=_make_imap([1, 2])):
+            await email_client.get_emails_metadata_page()
+
+        imap = _make_imap([1, 2])
+        imap.uid = AsyncMock(
+            return_value=(
+                "OK",
+                [
+                    b"1 FETCH (UID 2 RFC822 {100}",
+                    bytearray(_raw_email(2, "Invoice for March")),
+                    b")",
+                    b"2 FETCH (UID 1 RFC822 {100}",
+                    bytearray(_raw_email(1, "Lunch plans")),
+                    b")",
+                ],
+            )
+        )
+        with patch.object(email_client, "imap_class", return_value=imap):
+            assert await email_client.index_missing_text("INBOX") == 2
+            assert await email_client.index_missing_text("INBOX") == 0
+
+        imap.uid.assert_called_once_with("fetch", "1:2", "RFC822")
+        results, total = email_client.search_text("invoice")
+        assert total == 1
+        assert results[0]["email_id"] == "2"
+
+    def test_search_requires_full_text_index(self, email_client):
+        with pytest.raises(RuntimeError, match="full-text index"):
+            email_client.search_text("invoice")
+
+
+def _make_folders_imap(folders, uidvalidity=1):
+    """An IMAP mock serving several mailboxes; ``folders`` maps mailbox -> {uid: Message-ID}."""
+    imap = _make_imap([])
+    selected = []
+
+    async def examine(mailbox):
+        selected[:] = [mailbox.strip('"')]
+        emails = folders.get(selected[0])
+        if emails is None:
+            return ("NO", [b"Mailbox does not exist"])
+        return (
+            "OK",
+            [
+                f"{len(emails)} EXISTS".encode(),
+                f"OK [UIDVALIDITY {uidvalidity}] UIDs valid".encode(),
+                f"OK [UIDNEXT {max(emails, default=0) + 1}] Predicted next UID".encode(),
+            ],
+        )
+
+    async def status(mailbox, names):
+        emails = folders.get(mailbox.strip('"'))
+        if emails is None:
+            return ("NO", [b"Mailbox does not exist"])
+        uidnext = max(emails, default=0) + 1
+        return ("OK", [f"{mailbox} (MESSAGES {len(emails)} UIDNEXT {uidnext} UIDVALIDITY {uidvalidity})".encode()])
+
+    async def uid_search(criteria):
+        emails = folders[selected[0]]
+        if criteria.startswith("HEADER MESSAGE-ID"):
+            wanted = criteria.split('"')[1]
+            return ("OK", [" ".join(str(uid) for uid, mid in emails.items() if mid == wanted).encode()])
+        return ("OK", [" ".join(map(str, emails)).encode()])
+
+    async def uid(command, uid_set, *args):
+        emails = folders[selected[0]]
+        data = []
+        for u in _expand_sequence_set(uid_set):
+            raw = f"Message-ID: {emails[int(u)]}\r\nDate: Mon, 1 Jan 2024 00:00:00 +0000\r\n\r\n".encode()
+            data += [f"{u} FETCH (UID {u} FLAGS () BODY[HEADER] {{{len(raw)}}}".encode(), bytearray(raw), b")"]
+        return ("OK", data)
+
+    imap.examine = AsyncMock(side_effect=examine)
+    imap.select = imap.examine
+    imap.status = AsyncMock(side_effect=status)
+    imap.uid_search = AsyncMock(side_effect=uid_search)
+    imap.uid = AsyncMock(side_effect=uid)
+    return imap
+
+
+class TestMessageIdIndex:
+    FOLDERS = {  # noqa: RUF012
+        "INBOX": {1: "<a@example.com>", 2: "<b@example.com>"},
+        "Labels/Work": {10: "<a@example.com>"},
+        "Labels/Home": {20: "<b@example.com>", 21: "<a@example.com>"},
+        "Labels/Empty": {},
+    }
+
+    def test_locate_across_mailboxes(self):
+        index = MetadataIndex(None)
+        for mailbox, uids in (("INBOX", [1, 2]), ("Labels/Work", [3])):
+            index.reset_mailbox("acct", mailbox, 1)
+            index.add("acct", mailbox, [_entry(uid) for uid in uids])
+        index.add("acct", "Labels/Work", [{**_entry(4), "message_id": " <1@example.com> "}])
+
+        assert index.locate("acct", "<1@example.com>") == {"INBOX": [1], "Labels/Work": [4]}
+        assert index.locate("other", "<1@example.com>") == {}
+        assert index.message_id("acct", "INBOX", "2") == "<2@example.com>"
+        assert index.message_id("acct", "INBOX", 9) is None
+
+    def _sessions(self, folders=None):
+        """An imap_class side effect giving each session its own mock, so parallel sessions keep their own state."""
+        sessions = []
+
+        def connect(*args):
+            sessions.append(_make_folders_imap(folders or self.FOLDERS))
+            return sessions[-1]
+
+        return sessions, connect
+
+    @pytest.mark.asyncio
+    async def test_labels_found_over_parallel_sessions(self, email_client, monkeypatch):
+        monkeypatch.setattr(get_settings(), "folder_concurrency", 2)
+        sessions, connect = self._sessions()
+        labels = ["Labels/Work", "Labels/Home", "Labels/Empty"]
+
+        with patch.object(email_client, "imap_class", side_effect=connect):
+            locations = await email_client.locate_message_id("<a@example.com>", labels)
+
+        assert locations == {"Labels/Work": ["10"], "Labels/Home": ["21"]}
+        assert len(sessions) == 2
+        assert sum(imap.examine.call_count for imap in sessions) == 3
+        assert not any(c.args[0].startswith("HEADER") for imap in sessions for c in imap.uid_search.call_args_list)
+
+    @pytest.mark.asyncio
+    async def test_unchanged_folders_answered_locally(self, email_client):
+        labels = ["Labels/Work", "Labels/Home"]
+        with patch.object(email_client, "imap_class", side_effect=self._sessions()[1]):
+            await email_client.locate_message_id("<a@example.com>", labels)
+
+        sessions, connect = self._sessions()
+        with patch.object(email_client, "imap_class", side_effect=connect):
+            locations = await email_client.locate_message_id("<b@example.com>", labels)
+
+        assert locations == {"Labels/Home": ["20"]}
+        for imap in sessions:
+            imap.examine.assert_not_called()
+            imap.uid.assert_not_called()
+            imap.uid_search.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_only_changed_folders_resynced(self, email_client):
+        labels = ["Labels/Work", "Labels/Home"]
+        with patch.object(email_client, "imap_class", side_effect=self._sessions()[1]):
+            await email_client.locate_message_id("<a@example.com>", labels)
+        folders = {**self.FOLDERS, "Labels/Work": {10: "<a@example.com>", 11: "<b@example.com>"}}
+
+        sessions, connect = self._sessions(folders)
+        with patch.object(email_client, "imap_class", side_effect=connect):
+            locations = await email_client.locate_message_id("<b@example.com>", labels)
+
+        assert locations == {"Labels/Work": ["11"], "Labels/Home": ["20"]}
+        assert [c.args[0] for imap in sessions for c in imap.examine.call_args_list] == ['"Labels/Work"']
+        assert [c.args[1] for imap in sessions for c in imap.uid.call_args_list] == ["11"]
+
+    @pytest.mark.asyncio
+    async def test_unindexable_folders_searched_on_server(self, email_client):
+        imap = _make_folders_imap(self.FOLDERS)
+        examine = imap.examine.side_effect
+
+        async def examine_without_uidvalidity(mailbox):
+            status, lines = await examine(mailbox)
+            return status, [line for line in lines if b"UIDVALIDITY" not in line]
+
+        imap.examine.side_effect = examine_without_uidvalidity
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            locations = await email_client.locate_message_id("<a@example.com>", ["Labels/Work"])
+
+        assert locations == {"Labels/Work": ["10"]}
+        imap.uid_search.assert_called_once_with('HEADER MESSAGE-ID "<a@example.com>"')
+
+    @pytest.mark.asyncio
+    async def test_missing_folder_holds_nothing(self, email_client):
+        with patch.object(email_client, "imap_class", side_effect=self._sessions()[1]):
+            locations = await email_client.locate_message_id("<a@example.com>", ["Labels/Gone", "Labels/Work"])
+
+        assert locations == {"Labels/Work": ["10"]}
+
+    @pytest.mark.asyncio
+    async def test_message_id_read_from_index(self, email_client):
+        with patch.object(email_client, "imap_class", return_value=_make_folders_imap(self.FOLDERS)):
+            await email_client.locate_message_id("<a@example.com>", ["INBOX"])
+
+        imap = _make_folders_imap(self.FOLDERS)
+        with patch.object(email_client, "imap_class", return_value=imap):
+            assert await email_client.get_email_message_id("2", "INBOX") == "<b@example.com>"
+
+        imap.uid.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_copies_removed_via_index(self, email_client):
+        imap = _make_folders_imap(self.FOLDERS)
+
+        with patch.object(email_client, "imap_class", return_value=imap):
+            removed, failed = await email_client.remove_copies(["1", "2"], "INBOX", "Labels/Home")
+
+        assert (removed, failed) == (["1", "2"], [])
+        assert not any(c.args[0].startswith("HEADER") for c in imap.uid_search.call_args_list)
+        imap.uid.assert_any_call("store", "20:21", "+FLAGS", r"(\Deleted)")
+        assert email_client.index.uids(email_client._server_key, "Labels/Home") == set()
@@ -7,6 +7,7 @@ from unittest.mock import AsyncMock, patch
 import pytest
 
 from mcp_email_server.config import EmailServer, EmailSettings
+from mcp_email_server.emails.capabilities import get_capability_store
 from mcp_email_server.emails.classic import ClassicEmailHandler, EmailClient
 
 
@@ -201,7 +202,7 @@ class TestClassicEmailHandlerSaveToSent:
         mock_append = AsyncMock(return_value=True)
 
         with patch.object(handler.outgoing_client, "send_email", mock_send):
-            with patch.object(handler.outgoing_client, "append_to_sent", mock_append):
+            with patch.object(handler.incoming_client, "append_to_sent", mock_append):
                 await handler.send_email(
                     recipients=["recipient@example.com"],
                     subject="Test",
@@ -209,11 +210,7 @@ class TestClassicEmailHandlerSaveToSent:
                 )
 
                 mock_send.assert_called_once()
-                mock_append.assert_called_once_with(
-                    mock_msg,
-                    email_settings_with_save_to_sent.incoming,
-                    "INBOX.Sent",
-                )
+                mock_append.assert_called_once_with(mock_msg, "INBOX.Sent")
 
     @pytest.mark.asyncio
     async def test_send_email_skips_append_when_disabled(self, email_settings_without_save_to_sent):
@@ -225,7 +222,7 @@ class TestClassicEmailHandlerSaveToSent:
         mock_append = AsyncMock()
 
         with patch.object(handler.outgoing_client, "send_email", mock_send):
-            with patch.object(handler.outgoing_client, "append_to_sent", mock_append):
+            with patch.object(handler.incoming_client, "append_to_sent", mock_append):
                 await handler.send_email(
                     recipients=["recipient@example.com"],
                     subject="Test",
@@ -241,26 +238,15 @@ class TestEmailClientAppendToSent:
 
     @pytest.fixture
     def email_client(self):
-        """Create an EmailClient for testing."""
+        """Create an incoming EmailClient for testing."""
         server = EmailServer(
-            user_name="test_user",
-            password="test_password",
-            host="smtp.example.com",
-            port=465,
-            use_ssl=True,
-        )
-        return EmailClient(server)
-
-    @pytest.fixture
-    def incoming_server(self):
-        """Create an incoming EmailServer for testing."""
-        return EmailServer(
             user_name="test_user",
             password="test_password",
             host="imap.example.com",
             port=993,
             use_ssl=True,
         )
+        return EmailClient(server)
 
     @pytest.fixture
     def mock_imap_for_append(self):
@@ -276,93 +262,76 @@ class TestEmailClientAppendToSent:
         return mock
 
     @pytest.mark.asyncio
-    async def test_append_to_sent_success(self, email_client, incoming_server, mock_imap_for_append):
+    async def test_append_to_sent_success(self, email_client, mock_imap_for_append):
         """Test successful append to sent folder."""
         msg = MIMEText("Test body")
         msg["Subject"] = "Test"
         msg["From"] = "test@example.com"
         msg["To"] = "recipient@example.com"
 
-        with patch("mcp_email_server.emails.classic.aioimaplib") as mock_aioimaplib:
-            mock_aioimaplib.IMAP4_SSL.return_value = mock_imap_for_append
-
-            result = await email_client.append_to_sent(msg, incoming_server, "INBOX.Sent")
+        with patch.object(email_client, "imap_class", return_value=mock_imap_for_append):
+            result = await email_client.append_to_sent(msg, "INBOX.Sent")
 
             assert result is True
-            mock_imap_for_append.select.assert_called_with('"INBOX.Sent"')
+            mock_imap_for_append.select.assert_not_called()
             mock_imap_for_append.append.assert_called_once()
+            assert mock_imap_for_append.append.call_args.kwargs["mailbox"] == '"INBOX.Sent"'
 
     @pytest.mark.asyncio
-    async def test_append_to_sent_auto_detect_folder(self, email_client, incoming_server, mock_imap_for_append):
+    async def test_append_to_sent_auto_detect_folder(self, email_client, mock_imap_for_append):
         """Test auto-detection of sent folder."""
         msg = MIMEText("Test body")
         msg["Subject"] = "Test"
 
-        # First folder fails, second succeeds
-        mock_imap_for_append.select = AsyncMock(side_effect=[("NO", []), ("OK", [])])
-
-        with patch("mcp_email_server.emails.classic.aioimaplib") as mock_aioimaplib:
-            mock_aioimaplib.IMAP4_SSL.return_value = mock_imap_for_append
+        # First folder does not exist, second succeeds
+        mock_imap_for_append.append = AsyncMock(side_effect=[("NO", [b"[TRYCREATE] No such folder"]), ("OK", [])])
 
-            result = await email_client.append_to_sent(msg, incoming_server, None)
+        with patch.object(email_client, "imap_class", return_value=mock_imap_for_append):
+            result = await email_client.append_to_sent(msg, None)
 
             assert result is True
+            assert mock_imap_for_append.append.call_args.kwargs["mailbox"] == '"INBOX.Sent"'
 
     @pytest.mark.asyncio
-    async def test_append_to_sent_no_valid_folder(self, email_client, incoming_server, mock_imap_for_append):
+    async def test_append_to_sent_no_valid_folder(self, email_client, mock_imap_for_append):
         """Test when no valid sent folder is found."""
         msg = MIMEText("Test body")
 
         # All folders fail
-        mock_imap_for_append.select = AsyncMock(return_value=("NO", []))
-
-        with patch("mcp_email_server.emails.classic.aioimaplib") as mock_aioimaplib:
-            mock_aioimaplib.IMAP4_SSL.return_value = mock_imap_for_append
+        mock_imap_for_append.append = AsyncMock(return_value=("NO", []))
 
-            result = await email_client.append_to_sent(msg, incoming_server, None)
+        with patch.object(email_client, "imap_class", return_value=mock_imap_for_append):
+            result = await email_client.append_to_sent(msg, None)
 
             assert result is False
 
     @pytest.mark.asyncio
-    async def test_append_to_sent_append_fails(self, email_client, incoming_server, mock_imap_for_append):
+    async def test_append_to_sent_append_fails(self, email_client, mock_imap_for_append):
         """Test when append command fails."""
         msg = MIMEText("Test body")
 
         mock_imap_for_append.append = AsyncMock(return_value=("NO", []))
 
-        with patch("mcp_email_server.emails.classic.aioimaplib") as mock_aioimaplib:
-            mock_aioimaplib.IMAP4_SSL.return_value = mock_imap_for_append
-
-            result = await email_client.append_to_sent(msg, incoming_server, "Sent")
+        with patch.object(email_client, "imap_class", return_value=mock_imap_for_append):
+            result = await email_client.append_to_sent(msg, "Sent")
 
             assert result is False
 
     @pytest.mark.asyncio
-    async def test_append_to_sent_login_error(self, email_client, incoming_server, mock_imap_for_append):
+    async def test_append_to_sent_login_error(self, email_client, mock_imap_for_append):
         """Test when login fails."""
         msg = MIMEText("Test body")
 
         mock_imap_for_append.login = AsyncMock(side_effect=Exception("Login failed"))
 
-        with patch("mcp_email_server.emails.classic.aioimaplib") as mock_aioimaplib:
-            mock_aioimaplib.IMAP4_SSL.return_value = mock_imap_for_append
-
-            result = await email_client.append_to_sent(msg, incoming_server, "Sent")
+        with patch.object(email_client, "imap_class", return_value=mock_imap_for_append):
+            result = await email_client.append_to_sent(msg, "Sent")
 
             assert result is False
 
     @pytest.mark.asyncio
-    async def test_append_to_sent_non_ssl(self, incoming_server, mock_imap_for_append):
+    async def test_append_to_sent_non_ssl(self, mock_imap_for_append):
         """Test append with non-SSL connection."""
-        server = EmailServer(
-            user_name="test_user",
-            password="test_password",
-            host="smtp.example.com",
-            port=465,
-            use_ssl=False,
-        )
-        client = EmailClient(server)
-
         incoming_non_ssl = EmailServer(
             user_name="test_user",
             password="test_password",
@@ -375,8 +344,9 @@ class TestEmailClientAppendToSent:
 
         with patch("mcp_email_server.emails.classic.aioimaplib") as mock_aioimaplib:
             mock_aioimaplib.IMAP4.return_value = mock_imap_for_append
+            client = EmailClient(incoming_non_ssl)
 
-            result = await client.append_to_sent(msg, incoming_non_ssl, "Sent")
+            result = await client.append_to_sent(msg, "Sent")
 
             assert result is True
             mock_aioimaplib.IMAP4.assert_called_once()
@@ -540,29 +510,18 @@ class TestAppendToSentWithFlagDetection:
 
     @pytest.fixture
     def email_client(self):
-        """Create an EmailClient for testing."""
+        """Create an incoming EmailClient for testing."""
         server = EmailServer(
-            user_name="test_user",
-            password="test_password",
-            host="smtp.example.com",
-            port=465,
-            use_ssl=True,
-        )
-        return EmailClient(server)
-
-    @pytest.fixture
-    def incoming_server(self):
-        """Create an incoming EmailServer for testing."""
-        return EmailServer(
             user_name="test_user",
             password="test_password",
             host="imap.example.com",
             port=993,
             use_ssl=True,
         )
+        return EmailClient(server)
 
     @pytest.mark.asyncio
-    async def test_append_uses_flag_detected_folder(self, email_client, incoming_server):
+    async def test_append_uses_flag_detected_folder(self, email_client):
         """Test that append_to_sent uses flag-detected folder when auto-detecting."""
         msg = MIMEText("Test body")
 
@@ -581,17 +540,17 @@ class TestAppendToSentWithFlagDetection:
         mock_imap.append = AsyncMock(return_value=("OK", []))
         mock_imap.logout = AsyncMock()
 
-        with patch("mcp_email_server.emails.classic.aioimaplib") as mock_aioimaplib:
-            mock_aioimaplib.IMAP4_SSL.return_value = mock_imap
-
-            result = await email_client.append_to_sent(msg, incoming_server, None)
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            result = await email_client.append_to_sent(msg, None)
 
             assert result is True
             # Verify it used the flag-detected folder with proper quoting
-            mock_imap.select.assert_called_with('"Gesendete Objekte"')
+            mock_imap.append.assert_called_once()
+            assert mock_imap.append.call_args.kwargs["mailbox"] == '"Gesendete Objekte"'
+            mock_imap.select.assert_not_called()
 
     @pytest.mark.asyncio
-    async def test_append_prefers_flag_over_explicit(self, email_client, incoming_server):
+    async def test_append_prefers_flag_over_explicit(self, email_client):
         """Test that IMAP flag detection has highest priority, even with explicit folder."""
         msg = MIMEText("Test body")
 
@@ -610,15 +569,51 @@ class TestAppendToSentWithFlagDetection:
         mock_imap.append = AsyncMock(return_value=("OK", []))
         mock_imap.logout = AsyncMock()
 
-        with patch("mcp_email_server.emails.classic.aioimaplib") as mock_aioimaplib:
-            mock_aioimaplib.IMAP4_SSL.return_value = mock_imap
-
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
             # Even with explicit folder, flag-detected should be preferred (most reliable)
-            result = await email_client.append_to_sent(msg, incoming_server, "INBOX.Sent")
+            result = await email_client.append_to_sent(msg, "INBOX.Sent")
 
             assert result is True
             # Should use flag-detected folder (highest priority)
-            mock_imap.select.assert_called_with('"Flag Detected"')
+            assert mock_imap.append.call_args.kwargs["mailbox"] == '"Flag Detected"'
+
+    @staticmethod
+    def _mock_imap(sent_folder="Gesendete Objekte"):
+        mock_imap = AsyncMock()
+        mock_imap._client_task = asyncio.Future()
+        mock_imap._client_task.set_result(None)
+        mock_imap.list = AsyncMock(return_value=("OK", [f'(\\Sent \\HasNoChildren) "/" "{sent_folder}"'.encode()]))
+        mock_imap.append = AsyncMock(return_value=("OK", []))
+        return mock_imap
+
+    @pytest.mark.asyncio
+    async def test_flag_detected_folder_is_remembered(self, email_client):
+        """Test that later sends APPEND to the remembered folder without LIST or SELECT."""
+        with patch.object(email_client, "imap_class", return_value=self._mock_imap()) as imap_class:
+            assert await email_client.append_to_sent(MIMEText("First"), None) is True
+
+            mock_imap = self._mock_imap()
+            imap_class.return_value = mock_imap
+            assert await email_client.append_to_sent(MIMEText("Second"), None) is True
+
+        mock_imap.list.assert_not_called()
+        mock_imap.select.assert_not_called()
+        mock_imap.append.assert_called_once()
+        assert mock_imap.append.call_args.kwargs["mailbox"] == '"Gesendete Objekte"'
+        assert get_capability_store().get(email_client._server_key).sent_folder == "Gesendete Objekte"
+
+    @pytest.mark.asyncio
+    async def test_stale_folder_is_looked_up_again(self, email_client):
+        """Test that a remembered folder that no longer exists is replaced."""
+        get_capability_store().record_sent_folder(email_client._server_key, "Old Sent")
+        mock_imap = self._mock_imap("New Sent")
+        mock_imap.append = AsyncMock(side_effect=[("NO", [b"[TRYCREATE] No such folder"]), ("OK", [])])
+
+        with patch.object(email_client, "imap_class", return_value=mock_imap):
+            assert await email_client.append_to_sent(MIMEText("Body"), None) is True
+
+        assert mock_imap.append.call_args.kwargs["mailbox"] == '"New Sent"'
+        assert get_capability_store().get(email_client._server_key).sent_folder == "New Sent"
 
 
 class TestHandlerErrorHandling:
@@ -655,7 +650,7 @@ class TestHandlerErrorHandling:
         mock_append = AsyncMock(side_effect=Exception("IMAP connection failed"))
 
         with patch.object(handler.outgoing_client, "send_email", mock_send):
-            with patch.object(handler.outgoing_client, "append_to_sent", mock_append):
+            with patch.object(handler.incoming_client, "append_to_sent", mock_append):
                 # Should not raise exception even though append fails
                 await handler.send_email(
                     recipients=["recipient@example.com"],
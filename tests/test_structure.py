@@ -0,0 +1,155 @@
+"""Tests for parsing IMAP FETCH structures (ENVELOPE, BODYSTRUCTURE)."""
+
+from datetime import datetime, timedelta, timezone
+
+from mcp_email_server.emails.structure import (
+    attachment_names,
+    decode_text,
+    format_addresses,
+    parse_envelope,
+    parse_fetch_responses,
+    parse_internaldate,
+    parse_response,
+    walk_bodystructure,
+)
+
+MULTIPART = [
+    ["TEXT", "PLAIN", ["CHARSET", "utf-8"], None, None, "7BIT", 10, 1, None, None, None, None],
+    [
+        ["TEXT", "PLAIN", None, None, None, "QUOTED-PRINTABLE", 20, 1],
+        ["TEXT", "HTML", None, None, None, "BASE64", 30, 1],
+        "ALTERNATIVE",
+    ],
+    ["IMAGE", "PNG", ["NAME", "inline.png"], None, None, "BASE64", 40, None, ["INLINE", None], None, None],
+    ["APPLICATION", "PDF", None, None, None, "BASE64", 50, None, ["ATTACHMENT", ["FILENAME", "report.pdf"]], None],
+    [
+        "MESSAGE",
+        "RFC822",
+        None,
+        None,
+        None,
+        "7BIT",
+        60,
+        [None, "Forwarded", None, None, None, None, None, None, None, None],
+        ["TEXT", "PLAIN", None, None, None, "7BIT", 5, 1],
+        3,
+        None,
+        ["ATTACHMENT", ["FILENAME", "forwarded.eml"]],
+        None,
+        None,
+    ],
+    "MIXED",
+    ["BOUNDARY", "xyz"],
+    None,
+    None,
+    None,
+]
+
+
+class TestParseResponse:
+    def test_tokens(self):
+        assert parse_response([b'(UID 7 FLAGS (\\Seen) X "a \\"b\\"" NIL BODY[HEADER.FIELDS (DATE)]<0>)']) == [
+            ["UID", 7, "FLAGS", ["\\Seen"], "X", 'a "b"', None, "BODY[HEADER.FIELDS (DATE)]<0>"]
+        ]
+
+    def test_literal_in_next_segment(self):
+        assert parse_response([b"(A {5}", bytearray(b"he)lo"), b" B)"]) == [["A", b"he)lo", "B"]]
+
+    def test_inline_literal(self):
+        assert parse_response([b"(A {5}\r\nhe)lo B)"]) == [["A", b"he)lo", "B"]]
+
+    def test_fetch_responses(self):
+        data = [
+            b"1 FETCH (UID 10 FLAGS () SUBJECT {3}",
+            bytearray(b"abc"),
+            b")",
+            b"2 FETCH (UID 11 RFC822.SIZE 99)",
+            b"FETCH completed",
+        ]
+        assert list(parse_fetch_responses(data)) == [
+            {"UID": 10, "FLAGS": [], "SUBJECT": b"abc"},
+            {"UID": 11, "RFC822.SIZE": 99},
+        ]
+
+
+class TestEnvelope:
+    def test_decode_text(self):
+        assert decode_text("=?utf-8?q?J=C3=B6rg?=") == "Jörg"
+        assert decode_text(b"plain") == "plain"
+        assert decode_text(None) == ""
+
+    def test_format_addresses_skips_groups_and_quotes_names(self):
+        addresses = [
+            ["Doe, Jane", None, "jane", "example.com"],
+            [None, None, "team", None],
+            [None, None, "bob", "example.com"],
+            [None, None, None, None],
+        ]
+        assert format_addresses(addresses) == ['"Doe, Jane" <jane@example.com>', "bob@example.com"]
+
+    def test_parse_envelope(self):
+        envelope = parse_envelope([
+            "Mon, 1 Jan 2024 00:00:00 +0000",
+            "=?utf-8?b?UsOpc3Vtw6k=?=",
+            [["Sender", None, "sender", "example.com"]],
+            None,
+            None,
+            [[None, None, "to", "example.com"]],
+            [[None, None, "cc", "example.com"]],
+            None,
+            None,
+            "<1@example.com>",
+        ])
+        assert envelope.subject == "Résumé"
+        assert envelope.sender == ["Sender <sender@example.com>"]
+        assert envelope.to == ["to@example.com"]
+        assert envelope.cc == ["cc@example.com"]
+        assert envelope.message_id == "<1@example.com>"
+
+    def test_malformed_envelope(self):
+        assert parse_envelope(None) is None
+        assert parse_envelope(["too", "short"]) is None
+
+    def test_parse_internaldate(self):
+        assert parse_internaldate(" 2-Jan-2024 08:00:00 +0100") == datetime(
+            2024, 1, 2, 8, tzinfo=timezone(timedelta(hours=1))
+        )
+        assert parse_internaldate("yesterday") is None
+
+
+class TestBodyStructure:
+    def test_sections(self):
+        parts = walk_bodystructure(MULTIPART)
+        assert [(part.section, part.content_type) for part in parts] == [
+            ("1", "text/plain"),
+            ("2.1", "text/plain"),
+            ("2.2", "text/html"),
+            ("3", "image/png"),
+            ("4", "application/pdf"),
+            ("5", "message/rfc822"),
+            ("5.1", "text/plain"),
+        ]
+        assert parts[0].charset == "utf-8"
+        assert parts[1].encoding == "quoted-printable"
+        assert parts[4].size == 50
+
+    def test_single_part_is_section_one(self):
+        parts = walk_bodystructure(["TEXT", "PLAIN", None, None, None, "7BIT", 5, 1])
+        assert [part.section for part in parts] == ["1"]
+
+    def test_attachment_names(self):
+        assert attachment_names(MULTIPART) == ["report.pdf", "forwarded.eml"]
+
+    def test_rfc2231_filename(self):
+        structure = [
+            "APPLICATION",
+            "PDF",
+            None,
+            None,
+            None,
+            "BASE64",
+            10,
+            None,
+            ["ATTACHMENT", ["FILENAME*0*", "utf-8''r%C3%A9", "FILENAME*1", "sumé.pdf"]],
+        ]
+        assert attachment_names(structure) == ["résumé.pdf"]
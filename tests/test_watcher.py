@@ -0,0 +1,157 @@
+"""Tests for the IDLE/NOOP mailbox watcher."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, call, patch
+
+import pytest
+
+from mcp_email_server.config import EmailServer, get_settings
+from mcp_email_server.emails.capabilities import get_capability_store
+from mcp_email_server.emails.classic import EmailClient, SelectedMailbox
+from mcp_email_server.emails.watcher import MailboxWatcher, _mailbox_changes
+
+
+def _state(uidnext, exists):
+    return SelectedMailbox(name="INBOX", readonly=True, uidvalidity=1, uidnext=uidnext, exists=exists)
+
+
+def _make_imap(pushes=()):
+    pushes = list(pushes)
+
+    async def wait_server_push(timeout):
+        if pushes:
+            push = pushes.pop(0)
+            if isinstance(push, Exception):
+                raise push
+            return push
+        await asyncio.Event().wait()
+
+    idle = asyncio.get_running_loop().create_future()
+    idle.set_result(None)
+    imap = AsyncMock()
+    imap.idle_start = AsyncMock(return_value=idle)
+    imap.wait_server_push = AsyncMock(side_effect=wait_server_push)
+    imap.has_pending_idle = MagicMock(return_value=True)
+    imap.idle_done = MagicMock()
+    return imap
+
+
+@pytest.fixture
+def email_client():
+    server = EmailServer(user_name="watch_user", password="pw", host="imap.watch.example.com", port=993)
+    return EmailClient(server)
+
+
+def _watcher(email_client, capabilities, on_change, **kwargs):
+    get_capability_store().record_capabilities(email_client._server_key, capabilities)
+    return MailboxWatcher(email_client, "INBOX", on_change, poll_interval=0, retry_delay=0, **kwargs)
+
+
+class TestMailboxChanges:
+    def test_detects_changes(self):
+        lines = [b"5 EXISTS", b"1 RECENT", b"3 EXPUNGE", b"2 FETCH (FLAGS (\\Seen))", b"VANISHED 4:5"]
+        assert _mailbox_changes(lines) == {"EXISTS", "EXPUNGE", "FETCH", "VANISHED"}
+
+    def test_ignores_other_responses(self):
+        assert _mailbox_changes([b"1 RECENT", b"OK Still here"]) == set()
+        assert _mailbox_changes(None) == set()
+
+
+class TestMailboxWatcher:
+    @pytest.mark.asyncio
+    async def test_idle_push_syncs_and_notifies(self, email_client):
+        changed = asyncio.Queue()
+        imap = _make_imap([[b"4 EXISTS", b"1 RECENT"]])
+        email_client._connect = AsyncMock(return_value=imap)
+        email_client.refresh_index = AsyncMock(side_effect=[_state(4, 3), _state(5, 4)])
+        watcher = _watcher(email_client, ["IMAP4rev1", "IDLE"], changed.put)
+
+        watcher.start()
+        try:
+            assert await asyncio.wait_for(changed.get(), 1) == "INBOX"
+        finally:
+            watcher.stop()
+
+        assert email_client.refresh_index.call_args_list == [
+            call(imap, "INBOX", refresh_flags=False),
+            call(imap, "INBOX", refresh_flags=False),
+        ]
+        imap.idle_done.assert_called()
+        imap.noop.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_polls_with_noop_without_idle(self, email_client):
+        changed = asyncio.Queue()
+        imap = _make_imap()
+        responses = [MagicMock(lines=[b"2 FETCH (FLAGS (\\Seen))"])]
+        imap.noop = AsyncMock(side_effect=lambda: responses.pop(0) if responses else MagicMock(lines=[]))
+        email_client._connect = AsyncMock(return_value=imap)
+        email_client.refresh_index = AsyncMock(return_value=_state(4, 3))
+        watcher = _watcher(email_client, ["IMAP4rev1"], changed.put)
+
+        watcher.start()
+        try:
+            assert await asyncio.wait_for(changed.get(), 1) == "INBOX"
+        finally:
+            watcher.stop()
+
+        assert email_client.refresh_index.call_args_list[1] == call(imap, "INBOX", refresh_flags=True)
+        imap.idle_start.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_reconnect_reports_changes_missed_meanwhile(self, email_client):
+        changed = asyncio.Queue()
+        email_client._connect = AsyncMock(side_effect=[_make_imap([ConnectionError("gone")]), _make_imap()])
+        email_client.refresh_index = AsyncMock(side_effect=[_state(4, 3), _state(6, 5)])
+        watcher = _watcher(email_client, ["IMAP4rev1", "IDLE"], changed.put)
+
+        watcher.start()
+        try:
+            assert await asyncio.wait_for(changed.get(), 1) == "INBOX"
+        finally:
+            watcher.stop()
+
+        assert email_client._connect.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_first_sync_is_logged_and_retried(self, email_client):
+        changed = asyncio.Queue()
+        email_client._connect = AsyncMock(side_effect=[_make_imap(), _make_imap()])
+        email_client.refresh_index = AsyncMock(side_effect=[RuntimeError("index locked"), _state(4, 3), _state(5, 4)])
+        watcher = _watcher(email_client, ["IMAP4rev1", "IDLE"], changed.put)
+
+        with patch("mcp_email_server.emails.watcher.logger") as logger:
+            watcher.start()
+            try:
+                while email_client._connect.call_count < 2:
+                    await asyncio.sleep(0)
+            finally:
+                watcher.stop()
+
+        logger.error.assert_called_once()
+        assert "index locked" in logger.error.call_args.args[0]
+
+
+class TestRefreshIndex:
+    @pytest.mark.asyncio
+    async def test_selects_mailbox_read_write(self, email_client):
+        imap = AsyncMock()
+        imap.select = AsyncMock(return_value=("OK", [b"3 EXISTS", b"OK [UIDVALIDITY 1] UIDs valid"]))
+        email_client._sync_index = AsyncMock()
+
+        state = await email_client.refresh_index(imap, "INBOX")
+
+        imap.select.assert_awaited_once()
+        imap.examine.assert_not_called()
+        assert not state.readonly
+
+    @pytest.mark.asyncio
+    async def test_sync_failure_is_raised(self, email_client, monkeypatch):
+        monkeypatch.setattr(get_settings(), "metadata_index", True)
+        email_client.use_index = True
+        imap = AsyncMock()
+        imap.select = AsyncMock(return_value=("OK", [b"3 EXISTS", b"OK [UIDVALIDITY 1] UIDs valid"]))
+        email_client._sync_index = AsyncMock(side_effect=RuntimeError("index locked"))
+
+        with pytest.raises(RuntimeError, match="index locked"):
+            await email_client.refresh_index(imap, "INBOX")
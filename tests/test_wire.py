@@ -0,0 +1,169 @@
+"""Tests for wire byte counters and COMPRESS=DEFLATE."""
+
+import asyncio
+import zlib
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from mcp_email_server.config import EmailServer
+from mcp_email_server.emails.classic import EmailClient
+from mcp_email_server.emails.wire import WireStats, attach_wire_tap, enable_deflate
+
+
+class FakeTransport(asyncio.Transport):
+    def __init__(self):
+        super().__init__()
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data)
+
+
+class FakeProtocol:
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.received = []
+        self.capabilities = {"IMAP4rev1", "COMPRESS=DEFLATE"}
+
+    def data_received(self, data):
+        self.received.append(data)
+
+
+def _make_imap():
+    imap = AsyncMock()
+    imap._client_task = asyncio.Future()
+    imap._client_task.set_result(None)
+    imap.protocol = FakeProtocol()
+    imap.timeout = 10
+    imap.protocol.new_tag = MagicMock(return_value="A1")
+    imap.protocol.execute = AsyncMock(return_value=MagicMock(result="OK"))
+    imap.id = AsyncMock(return_value=MagicMock(result="OK"))
+    imap.select = AsyncMock(return_value=("OK", [b"3 EXISTS"]))
+    imap.examine = AsyncMock(return_value=("OK", [b"3 EXISTS"]))
+    imap.uid_search = AsyncMock(return_value=(None, [b"1 2 3"]))
+    return imap
+
+
+class TestWireTap:
+    def test_counts_uncompressed_traffic(self):
+        imap = _make_imap()
+        raw_transport = imap.protocol.transport
+        stats = WireStats()
+        attach_wire_tap(imap, stats)
+
+        imap.protocol.transport.write(b"A1 NOOP\r\n")
+        imap.protocol.data_received(b"A1 OK NOOP completed\r\n")
+
+        assert raw_transport.written == [b"A1 NOOP\r\n"]
+        assert imap.protocol.received == [b"A1 OK NOOP completed\r\n"]
+        assert stats.bytes_sent == stats.payload_bytes_sent == 9
+        assert stats.bytes_received == stats.payload_bytes_received == 22
+        assert stats.compression_ratio == 1.0
+
+    def test_deflate_round_trip(self):
+        imap = _make_imap()
+        raw_transport = imap.protocol.transport
+        stats = WireStats()
+        tap = attach_wire_tap(imap, stats)
+        tap.start_deflate()
+
+        command = b"A2 UID FETCH 1:500 BODY.PEEK[HEADER]\r\n"
+        imap.protocol.transport.write(command)
+        assert zlib.decompressobj(-15).decompress(raw_transport.written[0]) == command
+
+        response = b"* 1 FETCH (UID 1 BODY[HEADER] {40}\r\nSubject: hello\r\n" * 50
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        wire = compressor.compress(response) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        imap.protocol.data_received(wire[:10])
+        imap.protocol.data_received(wire[10:])
+
+        assert b"".join(imap.protocol.received) == response
+        assert stats.bytes_received == len(wire)
+        assert stats.payload_bytes_received == len(response)
+        assert stats.compression_ratio > 1
+
+    def test_mock_session_is_not_tapped(self):
+        assert attach_wire_tap(AsyncMock(), WireStats()) is None
+
+    @pytest.mark.asyncio
+    async def test_rejected_compress_leaves_stream_plain(self):
+        imap = _make_imap()
+        imap.protocol.execute = AsyncMock(return_value=MagicMock(result="NO"))
+        tap = attach_wire_tap(imap, WireStats())
+
+        assert await enable_deflate(imap, tap) == "NO"
+        assert tap.compressed is False
+
+
+class TestEmailClientCompression:
+    def _client(self, compress):
+        return EmailClient(
+            EmailServer(
+                user_name="wire_user",
+                password="wire_password",
+                host="imap.wire.example.com",
+                port=993,
+                compress=compress,
+            )
+        )
+
+    @pytest.mark.asyncio
+    async def test_negotiates_when_enabled(self):
+        client = self._client(compress=True)
+        imap = _make_imap()
+        raw_transport = imap.protocol.transport
+
+        with (
+            patch.object(client, "imap_class", return_value=imap),
+            patch("mcp_email_server.emails.wire.aioimaplib.Command") as mock_command,
+        ):
+            await client.get_email_count()
+
+        mock_command.assert_called_once_with("COMPRESS", "A1", "DEFLATE")
+        # Everything written from now on is deflated and counted
+        before = client.wire_stats.snapshot()
+        imap.protocol.transport.write(b"A2 LOGOUT\r\n")
+        assert zlib.decompressobj(-15).decompress(raw_transport.written[-1]) == b"A2 LOGOUT\r\n"
+        assert client.wire_stats.since(before).payload_bytes_sent == 11
+
+    @pytest.mark.asyncio
+    async def test_not_negotiated_by_default(self):
+        client = self._client(compress=False)
+        imap = _make_imap()
+
+        with patch.object(client, "imap_class", return_value=imap):
+            await client.get_email_count()
+
+        imap.protocol.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_rejection_is_remembered(self):
+        client = self._client(compress=True)
+        first, second = _make_imap(), _make_imap()
+        first.protocol.execute = AsyncMock(return_value=MagicMock(result="BAD"))
+
+        with patch.object(client, "imap_class", side_effect=[first, second]):
+            await client.get_email_count()
+            await client.get_email_count()
+
+        first.protocol.execute.assert_called_once()
+        second.protocol.execute.assert_not_called()
+        assert client.capabilities.compress_deflate is False
+
+    @pytest.mark.asyncio
+    async def test_unanswered_compress_drops_the_session(self):
+        client = self._client(compress=True)
+        imap = _make_imap()
+        imap.timeout = 0.05
+
+        async def execute(command):
+            await asyncio.Event().wait()  # never answered
+
+        imap.protocol.execute = execute
+
+        with patch.object(client, "imap_class", return_value=imap), pytest.raises(asyncio.TimeoutError):
+            await client.get_email_count()
+
+        imap.logout.assert_awaited_once()
+        assert client.capabilities.compress_deflate is True